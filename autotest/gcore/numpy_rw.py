@@ -736,6 +736,159 @@ def numpy_rw_15():
 
     return 'success'
 
+###############################################################################
+# Test Band.ComputeAllStats() and Dataset.ComputeAllStats()
+
+def numpy_rw_16():
+
+    if gdaltest.numpy_drv is None:
+        return 'skip'
+
+    import numpy
+
+    for (datatype, nodata) in [ (gdal.GDT_Byte, None),
+                                (gdal.GDT_Int16, -5),
+                                (gdal.GDT_UInt32, None),
+                                (gdal.GDT_Float32, 7),
+                                (gdal.GDT_CFloat64, None) ]:
+        ds = gdal.GetDriverByName('MEM').Create('', 67, 53, 2, datatype)
+        for i in range(2):
+            band = ds.GetRasterBand(i + 1)
+            array = (numpy.arange(67 * 53).reshape(53, 67) * (i + 7)) % 241
+            if datatype != gdal.GDT_Byte and datatype != gdal.GDT_UInt32:
+                array = array - 100
+            band.WriteArray(array)
+            if nodata is not None:
+                band.SetNoDataValue(nodata)
+        ref_ds = gdal.GetDriverByName('MEM').CreateCopy('', ds)
+
+        results = ds.ComputeAllStats(num_threads = 3)
+        for i in range(2):
+            ref_band = ref_ds.GetRasterBand(i + 1)
+            ref_stats = ref_band.ComputeStatistics(False)
+            ref_hist = ref_band.GetDefaultHistogram(force = True)
+            ref_checksum = ref_band.Checksum()
+
+            result = results[i]
+            if result['min'] != ref_stats[0] or result['max'] != ref_stats[1] or \
+               abs(result['mean'] - ref_stats[2]) > 1e-8 or \
+               abs(result['stddev'] - ref_stats[3]) > 1e-8:
+                gdaltest.post_reason('wrong statistics')
+                print(datatype, result, ref_stats)
+                return 'fail'
+            if abs(result['histogram'][0] - ref_hist[0]) > 1e-10 or \
+               abs(result['histogram'][1] - ref_hist[1]) > 1e-10 or \
+               result['histogram'][2:] != ref_hist[2:]:
+                gdaltest.post_reason('wrong histogram')
+                print(datatype, result['histogram'], ref_hist)
+                return 'fail'
+            if result['checksum'] != ref_checksum:
+                gdaltest.post_reason('wrong checksum')
+                print(datatype, result['checksum'], ref_checksum)
+                return 'fail'
+
+            # The statistics are set on the band
+            stats = ds.GetRasterBand(i + 1).GetStatistics(False, False)
+            if abs(stats[2] - ref_stats[2]) > 1e-8:
+                gdaltest.post_reason('statistics not set')
+                print(stats, ref_stats)
+                return 'fail'
+
+        # Band level, without histogram nor checksum
+        result = ds.GetRasterBand(2).ComputeAllStats(False, 0, False, num_threads = 1)
+        if result['histogram'] is not None or result['checksum'] is not None or \
+           result['min'] != results[1]['min']:
+            gdaltest.post_reason('failure')
+            print(result)
+            return 'fail'
+
+    # Interruption by the progress callback
+    ds = gdal.GetDriverByName('MEM').Create('', 10, 10)
+    if ds.ComputeAllStats(callback = numpy_rw_14_progress_interrupt_callback,
+                          callback_data = [0]) is not None:
+        gdaltest.post_reason('failure')
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Test gdal_array.OpenArray() with strided arrays, interleave, update and
+# georeferencing arguments
+
+def numpy_rw_17():
+
+    if gdaltest.numpy_drv is None:
+        return 'skip'
+
+    import numpy
+    from osgeo import gdal_array
+    from osgeo import osr
+
+    # Pixel interleaved array
+    array = numpy.arange(4 * 5 * 3, dtype = numpy.uint8).reshape(4, 5, 3)
+    ds = gdal_array.OpenArray( array, interleave = 'pixel' )
+    if ds.RasterCount != 3 or ds.RasterXSize != 5 or ds.RasterYSize != 4:
+        gdaltest.post_reason('failure')
+        return 'fail'
+    for i in range(3):
+        if not numpy.array_equal(ds.GetRasterBand(i + 1).ReadAsArray(), array[:,:,i]):
+            gdaltest.post_reason('failure')
+            print(i)
+            return 'fail'
+
+    # Band sequential view, with steps and reversed lines
+    array = numpy.arange(3 * 20 * 30, dtype = numpy.float32).reshape(3, 20, 30)
+    view = array[1:, ::-2, 3::4]
+    ds = gdal_array.OpenArray( view )
+    if ds.RasterCount != 2 or ds.RasterXSize != 7 or ds.RasterYSize != 10:
+        gdaltest.post_reason('failure')
+        return 'fail'
+    if not numpy.array_equal(ds.ReadAsArray(), view):
+        gdaltest.post_reason('failure')
+        return 'fail'
+
+    # Georeferencing
+    srs = osr.SpatialReference()
+    srs.ImportFromEPSG(32631)
+    ds = gdal_array.OpenArray( view, geotransform = [2, 1, 0, 49, 0, -1],
+                               srs = srs, nodata = [ 5, None ] )
+    if ds.GetGeoTransform() != (2, 1, 0, 49, 0, -1) or \
+       ds.GetProjectionRef().find('32631') < 0 or \
+       ds.GetRasterBand(1).GetNoDataValue() != 5 or \
+       ds.GetRasterBand(2).GetNoDataValue() is not None:
+        gdaltest.post_reason('failure')
+        return 'fail'
+
+    # Update writes in the array
+    array = numpy.zeros( (10, 12), dtype = numpy.int16 )
+    ds = gdal_array.OpenArray( array[2:8, 3:9], update = True )
+    ds.GetRasterBand(1).Fill(7)
+    ds.FlushCache()
+    if array.sum() != 7 * 36 or array[2:8, 3:9].min() != 7:
+        gdaltest.post_reason('failure')
+        print(array)
+        return 'fail'
+    ds = None
+
+    # No update mode on read-only arrays
+    array.flags.writeable = False
+    gdal.PushErrorHandler('CPLQuietErrorHandler')
+    ds = gdal_array.OpenArray( array, update = True )
+    gdal.PopErrorHandler()
+    if ds is not None:
+        gdaltest.post_reason('failure')
+        return 'fail'
+
+    # 64 bit integers cannot be accessed as a GDAL data type
+    gdal.PushErrorHandler('CPLQuietErrorHandler')
+    ds = gdal_array.OpenArray( numpy.zeros( (2, 2), dtype = numpy.int64 ) )
+    gdal.PopErrorHandler()
+    if ds is not None:
+        gdaltest.post_reason('failure')
+        return 'fail'
+
+    return 'success'
+
 def numpy_rw_cleanup():
     gdaltest.numpy_drv = None
 
@@ -757,6 +910,8 @@ gdaltest_list = [
     numpy_rw_13,
     numpy_rw_14,
     numpy_rw_15,
+    numpy_rw_16,
+    numpy_rw_17,
     numpy_rw_cleanup ]
 
 if __name__ == '__main__':
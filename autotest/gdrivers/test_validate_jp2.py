@@ -385,6 +385,42 @@ def test_validate_jp2_8():
 
     return 'success'
 
+###############################################################################
+# Batch validation with a JSON summary
+
+def test_validate_jp2_9():
+
+    if not gdaltest.has_validate_jp2_and_build_jp2:
+        return 'skip'
+
+    import json
+    import validate_jp2
+
+    filenames = [ 'data/test_validate_jp2/byte.jp2',
+                  'data/test_validate_jp2/utmsmall_pct.jp2' ]
+    invalid_count = validate_jp2.validate_batch(filenames, None, True, False, 'disabled',
+                                                summary_filename = 'tmp/validate_jp2_9.json')
+    summary = json.loads(open('tmp/validate_jp2_9.json').read())
+    os.unlink('tmp/validate_jp2_9.json')
+
+    if summary['file_count'] != 2 or summary['invalid_file_count'] != invalid_count:
+        gdaltest.post_reason('fail')
+        print(summary)
+        return 'fail'
+
+    for i in range(2):
+        error_report = validate_jp2.ErrorReport(collect_internally = True)
+        validate_jp2.validate(filenames[i], None, True, False, 'disabled', error_report = error_report)
+        result = summary['files'][i]
+        if result['filename'] != filenames[i] or \
+           result['errors'] != error_report.error_array or \
+           result['warnings'] != error_report.warning_array:
+            gdaltest.post_reason('batch validation differs from single file one')
+            print(result)
+            return 'fail'
+
+    return 'success'
+
 ###############################################################################
 def test_validate_jp2_cleanup():
 
@@ -401,6 +437,7 @@ gdaltest_list = [
     test_validate_jp2_5,
     test_validate_jp2_6,
     test_validate_jp2_7,
+    test_validate_jp2_9,
     test_validate_jp2_cleanup,
 ]
 
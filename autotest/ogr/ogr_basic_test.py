@@ -35,6 +35,7 @@ import gdaltest
 import ogrtest
 from osgeo import gdal
 from osgeo import ogr
+from osgeo import osr
 
 ###############################################################################
 
@@ -633,6 +634,317 @@ def ogr_basic_12():
 
     return 'success'
 
+###############################################################################
+# Test GetField(), GetFieldsAsTuple(), items() and SetField2() with the
+# cached field schema
+
+def ogr_basic_13():
+
+    feat_def = ogr.FeatureDefn()
+    for (name, fld_type) in [ ('int', ogr.OFTInteger),
+                              ('int64', ogr.OFTInteger64),
+                              ('real', ogr.OFTReal),
+                              ('str', ogr.OFTString),
+                              ('date', ogr.OFTDate),
+                              ('intlist', ogr.OFTIntegerList),
+                              ('unset', ogr.OFTString) ]:
+        feat_def.AddFieldDefn(ogr.FieldDefn(name, fld_type))
+
+    feat = ogr.Feature(feat_def)
+    feat.SetField2('int', 1)
+    feat.SetField2('INT64', 12345678901234)
+    feat.SetField2(2, 1.5)
+    feat.SetField2('str', 3)
+    feat.SetField2('date', '2016/01/02')
+    feat.SetField2('intlist', [1, 2])
+
+    expected = (1, 12345678901234, 1.5, '3', '2016/01/02', [1, 2], None)
+    if feat.GetFieldsAsTuple() != expected:
+        gdaltest.post_reason('fail')
+        print(feat.GetFieldsAsTuple())
+        return 'fail'
+    for i in range(feat_def.GetFieldCount()):
+        if feat.GetField(i) != expected[i] or \
+           feat.GetField(feat_def.GetFieldDefn(i).GetName()) != expected[i]:
+            gdaltest.post_reason('fail')
+            print(i)
+            return 'fail'
+    if feat.GetField('Real') != 1.5:
+        gdaltest.post_reason('fail')
+        return 'fail'
+    if feat.keys() != ['int', 'int64', 'real', 'str', 'date', 'intlist', 'unset']:
+        gdaltest.post_reason('fail')
+        print(feat.keys())
+        return 'fail'
+    if feat.items() != dict(zip(feat.keys(), expected)):
+        gdaltest.post_reason('fail')
+        print(feat.items())
+        return 'fail'
+
+    # Not an int, float or string
+    feat.SetField2('str', (1, 2))
+    if feat.GetField('str') != '(1, 2)':
+        gdaltest.post_reason('fail')
+        print(feat.GetField('str'))
+        return 'fail'
+    feat.SetField2('int', True)
+    if feat.GetField('int') != 1:
+        gdaltest.post_reason('fail')
+        return 'fail'
+    feat.SetField2('int', None)
+    if feat.GetField('int') is not None:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    for idx in [-1, feat_def.GetFieldCount(), 'non_existing']:
+        try:
+            feat.GetField(idx)
+            gdaltest.post_reason('expected exception')
+            return 'fail'
+        except ValueError:
+            pass
+
+    return 'success'
+
+###############################################################################
+# Test pickling of FeatureDefn, Feature and FeatureBatch
+
+def ogr_basic_14():
+
+    import pickle
+
+    ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+    srs = osr.SpatialReference()
+    srs.SetFromUserInput('WGS84')
+    lyr = ds.CreateLayer('test', srs = srs, geom_type = ogr.wkbPoint)
+    fld_defn = ogr.FieldDefn('int', ogr.OFTInteger)
+    fld_defn.SetSubType(ogr.OFSTBoolean)
+    fld_defn.SetNullable(0)
+    lyr.CreateField(fld_defn)
+    fld_defn = ogr.FieldDefn('str', ogr.OFTString)
+    fld_defn.SetWidth(10)
+    fld_defn.SetDefault("'def'")
+    lyr.CreateField(fld_defn)
+    lyr.CreateField(ogr.FieldDefn('reallist', ogr.OFTRealList))
+    lyr.CreateField(ogr.FieldDefn('bin', ogr.OFTBinary))
+    lyr.CreateField(ogr.FieldDefn('datetime', ogr.OFTDateTime))
+    for i in range(3):
+        f = ogr.Feature(lyr.GetLayerDefn())
+        f.SetField('int', i % 2)
+        if i != 1:
+            f.SetField('str', 'val%d' % i)
+            f.SetGeometry(ogr.CreateGeometryFromWkt('POINT (%d 2)' % i))
+        f.SetFieldDoubleList(2, [1.5, i])
+        f.SetFieldBinaryFromHexString('bin', '0102%02X' % i)
+        f.SetField('datetime', '2016/01/02 03:04:05.678+01')
+        f.SetStyleString('PEN(c:#FF0000)')
+        lyr.CreateFeature(f)
+
+    defn = pickle.loads(pickle.dumps(lyr.GetLayerDefn()))
+    if defn.GetFieldCount() != 5 or defn.GetGeomFieldCount() != 1 or \
+       defn.GetFieldDefn(0).GetSubType() != ogr.OFSTBoolean or \
+       defn.GetFieldDefn(0).IsNullable() != 0 or \
+       defn.GetFieldDefn(1).GetWidth() != 10 or \
+       defn.GetFieldDefn(1).GetDefault() != "'def'" or \
+       defn.GetGeomType() != ogr.wkbPoint or \
+       not defn.GetGeomFieldDefn(0).GetSpatialRef().IsSame(srs):
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    features = [ f for f in lyr ]
+    got_features = pickle.loads(pickle.dumps(features))
+    batch = pickle.loads(pickle.dumps(ogr.FeatureBatch(lyr)))
+    if len(batch) != 3:
+        gdaltest.post_reason('fail')
+        return 'fail'
+    def same_feature(f1, f2):
+        g1 = f1.GetGeometryRef()
+        g2 = f2.GetGeometryRef()
+        if g1 is not None:
+            g1 = g1.ExportToWkt()
+        if g2 is not None:
+            g2 = g2.ExportToWkt()
+        return f1.GetFID() == f2.GetFID() and g1 == g2 and \
+            f1.GetFieldsAsTuple() == f2.GetFieldsAsTuple() and \
+            f1.GetStyleString() == f2.GetStyleString()
+
+    for got in [ got_features, batch.GetFeatures() ]:
+        for i in range(3):
+            if not same_feature(got[i], features[i]):
+                gdaltest.post_reason('fail')
+                got[i].DumpReadable()
+                features[i].DumpReadable()
+                return 'fail'
+        # Features of the same definition share their FeatureDefn
+        if got[0].GetDefnRef().this != got[2].GetDefnRef().this:
+            gdaltest.post_reason('fail')
+            return 'fail'
+
+    # Shared memory requires Python >= 3.8
+    if sys.version_info < (3, 8):
+        return 'success'
+
+    handle = ogr.FeatureBatch(features).ToSharedMemory()
+    try:
+        got = pickle.loads(pickle.dumps(handle)).GetFeatures()
+    finally:
+        handle.Unlink()
+    if len(got) != 3 or not same_feature(got[2], features[2]):
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Test that the features returned by a layer share its field schema
+
+def ogr_basic_15():
+
+    ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+    lyr = ds.CreateLayer('test')
+    lyr.CreateField(ogr.FieldDefn('int', ogr.OFTInteger))
+    lyr.CreateField(ogr.FieldDefn('str', ogr.OFTString))
+    for i in range(2):
+        f = ogr.Feature(lyr.GetLayerDefn())
+        f.SetField('int', i)
+        f.SetField('str', 'val%d' % i)
+        lyr.CreateFeature(f)
+
+    schema = lyr._GetFieldSchema()
+    features = [ f for f in lyr ]
+    lyr.ResetReading()
+    features.append(lyr.GetNextFeature())
+    features.append(lyr.GetFeature(features[0].GetFID()))
+    for f in features:
+        if f._GetFieldSchema() is not schema:
+            gdaltest.post_reason('fail')
+            return 'fail'
+    if features[3].items() != { 'int': 0, 'str': 'val0' }:
+        gdaltest.post_reason('fail')
+        print(features[3].items())
+        return 'fail'
+    if lyr.GetNextFeature() is None or lyr.GetNextFeature() is not None:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    # Features created from the definition, and the definitions returned by
+    # the layer and its features, share the same schema
+    if ogr.Feature(lyr.GetLayerDefn())._GetFieldSchema() is not schema or \
+       ogr.Feature(feature_def = lyr.GetLayerDefn())._GetFieldSchema() is not schema or \
+       features[0].GetDefnRef().GetFieldSchema() is not schema:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    # Same for a definition that does not belong to a layer
+    defn = ogr.FeatureDefn()
+    defn.AddFieldDefn(ogr.FieldDefn('int', ogr.OFTInteger))
+    defn_schema = defn.GetFieldSchema()
+    if defn.GetFieldSchema() is not defn_schema or \
+       ogr.Feature(defn)._GetFieldSchema() is not defn_schema:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    # A SELECT does not invalidate it
+    sql_lyr = ds.ExecuteSQL('SELECT * FROM test')
+    ds.ReleaseResultSet(sql_lyr)
+    if lyr._GetFieldSchema() is not schema:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Test that the cached field schemas follow the changes of the fields
+
+def ogr_basic_16():
+
+    ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+    lyr = ds.CreateLayer('test')
+    lyr.CreateField(ogr.FieldDefn('int', ogr.OFTInteger))
+    lyr.CreateField(ogr.FieldDefn('str', ogr.OFTString))
+    f = ogr.Feature(lyr.GetLayerDefn())
+    f.SetField('int', 1)
+    f.SetField('str', 'val')
+    lyr.CreateFeature(f)
+
+    def check(expected_keys):
+        lyr.ResetReading()
+        f = lyr.GetNextFeature()
+        if f.keys() != expected_keys:
+            gdaltest.post_reason('fail')
+            print(f.keys())
+            return False
+        return True
+
+    if not check(['int', 'str']):
+        return 'fail'
+
+    fld_defn = ogr.FieldDefn('renamed', ogr.OFTInteger)
+    lyr.AlterFieldDefn(0, fld_defn, ogr.ALTER_NAME_FLAG)
+    if not check(['renamed', 'str']):
+        return 'fail'
+
+    lyr.ReorderFields([1, 0])
+    if not check(['str', 'renamed']):
+        return 'fail'
+
+    # Same field count as before
+    lyr.DeleteField(0)
+    lyr.CreateField(ogr.FieldDefn('real', ogr.OFTReal))
+    if not check(['renamed', 'real']):
+        return 'fail'
+    if lyr._GetFieldSchema().types != (ogr.OFTInteger, ogr.OFTReal):
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    # Through another Python object of the same layer
+    lyr2 = ds.GetLayer(0)
+    lyr2.AlterFieldDefn(1, ogr.FieldDefn('other', ogr.OFTReal), ogr.ALTER_NAME_FLAG)
+    if not check(['renamed', 'other']):
+        return 'fail'
+
+    # Through SQL
+    ds.ExecuteSQL('ALTER TABLE test ADD COLUMN sqladded integer')
+    if not check(['renamed', 'other', 'sqladded']):
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Test pickling of features with strings that are not valid UTF-8
+
+def ogr_basic_17():
+
+    import pickle
+
+    ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+    lyr = ds.CreateLayer('test')
+    lyr.CreateField(ogr.FieldDefn('str', ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn('int', ogr.OFTInteger))
+    for i in range(2):
+        f = ogr.Feature(lyr.GetLayerDefn())
+        # 'caf\xe9', encoded in Latin-1
+        f.SetFieldBinaryFromHexString('str', '636166E9')
+        f.SetField('int', i)
+        lyr.CreateFeature(f)
+
+    features = [ f for f in lyr ]
+    expected = features[0].GetField('str')
+    for got in [ pickle.loads(pickle.dumps(features)),
+                 pickle.loads(pickle.dumps(ogr.FeatureBatch(features))).GetFeatures() ]:
+        for i in range(2):
+            if got[i].GetField('str') != expected or got[i].GetField('int') != i or \
+               got[i].GetFieldAsBinary('str') != features[i].GetFieldAsBinary('str'):
+                gdaltest.post_reason('fail')
+                got[i].DumpReadable()
+                return 'fail'
+        # The unpickled features share one field schema
+        if got[0]._GetFieldSchema() is not got[1]._GetFieldSchema():
+            gdaltest.post_reason('fail')
+            return 'fail'
+
+    return 'success'
+
 ###############################################################################
 # cleanup
 
@@ -655,6 +967,11 @@ gdaltest_list = [
     ogr_basic_10,
     ogr_basic_11,
     ogr_basic_12,
+    ogr_basic_13,
+    ogr_basic_14,
+    ogr_basic_15,
+    ogr_basic_16,
+    ogr_basic_17,
     ogr_basic_cleanup ]
 
 if __name__ == '__main__':
@@ -2122,6 +2122,75 @@ def ogr_geojson_43():
     return 'success'
 
 
+###############################################################################
+# Test Layer.ExportToGeoJSONStream() and Feature.ExportToJson()
+
+def ogr_geojson_44():
+    if gdaltest.geojson_drv is None:
+        return 'skip'
+
+    try:
+        import json
+    except ImportError:
+        return 'skip'
+
+    ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+    lyr = ds.CreateLayer('test')
+    lyr.CreateField(ogr.FieldDefn('str', ogr.OFTString))
+    fld_defn = ogr.FieldDefn('bool', ogr.OFTInteger)
+    fld_defn.SetSubType(ogr.OFSTBoolean)
+    lyr.CreateField(fld_defn)
+    for i in range(5):
+        feat = ogr.Feature(lyr.GetLayerDefn())
+        feat.SetField('str', 'val%d' % i)
+        feat.SetField('bool', i % 2)
+        if i != 3:
+            feat.SetGeometry(ogr.CreateGeometryFromWkt('POINT (%d 2)' % i))
+        lyr.CreateFeature(feat)
+
+    feat = lyr.GetFeature(1)
+    got = json.loads(feat.ExportToJson())
+    if got != feat.ExportToJson(as_object = True) or \
+       got['properties'] != { 'str': 'val1', 'bool': True } or \
+       got['geometry']['coordinates'] != [1, 2] or got['id'] != 1:
+        gdaltest.post_reason('fail')
+        print(got)
+        return 'fail'
+
+    try:
+        from StringIO import StringIO
+    except ImportError:
+        from io import StringIO
+    for batch_size in [1, 2, 1000]:
+        fp = StringIO()
+        count = lyr.ExportToGeoJSONStream(fp, batch_size = batch_size)
+        got = json.loads(fp.getvalue())
+        if count != 5 or got['type'] != 'FeatureCollection' or \
+           len(got['features']) != 5:
+            gdaltest.post_reason('fail')
+            print(fp.getvalue())
+            return 'fail'
+        for (i, feature) in enumerate(got['features']):
+            if feature != lyr.GetFeature(i).ExportToJson(as_object = True):
+                gdaltest.post_reason('fail')
+                print(feature)
+                return 'fail'
+        if got['features'][3]['geometry'] is not None:
+            gdaltest.post_reason('fail')
+            return 'fail'
+
+    # Schema changes must be taken into account
+    lyr.CreateField(ogr.FieldDefn('int', ogr.OFTInteger))
+    fp = StringIO()
+    lyr.ExportToGeoJSONStream(fp)
+    got = json.loads(fp.getvalue())
+    if got['features'][0]['properties'] != { 'str': 'val0', 'bool': False, 'int': None }:
+        gdaltest.post_reason('fail')
+        print(got['features'][0])
+        return 'fail'
+
+    return 'success'
+
 ###############################################################################
 
 def ogr_geojson_cleanup():
@@ -2202,6 +2271,7 @@ gdaltest_list = [
     ogr_geojson_41,
     ogr_geojson_42,
     ogr_geojson_43,
+    ogr_geojson_44,
     ogr_geojson_cleanup ]
 
 if __name__ == '__main__':
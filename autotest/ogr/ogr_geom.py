@@ -855,6 +855,293 @@ def ogr_geom_getpoints():
         
     return 'success'
 
+###############################################################################
+# Test Geometry.GetPointsAsArray() and Geometry.SetPointsFromArray()
+
+def ogr_geom_points_array():
+
+    try:
+        import numpy
+    except ImportError:
+        return 'skip'
+
+    geom = ogr.CreateGeometryFromWkt('LINESTRING(0 1,2 3)')
+    points = geom.GetPointsAsArray()
+    if points.shape != (2, 2) or points.tolist() != [[0.0, 1.0], [2.0, 3.0]]:
+        gdaltest.post_reason('did not get expected points (1)')
+        print(points)
+        return 'fail'
+    points = geom.GetPointsAsArray(nCoordDimension = 3)
+    if points.tolist() != [[0.0, 1.0, 0.0], [2.0, 3.0, 0.0]]:
+        gdaltest.post_reason('did not get expected points (2)')
+        print(points)
+        return 'fail'
+
+    geom = ogr.CreateGeometryFromWkt('POINT(0 1 2)')
+    points = geom.GetPointsAsArray()
+    if points.tolist() != [[0.0, 1.0, 2.0]]:
+        gdaltest.post_reason('did not get expected points (3)')
+        print(points)
+        return 'fail'
+
+    geom = ogr.Geometry(ogr.wkbLineString)
+    geom.SetPointsFromArray(numpy.array([[0, 1], [2, 3], [4, 5]]))
+    if geom.ExportToWkt() != 'LINESTRING (0 1,2 3,4 5)':
+        gdaltest.post_reason('did not get expected geometry (1)')
+        print(geom.ExportToWkt())
+        return 'fail'
+
+    # Non contiguous input and switch to 3D
+    array = numpy.arange(12, dtype = numpy.float64).reshape(3, 4)
+    geom.SetPointsFromArray(array[:, 1:])
+    if geom.ExportToWkt() != 'LINESTRING (1 2 3,5 6 7,9 10 11)':
+        gdaltest.post_reason('did not get expected geometry (2)')
+        print(geom.ExportToWkt())
+        return 'fail'
+
+    # And back to 2D
+    geom.SetPointsFromArray([[0, 0], [1, 1]])
+    if geom.ExportToWkt() != 'LINESTRING (0 0,1 1)':
+        gdaltest.post_reason('did not get expected geometry (3)')
+        print(geom.ExportToWkt())
+        return 'fail'
+
+    geom = ogr.CreateGeometryFromWkt('POLYGON((0 0,0 1,1 1,0 0))')
+    ring = geom.GetGeometryRef(0)
+    ring.SetPointsFromArray(ring.GetPointsAsArray() * 2)
+    if geom.ExportToWkt() != 'POLYGON ((0 0,0 2,2 2,0 0))':
+        gdaltest.post_reason('did not get expected geometry (4)')
+        print(geom.ExportToWkt())
+        return 'fail'
+
+    try:
+        geom.GetPointsAsArray()
+        gdaltest.post_reason('expected exception')
+        return 'fail'
+    except (TypeError, RuntimeError):
+        pass
+
+    try:
+        ogr.Geometry(ogr.wkbPoint).SetPointsFromArray([[0, 0], [1, 1]])
+        gdaltest.post_reason('expected exception')
+        return 'fail'
+    except ValueError:
+        pass
+
+    return 'success'
+
+###############################################################################
+# Test ogr.ExportToWkbArray() and ogr.CreateGeometriesFromWkbArray()
+
+def ogr_geom_wkb_array():
+
+    try:
+        import numpy
+    except ImportError:
+        return 'skip'
+
+    wkts = [ 'POINT (1 2)', None, 'LINESTRING (0 1,2 3)',
+             'POLYGON ((0 0,0 1,1 1,0 0))' ]
+    geoms = []
+    for wkt in wkts:
+        if wkt is None:
+            geoms.append(None)
+        else:
+            geoms.append(ogr.CreateGeometryFromWkt(wkt))
+
+    (data, offsets) = ogr.ExportToWkbArray(geoms)
+    if data.dtype != numpy.uint8 or offsets.dtype != numpy.int64 or \
+       len(offsets) != len(geoms) + 1 or offsets[-1] != len(data):
+        gdaltest.post_reason('fail')
+        print(offsets)
+        return 'fail'
+    if offsets[1] != offsets[2]:
+        gdaltest.post_reason('None should give an empty range')
+        print(offsets)
+        return 'fail'
+    for i in range(len(geoms)):
+        if geoms[i] is not None and \
+           bytes(data[offsets[i]:offsets[i+1]].tobytes()) != bytes(geoms[i].ExportToWkb(ogr.wkbNDR)):
+            gdaltest.post_reason('fail')
+            return 'fail'
+
+    srs = osr.SpatialReference()
+    srs.SetFromUserInput('WGS84')
+    got_geoms = ogr.CreateGeometriesFromWkbArray(data, offsets, srs)
+    if len(got_geoms) != len(wkts) or got_geoms[1] is not None:
+        gdaltest.post_reason('fail')
+        print(got_geoms)
+        return 'fail'
+    for i in range(len(wkts)):
+        if wkts[i] is None:
+            continue
+        if got_geoms[i].ExportToWkt() != wkts[i]:
+            gdaltest.post_reason('fail')
+            print(got_geoms[i].ExportToWkt())
+            return 'fail'
+        if got_geoms[i].GetSpatialReference() is None:
+            gdaltest.post_reason('missing SRS')
+            return 'fail'
+
+    # Also from a bytes buffer and a list of offsets
+    got_geoms = ogr.CreateGeometriesFromWkbArray(data.tobytes(), offsets.tolist())
+    if got_geoms[2].ExportToWkt() != wkts[2]:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    try:
+        ogr.CreateGeometriesFromWkbArray(data[:-1], offsets)
+        gdaltest.post_reason('expected exception')
+        return 'fail'
+    except ValueError:
+        pass
+
+    return 'success'
+
+###############################################################################
+# Test batch predicates and overlays on WKB arrays
+
+def ogr_geom_batch_operations():
+
+    try:
+        import numpy
+    except ImportError:
+        return 'skip'
+
+    if not ogrtest.have_geos():
+        return 'skip'
+
+    poly = ogr.CreateGeometryFromWkt('POLYGON ((0 0,0 10,10 10,10 0,0 0))')
+    wkts = [ 'POINT (5 5)', 'POINT (20 20)', None, 'LINESTRING (5 5,15 5)',
+             'POINT (0 5)', 'POLYGON ((1 1,1 2,2 2,2 1,1 1))' ]
+    geoms = []
+    for wkt in wkts:
+        if wkt is None:
+            geoms.append(None)
+        else:
+            geoms.append(ogr.CreateGeometryFromWkt(wkt))
+    others = ogr.ExportToWkbArray(geoms)
+
+    for (func, method) in [ (ogr.IntersectsArray, 'Intersects'),
+                            (ogr.DisjointArray, 'Disjoint'),
+                            (ogr.ContainsArray, 'Contains'),
+                            (ogr.WithinArray, 'Within'),
+                            (ogr.TouchesArray, 'Touches'),
+                            (ogr.CrossesArray, 'Crosses'),
+                            (ogr.OverlapsArray, 'Overlaps'),
+                            (ogr.EqualsArray, 'Equals') ]:
+        for num_threads in [1, 2]:
+            res = func(poly, others, num_threads)
+            if res.dtype != numpy.bool_ or len(res) != len(geoms):
+                gdaltest.post_reason('fail')
+                print(method)
+                return 'fail'
+            for i in range(len(geoms)):
+                if geoms[i] is None:
+                    expected = False
+                else:
+                    expected = getattr(poly, method)(geoms[i])
+                if res[i] != expected:
+                    gdaltest.post_reason('fail')
+                    print(method, i, res)
+                    return 'fail'
+
+    # Pairwise mode, with a sequence of geometries as input
+    res = ogr.ContainsArray(geoms, geoms)
+    if list(res) != [True, True, False, True, True, True]:
+        gdaltest.post_reason('fail')
+        print(res)
+        return 'fail'
+
+    res = ogr.DistanceArray(poly, others)
+    if res.dtype != numpy.float64 or res[0] != 0 or \
+       abs(res[1] - math.sqrt(200)) > 1e-10 or res[2] != -1:
+        gdaltest.post_reason('fail')
+        print(res)
+        return 'fail'
+
+    (data, offsets) = ogr.IntersectionArray(poly, others)
+    got_geoms = ogr.CreateGeometriesFromWkbArray(data, offsets)
+    if got_geoms[1] is not None or got_geoms[2] is not None or \
+       got_geoms[3].ExportToWkt() != 'LINESTRING (5 5,10 5)':
+        gdaltest.post_reason('fail')
+        print(got_geoms)
+        return 'fail'
+
+    (data, offsets) = ogr.DifferenceArray(poly, others)
+    got_geoms = ogr.CreateGeometriesFromWkbArray(data, offsets)
+    if got_geoms[1].GetArea() != 100 or got_geoms[5].GetArea() != 99:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    try:
+        ogr.IntersectsArray(geoms[0:2], others)
+        gdaltest.post_reason('expected exception')
+        return 'fail'
+    except ValueError:
+        pass
+
+    return 'success'
+
+###############################################################################
+# Test ogr.SpatialIndex
+
+def ogr_geom_spatial_index():
+
+    try:
+        import numpy
+    except ImportError:
+        return 'skip'
+
+    ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+    lyr = ds.CreateLayer('test')
+    for i in range(100):
+        feat = ogr.Feature(lyr.GetLayerDefn())
+        feat.SetGeometry(ogr.CreateGeometryFromWkt('POINT (%d %d)' % (i % 10, i // 10)))
+        lyr.CreateFeature(feat)
+    feat = ogr.Feature(lyr.GetLayerDefn())
+    lyr.CreateFeature(feat)
+
+    index = ogr.SpatialIndex.FromLayer(lyr, node_capacity = 4)
+    if len(index) != 100 or index.GetExtent() != (0, 9, 0, 9):
+        gdaltest.post_reason('fail')
+        print(len(index), index.GetExtent())
+        return 'fail'
+
+    # Compare to the spatial filter of the layer
+    rects = [ (0.5, 0.5, 2.5, 1.5), (-10, -10, -5, -5), (8, 8, 100, 100), (3, 3, 3, 3) ]
+    for rect in rects:
+        lyr.SetSpatialFilterRect(rect[0], rect[1], rect[2], rect[3])
+        expected = sorted([f.GetFID() for f in lyr])
+        got = index.Query(rect[0], rect[1], rect[2], rect[3])
+        if list(got) != expected:
+            gdaltest.post_reason('fail')
+            print(rect, got, expected)
+            return 'fail'
+    lyr.SetSpatialFilter(None)
+
+    rects = numpy.array(rects)
+    (fids, offsets) = index.QueryMany(rects[:,0], rects[:,1], rects[:,2], rects[:,3])
+    if list(offsets) != [0, 2, 2, 6, 7] or list(fids[offsets[3]:offsets[4]]) != [33]:
+        gdaltest.post_reason('fail')
+        print(fids, offsets)
+        return 'fail'
+
+    got = index.Nearest(3.2, 5.1, 3)
+    if list(got) != [53, 54, 63]:
+        gdaltest.post_reason('fail')
+        print(got)
+        return 'fail'
+
+    index.Save('tmp/ogr_geom_spatial_index.idx')
+    index = ogr.SpatialIndex.Load('tmp/ogr_geom_spatial_index.idx')
+    gdal.Unlink('tmp/ogr_geom_spatial_index.idx')
+    if list(index.Query(0.5, 0.5, 2.5, 1.5)) != [11, 12]:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    return 'success'
+
 ###############################################################################
 # Test OGRGeometry::empty()
 
@@ -3312,6 +3599,10 @@ gdaltest_list = [
     ogr_geom_length_geometrycollection,
     ogr_geom_empty,
     ogr_geom_getpoints,
+    ogr_geom_points_array,
+    ogr_geom_wkb_array,
+    ogr_geom_batch_operations,
+    ogr_geom_spatial_index,
     ogr_geom_mixed_coordinate_dimension,
     ogr_geom_getenvelope3d,
     ogr_geom_z_empty,
@@ -581,6 +581,81 @@ def ogr_mem_15():
 
     return 'success'
 
+###############################################################################
+# Test Layer.WriteArrays()
+
+def ogr_mem_16():
+
+    try:
+        import numpy
+    except ImportError:
+        return 'skip'
+
+    lyr = gdaltest.mem_ds.CreateLayer('write_arrays')
+    lyr.CreateField(ogr.FieldDefn('int', ogr.OFTInteger))
+    lyr.CreateField(ogr.FieldDefn('real', ogr.OFTReal))
+    lyr.CreateField(ogr.FieldDefn('str', ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn('date', ogr.OFTDate))
+
+    geoms = [ ogr.CreateGeometryFromWkt('POINT (%d 2)' % i) for i in range(5) ]
+    geoms[2] = None
+    columns = { 'int': numpy.ma.masked_array(numpy.arange(5), mask = [0, 1, 0, 0, 0]),
+                'real': numpy.arange(5) * 1.5,
+                'str': numpy.array(['a', 'b', 'c', 'd', 'e']),
+                'date': numpy.array(['2016-01-02', 'NaT', '2016-01-04', '2016-01-05', '2016-01-06'],
+                                    dtype = 'datetime64[D]') }
+    ret = lyr.WriteArrays(columns, geometry_wkb = ogr.ExportToWkbArray(geoms),
+                          fids = [10, 11, 12, 13, 14], batch_size = 2)
+    if ret != 5 or lyr.GetFeatureCount() != 5:
+        gdaltest.post_reason('fail')
+        print(ret)
+        return 'fail'
+
+    f = lyr.GetFeature(11)
+    if f.GetField('int') is not None or f.GetField('real') != 1.5 or \
+       f.GetField('str') != 'b' or f.GetField('date') is not None or \
+       f.GetGeometryRef().ExportToWkt() != 'POINT (1 2)':
+        gdaltest.post_reason('fail')
+        f.DumpReadable()
+        return 'fail'
+    f = lyr.GetFeature(12)
+    if f.GetField('int') != 2 or f.GetField('date') != '2016/01/04' or \
+       f.GetGeometryRef() is not None:
+        gdaltest.post_reason('fail')
+        f.DumpReadable()
+        return 'fail'
+
+    # Sequence of WKB and object column, without FIDs
+    ret = lyr.WriteArrays({ 'str': numpy.array([None, 'x'], dtype = object) },
+                          geometry_wkb = [ geoms[0].ExportToWkb(), None ])
+    if ret != 2 or lyr.GetFeatureCount() != 7:
+        gdaltest.post_reason('fail')
+        return 'fail'
+    lyr.SetAttributeFilter("str = 'x'")
+    f = lyr.GetNextFeature()
+    lyr.SetAttributeFilter(None)
+    if f is None or f.GetGeometryRef() is not None or f.GetField('int') is not None:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    # Type and length validation
+    for (columns, exception) in [ ({ 'int': numpy.array([1.5]) }, TypeError),
+                                  ({ 'date': numpy.array([1]) }, TypeError),
+                                  ({ 'non_existing': numpy.array([1]) }, ValueError),
+                                  ({ 'int': numpy.array([1]), 'real': numpy.array([1.5, 2]) }, ValueError) ]:
+        try:
+            lyr.WriteArrays(columns)
+            gdaltest.post_reason('expected exception')
+            print(columns)
+            return 'fail'
+        except exception:
+            pass
+    if lyr.GetFeatureCount() != 7:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    return 'success'
+
 def ogr_mem_cleanup():
 
     if gdaltest.mem_ds is None:
@@ -607,6 +682,7 @@ gdaltest_list = [
     ogr_mem_13,
     ogr_mem_14,
     ogr_mem_15,
+    ogr_mem_16,
     ogr_mem_cleanup ]
 
 if __name__ == '__main__':
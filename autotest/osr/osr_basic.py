@@ -36,6 +36,7 @@ import sys
 sys.path.append( '../pymod' )
 
 import gdaltest
+from osgeo import gdal
 from osgeo import osr
 
 
@@ -619,6 +620,78 @@ def osr_basic_18():
 
     return 'success'
 
+###############################################################################
+# Test the SpatialReference / CoordinateTransformation cache
+
+def osr_basic_19():
+
+    osr.ClearCache()
+
+    srs1 = osr.GetCachedSpatialReference( 4326 )
+    srs2 = osr.GetCachedSpatialReference( 'EPSG:4326' )
+    if srs1 is not srs2:
+        gdaltest.post_reason( 'expected the same cached object' )
+        return 'fail'
+    if srs1.GetAuthorityCode(None) != '4326':
+        gdaltest.post_reason( 'fail' )
+        return 'fail'
+
+    srs3 = osr.GetCachedSpatialReference( srs1.ExportToWkt() )
+    if srs3 is srs1 or not srs3.IsSame(srs1):
+        gdaltest.post_reason( 'fail' )
+        return 'fail'
+
+    stats = osr.GetCacheStatistics()['srs']
+    if stats['hits'] != 1 or stats['misses'] != 2 or stats['size'] != 2:
+        gdaltest.post_reason( 'fail' )
+        print(stats)
+        return 'fail'
+
+    ct1 = osr.GetCachedCoordinateTransformation( 4326, 'EPSG:3857' )
+    ct2 = osr.GetCachedCoordinateTransformation( srs1, 3857 )
+    if ct1 is not ct2:
+        gdaltest.post_reason( 'expected the same cached transformation' )
+        return 'fail'
+
+    # Transformations are not shared between threads
+    import threading
+    other_thread_ct = []
+    thread = threading.Thread( target = lambda: other_thread_ct.append(
+        osr.GetCachedCoordinateTransformation( 4326, 3857 ) ) )
+    thread.start()
+    thread.join()
+    if other_thread_ct[0] is ct1:
+        gdaltest.post_reason( 'expected a different transformation' )
+        return 'fail'
+    if other_thread_ct[0].TransformPoint( 2, 49 ) != ct1.TransformPoint( 2, 49 ):
+        gdaltest.post_reason( 'fail' )
+        return 'fail'
+
+    osr.SetCacheMaxSize( 1 )
+    if osr.GetCacheStatistics()['srs']['size'] != 1:
+        gdaltest.post_reason( 'fail' )
+        print(osr.GetCacheStatistics())
+        return 'fail'
+    osr.SetCacheMaxSize( 256 )
+
+    gdal.PushErrorHandler( 'CPLQuietErrorHandler' )
+    try:
+        osr.GetCachedSpatialReference( 'invalid' )
+        gdal.PopErrorHandler()
+        gdaltest.post_reason( 'expected exception' )
+        return 'fail'
+    except RuntimeError:
+        gdal.PopErrorHandler()
+
+    osr.ClearCache()
+    stats = osr.GetCacheStatistics()
+    if stats['srs']['size'] != 0 or stats['ct']['size'] != 0 or stats['srs']['hits'] != 0:
+        gdaltest.post_reason( 'fail' )
+        print(stats)
+        return 'fail'
+
+    return 'success'
+
 ###############################################################################
 
 gdaltest_list = [ 
@@ -640,6 +713,7 @@ gdaltest_list = [
     osr_basic_16,
     osr_basic_17,
     osr_basic_18,
+    osr_basic_19,
     None ]
 
 if __name__ == '__main__':
@@ -322,6 +322,71 @@ def osr_ct_8():
 
     return 'success'
 
+###############################################################################
+# Test TransformPointsArray() on buffers, in place, to out arrays and threaded
+
+def osr_ct_9():
+
+    if gdaltest.have_proj4 == 0:
+        return 'skip'
+
+    import array
+
+    src_srs = osr.SpatialReference()
+    src_srs.ImportFromEPSG( 32611 )
+
+    dst_srs = osr.SpatialReference()
+    dst_srs.SetWellKnownGeogCS( 'WGS84' )
+
+    ct = osr.CoordinateTransformation( src_srs, dst_srs )
+
+    n = 50000
+    xs = array.array('d', [ 500000.0 + i for i in range(n) ])
+    ys = array.array('d', [ 4000000.0 ] * n)
+    expected = [ ct.TransformPoint( xs[i], ys[i] ) for i in (0, n // 2, n - 1) ]
+
+    out_x = array.array('d', [ 0.0 ] * n)
+    out_y = array.array('d', [ 0.0 ] * n)
+    ret = ct.TransformPointsArray( xs, ys, out = (out_x, out_y) )
+    if ret != n:
+        gdaltest.post_reason('fail')
+        print(ret)
+        return 'fail'
+    if xs[0] != 500000.0:
+        gdaltest.post_reason('input array should not have been modified')
+        return 'fail'
+    for (i, exp) in zip((0, n // 2, n - 1), expected):
+        if abs(out_x[i] - exp[0]) > 1e-10 or abs(out_y[i] - exp[1]) > 1e-10:
+            gdaltest.post_reason('fail')
+            print(i, out_x[i], out_y[i], exp)
+            return 'fail'
+
+    zs = array.array('d', [ 0.0 ] * n)
+    ret = ct.TransformPointsArray( xs, ys, zs, num_threads = 4 )
+    if ret != n:
+        gdaltest.post_reason('fail')
+        print(ret)
+        return 'fail'
+    if xs != out_x or ys != out_y:
+        gdaltest.post_reason('threaded in place transform differs')
+        return 'fail'
+
+    try:
+        ct.TransformPointsArray( xs, array.array('d', [ 0.0 ]) )
+        gdaltest.post_reason('expected exception on length mismatch')
+        return 'fail'
+    except ValueError:
+        pass
+
+    try:
+        ct.TransformPointsArray( xs, array.array('f', [ 0.0 ] * n) )
+        gdaltest.post_reason('expected exception on non float64 buffer')
+        return 'fail'
+    except TypeError:
+        pass
+
+    return 'success'
+
 ###############################################################################
 # Cleanup
 
@@ -343,6 +408,7 @@ gdaltest_list = [
     osr_ct_6,
     osr_ct_7,
     osr_ct_8,
+    osr_ct_9,
     osr_ct_cleanup,
     None ]
 
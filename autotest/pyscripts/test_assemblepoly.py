@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  assemblepoly.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+
+
+import sys
+
+sys.path.append( '../pymod' )
+
+from osgeo import gdal
+from osgeo import ogr
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+# Two polygons sharing an edge in tile A, and a triangle in tile B whose lines
+# have the same GEOM_ID values as the lines of tile A.
+
+lines = [ ('A', 1, 'LINESTRING (0 0,1 0)'),
+          ('A', 2, 'LINESTRING (1 0,2 0)'),
+          ('A', 3, 'LINESTRING (2 0,2 1)'),
+          ('A', 4, 'LINESTRING (2 1,1 1)'),
+          ('A', 5, 'LINESTRING (1 1,0 1)'),
+          ('A', 6, 'LINESTRING (0 1,0 0)'),
+          ('A', 7, 'LINESTRING (1 0,1 1)'),
+          ('B', 1, 'LINESTRING (10 10,11 10)'),
+          ('B', 2, 'LINESTRING (11 10,11 11)'),
+          ('B', 3, 'LINESTRING (11 11,10 10)') ]
+
+polygons = [ ('A', '(4:1,7,5,6)'),
+             ('A', '(4:2,3,4,7)'),
+             ('B', '(3:1,2,3)') ]
+
+def create_datasource(filename):
+    ogr.GetDriverByName('SQLite').DeleteDataSource(filename)
+    ds = ogr.GetDriverByName('SQLite').CreateDataSource(filename)
+
+    lyr = ds.CreateLayer('lines', geom_type = ogr.wkbLineString)
+    lyr.CreateField(ogr.FieldDefn('TILE_REF', ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn('GEOM_ID', ogr.OFTInteger))
+    for (tile_ref, geom_id, wkt) in lines:
+        feat = ogr.Feature(lyr.GetLayerDefn())
+        feat.SetField('TILE_REF', tile_ref)
+        feat.SetField('GEOM_ID', geom_id)
+        feat.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        lyr.CreateFeature(feat)
+
+    lyr = ds.CreateLayer('polygons', geom_type = ogr.wkbPolygon)
+    lyr.CreateField(ogr.FieldDefn('TILE_REF', ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn('GEOM_ID_OF_LINK', ogr.OFTString))
+    for (tile_ref, link_list) in polygons:
+        feat = ogr.Feature(lyr.GetLayerDefn())
+        feat.SetField('TILE_REF', tile_ref)
+        feat.SetField('GEOM_ID_OF_LINK', link_list)
+        lyr.CreateFeature(feat)
+
+    ds = None
+
+def run_assemblepoly(options):
+    script_path = test_py_scripts.get_py_script('assemblepoly')
+    ret = test_py_scripts.run_py_script_as_external_script(script_path, 'assemblepoly', options)
+    return sorted([ line.strip() for line in ret.split('\n') if line.startswith('POLYGON') ])
+
+###############################################################################
+# The streaming mode, with and without worker processes, assembles the same
+# polygons as the in-memory mode
+
+def test_assemblepoly_1():
+
+    script_path = test_py_scripts.get_py_script('assemblepoly')
+    if script_path is None:
+        return 'skip'
+
+    if ogr.GetDriverByName('SQLite') is None:
+        return 'skip'
+
+    create_datasource('tmp/assemblepoly.sqlite')
+
+    expected = run_assemblepoly('tmp/assemblepoly.sqlite')
+    if len(expected) != len(polygons):
+        gdaltest.post_reason('fail')
+        print(expected)
+        return 'fail'
+
+    for options in [ '-stream', '-stream -j 2 -gt 1' ]:
+        got = run_assemblepoly(options + ' -store tmp/assemblepoly_store.sqlite tmp/assemblepoly.sqlite')
+        if got != expected:
+            gdaltest.post_reason('fail')
+            print(options)
+            print(got)
+            print(expected)
+            return 'fail'
+
+    # Nothing written back without -update
+    ds = ogr.Open('tmp/assemblepoly.sqlite')
+    lyr = ds.GetLayerByName('polygons')
+    for feat in lyr:
+        if feat.GetGeometryRef() is not None:
+            gdaltest.post_reason('fail')
+            feat.DumpReadable()
+            return 'fail'
+    ds = None
+
+    return 'success'
+
+###############################################################################
+# -update writes the assembled polygons back to the polygon layer
+
+def test_assemblepoly_2():
+
+    script_path = test_py_scripts.get_py_script('assemblepoly')
+    if script_path is None:
+        return 'skip'
+
+    if ogr.GetDriverByName('SQLite') is None:
+        return 'skip'
+
+    expected = run_assemblepoly('tmp/assemblepoly.sqlite')
+
+    for options in [ '-update', '-stream -j 2 -gt 1 -update' ]:
+        create_datasource('tmp/assemblepoly.sqlite')
+        test_py_scripts.run_py_script_as_external_script(script_path, 'assemblepoly',
+            options + ' -store tmp/assemblepoly_store.sqlite tmp/assemblepoly.sqlite')
+
+        ds = ogr.Open('tmp/assemblepoly.sqlite')
+        lyr = ds.GetLayerByName('polygons')
+        got = sorted([ feat.GetGeometryRef().ExportToWkt() for feat in lyr
+                       if feat.GetGeometryRef() is not None ])
+        ds = None
+        if got != expected:
+            gdaltest.post_reason('fail')
+            print(options)
+            print(got)
+            print(expected)
+            return 'fail'
+
+    return 'success'
+
+###############################################################################
+# -gt 0 is rejected
+
+def test_assemblepoly_3():
+
+    script_path = test_py_scripts.get_py_script('assemblepoly')
+    if script_path is None:
+        return 'skip'
+
+    if ogr.GetDriverByName('SQLite') is None:
+        return 'skip'
+
+    ret = test_py_scripts.run_py_script_as_external_script(script_path, 'assemblepoly',
+        '-stream -gt 0 -update -store tmp/assemblepoly_store.sqlite tmp/assemblepoly.sqlite')
+    if ret.find('-gt should be at least 1') < 0:
+        gdaltest.post_reason('fail')
+        print(ret)
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Cleanup
+
+def test_assemblepoly_cleanup():
+
+    ogr.GetDriverByName('SQLite').DeleteDataSource('tmp/assemblepoly.sqlite')
+    gdal.Unlink('tmp/assemblepoly_store.sqlite')
+
+    return 'success'
+
+gdaltest_list = [
+    test_assemblepoly_1,
+    test_assemblepoly_2,
+    test_assemblepoly_3,
+    test_assemblepoly_cleanup,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_assemblepoly' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
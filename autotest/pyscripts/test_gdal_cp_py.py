@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  gdal_cp.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+
+from osgeo import gdal
+import os
+import sys
+
+sys.path.append( '../pymod' )
+
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+def import_gdal_cp():
+    script_path = test_py_scripts.get_py_script('gdal_cp')
+    if script_path is None:
+        return None
+
+    saved_syspath = sys.path
+    sys.path.append(script_path)
+    try:
+        import gdal_cp
+    except:
+        gdal_cp = None
+    sys.path = saved_syspath
+
+    return gdal_cp
+
+def read_file(filename):
+    f = gdal.VSIFOpenL(filename, 'rb')
+    if f is None:
+        return None
+    gdal.VSIFSeekL(f, 0, 2)
+    size = gdal.VSIFTellL(f)
+    gdal.VSIFSeekL(f, 0, 0)
+    content = gdal.VSIFReadL(1, size, f)
+    gdal.VSIFCloseL(f)
+    return content
+
+def write_file(filename, content):
+    f = gdal.VSIFOpenL(filename, 'wb')
+    gdal.VSIFWriteL(content, 1, len(content), f)
+    gdal.VSIFCloseL(f)
+
+###############################################################################
+# Simple copy, and -resume of a partial copy
+
+def test_gdal_cp_py_1():
+
+    gdal_cp = import_gdal_cp()
+    if gdal_cp is None:
+        return 'skip'
+
+    src = '../gcore/data/byte.tif'
+    ref = read_file(src)
+
+    if gdal_cp.gdal_cp(['', src, 'tmp/gdal_cp_py_1.tif']) != 0 or \
+       read_file('tmp/gdal_cp_py_1.tif') != ref:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    write_file('tmp/gdal_cp_py_1.tif', ref[0:100])
+    if gdal_cp.gdal_cp(['', '-resume', src, 'tmp/gdal_cp_py_1.tif']) != 0 or \
+       read_file('tmp/gdal_cp_py_1.tif') != ref:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    # With -checksum, a partial copy that differs from the source is
+    # copied again
+    write_file('tmp/gdal_cp_py_1.tif', b'X' * 100)
+    if gdal_cp.gdal_cp(['', '-resume', '-checksum', src, 'tmp/gdal_cp_py_1.tif']) != 0 or \
+       read_file('tmp/gdal_cp_py_1.tif') != ref:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    gdal.Unlink('tmp/gdal_cp_py_1.tif')
+
+    # -checksum requires -resume
+    if gdal_cp.gdal_cp(['', '-checksum', src, 'tmp/gdal_cp_py_1.tif']) == 0 or \
+       gdal.VSIStatL('tmp/gdal_cp_py_1.tif') is not None:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Copy of a file by ranges with -j, interrupted and then resumed
+
+class StopProgress:
+    def Progress(self, dfComplete, message):
+        return False
+
+def test_gdal_cp_py_2():
+
+    gdal_cp = import_gdal_cp()
+    if gdal_cp is None:
+        return 'skip'
+
+    # Small ranges so that a small file is split
+    saved_min_range_size = gdal_cp.MIN_RANGE_SIZE
+    gdal_cp.MIN_RANGE_SIZE = 1000
+
+    ref = b''.join([ ('%05d' % i).encode('ascii') for i in range(2000) ])
+    write_file('tmp/gdal_cp_py_2_src.bin', ref)
+
+    ret = 'success'
+    try:
+        if gdal_cp.gdal_cp(['', '-j', '2', 'tmp/gdal_cp_py_2_src.bin', 'tmp/gdal_cp_py_2.bin']) != 0 or \
+           read_file('tmp/gdal_cp_py_2.bin') != ref or \
+           gdal.VSIStatL('tmp/gdal_cp_py_2.bin.gdal_cp_tmp') is not None:
+            gdaltest.post_reason('fail')
+            ret = 'fail'
+        gdal.Unlink('tmp/gdal_cp_py_2.bin')
+
+        # An interrupted copy must not leave a target that looks complete
+        if ret == 'success':
+            if gdal_cp.gdal_cp(['', '-j', '2', 'tmp/gdal_cp_py_2_src.bin', 'tmp/gdal_cp_py_2.bin'],
+                               progress = StopProgress()) != -2:
+                gdaltest.post_reason('fail')
+                ret = 'fail'
+            statBuf = gdal.VSIStatL('tmp/gdal_cp_py_2.bin')
+            if statBuf is not None and statBuf.size == len(ref):
+                gdaltest.post_reason('fail')
+                ret = 'fail'
+
+        if ret == 'success':
+            if gdal_cp.gdal_cp(['', '-resume', 'tmp/gdal_cp_py_2_src.bin', 'tmp/gdal_cp_py_2.bin']) != 0 or \
+               read_file('tmp/gdal_cp_py_2.bin') != ref:
+                gdaltest.post_reason('fail')
+                ret = 'fail'
+    finally:
+        gdal_cp.MIN_RANGE_SIZE = saved_min_range_size
+        gdal.Unlink('tmp/gdal_cp_py_2_src.bin')
+        gdal.Unlink('tmp/gdal_cp_py_2.bin')
+        gdal.Unlink('tmp/gdal_cp_py_2.bin.gdal_cp_tmp')
+
+    return ret
+
+###############################################################################
+# A range that cannot be fully read is an error
+
+def test_gdal_cp_py_3():
+
+    gdal_cp = import_gdal_cp()
+    if gdal_cp is None:
+        return 'skip'
+
+    write_file('tmp/gdal_cp_py_3_src.bin', b'0123456789' * 10)
+    write_file('tmp/gdal_cp_py_3.bin', b'X' * 150)
+
+    # Range of 100 bytes at offset 50 of a 100 bytes file
+    (ret, copied) = gdal_cp.copy_range_worker(('tmp/gdal_cp_py_3_src.bin', 'tmp/gdal_cp_py_3.bin',
+                                               50, 100, None))
+    gdal.Unlink('tmp/gdal_cp_py_3_src.bin')
+    gdal.Unlink('tmp/gdal_cp_py_3.bin')
+    if ret == 0 or copied != 50:
+        gdaltest.post_reason('fail')
+        print(ret, copied)
+        return 'fail'
+
+    return 'success'
+
+gdaltest_list = [
+    test_gdal_cp_py_1,
+    test_gdal_cp_py_2,
+    test_gdal_cp_py_3,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_gdal_cp_py' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
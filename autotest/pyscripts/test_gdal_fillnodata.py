@@ -77,12 +77,43 @@ def test_gdal_fillnodata_2():
     return 'success'
 
 
+###############################################################################
+# Test the tiled mode against the default one.
+
+def test_gdal_fillnodata_3():
+
+    script_path = test_py_scripts.get_py_script('gdal_fillnodata')
+    if script_path is None:
+        return 'skip'
+
+    test_py_scripts.run_py_script(script_path, 'gdal_fillnodata', '-q -md 3 -si 1 ../gcore/data/nodata_byte.tif tmp/test_gdal_fillnodata_3.tif')
+    test_py_scripts.run_py_script(script_path, 'gdal_fillnodata', '-q -md 3 -si 1 -tile 7 -j 2 ../gcore/data/nodata_byte.tif tmp/test_gdal_fillnodata_4.tif')
+
+    ds = gdal.Open('tmp/test_gdal_fillnodata_3.tif')
+    cs_expected = ds.GetRasterBand(1).Checksum()
+    ds = None
+
+    ds = gdal.Open('tmp/test_gdal_fillnodata_4.tif')
+    cs = ds.GetRasterBand(1).Checksum()
+    if ds.GetRasterBand(1).GetNoDataValue() != 0:
+        gdaltest.post_reason('Failed to copy No Data Value to dst dataset.')
+        return 'fail'
+    ds = None
+
+    if cs != cs_expected:
+        print('Got: ', cs, ' Expected: ', cs_expected)
+        gdaltest.post_reason( 'got wrong checksum' )
+        return 'fail'
+
+    return 'success'
+
 ###############################################################################
 # Cleanup
 
 def test_gdal_fillnodata_cleanup():
 
-    lst = [ 'tmp/test_gdal_fillnodata_1.tif', 'tmp/test_gdal_fillnodata_2.tif' ]
+    lst = [ 'tmp/test_gdal_fillnodata_1.tif', 'tmp/test_gdal_fillnodata_2.tif',
+            'tmp/test_gdal_fillnodata_3.tif', 'tmp/test_gdal_fillnodata_4.tif' ]
     for filename in lst:
         try:
             os.remove(filename)
@@ -94,6 +125,7 @@ def test_gdal_fillnodata_cleanup():
 gdaltest_list = [
     test_gdal_fillnodata_1,
     test_gdal_fillnodata_2,
+    test_gdal_fillnodata_3,
     test_gdal_fillnodata_cleanup
     ]
 
@@ -286,6 +286,51 @@ def test_gdal_ls_py_8():
 
     return 'success'
 
+###############################################################################
+# Test the parallel crawler : same output as the sequential listing,
+# JSON output and stat cache
+
+def test_gdal_ls_py_9():
+
+    (ret, ret_str_ref) = run_gdal_ls(['', '-l', '-R', '-Rzip', '../ogr/data'])
+    if ret != 'success':
+        return ret
+
+    (ret, ret_str) = run_gdal_ls(['', '-l', '-R', '-Rzip', '-j', '4', '../ogr/data'])
+    if ret != 'success':
+        return ret
+
+    if ret_str != ret_str_ref:
+        gdaltest.post_reason('parallel listing differs from sequential one')
+        print(ret_str)
+        return 'fail'
+
+    gdal.Unlink('/vsimem/gdal_ls_py_9.json')
+
+    for i in range(2):
+        (ret, ret_str) = run_gdal_ls(['', '-json', '-R', '-Rzip', '-j', '4',
+                                      '-stat-cache', '/vsimem/gdal_ls_py_9.json',
+                                      '../ogr/data'])
+        if ret != 'success':
+            return ret
+
+        if ret_str.find('"name": "/vsizip/../ogr/data/poly.zip/poly.shp"') == -1 or \
+           ret_str.find('"driver": "ESRI Shapefile"') == -1:
+            gdaltest.post_reason('fail')
+            print(ret_str)
+            return 'fail'
+
+        if i == 0:
+            first_str = ret_str
+        elif ret_str != first_str:
+            gdaltest.post_reason('cached listing differs')
+            print(ret_str)
+            return 'fail'
+
+    gdal.Unlink('/vsimem/gdal_ls_py_9.json')
+
+    return 'success'
+
 gdaltest_list = [
     test_gdal_ls_py_1,
     test_gdal_ls_py_2,
@@ -295,6 +340,7 @@ gdaltest_list = [
     test_gdal_ls_py_6,
     test_gdal_ls_py_7,
     test_gdal_ls_py_8,
+    test_gdal_ls_py_9,
     ]
 
 if __name__ == '__main__':
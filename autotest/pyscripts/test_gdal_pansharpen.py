@@ -97,6 +97,35 @@ def test_gdal_pansharpen_2():
 
     return 'success'
 
+###############################################################################
+# Windowed output computed by several processes
+
+def test_gdal_pansharpen_3():
+
+    script_path = test_py_scripts.get_py_script('gdal_pansharpen')
+    if script_path is None:
+        return 'skip'
+
+    test_py_scripts.run_py_script(script_path, 'gdal_pansharpen', ' -q -j 2 -window 256 tmp/small_world_pan.tif ../gdrivers/data/small_world.tif tmp/out.tif')
+
+    ds = gdal.Open('tmp/out.tif')
+    cs = [ ds.GetRasterBand(i+1).Checksum() for i in range(ds.RasterCount) ]
+    block_size = ds.GetRasterBand(1).GetBlockSize()
+    ds = None
+    gdal.GetDriverByName('GTiff').Delete('tmp/out.tif')
+
+    if cs != [4735, 10000, 9742]:
+        gdaltest.post_reason('fail')
+        print(cs)
+        return 'fail'
+
+    if block_size != [256, 256]:
+        gdaltest.post_reason('fail')
+        print(block_size)
+        return 'fail'
+
+    return 'success'
+
 ###############################################################################
 # Cleanup
 
@@ -113,6 +142,7 @@ def test_gdal_pansharpen_cleanup():
 gdaltest_list = [
     test_gdal_pansharpen_1,
     test_gdal_pansharpen_2,
+    test_gdal_pansharpen_3,
     test_gdal_pansharpen_cleanup
     ]
 
@@ -145,9 +145,71 @@ def test_gdal_polygonize_2():
     else:
         return 'fail'
 
+###############################################################################
+# Test the tiled mode: the polygons crossing tile seams must be merged back.
+
+def test_gdal_polygonize_3():
+
+    script_path = test_py_scripts.get_py_script('gdal_polygonize')
+    if script_path is None:
+        return 'skip'
+
+    if not ogrtest.have_geos():
+        return 'skip'
+
+    shp_drv = ogr.GetDriverByName( 'ESRI Shapefile' )
+    for filename in ['tmp/out.shp', 'tmp/out_tiled.shp']:
+        try:
+            os.stat(filename)
+            shp_drv.DeleteDataSource( filename )
+        except:
+            pass
+
+    test_py_scripts.run_py_script(script_path, 'gdal_polygonize', '-b 1 -f "ESRI Shapefile" -q -nomask ../alg/data/polygonize_in.grd tmp/out.shp' )
+    test_py_scripts.run_py_script(script_path, 'gdal_polygonize', '-b 1 -f "ESRI Shapefile" -q -nomask -tile 7 -j 2 ../alg/data/polygonize_in.grd tmp/out_tiled.shp' )
+
+    ref_ds = ogr.Open( 'tmp/out.shp' )
+    ref_lyr = ref_ds.GetLayer(0)
+    tiled_ds = ogr.Open( 'tmp/out_tiled.shp' )
+    tiled_lyr = tiled_ds.GetLayer(0)
+
+    if tiled_lyr.GetFeatureCount() != ref_lyr.GetFeatureCount():
+        gdaltest.post_reason( 'GetFeatureCount() returned %d instead of %d' % (tiled_lyr.GetFeatureCount(), ref_lyr.GetFeatureCount()) )
+        return 'fail'
+
+    # Compare each polygon with the one of the single pass result having
+    # the same DN and the same area.
+    ref = [ (feat.GetField('DN'), feat.GetGeometryRef().Clone()) for feat in ref_lyr ]
+    tr = 1
+    for feat in tiled_lyr:
+        geom = feat.GetGeometryRef()
+        found = False
+        for (dn, ref_geom) in ref:
+            if dn == feat.GetField('DN') and abs(ref_geom.GetArea() - geom.GetArea()) < 1e-5 and \
+               ref_geom.SymDifference(geom).GetArea() < 1e-5:
+                found = True
+                break
+        if not found:
+            gdaltest.post_reason( 'polygon not found in single pass result' )
+            feat.DumpReadable()
+            tr = 0
+
+    ref_ds = None
+    tiled_ds = None
+    # Reload drv because of side effects of run_py_script()
+    shp_drv = ogr.GetDriverByName( 'ESRI Shapefile' )
+    shp_drv.DeleteDataSource( 'tmp/out.shp' )
+    shp_drv.DeleteDataSource( 'tmp/out_tiled.shp' )
+
+    if tr:
+        return 'success'
+    else:
+        return 'fail'
+
 gdaltest_list = [
     test_gdal_polygonize_1,
     test_gdal_polygonize_2,
+    test_gdal_polygonize_3,
     ]
 
 if __name__ == '__main__':
@@ -124,6 +124,162 @@ def test_gdal_proximity_3():
     else:
         return 'success' 
 
+###############################################################################
+# Test the exact distance transform, computed by strips in parallel, with
+# and without a maximum distance.
+
+def test_gdal_proximity_4():
+
+    script_path = test_py_scripts.get_py_script('gdal_proximity')
+    if script_path is None:
+        return 'skip'
+
+    try:
+        from osgeo import gdal_array
+        gdal_array.BandReadAsArray
+    except:
+        return 'skip'
+
+    for options in [ '', '-values 65,64 -maxdist 12 -nodata -1 -fixed-buf-val 255' ]:
+
+        for filename in [ 'tmp/proximity_4.tif', 'tmp/proximity_5.tif' ]:
+            try:
+                os.remove(filename)
+            except:
+                pass
+
+        test_py_scripts.run_py_script(script_path, 'gdal_proximity', '-q -exact ' + options + ' ../alg/data/pat.tif tmp/proximity_4.tif' )
+        test_py_scripts.run_py_script(script_path, 'gdal_proximity', '-q -strip 7 -j 2 ' + options + ' ../alg/data/pat.tif tmp/proximity_5.tif' )
+
+        ds = gdal.Open('tmp/proximity_4.tif')
+        cs_expected = ds.GetRasterBand(1).Checksum()
+        ds = None
+
+        ds = gdal.Open('tmp/proximity_5.tif')
+        cs = ds.GetRasterBand(1).Checksum()
+        ds = None
+
+        if cs != cs_expected:
+            print('Got: ', cs, ' Expected: ', cs_expected)
+            gdaltest.post_reason( 'got wrong checksum' )
+            return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Test the nearest target value and index outputs.
+
+def test_gdal_proximity_5():
+
+    script_path = test_py_scripts.get_py_script('gdal_proximity')
+    if script_path is None:
+        return 'skip'
+
+    try:
+        from osgeo import gdal_array
+        gdal_array.BandReadAsArray
+    except:
+        return 'skip'
+
+    test_py_scripts.run_py_script(script_path, 'gdal_proximity', '-q -values 65,64 -strip 10 -nearest_value tmp/proximity_6.tif -nearest_index tmp/proximity_7.tif ../alg/data/pat.tif tmp/proximity_8.tif' )
+
+    src_ds = gdal.Open('../alg/data/pat.tif')
+    src = src_ds.GetRasterBand(1).ReadAsArray()
+    xsize = src_ds.RasterXSize
+    src_ds = None
+
+    ds = gdal.Open('tmp/proximity_8.tif')
+    prox = ds.GetRasterBand(1).ReadAsArray()
+    ds = None
+    ds = gdal.Open('tmp/proximity_6.tif')
+    nearest_value = ds.GetRasterBand(1).ReadAsArray()
+    ds = None
+    ds = gdal.Open('tmp/proximity_7.tif')
+    nearest_index = ds.GetRasterBand(1).ReadAsArray()
+    ds = None
+
+    # gdal.ComputeProximity() propagates the nearest target found so far,
+    # which can miss the closest one by a fraction of pixel, but never
+    # finds a closer one than the exact transform
+    src_ds = gdal.Open('../alg/data/pat.tif')
+    ref_ds = gdal.GetDriverByName('MEM').Create('', src_ds.RasterXSize, src_ds.RasterYSize, 1, gdal.GDT_Float32)
+    gdal.ComputeProximity(src_ds.GetRasterBand(1), ref_ds.GetRasterBand(1), ['VALUES=65,64'])
+    ref = ref_ds.GetRasterBand(1).ReadAsArray()
+    ref_ds = None
+    src_ds = None
+    diff = ref - prox
+    if diff.min() < -1e-4 or diff.max() > 0.5:
+        gdaltest.post_reason( 'distances differ from gdal.ComputeProximity()' )
+        print(diff.min(), diff.max())
+        return 'fail'
+
+    for y in range(prox.shape[0]):
+        for x in range(prox.shape[1]):
+            (ty, tx) = divmod(int(nearest_index[y][x]), xsize)
+            if src[ty][tx] not in (64, 65) or nearest_value[y][x] != src[ty][tx]:
+                gdaltest.post_reason( 'wrong nearest target at %d,%d' % (x, y) )
+                return 'fail'
+            dist = ((tx - x) ** 2 + (ty - y) ** 2) ** 0.5
+            if abs(dist - prox[y][x]) > 1e-4:
+                gdaltest.post_reason( 'wrong distance at %d,%d' % (x, y) )
+                print(dist, prox[y][x])
+                return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Test -srcwin: the pixels outside of the window are set to nodata.
+
+def test_gdal_proximity_6():
+
+    script_path = test_py_scripts.get_py_script('gdal_proximity')
+    if script_path is None:
+        return 'skip'
+
+    try:
+        from osgeo import gdal_array
+        gdal_array.BandReadAsArray
+    except:
+        return 'skip'
+
+    for filename in [ 'tmp/proximity_9.tif', 'tmp/proximity_10.tif' ]:
+        try:
+            os.remove(filename)
+        except:
+            pass
+
+    test_py_scripts.run_py_script(script_path, 'gdal_proximity', '-q -values 65,64 -srcwin 5 7 12 10 -nearest_index tmp/proximity_10.tif ../alg/data/pat.tif tmp/proximity_9.tif' )
+
+    # Computed over the whole raster by test_gdal_proximity_5()
+    ds = gdal.Open('tmp/proximity_8.tif')
+    ref = ds.GetRasterBand(1).ReadAsArray()
+    ds = None
+
+    ds = gdal.Open('tmp/proximity_9.tif')
+    if ds.GetRasterBand(1).GetNoDataValue() != 65535:
+        gdaltest.post_reason( 'fail' )
+        print(ds.GetRasterBand(1).GetNoDataValue())
+        return 'fail'
+    prox = ds.GetRasterBand(1).ReadAsArray()
+    ds = None
+    ds = gdal.Open('tmp/proximity_10.tif')
+    nearest_index = ds.GetRasterBand(1).ReadAsArray()
+    ds = None
+
+    for y in range(prox.shape[0]):
+        for x in range(prox.shape[1]):
+            if x >= 5 and x < 17 and y >= 7 and y < 17:
+                ok = abs(prox[y][x] - ref[y][x]) < 1e-4 and \
+                     nearest_index[y][x] >= 0
+            else:
+                ok = prox[y][x] == 65535 and nearest_index[y][x] == -1
+            if not ok:
+                gdaltest.post_reason( 'wrong value at %d,%d' % (x, y) )
+                print(prox[y][x], nearest_index[y][x])
+                return 'fail'
+
+    return 'success'
+
 ###############################################################################
 # Cleanup
 
@@ -131,7 +287,14 @@ def test_gdal_proximity_cleanup():
 
     lst = [ 'tmp/proximity_1.tif',
             'tmp/proximity_2.tif',
-            'tmp/proximity_3.tif' ]
+            'tmp/proximity_3.tif',
+            'tmp/proximity_4.tif',
+            'tmp/proximity_5.tif',
+            'tmp/proximity_6.tif',
+            'tmp/proximity_7.tif',
+            'tmp/proximity_8.tif',
+            'tmp/proximity_9.tif',
+            'tmp/proximity_10.tif' ]
     for filename in lst:
         try:
             os.remove(filename)
@@ -144,6 +307,9 @@ gdaltest_list = [
     test_gdal_proximity_1,
     test_gdal_proximity_2,
     test_gdal_proximity_3,
+    test_gdal_proximity_4,
+    test_gdal_proximity_5,
+    test_gdal_proximity_6,
     test_gdal_proximity_cleanup,
     ]
 
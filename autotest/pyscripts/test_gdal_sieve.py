@@ -75,8 +75,46 @@ def test_gdal_sieve_1():
     else:
         return 'success' 
 
+###############################################################################
+# Test the tiled mode, which must give the same result as a single pass.
+
+def test_gdal_sieve_2():
+
+    script_path = test_py_scripts.get_py_script('gdal_sieve')
+    if script_path is None:
+        return 'skip'
+
+    try:
+        from osgeo import gdal_array
+        gdal_array.BandReadAsArray
+    except:
+        return 'skip'
+
+    test_py_scripts.run_py_script(script_path, 'gdal_sieve', '-q -nomask -st 2 -4 -tile 2 -j 2 ../alg/data/sieve_src.grd tmp/sieve_2.tif' )
+
+    dst_ds = gdal.Open('tmp/sieve_2.tif')
+    dst_band = dst_ds.GetRasterBand(1)
+
+    cs_expected = 364
+    cs = dst_band.Checksum()
+
+    dst_band = None
+    dst_ds = None
+
+    # Reload because of side effects of run_py_script()
+    drv = gdal.GetDriverByName( 'GTiff' )
+    drv.Delete( 'tmp/sieve_2.tif' )
+
+    if cs != cs_expected:
+        print('Got: ', cs)
+        gdaltest.post_reason( 'got wrong checksum' )
+        return 'fail'
+
+    return 'success'
+
 gdaltest_list = [
     test_gdal_sieve_1,
+    test_gdal_sieve_2,
     ]
 
 if __name__ == '__main__':
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  gdalident.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+
+import json
+import os
+import shutil
+import sys
+
+sys.path.append( '../pymod' )
+
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+def run_gdalident(options):
+    script_path = test_py_scripts.get_py_script('gdalident')
+    ret = test_py_scripts.run_py_script_as_external_script(script_path, 'gdalident', options)
+    return sorted([ line.strip() for line in ret.split('\n') if line.strip() != '' ])
+
+###############################################################################
+# Recursive scan, sequential and with worker processes
+
+def test_gdalident_1():
+
+    script_path = test_py_scripts.get_py_script('gdalident')
+    if script_path is None:
+        return 'skip'
+
+    shutil.rmtree('tmp/gdalident', ignore_errors = True)
+    os.makedirs('tmp/gdalident/sub')
+    shutil.copy('../gcore/data/byte.tif', 'tmp/gdalident/a.tif')
+    shutil.copy('../gcore/data/byte.tif', 'tmp/gdalident/sub/c.tif')
+    f = open('tmp/gdalident/b.txt', 'wt')
+    f.write('not a raster\n')
+    f.close()
+    # More files than in a chunk of targets identified at once
+    os.makedirs('tmp/gdalident/sub/many')
+    for i in range(100):
+        f = open('tmp/gdalident/sub/many/%d.txt' % i, 'wt')
+        f.write('not a raster\n')
+        f.close()
+
+    expected = [ 'tmp/gdalident/a.tif: GTiff',
+                 'tmp/gdalident/sub/c.tif: GTiff' ]
+    got = run_gdalident('-r tmp/gdalident')
+    if got != expected:
+        gdaltest.post_reason('fail')
+        print(got)
+        return 'fail'
+
+    expected_with_failures = run_gdalident('-r -f tmp/gdalident')
+    if 'tmp/gdalident/b.txt: unrecognised' not in expected_with_failures or \
+       'tmp/gdalident/sub/many/99.txt: unrecognised' not in expected_with_failures or \
+       'tmp/gdalident/a.tif: GTiff' not in expected_with_failures:
+        gdaltest.post_reason('fail')
+        print(expected_with_failures)
+        return 'fail'
+
+    for options in [ '-r -f -j 2', '-r -f -j 3 -fast' ]:
+        got = run_gdalident(options + ' tmp/gdalident')
+        if got != expected_with_failures:
+            gdaltest.post_reason('fail')
+            print(options)
+            print(got)
+            return 'fail'
+
+    return 'success'
+
+###############################################################################
+# JSON lines output and persistent cache
+
+def test_gdalident_2():
+
+    script_path = test_py_scripts.get_py_script('gdalident')
+    if script_path is None:
+        return 'skip'
+
+    got = [ json.loads(line) for line in run_gdalident('-r -json -j 2 tmp/gdalident') ]
+    got = sorted([ (item['path'], item['driver']) for item in got ])
+    if got != [ ('tmp/gdalident/a.tif', 'GTiff'), ('tmp/gdalident/sub/c.tif', 'GTiff') ]:
+        gdaltest.post_reason('fail')
+        print(got)
+        return 'fail'
+
+    expected = run_gdalident('-r -f tmp/gdalident')
+    for i in range(2):
+        got = run_gdalident('-r -f -cache tmp/gdalident.json tmp/gdalident')
+        if got != expected or not os.path.exists('tmp/gdalident.json'):
+            gdaltest.post_reason('fail')
+            print(i)
+            print(got)
+            return 'fail'
+
+    f = open('tmp/gdalident.json', 'rt')
+    cache = json.load(f)
+    f.close()
+    if cache['tmp/gdalident/a.tif'][2] != 'GTiff' or \
+       cache['tmp/gdalident/b.txt'][2] is not None:
+        gdaltest.post_reason('fail')
+        print(cache)
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Cleanup
+
+def test_gdalident_cleanup():
+
+    shutil.rmtree('tmp/gdalident', ignore_errors = True)
+    try:
+        os.remove('tmp/gdalident.json')
+    except:
+        pass
+
+    return 'success'
+
+gdaltest_list = [
+    test_gdalident_1,
+    test_gdalident_2,
+    test_gdalident_cleanup,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_gdalident' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
@@ -33,6 +33,7 @@ import os
 
 sys.path.append( '../pymod' )
 
+from osgeo import gdal
 import gdaltest
 import test_py_scripts
 
@@ -244,6 +245,74 @@ def test_gdalinfo_py_10():
 
     return 'success'
 
+###############################################################################
+# Test -stats with -hist, -checksum and -mm, computed in a single pass
+
+def test_gdalinfo_py_11():
+    script_path = test_py_scripts.get_py_script('gdalinfo')
+    if script_path is None:
+        return 'skip'
+
+    try:
+        os.remove('../gcore/data/byte.tif.aux.xml')
+    except:
+        pass
+
+    ret = test_py_scripts.run_py_script(script_path, 'gdalinfo', '-stats -hist -checksum -mm ../gcore/data/byte.tif')
+    for expected in [ 'STATISTICS_MINIMUM=74',
+                      'Minimum=74.000, Maximum=255.000, Mean=126.765, StdDev=22.928',
+                      'Computed Min/Max=74.000,255.000',
+                      'Checksum=4672',
+                      '256 buckets from -0.5 to 255.5:',
+                      '0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 1 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 6 0 0 0 0 0 0 0 0 37 0 0 0 0 0 0 0 57 0 0 0 0 0 0 0 62 0 0 0 0 0 0 0 66 0 0 0 0 0 0 0 0 72 0 0 0 0 0 0 0 31 0 0 0 0 0 0 0 24 0 0 0 0 0 0 0 12 0 0 0 0 0 0 0 0 7 0 0 0 0 0 0 0 12 0 0 0 0 0 0 0 5 0 0 0 0 0 0 0 3 0 0 0 0 0 0 0 1 0 0 0 0 0 0 0 0 2 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 1 0 0 0 0 0 0 0 1' ]:
+        if ret.find(expected) == -1:
+            gdaltest.post_reason( 'did not get %s' % expected )
+            print(ret)
+            return 'fail'
+
+    # We will blow an exception if the file does not exist now!
+    os.remove('../gcore/data/byte.tif.aux.xml')
+
+    return 'success'
+
+###############################################################################
+# Test that -stats keeps the exact statistics already stored, and only
+# recomputes approximate ones
+
+def test_gdalinfo_py_12():
+    script_path = test_py_scripts.get_py_script('gdalinfo')
+    if script_path is None:
+        return 'skip'
+
+    src_ds = gdal.Open('../gcore/data/byte.tif')
+    gdal.GetDriverByName('GTiff').CreateCopy('tmp/gdalinfo_py_12.tif', src_ds)
+    src_ds = None
+
+    # Exact statistics that do not match the data
+    ds = gdal.Open('tmp/gdalinfo_py_12.tif')
+    ds.GetRasterBand(1).SetStatistics(1, 2, 1.5, 0.5)
+    ds = None
+
+    ret = test_py_scripts.run_py_script(script_path, 'gdalinfo', '-stats tmp/gdalinfo_py_12.tif')
+    if ret.find('Minimum=1.000, Maximum=2.000, Mean=1.500, StdDev=0.500') == -1:
+        gdaltest.post_reason( 'stored statistics not kept' )
+        print(ret)
+        return 'fail'
+
+    ds = gdal.Open('tmp/gdalinfo_py_12.tif')
+    ds.GetRasterBand(1).SetMetadataItem('STATISTICS_APPROXIMATE', 'YES')
+    ds = None
+
+    ret = test_py_scripts.run_py_script(script_path, 'gdalinfo', '-stats tmp/gdalinfo_py_12.tif')
+    if ret.find('Minimum=74.000, Maximum=255.000, Mean=126.765, StdDev=22.928') == -1:
+        gdaltest.post_reason( 'approximate statistics not recomputed' )
+        print(ret)
+        return 'fail'
+
+    gdal.GetDriverByName('GTiff').Delete('tmp/gdalinfo_py_12.tif')
+
+    return 'success'
+
 gdaltest_list = [
     test_gdalinfo_py_1,
     test_gdalinfo_py_2,
@@ -254,7 +323,9 @@ gdaltest_list = [
     test_gdalinfo_py_7,
     test_gdalinfo_py_8,
     test_gdalinfo_py_9,
-    test_gdalinfo_py_10
+    test_gdalinfo_py_10,
+    test_gdalinfo_py_11,
+    test_gdalinfo_py_12
     ]
 
 
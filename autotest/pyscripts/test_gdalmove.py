@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  gdalmove.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+
+import sys
+
+sys.path.append( '../pymod' )
+
+from osgeo import gdal
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+def import_gdalmove():
+    script_path = test_py_scripts.get_py_script('gdalmove')
+    if script_path is None:
+        return None
+
+    saved_syspath = sys.path
+    sys.path.append(script_path)
+    try:
+        import gdalmove
+    except:
+        gdalmove = None
+    sys.path = saved_syspath
+
+    return gdalmove
+
+###############################################################################
+# Least squares fit on a grid of check points
+
+def test_gdalmove_1():
+
+    gdalmove = import_gdalmove()
+    if gdalmove is None:
+        return 'skip'
+
+    src_ds = gdal.Open('../gcore/data/byte.tif')
+    for filename in [ 'tmp/test_gdalmove_1.tif', 'tmp/test_gdalmove_1_corners.tif' ]:
+        gdal.GetDriverByName('GTiff').CreateCopy(filename, src_ds)
+    src_ds = None
+
+    result = gdalmove.move('tmp/test_gdalmove_1.tif', 'EPSG:32611',
+                           pixel_threshold = 1.0, grid_size = 5, quiet = True)
+    corners_result = gdalmove.move('tmp/test_gdalmove_1_corners.tif', 'EPSG:32611',
+                                   pixel_threshold = 1.0, quiet = True)
+    if result is None or corners_result is None:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    (new_gt, max_error, rms_error, update) = result
+    if update != 1 or max_error > 1.0 or rms_error > max_error:
+        gdaltest.post_reason('fail')
+        print(result)
+        return 'fail'
+
+    # Over such a small area, the fit is close to the one of the corners
+    for i in range(6):
+        if abs(new_gt[i] - corners_result[0][i]) > 1e-3 * max(1, abs(new_gt[i])):
+            gdaltest.post_reason('fail')
+            print(new_gt)
+            print(corners_result[0])
+            return 'fail'
+
+    ds = gdal.Open('tmp/test_gdalmove_1.tif')
+    if ds.GetProjectionRef().find('WGS 84') < 0:
+        gdaltest.post_reason('fail')
+        print(ds.GetProjectionRef())
+        return 'fail'
+    got_gt = ds.GetGeoTransform()
+    for i in range(6):
+        if abs(got_gt[i] - new_gt[i]) > 1e-8 * max(1, abs(new_gt[i])):
+            gdaltest.post_reason('fail')
+            print(got_gt)
+            return 'fail'
+    ds = None
+
+    # A grid needs at least two points in each direction
+    if gdalmove.move('tmp/test_gdalmove_1.tif', 'EPSG:32611',
+                     grid_size = 1, quiet = True) is not None:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    script_path = test_py_scripts.get_py_script('gdalmove')
+    ret = test_py_scripts.run_py_script_as_external_script(script_path, 'gdalmove',
+        '-t_srs EPSG:32611 -grid 1 tmp/test_gdalmove_1.tif')
+    if ret.find('must be at least 2') < 0 or ret.find('Traceback') >= 0:
+        gdaltest.post_reason('fail')
+        print(ret)
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Batch mode with -list and -j
+
+def test_gdalmove_2():
+
+    script_path = test_py_scripts.get_py_script('gdalmove')
+    if script_path is None:
+        return 'skip'
+
+    src_ds = gdal.Open('../gcore/data/byte.tif')
+    filenames = [ 'tmp/test_gdalmove_2_%d.tif' % i for i in range(3) ]
+    for filename in filenames:
+        gdal.GetDriverByName('GTiff').CreateCopy(filename, src_ds)
+    src_ds = None
+
+    f = open('tmp/test_gdalmove_2.txt', 'wt')
+    for filename in filenames + [ 'tmp/non_existing.tif' ]:
+        f.write(filename + '\n')
+    f.close()
+
+    ret = test_py_scripts.run_py_script_as_external_script(script_path, 'gdalmove',
+        '-t_srs EPSG:32611 -et 1 -grid 3 -list tmp/test_gdalmove_2.txt -j 2')
+
+    for filename in filenames:
+        if ret.find('%s: max error' % filename) < 0:
+            gdaltest.post_reason('fail')
+            print(ret)
+            return 'fail'
+        ds = gdal.Open(filename)
+        if ds.GetProjectionRef().find('WGS 84') < 0:
+            gdaltest.post_reason('fail')
+            print(ret)
+            return 'fail'
+        ds = None
+    if ret.find('tmp/non_existing.tif: failed') < 0:
+        gdaltest.post_reason('fail')
+        print(ret)
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Cleanup
+
+def test_gdalmove_cleanup():
+
+    lst = [ 'tmp/test_gdalmove_1.tif', 'tmp/test_gdalmove_1_corners.tif',
+            'tmp/test_gdalmove_2_0.tif', 'tmp/test_gdalmove_2_1.tif',
+            'tmp/test_gdalmove_2_2.tif', 'tmp/test_gdalmove_2.txt' ]
+    for filename in lst:
+        gdal.Unlink(filename)
+
+    return 'success'
+
+gdaltest_list = [
+    test_gdalmove_1,
+    test_gdalmove_2,
+    test_gdalmove_cleanup,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_gdalmove' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  jpeg_in_tiff_extract.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+import sys
+
+sys.path.append( '../pymod' )
+
+from osgeo import gdal
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+def read_file(filename):
+    f = gdal.VSIFOpenL(filename, 'rb')
+    if f is None:
+        return None
+    gdal.VSIFSeekL(f, 0, 2)
+    size = gdal.VSIFTellL(f)
+    gdal.VSIFSeekL(f, 0, 0)
+    content = gdal.VSIFReadL(1, size, f)
+    gdal.VSIFCloseL(f)
+    return content
+
+###############################################################################
+# Extract all the tiles of a JPEG-in-TIFF file, one at a time, in bulk mode
+# and with worker processes, and check the tiles byte for byte
+
+def test_jpeg_in_tiff_extract_1():
+
+    script_path = test_py_scripts.get_py_script('jpeg_in_tiff_extract')
+    if script_path is None:
+        return 'skip'
+
+    drv = gdal.GetDriverByName('GTiff')
+    if drv.GetMetadataItem('DMD_CREATIONOPTIONLIST').find('JPEG') == -1:
+        return 'skip'
+
+    src_ds = gdal.Open('../gcore/data/rgbsmall.tif')
+    ds = drv.CreateCopy('tmp/jpeg_in_tiff_extract.tif', src_ds,
+                        options = [ 'COMPRESS=JPEG', 'TILED=YES',
+                                    'BLOCKXSIZE=16', 'BLOCKYSIZE=16' ])
+    ds = None
+    src_ds = None
+
+    radices = [ 'tmp/jpeg_in_tiff_extract_seq',
+                'tmp/jpeg_in_tiff_extract_bulk',
+                'tmp/jpeg_in_tiff_extract_j2' ]
+    test_py_scripts.run_py_script_as_external_script(script_path, 'jpeg_in_tiff_extract',
+        'tmp/jpeg_in_tiff_extract.tif %s.jpg' % radices[0])
+    test_py_scripts.run_py_script_as_external_script(script_path, 'jpeg_in_tiff_extract',
+        '-bulk tmp/jpeg_in_tiff_extract.tif %s.jpg' % radices[1])
+    test_py_scripts.run_py_script_as_external_script(script_path, 'jpeg_in_tiff_extract',
+        '-j 2 tmp/jpeg_in_tiff_extract.tif %s.jpg' % radices[2])
+
+    ds = gdal.Open('tmp/jpeg_in_tiff_extract.tif')
+    tiff_content = read_file('tmp/jpeg_in_tiff_extract.tif')
+    ret = 'success'
+    for tile_y in range(4):
+        for tile_x in range(4):
+            offset = int(ds.GetRasterBand(1).GetMetadataItem('BLOCK_OFFSET_%d_%d' % (tile_x, tile_y), 'TIFF'))
+            size = int(ds.GetRasterBand(1).GetMetadataItem('BLOCK_SIZE_%d_%d' % (tile_x, tile_y), 'TIFF'))
+            codestream = tiff_content[offset+2:offset+size]
+
+            contents = []
+            for radix in radices:
+                filename = '%s_%d_%d.jpg' % (radix, tile_x, tile_y)
+                contents.append(read_file(filename))
+                gdal.Unlink(filename)
+                gdal.Unlink(filename + '.aux.xml')
+
+            if ret == 'success':
+                if contents[0] is None or contents[0][-len(codestream):] != codestream:
+                    gdaltest.post_reason('wrong tile (%d,%d)' % (tile_x, tile_y))
+                    ret = 'fail'
+                elif contents[1] != contents[0] or contents[2] != contents[0]:
+                    gdaltest.post_reason('bulk extraction differs for tile (%d,%d)' % (tile_x, tile_y))
+                    ret = 'fail'
+
+    # The extracted tiles decode to the TIFF pixels
+    if ret == 'success':
+        test_py_scripts.run_py_script_as_external_script(script_path, 'jpeg_in_tiff_extract',
+            '-j 2 tmp/jpeg_in_tiff_extract.tif %s.jpg' % radices[2])
+        jpg_ds = gdal.Open('%s_1_1.jpg' % radices[2])
+        if jpg_ds is None or \
+           jpg_ds.ReadRaster(0, 0, 16, 16) != ds.ReadRaster(16, 16, 16, 16):
+            gdaltest.post_reason('extracted tile does not decode to the TIFF pixels')
+            ret = 'fail'
+        jpg_ds = None
+        for tile_y in range(4):
+            for tile_x in range(4):
+                filename = '%s_%d_%d.jpg' % (radices[2], tile_x, tile_y)
+                gdal.Unlink(filename)
+                gdal.Unlink(filename + '.aux.xml')
+
+    ds = None
+    drv.Delete('tmp/jpeg_in_tiff_extract.tif')
+
+    return ret
+
+###############################################################################
+# Sparse tiles are skipped with a warning, one at a time and in bulk mode
+
+def test_jpeg_in_tiff_extract_2():
+
+    script_path = test_py_scripts.get_py_script('jpeg_in_tiff_extract')
+    if script_path is None:
+        return 'skip'
+
+    drv = gdal.GetDriverByName('GTiff')
+    if drv.GetMetadataItem('DMD_CREATIONOPTIONLIST').find('JPEG') == -1:
+        return 'skip'
+
+    src_ds = gdal.Open('../gcore/data/rgbsmall.tif')
+    ds = drv.Create('tmp/jpeg_in_tiff_extract_sparse.tif', 32, 16, 3,
+                    options = [ 'COMPRESS=JPEG', 'TILED=YES', 'SPARSE_OK=YES',
+                                'BLOCKXSIZE=16', 'BLOCKYSIZE=16' ])
+    ds.WriteRaster(0, 0, 16, 16, src_ds.ReadRaster(0, 0, 16, 16))
+    ds = None
+    src_ds = None
+
+    ret = 'success'
+    for options in [ '', '-bulk', '-j 2' ]:
+        out = test_py_scripts.run_py_script_as_external_script(script_path, 'jpeg_in_tiff_extract',
+            options + ' tmp/jpeg_in_tiff_extract_sparse.tif tmp/jpeg_in_tiff_extract_sparse.jpg')
+        content = read_file('tmp/jpeg_in_tiff_extract_sparse_0_0.jpg')
+        sparse_content = read_file('tmp/jpeg_in_tiff_extract_sparse_1_0.jpg')
+        for filename in [ 'tmp/jpeg_in_tiff_extract_sparse_0_0.jpg',
+                          'tmp/jpeg_in_tiff_extract_sparse_1_0.jpg' ]:
+            gdal.Unlink(filename)
+            gdal.Unlink(filename + '.aux.xml')
+
+        if out.find('Block (1,0) is sparse') < 0 or content is None or \
+           sparse_content is not None:
+            gdaltest.post_reason('fail')
+            print(options)
+            print(out)
+            ret = 'fail'
+            break
+
+    drv.Delete('tmp/jpeg_in_tiff_extract_sparse.tif')
+
+    return ret
+
+gdaltest_list = [
+    test_jpeg_in_tiff_extract_1,
+    test_jpeg_in_tiff_extract_2,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_jpeg_in_tiff_extract' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
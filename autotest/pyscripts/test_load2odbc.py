@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  load2odbc.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+import os
+import sys
+
+sys.path.append( '../pymod' )
+
+from osgeo import ogr
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+# Load poly.shp into a SQLite database, standing for an ODBC datasource.
+
+def load2odbc_check(options):
+
+    script_path = test_py_scripts.get_py_script('load2odbc')
+    if script_path is None:
+        return 'skip'
+
+    drv = ogr.GetDriverByName('SQLite')
+    if drv is None:
+        return 'skip'
+
+    try:
+        os.remove('tmp/load2odbc.sqlite')
+    except:
+        pass
+    ds = drv.CreateDataSource('tmp/load2odbc.sqlite')
+    ds = None
+
+    test_py_scripts.run_py_script_as_external_script(script_path, 'load2odbc', options + ' ../ogr/data/poly.shp tmp/load2odbc.sqlite poly')
+
+    src_ds = ogr.Open('../ogr/data/poly.shp')
+    src_lyr = src_ds.GetLayer(0)
+    expected_area = sum([ feat.GetField('AREA') for feat in src_lyr ])
+    src_ds = None
+
+    ds = ogr.Open('tmp/load2odbc.sqlite')
+    sql_lyr = ds.ExecuteSQL('SELECT COUNT(*), SUM(AREA), MIN(WKT_GEOMETRY), MIN(XMIN) FROM poly')
+    feat = sql_lyr.GetNextFeature()
+    count = feat.GetField(0)
+    area = feat.GetField(1)
+    wkt = feat.GetField(2)
+    xmin = feat.GetField(3)
+    ds.ReleaseResultSet(sql_lyr)
+    ds = None
+
+    os.remove('tmp/load2odbc.sqlite')
+
+    if count != 10:
+        gdaltest.post_reason('fail')
+        print(count)
+        return 'fail'
+
+    if abs(area - expected_area) > 1e-3:
+        gdaltest.post_reason('fail')
+        print(area, expected_area)
+        return 'fail'
+
+    if wkt is None or wkt.find('POLYGON') != 0 or xmin is None:
+        gdaltest.post_reason('fail')
+        print(wkt, xmin)
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Bulk load with CreateFeature()
+
+def test_load2odbc_1():
+
+    return load2odbc_check('-bulk -gt 4')
+
+###############################################################################
+# Bulk load with multi-row INSERT statements
+
+def test_load2odbc_2():
+
+    return load2odbc_check('-bulk -sql -gt 4 -batch 3')
+
+gdaltest_list = [
+    test_load2odbc_1,
+    test_load2odbc_2,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_load2odbc' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
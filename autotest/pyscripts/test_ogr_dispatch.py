@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  ogr_dispatch.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+
+import shutil
+import sys
+
+sys.path.append( '../pymod' )
+
+from osgeo import gdal
+from osgeo import ogr
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+def import_ogr_dispatch():
+    script_path = test_py_scripts.get_py_script('ogr_dispatch')
+    if script_path is None:
+        return None
+
+    saved_syspath = sys.path
+    sys.path.append(script_path)
+    try:
+        import ogr_dispatch
+    except:
+        ogr_dispatch = None
+    sys.path = saved_syspath
+
+    return ogr_dispatch
+
+###############################################################################
+# Create a source with features alternating between target layers
+
+def test_ogr_dispatch_init():
+
+    features = []
+    for i in range(10):
+        if i % 3 == 2:
+            geom = '{ "type": "LineString", "coordinates": [ [ %d, 0 ], [ %d, 1 ] ] }' % (i, i)
+        else:
+            geom = '{ "type": "Point", "coordinates": [ %d, 0 ] }' % i
+        features.append('{ "type": "Feature", "properties": { "id": %d, "kind": "%s" }, "geometry": %s }' %
+                        (i, 'AB'[i % 2], geom))
+    f = open('tmp/ogr_dispatch_src.json', 'wt')
+    f.write('{ "type": "FeatureCollection", "features": [\n%s\n] }\n' % ',\n'.join(features))
+    f.close()
+
+    return 'success'
+
+###############################################################################
+def check_dispatched(ds, expected):
+    got = {}
+    for lyr in ds:
+        got[lyr.GetName()] = sorted([ feat.GetField('id') for feat in lyr ])
+    if got != expected:
+        gdaltest.post_reason('fail')
+        print(got)
+        return False
+    return True
+
+expected_layers = { 'A_POINT': [0, 4, 6], 'B_POINT': [1, 3, 7, 9],
+                    'A_LINESTRING': [2, 8], 'B_LINESTRING': [5] }
+
+###############################################################################
+# Dispatch on a field and on the geometry type
+
+def test_ogr_dispatch_1():
+
+    ogr_dispatch = import_ogr_dispatch()
+    if ogr_dispatch is None:
+        return 'skip'
+
+    shutil.rmtree('tmp/ogr_dispatch_1', ignore_errors = True)
+    ret = ogr_dispatch.ogr_dispatch([ '-quiet', '-src', 'tmp/ogr_dispatch_src.json',
+                                      '-dst', 'tmp/ogr_dispatch_1',
+                                      '-field', 'kind', '-field', 'OGR_GEOMETRY' ])
+    if ret != 0:
+        gdaltest.post_reason('fail')
+        return 'fail'
+
+    ds = ogr.Open('tmp/ogr_dispatch_1')
+    if not check_dispatched(ds, expected_layers):
+        return 'fail'
+    ds = None
+
+    shutil.rmtree('tmp/ogr_dispatch_1', ignore_errors = True)
+
+    return 'success'
+
+###############################################################################
+# Transactions committed every -gt features, in one or two passes
+
+def test_ogr_dispatch_2():
+
+    ogr_dispatch = import_ogr_dispatch()
+    if ogr_dispatch is None:
+        return 'skip'
+
+    if ogr.GetDriverByName('SQLite') is None:
+        return 'skip'
+
+    for options in [ [ '-gt', '2' ], [ '-gt', '2', '-two_pass' ], [ '-gt', '0' ] ]:
+        gdal.Unlink('tmp/ogr_dispatch_2.sqlite')
+        ret = ogr_dispatch.ogr_dispatch([ '-quiet', '-f', 'SQLite',
+                                          '-src', 'tmp/ogr_dispatch_src.json',
+                                          '-dst', 'tmp/ogr_dispatch_2.sqlite',
+                                          '-field', 'kind', '-field', 'OGR_GEOMETRY' ] + options)
+        if ret != 0:
+            gdaltest.post_reason('fail')
+            print(options)
+            return 'fail'
+
+        ds = ogr.Open('tmp/ogr_dispatch_2.sqlite')
+        if not check_dispatched(ds, dict([ (name.lower(), ids) for (name, ids) in expected_layers.items() ])):
+            print(options)
+            return 'fail'
+        ds = None
+
+    gdal.Unlink('tmp/ogr_dispatch_2.sqlite')
+
+    return 'success'
+
+###############################################################################
+# Cleanup
+
+def test_ogr_dispatch_cleanup():
+
+    gdal.Unlink('tmp/ogr_dispatch_src.json')
+
+    return 'success'
+
+gdaltest_list = [
+    test_ogr_dispatch_init,
+    test_ogr_dispatch_1,
+    test_ogr_dispatch_2,
+    test_ogr_dispatch_cleanup,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_ogr_dispatch' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
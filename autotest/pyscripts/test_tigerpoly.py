@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+###############################################################################
+# $Id$
+#
+# Project:  GDAL/OGR Test Suite
+# Purpose:  tigerpoly.py testing
+#
+###############################################################################
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+# OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+# DEALINGS IN THE SOFTWARE.
+###############################################################################
+
+
+
+import sys
+
+sys.path.append( '../pymod' )
+
+from osgeo import ogr
+import gdaltest
+import test_py_scripts
+
+###############################################################################
+# Two polygons sharing a chain in module A, with a dangling chain inside the
+# first one, and a triangle in module B whose POLYID is also used in module A.
+
+chains = [ ('A', 1, 'LINESTRING (0 0,1 0)', 1, 0),
+           ('A', 2, 'LINESTRING (1 0,2 0)', 0, 2),
+           ('A', 3, 'LINESTRING (2 0,2 1)', 0, 2),
+           ('A', 4, 'LINESTRING (2 1,1 1)', 0, 2),
+           ('A', 5, 'LINESTRING (1 1,0 1)', 0, 1),
+           ('A', 6, 'LINESTRING (0 1,0 0)', 0, 1),
+           ('A', 7, 'LINESTRING (1 0,1 1)', 1, 2),
+           ('A', 8, 'LINESTRING (0.5 0.2,0.5 0.5)', 1, 1),
+           ('B', 1, 'LINESTRING (10 10,11 10)', 1, 0),
+           ('B', 2, 'LINESTRING (11 10,11 11)', 1, 0),
+           ('B', 3, 'LINESTRING (11 11,10 10)', 1, 0) ]
+
+polygons = [ ('A', 1, 'west'),
+             ('A', 2, 'east'),
+             ('B', 1, 'triangle') ]
+
+def create_datasource(filename):
+    ogr.GetDriverByName('SQLite').DeleteDataSource(filename)
+    ds = ogr.GetDriverByName('SQLite').CreateDataSource(filename)
+
+    chain_lyr = ds.CreateLayer('CompleteChain', geom_type = ogr.wkbLineString)
+    chain_lyr.CreateField(ogr.FieldDefn('MODULE', ogr.OFTString))
+    chain_lyr.CreateField(ogr.FieldDefn('TLID', ogr.OFTInteger))
+    link_lyr = ds.CreateLayer('PolyChainLink', geom_type = ogr.wkbNone)
+    link_lyr.CreateField(ogr.FieldDefn('MODULE', ogr.OFTString))
+    link_lyr.CreateField(ogr.FieldDefn('TLID', ogr.OFTInteger))
+    link_lyr.CreateField(ogr.FieldDefn('POLYIDL', ogr.OFTInteger))
+    link_lyr.CreateField(ogr.FieldDefn('POLYIDR', ogr.OFTInteger))
+    for (module, tlid, wkt, lpoly_id, rpoly_id) in chains:
+        feat = ogr.Feature(chain_lyr.GetLayerDefn())
+        feat.SetField('MODULE', module)
+        feat.SetField('TLID', tlid)
+        feat.SetGeometry(ogr.CreateGeometryFromWkt(wkt))
+        chain_lyr.CreateFeature(feat)
+
+        feat = ogr.Feature(link_lyr.GetLayerDefn())
+        feat.SetField('MODULE', module)
+        feat.SetField('TLID', tlid)
+        feat.SetField('POLYIDL', lpoly_id)
+        feat.SetField('POLYIDR', rpoly_id)
+        link_lyr.CreateFeature(feat)
+
+    lyr = ds.CreateLayer('Polygon', geom_type = ogr.wkbNone)
+    lyr.CreateField(ogr.FieldDefn('MODULE', ogr.OFTString))
+    lyr.CreateField(ogr.FieldDefn('POLYID', ogr.OFTInteger))
+    lyr.CreateField(ogr.FieldDefn('NAME', ogr.OFTString))
+    for (module, polyid, name) in polygons:
+        feat = ogr.Feature(lyr.GetLayerDefn())
+        feat.SetField('MODULE', module)
+        feat.SetField('POLYID', polyid)
+        feat.SetField('NAME', name)
+        lyr.CreateFeature(feat)
+
+    ds = None
+
+def read_polygons(filename):
+    ds = ogr.Open(filename)
+    lyr = ds.GetLayer(0)
+    ret = sorted([ (feat.GetField('MODULE'), feat.GetField('POLYID'), feat.GetField('NAME'),
+                    feat.GetGeometryRef().ExportToWkt()) for feat in lyr ])
+    ds = None
+    return ret
+
+###############################################################################
+# The streaming mode, with and without worker processes, assembles the same
+# polygons as the in-memory mode
+
+def test_tigerpoly_1():
+
+    script_path = test_py_scripts.get_py_script('tigerpoly')
+    if script_path is None:
+        return 'skip'
+
+    if ogr.GetDriverByName('SQLite') is None:
+        return 'skip'
+
+    create_datasource('tmp/tigerpoly.sqlite')
+
+    test_py_scripts.run_py_script_as_external_script(script_path, 'tigerpoly',
+        'tmp/tigerpoly.sqlite tmp/tigerpoly_in_memory.shp')
+    expected = read_polygons('tmp/tigerpoly_in_memory.shp')
+    if [ item[0:3] for item in expected ] != sorted(polygons):
+        gdaltest.post_reason('fail')
+        print(expected)
+        return 'fail'
+
+    for options in [ '-stream', '-stream -j 2 -gt 1' ]:
+        test_py_scripts.run_py_script_as_external_script(script_path, 'tigerpoly',
+            options + ' tmp/tigerpoly.sqlite tmp/tigerpoly_stream.shp')
+        got = read_polygons('tmp/tigerpoly_stream.shp')
+        if got != expected:
+            gdaltest.post_reason('fail')
+            print(options)
+            print(got)
+            print(expected)
+            return 'fail'
+
+    return 'success'
+
+###############################################################################
+# -gt 0 is rejected
+
+def test_tigerpoly_2():
+
+    script_path = test_py_scripts.get_py_script('tigerpoly')
+    if script_path is None:
+        return 'skip'
+
+    ret = test_py_scripts.run_py_script_as_external_script(script_path, 'tigerpoly',
+        '-stream -gt 0 tmp/tigerpoly.sqlite tmp/tigerpoly_stream.shp')
+    if ret.find('-gt should be at least 1') < 0:
+        gdaltest.post_reason('fail')
+        print(ret)
+        return 'fail'
+
+    return 'success'
+
+###############################################################################
+# Cleanup
+
+def test_tigerpoly_cleanup():
+
+    ogr.GetDriverByName('SQLite').DeleteDataSource('tmp/tigerpoly.sqlite')
+    for filename in [ 'tmp/tigerpoly_in_memory.shp', 'tmp/tigerpoly_stream.shp' ]:
+        ogr.GetDriverByName('ESRI Shapefile').DeleteDataSource(filename)
+
+    return 'success'
+
+gdaltest_list = [
+    test_tigerpoly_1,
+    test_tigerpoly_2,
+    test_tigerpoly_cleanup,
+    ]
+
+if __name__ == '__main__':
+
+    gdaltest.setup_run( 'test_tigerpoly' )
+
+    gdaltest.run_tests( gdaltest_list )
+
+    gdaltest.summarize()
@@ -1335,10 +1335,12 @@ const char CPL_DLL * OGRToOGCGeomType( OGRwkbGeometryType eGeomType );
 
 /* Prepared geometry API (needs GEOS >= 3.1.0) */
 typedef struct _OGRPreparedGeometry OGRPreparedGeometry;
-int OGRHasPreparedGeometrySupport();
-OGRPreparedGeometry* OGRCreatePreparedGeometry( const OGRGeometry* poGeom );
-void OGRDestroyPreparedGeometry( OGRPreparedGeometry* poPreparedGeom );
-int OGRPreparedGeometryIntersects( const OGRPreparedGeometry* poPreparedGeom,
-                                   const OGRGeometry* poOtherGeom );
+int CPL_DLL OGRHasPreparedGeometrySupport();
+OGRPreparedGeometry CPL_DLL * OGRCreatePreparedGeometry( const OGRGeometry* poGeom );
+void CPL_DLL OGRDestroyPreparedGeometry( OGRPreparedGeometry* poPreparedGeom );
+int CPL_DLL OGRPreparedGeometryIntersects( const OGRPreparedGeometry* poPreparedGeom,
+                                           const OGRGeometry* poOtherGeom );
+int CPL_DLL OGRPreparedGeometryContains( const OGRPreparedGeometry* poPreparedGeom,
+                                         const OGRGeometry* poOtherGeom );
 
 #endif /* ndef _OGR_GEOMETRY_H_INCLUDED */
@@ -4752,6 +4752,32 @@ int OGRPreparedGeometryIntersects( const OGRPreparedGeometry* poPreparedGeom,
 #endif
 }
 
+/************************************************************************/
+/*                       OGRPreparedGeometryContains()                  */
+/************************************************************************/
+
+int OGRPreparedGeometryContains( const OGRPreparedGeometry* poPreparedGeom,
+                                 const OGRGeometry* poOtherGeom )
+{
+#ifdef HAVE_GEOS_PREPARED_GEOMETRY
+    if( poPreparedGeom == NULL || poOtherGeom == NULL )
+        return FALSE;
+
+    GEOSGeom hGEOSOtherGeom = poOtherGeom->exportToGEOS(poPreparedGeom->hGEOSCtxt);
+    if( hGEOSOtherGeom == NULL )
+        return FALSE;
+
+    int bRet = GEOSPreparedContains_r(poPreparedGeom->hGEOSCtxt,
+                                      poPreparedGeom->poPreparedGEOSGeom,
+                                      hGEOSOtherGeom);
+    GEOSGeom_destroy_r( poPreparedGeom->hGEOSCtxt, hGEOSOtherGeom );
+
+    return bRet == 1;
+#else
+    return FALSE;
+#endif
+}
+
 /************************************************************************/
 /*                       OGRGeometryFromEWKB()                          */
 /************************************************************************/
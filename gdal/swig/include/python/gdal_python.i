@@ -351,6 +351,26 @@ int wrapper_VSIFReadL( void **buf, int nMembSize, int nMembCount, VSILFILE *fp)
                                          callback = callback,
                                          callback_data = callback_data )
 
+  def ComputeAllStats(self, approx_ok = False, hist_buckets = 256, checksum = True,
+                      callback = None, callback_data = None, num_threads = 0):
+      """Compute the statistics, the default histogram and the checksum of
+      the band in a single read of the band. The values are computed by
+      blocks of lines in num_threads worker threads (one per CPU with 0).
+      hist_buckets = 0 or checksum = False skip the histogram or the checksum.
+
+      Returns a dictionary with 'min', 'max', 'mean', 'stddev', 'histogram'
+      (as returned by GetDefaultHistogram()) and 'checksum' keys, or None on
+      failure. As with ComputeStatistics() and GetDefaultHistogram(), the
+      statistics and the histogram are set on the band."""
+      import gdalnumeric
+
+      results = gdalnumeric.BandsComputeAllStats( [self], approx_ok, hist_buckets,
+                                                  checksum, callback, callback_data,
+                                                  num_threads )
+      if results is None:
+          return None
+      return results[0]
+
   def GetVirtualMemArray(self, eAccess = gdalconst.GF_Read, xoff=0, yoff=0,
                          xsize=None, ysize=None, bufxsize=None, bufysize=None,
                          datatype = None,
@@ -540,6 +560,17 @@ CPLErr ReadRaster1(  int xoff, int yoff, int xsize, int ysize,
                                                callback = callback,
                                                callback_data = callback_data )
 
+    def ComputeAllStats(self, approx_ok = False, hist_buckets = 256, checksum = True,
+                        callback = None, callback_data = None, num_threads = 0):
+        """Same as Band.ComputeAllStats() for all the bands of the dataset,
+        that are read together. Returns a list with a dictionary per band,
+        or None on failure."""
+
+        import gdalnumeric
+        return gdalnumeric.BandsComputeAllStats( [self.GetRasterBand(i + 1) for i in range(self.RasterCount)],
+                                                 approx_ok, hist_buckets, checksum,
+                                                 callback, callback_data, num_threads )
+
     def WriteRaster(self, xoff, yoff, xsize, ysize,
                     buf_string,
                     buf_xsize = None, buf_ysize = None, buf_type = None,
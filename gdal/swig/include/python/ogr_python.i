@@ -112,6 +112,9 @@
             return _ogr.DataSource_DeleteLayer(self, value)
         else:
             raise TypeError("Input %s is not of String or Int type" % type(value))
+
+    # ALTER TABLE statements change the fields of the layers
+    ExecuteSQL = _SQLAltersFieldSchema(ExecuteSQL)
   }
 }
 
@@ -183,6 +186,207 @@
         else:
             return feature
 
+    def _GetFieldSchema(self):
+        # Cached as long as this Layer object lives and no Python call may
+        # have altered the fields of a definition
+        schema = self.__dict__.get('_field_schema')
+        if schema is None or schema.generation != _field_schema_generation:
+            schema = _ogr.Layer_GetLayerDefn(self).GetFieldSchema()
+            self.__dict__['_field_schema'] = schema
+        return schema
+
+    # The features and definitions returned by the layer share the field
+    # schema of the layer definition instead of each building its own one
+    GetNextFeature = _AttachesFieldSchema(GetNextFeature)
+    GetFeature = _AttachesFieldSchema(GetFeature)
+    GetLayerDefn = _AttachesFieldSchema(GetLayerDefn)
+
+    CreateField = _AltersFieldSchema(CreateField)
+    DeleteField = _AltersFieldSchema(DeleteField)
+    ReorderField = _AltersFieldSchema(ReorderField)
+    ReorderFields = _AltersFieldSchema(ReorderFields)
+    AlterFieldDefn = _AltersFieldSchema(AlterFieldDefn)
+    CreateGeomField = _AltersFieldSchema(CreateGeomField)
+
+    def ExportToGeoJSONStream(self, fp, batch_size = 1000, options = None):
+        """ExportToGeoJSONStream(fp, batch_size = 1000, options = None) -> int
+
+           Write the features of the layer (honouring the current filters) as
+           a GeoJSON FeatureCollection into fp, a file object opened in text
+           mode. Features have the same members as with
+           Feature.ExportToJson(), the JSON of their geometry being written
+           as Geometry.ExportToJson() returns it, and are written by batches
+           of batch_size features. The options parameter is passed to
+           Geometry.ExportToJson(). Returns the number of features written."""
+
+        json = _GetJSONModule()
+        schema = self._GetFieldSchema()
+        if options is None:
+            options = []
+
+        fp.write('{"type": "FeatureCollection", "features": [\n')
+        count = 0
+        batch = []
+        self.ResetReading()
+        feature = self.GetNextFeature()
+        while feature is not None:
+            batch.append(feature._ExportToJsonString(schema, json, options))
+            count += 1
+            if len(batch) == batch_size:
+                if count > len(batch):
+                    fp.write(',\n')
+                fp.write(',\n'.join(batch))
+                batch = []
+            feature = self.GetNextFeature()
+        if batch:
+            if count > len(batch):
+                fp.write(',\n')
+            fp.write(',\n'.join(batch))
+        fp.write('\n]}\n')
+        return count
+
+    def WriteArrays(self, columns, geometry_wkb = None, fids = None, batch_size = 10000):
+        """WriteArrays(columns, geometry_wkb = None, fids = None, batch_size = 10000) -> int
+
+           Create features from columns of values, typically numpy arrays.
+
+           columns is a dictionary mapping field names to sequences of
+           values, all of the same length. Masked values of numpy masked
+           arrays, and None items of object arrays, leave the field unset.
+           geometry_wkb is either a (data, offsets) WKB array as returned by
+           ExportToWkbArray(), or a sequence of WKB strings, Geometry objects
+           or None. fids is an optional sequence of FIDs.
+
+           The type of each column is checked against the field type once,
+           before writing. Features are created by batches of batch_size
+           features, each in its own transaction when the layer supports
+           them. Returns the number of features written."""
+
+        import numpy
+
+        schema = self._GetFieldSchema()
+        count = None
+
+        # Convert the columns to lists of Python values, with the setter
+        # to use for each of them
+        fields = []
+        for name in columns:
+            fld_index = schema.GetFieldIndex(name)
+            if fld_index < 0:
+                raise ValueError('Field %s does not exist' % name)
+            values = columns[name]
+            mask = None
+            if isinstance(values, numpy.ma.MaskedArray):
+                mask = numpy.ma.getmaskarray(values)
+                values = values.data
+            values = numpy.asarray(values)
+            if values.ndim != 1:
+                raise ValueError('Column %s must be one-dimensional' % name)
+            if count is None:
+                count = len(values)
+            elif len(values) != count:
+                raise ValueError('Column %s has %d values instead of %d' % (name, len(values), count))
+
+            fld_type = schema.types[fld_index]
+            kind = values.dtype.kind
+            if kind != 'O' and (fld_type not in _ARRAY_FIELD_KINDS or
+                                kind not in _ARRAY_FIELD_KINDS[fld_type]):
+                raise TypeError('Column %s of type %s cannot be written in a field of type %s' %
+                                (name, str(values.dtype), GetFieldTypeName(fld_type)))
+
+            if kind == 'O':
+                setter = Feature.SetField2
+            elif kind in 'iub':
+                setter = _ogr.Feature_SetFieldInteger64
+                if kind == 'b':
+                    values = values.astype(numpy.int64)
+            elif kind == 'f':
+                setter = _ogr.Feature_SetField
+            elif kind == 'M':
+                setter = _ogr.Feature_SetFieldString
+                if mask is None:
+                    # NaT
+                    mask = values.view(numpy.int64) == numpy.iinfo(numpy.int64).min
+                if fld_type == OFTDate:
+                    values = numpy.datetime_as_string(values, unit = 'D')
+                else:
+                    values = numpy.datetime_as_string(values, unit = 's')
+            else:
+                setter = _ogr.Feature_SetFieldString
+
+            values = values.tolist()
+            if mask is not None:
+                for i in numpy.nonzero(mask)[0]:
+                    values[i] = None
+            fields.append((fld_index, setter, values))
+
+        if geometry_wkb is not None:
+            if isinstance(geometry_wkb, tuple) and len(geometry_wkb) == 2 and \
+               not isinstance(geometry_wkb[0], Geometry):
+                (wkb_data, wkb_offsets) = _AsWkbArray(geometry_wkb)
+                geom_count = len(wkb_offsets) - 1
+            else:
+                wkb_data = None
+                geom_count = len(geometry_wkb)
+            if count is None:
+                count = geom_count
+            elif geom_count != count:
+                raise ValueError('geometry_wkb has %d values instead of %d' % (geom_count, count))
+        if fids is not None:
+            fids = numpy.asarray(fids, dtype = numpy.int64).tolist()
+            if count is None:
+                count = len(fids)
+            elif len(fids) != count:
+                raise ValueError('fids has %d values instead of %d' % (len(fids), count))
+        if count is None:
+            return 0
+
+        use_transactions = self.TestCapability(OLCTransactions)
+        unset_field = _ogr.Feature_UnsetField
+        create_feature = _ogr.Layer_CreateFeature
+
+        # A single feature is reused for all the rows
+        feat = Feature(self.GetLayerDefn())
+        for start in range(0, count, batch_size):
+            end = min(start + batch_size, count)
+            if geometry_wkb is None:
+                geoms = None
+            elif wkb_data is not None:
+                geoms = CreateGeometriesFromWkbArray(wkb_data, wkb_offsets[start:end+1])
+            else:
+                geoms = []
+                for geom in geometry_wkb[start:end]:
+                    if geom is not None and not isinstance(geom, Geometry):
+                        geom = CreateGeometryFromWkb(geom)
+                    geoms.append(geom)
+
+            if use_transactions:
+                self.StartTransaction()
+            try:
+                for row in range(start, end):
+                    for (fld_index, setter, values) in fields:
+                        value = values[row]
+                        if value is None:
+                            unset_field(feat, fld_index)
+                        else:
+                            setter(feat, fld_index, value)
+                    if geoms is not None:
+                        feat.SetGeometry(geoms[row - start])
+                    if fids is not None:
+                        feat.SetFID(fids[row])
+                    else:
+                        feat.SetFID(NullFID)
+                    if create_feature(self, feat) != 0:
+                        raise RuntimeError('CreateFeature() failed for row %d' % row)
+            except:
+                if use_transactions:
+                    self.RollbackTransaction()
+                raise
+            if use_transactions:
+                self.CommitTransaction()
+
+        return count
+
     def schema(self):
         output = []
         defn = self.GetLayerDefn()
@@ -222,6 +426,9 @@
     def __copy__(self):
         return self.Clone()
 
+    def __reduce__(self):
+        return (_FeatureFromState, (_GetFeatureState(self),))
+
     # This makes it possible to fetch fields in the form "feature.area". 
     # This has some risk of name collisions.
     def __getattr__(self, key):
@@ -287,35 +494,30 @@
             return self.SetField2( fld_index, value )
 
     def GetField(self, fld_index):
+        schema = self._GetFieldSchema()
         if isinstance(fld_index, str):
-            fld_index = self.GetFieldIndex(fld_index)
-        if (fld_index < 0) or (fld_index > self.GetFieldCount()):
+            fld_index = schema.GetFieldIndex(fld_index)
+        if (fld_index < 0) or (fld_index >= schema.field_count):
             raise ValueError("Illegal field requested in GetField()")
-        if not (self.IsFieldSet(fld_index)):
+        if not _ogr.Feature_IsFieldSet(self, fld_index):
             return None
-        fld_type = self.GetFieldType(fld_index)
-        if fld_type == OFTInteger:
-            return self.GetFieldAsInteger(fld_index)
-        if fld_type == OFTInteger64:
-            return self.GetFieldAsInteger64(fld_index)
-        if fld_type == OFTReal:
-            return self.GetFieldAsDouble(fld_index)
-        if fld_type == OFTStringList:
-            return self.GetFieldAsStringList(fld_index)
-        if fld_type == OFTIntegerList:
-            return self.GetFieldAsIntegerList(fld_index)
-        if fld_type == OFTInteger64List:
-            return self.GetFieldAsInteger64List(fld_index)
-        if fld_type == OFTRealList:
-            return self.GetFieldAsDoubleList(fld_index)
-        ## if fld_type == OFTDateTime or fld_type == OFTDate or fld_type == OFTTime:
-        #     return self.GetFieldAsDate(fld_index)
-        # default to returning as a string.  Should we add more types?
-        try:
-            return self.GetFieldAsString(fld_index)
-        except:
-            # For Python3 on non-UTF8 strings
-            return self.GetFieldAsBinary(fld_index)
+        return schema.getters[fld_index](self, fld_index)
+
+    def GetFieldsAsTuple(self):
+        """GetFieldsAsTuple() -> tuple
+
+           Return the values of all the fields, in the order of the layer
+           definition, as GetField() would return them."""
+        schema = self._GetFieldSchema()
+        getters = schema.getters
+        is_field_set = _ogr.Feature_IsFieldSet
+        values = []
+        for i in range(schema.field_count):
+            if is_field_set(self, i):
+                values.append(getters[i](self, i))
+            else:
+                values.append(None)
+        return tuple(values)
 
     # With several override, SWIG cannot dispatch automatically unicode strings
     # to the right implementation, so we have to do it at hand
@@ -349,9 +551,10 @@
         return _ogr.Feature_SetField(self, *args)
 
     def SetField2(self, fld_index, value):
+        schema = self._GetFieldSchema()
         if isinstance(fld_index, str):
-            fld_index = self.GetFieldIndex(fld_index)
-        if (fld_index < 0) or (fld_index > self.GetFieldCount()):
+            fld_index = schema.GetFieldIndex(fld_index)
+        if (fld_index < 0) or (fld_index >= schema.field_count):
             raise ValueError("Illegal field requested in SetField2()")
 
         if value is None:
@@ -374,6 +577,22 @@
             else:
                 raise TypeError( 'Unsupported type of list in SetField2(). Type of element is %s' % str(type(value[0])) )
 
+        # Dispatch on the type of the value directly, rather than through
+        # the overloads of SetField()
+        value_type = type(value)
+        if value_type in _INTEGER_TYPES:
+            _ogr.Feature_SetFieldInteger64(self, fld_index, int(value))
+            return
+        if isinstance(value, float):
+            _ogr.Feature_SetField(self, fld_index, value)
+            return
+        if isinstance(value, str) or str(value_type) == "<type 'unicode'>":
+            _ogr.Feature_SetFieldString(self, fld_index, value)
+            return
+        if schema.types[fld_index] in _STRING_SET_FIELD_TYPES:
+            _ogr.Feature_SetFieldString(self, fld_index, str(value))
+            return
+
         try:
             self.SetField( fld_index, value )
         except:
@@ -381,69 +600,82 @@
         return
 
     def keys(self):
-        names = []
-        for i in range(self.GetFieldCount()):
-            fieldname = self.GetFieldDefnRef(i).GetName()
-            names.append(fieldname)
-        return names
-    
+        return list(self._GetFieldSchema().names)
+
     def items(self):
-        keys = self.keys()
-        output = {}
-        for key in keys:
-            output[key] = self.GetField(key)
-        return output
+        return dict(zip(self._GetFieldSchema().names, self.GetFieldsAsTuple()))
+
     def geometry(self):
         return self.GetGeometryRef()
 
+    def _GetFieldSchema(self):
+        schema = self.__dict__.get('_field_schema')
+        if schema is None or schema.generation != _field_schema_generation:
+            schema = _ogr.Feature_GetDefnRef(self).GetFieldSchema()
+            self.__dict__['_field_schema'] = schema
+        return schema
+
+    # Features created from a definition share its cached field schema,
+    # and so does the definition returned by a feature
+    __init__ = _AttachesDefnFieldSchema(__init__)
+    GetDefnRef = _AttachesFieldSchema(GetDefnRef)
+
+    def _GetJsonProperties(self, schema):
+        properties = {}
+        values = self.GetFieldsAsTuple()
+        for i in range(schema.field_count):
+            value = values[i]
+            if schema.types[i] == OFTInteger and schema.subtypes[i] == OFSTBoolean:
+                value = bool(value)
+            properties[schema.names[i]] = value
+        return properties
+
+    def _ExportToJsonString(self, schema, json, options):
+        # Used by Layer.ExportToGeoJSONStream(): the geometry JSON is spliced
+        # in as it is, without being parsed and serialized again
+        geom = self.GetGeometryRef()
+        if geom is not None:
+            geom_json_string = geom.ExportToJson(options = options)
+        else:
+            geom_json_string = 'null'
+        output = '{"type": "Feature", "geometry": %s, "properties": %s' % \
+            (geom_json_string, json.dumps(self._GetJsonProperties(schema)))
+        fid = self.GetFID()
+        if fid != NullFID:
+            output += ', "id": %d' % fid
+        return output + '}'
+
     def ExportToJson(self, as_object = False, options = None):
         """Exports a GeoJSON object which represents the Feature. The
            as_object parameter determines whether the returned value 
            should be a Python object instead of a string. Defaults to False.
            The options parameter is passed to Geometry.ExportToJson()"""
 
-        try:
-            import simplejson
-        except ImportError:
-            try:
-                import json as simplejson
-            except ImportError:
-                raise ImportError("Unable to import simplejson or json, needed for ExportToJson.")
+        json = _GetJSONModule()
+        if options is None:
+            options = []
+        schema = self._GetFieldSchema()
 
         geom = self.GetGeometryRef()
         if geom is not None:
-            if options is None:
-                options = []
-            geom_json_string = geom.ExportToJson(options = options)
-            geom_json_object = simplejson.loads(geom_json_string)
+            geom_json_object = json.loads(geom.ExportToJson(options = options))
         else:
             geom_json_object = None
 
         output = {'type':'Feature',
                    'geometry': geom_json_object,
-                   'properties': {}
-                  } 
-        
+                   'properties': self._GetJsonProperties(schema)
+                  }
+
         fid = self.GetFID()
         if fid != NullFID:
             output['id'] = fid
-            
-        for key in self.keys():
-            fld_defn = self.GetFieldDefnRef(self.GetFieldIndex(key))
-            if fld_defn.GetType() == _ogr.OFTInteger and fld_defn.GetSubType() == _ogr.OFSTBoolean:
-                if self.GetField(key):
-                    output['properties'][key] = True
-                else:
-                    output['properties'][key] = False
-            else:
-                output['properties'][key] = self.GetField(key)
-        
+
         if not as_object:
-            output = simplejson.dumps(output)
+            output = json.dumps(output)
 
         return output
 
-
 %}
 
 }
@@ -466,6 +698,36 @@
       result = CreateGeometryFromWkb(state)
       self.this = result.this
         
+  def GetPointsAsArray(self, nCoordDimension = 0):
+      """GetPointsAsArray(self, nCoordDimension = 0) -> numpy array
+
+         Return the vertices of a point, line string or ring as a float64
+         numpy array of shape (N, 2) or (N, 3), in a single call.
+         nCoordDimension forces the number of columns, otherwise the
+         coordinate dimension of the geometry is used."""
+
+      import numpy
+      if nCoordDimension == 0:
+          nCoordDimension = self.GetCoordinateDimension()
+      if nCoordDimension not in (2, 3):
+          raise ValueError('nCoordDimension must be 2 or 3')
+      array = numpy.empty((self.GetPointCount(), nCoordDimension), dtype = numpy.float64)
+      _ogr.Geometry_GetPointsIntoBuffer(self, array, nCoordDimension)
+      return array
+
+  def SetPointsFromArray(self, points):
+      """SetPointsFromArray(self, points)
+
+         Replace the vertices of a point, line string or ring with the rows
+         of a (N, 2) or (N, 3) array-like. The geometry becomes 2D or 3D
+         accordingly."""
+
+      import numpy
+      points = numpy.ascontiguousarray(points, dtype = numpy.float64)
+      if points.ndim != 2 or points.shape[1] not in (2, 3):
+          raise ValueError('points must be a (N, 2) or (N, 3) array')
+      _ogr.Geometry_SetPointsFromBuffer(self, points, points.shape[1])
+
   def __iter__(self):
       self.iter_subgeom = 0
       return self
@@ -506,6 +768,29 @@
     _ogr.delete_FeatureDefn( self )
     self.thisown = 0
 
+  def GetFieldSchema(self):
+    """GetFieldSchema() -> object
+
+       Fetch the names, types and subtypes of all the fields at once. The
+       returned object has field_count, names, types and subtypes
+       attributes, and a GetFieldIndex(name) method. It is computed
+       once per FeatureDefn object, and shared by the features created
+       from it and by the definitions and features returned by a Layer,
+       so that the Python field accessors do not query the definition
+       again for every feature."""
+    schema = self.__dict__.get('_field_schema')
+    if schema is None or schema.generation != _field_schema_generation:
+        schema = _FieldSchema(self)
+        self.__dict__['_field_schema'] = schema
+    return schema
+
+  AddFieldDefn = _AltersFieldSchema(AddFieldDefn)
+  AddGeomFieldDefn = _AltersFieldSchema(AddGeomFieldDefn)
+  DeleteGeomFieldDefn = _AltersFieldSchema(DeleteGeomFieldDefn)
+
+  def __reduce__(self):
+    return (_FeatureDefnFromState, (_GetFeatureDefnState(self),))
+
 }
 }
 
@@ -518,6 +803,1772 @@
 %}
 }
 
+%{
+#include "ogr_geometry.h"
+
+/* Acquire a C contiguous buffer from any object implementing the buffer */
+/* protocol (numpy arrays, bytearray, array.array, ...), whose items have */
+/* one of the struct formats of pszFormats and are nItemSize bytes large */
+static int OGRGetContiguousBuffer( PyObject *poObj, Py_buffer *psView,
+                                   int bWritable, const char *pszFormats,
+                                   int nItemSize, const char *pszName )
+{
+    int nFlags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+    if( bWritable )
+        nFlags |= PyBUF_WRITABLE;
+    if( PyObject_GetBuffer( poObj, psView, nFlags ) != 0 )
+        return FALSE;
+
+    const char *pszFormat = psView->format ? psView->format : "B";
+    if( *pszFormat == '@' || *pszFormat == '=' || *pszFormat == '<' )
+        pszFormat ++;
+    if( strlen(pszFormat) != 1 || strchr(pszFormats, *pszFormat) == NULL ||
+        psView->itemsize != nItemSize )
+    {
+        PyErr_Format( PyExc_TypeError,
+                      "%s must be a contiguous buffer of %d byte items",
+                      pszName, nItemSize );
+        PyBuffer_Release( psView );
+        return FALSE;
+    }
+    return TRUE;
+}
+
+static int OGRGetPointsGeometry( PyObject *poPyGeom, OGRGeometryH *phGeom )
+{
+    void *pGeom = NULL;
+    if( !SWIG_IsOK(SWIG_ConvertPtr( poPyGeom, &pGeom,
+                                    SWIGTYPE_p_OGRGeometryShadow, 0 )) ||
+        pGeom == NULL )
+    {
+        PyErr_SetString( PyExc_TypeError, "argument 1 must be a Geometry" );
+        return FALSE;
+    }
+    OGRwkbGeometryType eType = wkbFlatten(OGR_G_GetGeometryType( (OGRGeometryH) pGeom ));
+    if( eType != wkbPoint && eType != wkbLineString &&
+        eType != wkbCircularString && eType != wkbLinearRing )
+    {
+        PyErr_SetString( PyExc_TypeError,
+                         "geometry must be a point, a line string or a ring" );
+        return FALSE;
+    }
+    *phGeom = (OGRGeometryH) pGeom;
+    return TRUE;
+}
+
+static PyObject *
+py_OGR_G_GetPointsIntoBuffer(PyObject *self, PyObject *args) {
+
+    PyObject *poPyGeom = NULL;
+    PyObject *poBuffer = NULL;
+    int nDim = 2;
+    Py_buffer sView;
+    OGRGeometryH hGeom = NULL;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "OOi:Geometry_GetPointsIntoBuffer",
+                           &poPyGeom, &poBuffer, &nDim ) )
+        return NULL;
+    if( !OGRGetPointsGeometry( poPyGeom, &hGeom ) )
+        return NULL;
+    if( nDim != 2 && nDim != 3 )
+    {
+        PyErr_SetString( PyExc_ValueError, "dimension must be 2 or 3" );
+        return NULL;
+    }
+    if( !OGRGetContiguousBuffer( poBuffer, &sView, TRUE, "d",
+                                 sizeof(double), "buffer" ) )
+        return NULL;
+
+    const int nPoints = OGR_G_GetPointCount( hGeom );
+    const int nStride = nDim * (int) sizeof(double);
+    if( (size_t) sView.len != (size_t) nPoints * nStride )
+    {
+        PyErr_Format( PyExc_ValueError,
+                      "buffer must hold %d x %d values", nPoints, nDim );
+        PyBuffer_Release( &sView );
+        return NULL;
+    }
+
+    if( nPoints > 0 )
+    {
+        GByte *pabyBuffer = (GByte *) sView.buf;
+        Py_BEGIN_ALLOW_THREADS
+        OGR_G_GetPoints( hGeom,
+                         pabyBuffer, nStride,
+                         pabyBuffer + sizeof(double), nStride,
+                         nDim == 3 ? pabyBuffer + 2 * sizeof(double) : NULL,
+                         nStride );
+        Py_END_ALLOW_THREADS
+    }
+
+    PyBuffer_Release( &sView );
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+%}
+%native(Geometry_GetPointsIntoBuffer) py_OGR_G_GetPointsIntoBuffer;
+
+%{
+static PyObject *
+py_OGR_G_SetPointsFromBuffer(PyObject *self, PyObject *args) {
+
+    PyObject *poPyGeom = NULL;
+    PyObject *poBuffer = NULL;
+    int nDim = 2;
+    Py_buffer sView;
+    OGRGeometryH hGeom = NULL;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "OOi:Geometry_SetPointsFromBuffer",
+                           &poPyGeom, &poBuffer, &nDim ) )
+        return NULL;
+    if( !OGRGetPointsGeometry( poPyGeom, &hGeom ) )
+        return NULL;
+    if( nDim != 2 && nDim != 3 )
+    {
+        PyErr_SetString( PyExc_ValueError, "dimension must be 2 or 3" );
+        return NULL;
+    }
+    if( !OGRGetContiguousBuffer( poBuffer, &sView, FALSE, "d",
+                                 sizeof(double), "buffer" ) )
+        return NULL;
+
+    const size_t nValues = (size_t) sView.len / sizeof(double);
+    if( (nValues % nDim) != 0 || nValues / nDim > INT_MAX )
+    {
+        PyErr_SetString( PyExc_ValueError, "invalid buffer size" );
+        PyBuffer_Release( &sView );
+        return NULL;
+    }
+    const int nPoints = (int) (nValues / nDim);
+    const double *padfValues = (const double *) sView.buf;
+
+    if( wkbFlatten(OGR_G_GetGeometryType( hGeom )) == wkbPoint )
+    {
+        if( nPoints != 1 )
+        {
+            PyErr_SetString( PyExc_ValueError, "a point takes exactly one vertex" );
+            PyBuffer_Release( &sView );
+            return NULL;
+        }
+        if( nDim == 3 )
+            OGR_G_SetPoint( hGeom, 0, padfValues[0], padfValues[1], padfValues[2] );
+        else
+            OGR_G_SetPoint_2D( hGeom, 0, padfValues[0], padfValues[1] );
+        PyBuffer_Release( &sView );
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+
+    OGRSimpleCurve *poCurve = (OGRSimpleCurve *) hGeom;
+    int bOK = TRUE;
+    Py_BEGIN_ALLOW_THREADS
+    if( nDim == 2 )
+    {
+        /* (N,2) float64 arrays have the layout of OGRRawPoint arrays */
+        poCurve->setPoints( nPoints, (OGRRawPoint *) padfValues, NULL );
+    }
+    else
+    {
+        OGRRawPoint *paoPoints = (OGRRawPoint *)
+            VSIMalloc2( MAX(nPoints, 1), sizeof(OGRRawPoint) );
+        double *padfZ = (double *) VSIMalloc2( MAX(nPoints, 1), sizeof(double) );
+        if( paoPoints != NULL && padfZ != NULL )
+        {
+            for( int i = 0; i < nPoints; i++ )
+            {
+                paoPoints[i].x = padfValues[3 * i];
+                paoPoints[i].y = padfValues[3 * i + 1];
+                padfZ[i] = padfValues[3 * i + 2];
+            }
+            poCurve->setPoints( nPoints, paoPoints, padfZ );
+        }
+        else
+            bOK = FALSE;
+        VSIFree( paoPoints );
+        VSIFree( padfZ );
+    }
+    if( poCurve->getNumPoints() != nPoints )
+        bOK = FALSE;
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release( &sView );
+    if( !bOK )
+    {
+        PyErr_SetString( PyExc_MemoryError, "cannot allocate points" );
+        return NULL;
+    }
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+%}
+%native(Geometry_SetPointsFromBuffer) py_OGR_G_SetPointsFromBuffer;
+
+%{
+static PyObject *
+py_OGR_G_ExportToWkbArray(PyObject *self, PyObject *args) {
+
+    PyObject *poGeometries = NULL;
+    int nByteOrder = wkbNDR;
+    PyObject *poSeq = NULL;
+    PyObject *poData = NULL;
+    PyObject *poOffsets = NULL;
+    OGRGeometryH *pahGeoms = NULL;
+    GIntBig *panOffsets = NULL;
+    Py_ssize_t nCount, i;
+    size_t nTotalSize = 0;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "O|i:ExportToWkbArray",
+                           &poGeometries, &nByteOrder ) )
+        return NULL;
+
+    poSeq = PySequence_Fast( poGeometries, "geometries must be a sequence" );
+    if( poSeq == NULL )
+        return NULL;
+    nCount = PySequence_Fast_GET_SIZE( poSeq );
+
+    poOffsets = PyByteArray_FromStringAndSize( NULL, (nCount + 1) * sizeof(GIntBig) );
+    pahGeoms = (OGRGeometryH *) VSIMalloc2( MAX(nCount, 1), sizeof(OGRGeometryH) );
+    if( poOffsets == NULL || pahGeoms == NULL )
+    {
+        if( poOffsets != NULL )
+            PyErr_NoMemory();
+        goto fail;
+    }
+    panOffsets = (GIntBig *) PyByteArray_AS_STRING( poOffsets );
+
+    for( i = 0; i < nCount; i++ )
+    {
+        PyObject *poItem = PySequence_Fast_GET_ITEM( poSeq, i );
+        void *pGeom = NULL;
+        if( poItem != Py_None &&
+            (!SWIG_IsOK(SWIG_ConvertPtr( poItem, &pGeom,
+                                         SWIGTYPE_p_OGRGeometryShadow, 0 ))) )
+        {
+            PyErr_Format( PyExc_TypeError,
+                          "item %d is not a Geometry or None", (int) i );
+            goto fail;
+        }
+        pahGeoms[i] = (OGRGeometryH) pGeom;
+        panOffsets[i] = (GIntBig) nTotalSize;
+        if( pGeom != NULL )
+            nTotalSize += OGR_G_WkbSize( pahGeoms[i] );
+    }
+    panOffsets[nCount] = (GIntBig) nTotalSize;
+
+    poData = PyByteArray_FromStringAndSize( NULL, nTotalSize );
+    if( poData == NULL )
+        goto fail;
+
+    {
+        GByte *pabyData = (GByte *) PyByteArray_AS_STRING( poData );
+        Py_BEGIN_ALLOW_THREADS
+        for( i = 0; i < nCount; i++ )
+        {
+            if( pahGeoms[i] != NULL )
+                OGR_G_ExportToWkb( pahGeoms[i], (OGRwkbByteOrder) nByteOrder,
+                                   pabyData + panOffsets[i] );
+        }
+        Py_END_ALLOW_THREADS
+    }
+
+    VSIFree( pahGeoms );
+    Py_DECREF( poSeq );
+    return Py_BuildValue( "(NN)", poData, poOffsets );
+
+fail:
+    VSIFree( pahGeoms );
+    Py_XDECREF( poOffsets );
+    Py_XDECREF( poData );
+    Py_DECREF( poSeq );
+    return NULL;
+}
+%}
+%native(ExportToWkbArrayBuffers) py_OGR_G_ExportToWkbArray;
+
+%{
+static PyObject *
+py_OGR_G_CreateGeometriesFromWkbArray(PyObject *self, PyObject *args) {
+
+    PyObject *poData = NULL;
+    PyObject *poOffsets = NULL;
+    PyObject *poPySRS = Py_None;
+    OGRSpatialReferenceH hSRS = NULL;
+    Py_buffer sData, sOffsets;
+    OGRGeometryH *pahGeoms = NULL;
+    PyObject *poList = NULL;
+    Py_ssize_t nCount, i;
+    Py_ssize_t nFailure = -1;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "OO|O:CreateGeometriesFromWkbArray",
+                           &poData, &poOffsets, &poPySRS ) )
+        return NULL;
+
+    if( poPySRS != Py_None )
+    {
+        void *pSRS = NULL;
+        if( !SWIG_IsOK(SWIG_ConvertPtr( poPySRS, &pSRS,
+                            SWIGTYPE_p_OSRSpatialReferenceShadow, 0 )) )
+        {
+            PyErr_SetString( PyExc_TypeError,
+                             "reference must be a SpatialReference or None" );
+            return NULL;
+        }
+        hSRS = (OGRSpatialReferenceH) pSRS;
+    }
+
+    if( !OGRGetContiguousBuffer( poData, &sData, FALSE, "Bbc", 1, "data" ) )
+        return NULL;
+    if( !OGRGetContiguousBuffer( poOffsets, &sOffsets, FALSE, "qlL",
+                                 sizeof(GIntBig), "offsets" ) )
+    {
+        PyBuffer_Release( &sData );
+        return NULL;
+    }
+
+    const GIntBig *panOffsets = (const GIntBig *) sOffsets.buf;
+    nCount = sOffsets.len / (Py_ssize_t) sizeof(GIntBig) - 1;
+    if( nCount < 0 )
+        nCount = 0;
+    for( i = 0; i < nCount; i++ )
+    {
+        if( panOffsets[i] < 0 || panOffsets[i] > panOffsets[i+1] ||
+            panOffsets[i+1] > (GIntBig) sData.len ||
+            panOffsets[i+1] - panOffsets[i] > INT_MAX )
+        {
+            PyErr_Format( PyExc_ValueError, "invalid offsets at index %d", (int) i );
+            goto end;
+        }
+    }
+
+    pahGeoms = (OGRGeometryH *) VSICalloc( MAX(nCount, 1), sizeof(OGRGeometryH) );
+    if( pahGeoms == NULL )
+    {
+        PyErr_NoMemory();
+        goto end;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    for( i = 0; i < nCount; i++ )
+    {
+        const int nSize = (int) (panOffsets[i+1] - panOffsets[i]);
+        if( nSize == 0 )
+            continue;
+        if( OGR_G_CreateFromWkb( (unsigned char *) sData.buf + panOffsets[i],
+                                 hSRS, &pahGeoms[i], nSize ) != OGRERR_NONE )
+        {
+            pahGeoms[i] = NULL;
+            nFailure = i;
+            break;
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    if( nFailure >= 0 )
+    {
+        PyErr_Format( PyExc_RuntimeError,
+                      "corrupt WKB geometry at index %d", (int) nFailure );
+        for( i = 0; i < nCount; i++ )
+        {
+            if( pahGeoms[i] != NULL )
+                OGR_G_DestroyGeometry( pahGeoms[i] );
+        }
+        goto end;
+    }
+
+    poList = PyList_New( nCount );
+    for( i = 0; i < nCount; i++ )
+    {
+        PyObject *poItem;
+        if( pahGeoms[i] == NULL )
+        {
+            Py_INCREF(Py_None);
+            poItem = Py_None;
+        }
+        else
+            poItem = SWIG_NewPointerObj( (void *) pahGeoms[i],
+                                         SWIGTYPE_p_OGRGeometryShadow,
+                                         SWIG_POINTER_OWN );
+        PyList_SET_ITEM( poList, i, poItem );
+    }
+
+end:
+    VSIFree( pahGeoms );
+    PyBuffer_Release( &sData );
+    PyBuffer_Release( &sOffsets );
+    return poList;
+}
+%}
+%native(CreateGeometriesFromWkbArrayBuffers) py_OGR_G_CreateGeometriesFromWkbArray;
+
+%{
+#include "cpl_multiproc.h"
+
+/* Operations of py_OGR_G_BatchOperation(), keep in sync with _BATCH_xxx */
+/* constants of the Python side */
+#define OGR_BATCH_INTERSECTS     0
+#define OGR_BATCH_DISJOINT       1
+#define OGR_BATCH_CONTAINS       2
+#define OGR_BATCH_WITHIN         3
+#define OGR_BATCH_TOUCHES        4
+#define OGR_BATCH_CROSSES        5
+#define OGR_BATCH_OVERLAPS       6
+#define OGR_BATCH_EQUALS         7
+#define OGR_BATCH_DISTANCE       8
+#define OGR_BATCH_INTERSECTION   9
+#define OGR_BATCH_UNION         10
+#define OGR_BATCH_DIFFERENCE    11
+#define OGR_BATCH_SYMDIFFERENCE 12
+
+typedef struct
+{
+    int                 nOp;
+    const OGRGeometry  *poLeft;
+    const GByte        *pabyLeftData;
+    const GIntBig      *panLeftOffsets;
+    const GByte        *pabyRightData;
+    const GIntBig      *panRightOffsets;
+    size_t              nStart;
+    size_t              nCount;
+    GByte              *pabyPredicateOut;
+    double             *padfDistanceOut;
+    OGRGeometry       **papoGeometryOut;
+    GIntBig             nFailureIndex;
+} OGRBatchOperationJob;
+
+/* Envelope of a 2D or 3D point WKB, without instantiating the geometry */
+static int OGRGetWkbPointEnvelope( const GByte *pabyWkb, size_t nSize,
+                                   OGREnvelope *psEnvelope )
+{
+    if( nSize < 21 || pabyWkb[0] > 1 )
+        return FALSE;
+
+    const int bNeedSwap = (pabyWkb[0] == wkbNDR) != (CPL_IS_LSB != 0);
+    GUInt32 nType;
+    memcpy( &nType, pabyWkb + 1, 4 );
+    if( bNeedSwap )
+        CPL_SWAP32PTR( &nType );
+    if( nType != wkbPoint && nType != wkbPoint25D && nType != 1001 )
+        return FALSE;
+
+    double dfX, dfY;
+    memcpy( &dfX, pabyWkb + 5, 8 );
+    memcpy( &dfY, pabyWkb + 13, 8 );
+    if( bNeedSwap )
+    {
+        CPL_SWAPDOUBLE( &dfX );
+        CPL_SWAPDOUBLE( &dfY );
+    }
+    psEnvelope->MinX = psEnvelope->MaxX = dfX;
+    psEnvelope->MinY = psEnvelope->MaxY = dfY;
+    return TRUE;
+}
+
+static OGRGeometry *OGRBatchGetGeometry( const GByte *pabyData,
+                                         const GIntBig *panOffsets,
+                                         size_t i, int *pbFailure )
+{
+    const int nSize = (int) (panOffsets[i+1] - panOffsets[i]);
+    OGRGeometry *poGeom = NULL;
+    *pbFailure = FALSE;
+    if( nSize == 0 )
+        return NULL;
+    if( OGRGeometryFactory::createFromWkb( (unsigned char *) pabyData + panOffsets[i],
+                                           NULL, &poGeom, nSize ) != OGRERR_NONE )
+    {
+        *pbFailure = TRUE;
+        return NULL;
+    }
+    return poGeom;
+}
+
+static void OGRBatchOperationWorker( void *pData )
+{
+    OGRBatchOperationJob *psJob = (OGRBatchOperationJob *) pData;
+    const int nOp = psJob->nOp;
+    OGRPreparedGeometry *poPrepared = NULL;
+    OGREnvelope sLeftEnvelope;
+
+    psJob->nFailureIndex = -1;
+
+    if( psJob->poLeft != NULL )
+    {
+        psJob->poLeft->getEnvelope( &sLeftEnvelope );
+        /* Prepared geometries are not thread-safe, so each job has its own */
+        if( (nOp == OGR_BATCH_INTERSECTS || nOp == OGR_BATCH_DISJOINT ||
+             nOp == OGR_BATCH_CONTAINS) && OGRHasPreparedGeometrySupport() )
+            poPrepared = OGRCreatePreparedGeometry( psJob->poLeft );
+    }
+
+    for( size_t i = psJob->nStart; i < psJob->nStart + psJob->nCount; i++ )
+    {
+        const OGRGeometry *poLeft = psJob->poLeft;
+        OGRGeometry *poLeftOwned = NULL;
+        OGRGeometry *poRight = NULL;
+        OGREnvelope sRightEnvelope;
+        int bFailure = FALSE;
+        int bResult = FALSE;
+        double dfDistance = -1.0;
+        OGRGeometry *poResult = NULL;
+
+        if( poLeft == NULL )
+        {
+            poLeftOwned = OGRBatchGetGeometry( psJob->pabyLeftData,
+                                               psJob->panLeftOffsets, i,
+                                               &bFailure );
+            poLeft = poLeftOwned;
+            if( poLeft != NULL )
+                poLeft->getEnvelope( &sLeftEnvelope );
+        }
+
+        /* Envelope prefiltering: most candidates of a join are rejected */
+        /* there, and points are not even instantiated for that */
+        int bEnvelopeKnown = FALSE;
+        int bSkip = (poLeft == NULL);
+        if( !bSkip && nOp != OGR_BATCH_DISTANCE && nOp != OGR_BATCH_UNION &&
+            nOp != OGR_BATCH_DIFFERENCE && nOp != OGR_BATCH_SYMDIFFERENCE )
+        {
+            const GIntBig nOffset = psJob->panRightOffsets[i];
+            bEnvelopeKnown = OGRGetWkbPointEnvelope(
+                psJob->pabyRightData + nOffset,
+                (size_t) (psJob->panRightOffsets[i+1] - nOffset),
+                &sRightEnvelope );
+        }
+        if( bEnvelopeKnown )
+            bSkip = !sLeftEnvelope.Intersects( sRightEnvelope );
+        if( !bSkip && !bFailure )
+        {
+            poRight = OGRBatchGetGeometry( psJob->pabyRightData,
+                                           psJob->panRightOffsets, i,
+                                           &bFailure );
+            if( poRight == NULL )
+                bSkip = TRUE;
+            else if( !bEnvelopeKnown )
+            {
+                poRight->getEnvelope( &sRightEnvelope );
+                bEnvelopeKnown = TRUE;
+            }
+        }
+        if( bFailure )
+        {
+            psJob->nFailureIndex = (GIntBig) i;
+            delete poLeftOwned;
+            break;
+        }
+
+        const int bEnvelopesIntersect =
+            bEnvelopeKnown && sLeftEnvelope.Intersects( sRightEnvelope );
+
+        switch( nOp )
+        {
+          case OGR_BATCH_INTERSECTS:
+          case OGR_BATCH_DISJOINT:
+            if( !bSkip && bEnvelopesIntersect )
+            {
+                if( poPrepared != NULL )
+                    bResult = OGRPreparedGeometryIntersects( poPrepared, poRight );
+                else
+                    bResult = poLeft->Intersects( poRight );
+            }
+            if( nOp == OGR_BATCH_DISJOINT && poLeft != NULL &&
+                (poRight != NULL || bEnvelopeKnown) )
+                bResult = !bResult;
+            break;
+
+          case OGR_BATCH_CONTAINS:
+            if( !bSkip && sLeftEnvelope.Contains( sRightEnvelope ) )
+            {
+                if( poPrepared != NULL )
+                    bResult = OGRPreparedGeometryContains( poPrepared, poRight );
+                else
+                    bResult = poLeft->Contains( poRight );
+            }
+            break;
+
+          case OGR_BATCH_WITHIN:
+            if( !bSkip && sRightEnvelope.Contains( sLeftEnvelope ) )
+                bResult = poLeft->Within( poRight );
+            break;
+
+          case OGR_BATCH_TOUCHES:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Touches( poRight );
+            break;
+
+          case OGR_BATCH_CROSSES:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Crosses( poRight );
+            break;
+
+          case OGR_BATCH_OVERLAPS:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Overlaps( poRight );
+            break;
+
+          case OGR_BATCH_EQUALS:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Equals( poRight );
+            break;
+
+          case OGR_BATCH_DISTANCE:
+            if( !bSkip )
+                dfDistance = poLeft->Distance( poRight );
+            break;
+
+          case OGR_BATCH_INTERSECTION:
+            if( !bSkip && bEnvelopesIntersect )
+                poResult = poLeft->Intersection( poRight );
+            break;
+
+          case OGR_BATCH_UNION:
+            if( !bSkip )
+                poResult = poLeft->Union( poRight );
+            break;
+
+          case OGR_BATCH_DIFFERENCE:
+            if( !bSkip )
+                poResult = poLeft->Difference( poRight );
+            break;
+
+          case OGR_BATCH_SYMDIFFERENCE:
+            if( !bSkip )
+                poResult = poLeft->SymDifference( poRight );
+            break;
+
+          default:
+            break;
+        }
+
+        if( psJob->pabyPredicateOut != NULL )
+            psJob->pabyPredicateOut[i] = (GByte) (bResult != 0);
+        if( psJob->padfDistanceOut != NULL )
+            psJob->padfDistanceOut[i] = dfDistance;
+        if( psJob->papoGeometryOut != NULL )
+        {
+            if( poResult != NULL && poResult->IsEmpty() )
+            {
+                delete poResult;
+                poResult = NULL;
+            }
+            psJob->papoGeometryOut[i] = poResult;
+        }
+
+        delete poRight;
+        delete poLeftOwned;
+    }
+
+    OGRDestroyPreparedGeometry( poPrepared );
+}
+
+static int OGRGetWkbArrayBuffers( PyObject *poData, PyObject *poOffsets,
+                                  Py_buffer *psData, Py_buffer *psOffsets,
+                                  size_t *pnCount, const char *pszName )
+{
+    if( !OGRGetContiguousBuffer( poData, psData, FALSE, "Bbc", 1, pszName ) )
+        return FALSE;
+    if( !OGRGetContiguousBuffer( poOffsets, psOffsets, FALSE, "qlL",
+                                 sizeof(GIntBig), pszName ) )
+    {
+        PyBuffer_Release( psData );
+        return FALSE;
+    }
+
+    const GIntBig *panOffsets = (const GIntBig *) psOffsets->buf;
+    const Py_ssize_t nCount = psOffsets->len / (Py_ssize_t) sizeof(GIntBig) - 1;
+    for( Py_ssize_t i = 0; i < nCount; i++ )
+    {
+        if( panOffsets[i] < 0 || panOffsets[i] > panOffsets[i+1] ||
+            panOffsets[i+1] > (GIntBig) psData->len ||
+            panOffsets[i+1] - panOffsets[i] > INT_MAX )
+        {
+            PyErr_Format( PyExc_ValueError, "invalid %s offsets at index %d",
+                          pszName, (int) i );
+            PyBuffer_Release( psData );
+            PyBuffer_Release( psOffsets );
+            return FALSE;
+        }
+    }
+    *pnCount = nCount < 0 ? 0 : (size_t) nCount;
+    return TRUE;
+}
+
+static PyObject *
+py_OGR_G_BatchOperation(PyObject *self, PyObject *args) {
+
+    int nOp = 0;
+    PyObject *poPyLeft = NULL;
+    PyObject *apoLeft[2] = { NULL, NULL };
+    PyObject *apoRight[2] = { NULL, NULL };
+    PyObject *poOut = NULL;
+    int nThreads = 1;
+    const OGRGeometry *poLeft = NULL;
+    Py_buffer sLeftData, sLeftOffsets, sRightData, sRightOffsets, sOut;
+    int bLeftAcquired = FALSE, bRightAcquired = FALSE, bOutAcquired = FALSE;
+    size_t nLeftCount = 0, nCount = 0;
+    OGRGeometry **papoResults = NULL;
+    PyObject *poRet = NULL;
+    GIntBig nFailureIndex = -1;
+    int i;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "iOOOOOOi:BatchOperation", &nOp,
+                           &poPyLeft, &apoLeft[0], &apoLeft[1],
+                           &apoRight[0], &apoRight[1], &poOut, &nThreads ) )
+        return NULL;
+
+    if( nOp < OGR_BATCH_INTERSECTS || nOp > OGR_BATCH_SYMDIFFERENCE )
+    {
+        PyErr_SetString( PyExc_ValueError, "invalid operation" );
+        return NULL;
+    }
+
+    if( poPyLeft != Py_None )
+    {
+        void *pGeom = NULL;
+        if( !SWIG_IsOK(SWIG_ConvertPtr( poPyLeft, &pGeom,
+                                        SWIGTYPE_p_OGRGeometryShadow, 0 )) ||
+            pGeom == NULL )
+        {
+            PyErr_SetString( PyExc_TypeError, "geometry must be a Geometry" );
+            return NULL;
+        }
+        poLeft = (const OGRGeometry *) pGeom;
+    }
+    else
+    {
+        if( !OGRGetWkbArrayBuffers( apoLeft[0], apoLeft[1], &sLeftData,
+                                    &sLeftOffsets, &nLeftCount, "geometries" ) )
+            return NULL;
+        bLeftAcquired = TRUE;
+    }
+
+    if( !OGRGetWkbArrayBuffers( apoRight[0], apoRight[1], &sRightData,
+                                &sRightOffsets, &nCount, "others" ) )
+        goto end;
+    bRightAcquired = TRUE;
+
+    if( bLeftAcquired && nLeftCount != nCount )
+    {
+        PyErr_SetString( PyExc_ValueError,
+                         "geometries and others must have the same length" );
+        goto end;
+    }
+
+    if( nOp < OGR_BATCH_DISTANCE )
+    {
+        if( !OGRGetContiguousBuffer( poOut, &sOut, TRUE, "B?b", 1, "out" ) )
+            goto end;
+        bOutAcquired = TRUE;
+    }
+    else if( nOp == OGR_BATCH_DISTANCE )
+    {
+        if( !OGRGetContiguousBuffer( poOut, &sOut, TRUE, "d", sizeof(double), "out" ) )
+            goto end;
+        bOutAcquired = TRUE;
+    }
+    if( bOutAcquired && (size_t) sOut.len != nCount * sOut.itemsize )
+    {
+        PyErr_SetString( PyExc_ValueError, "out must have the length of others" );
+        goto end;
+    }
+
+    if( nOp >= OGR_BATCH_INTERSECTION )
+    {
+        papoResults = (OGRGeometry **) VSICalloc( MAX(nCount, 1), sizeof(OGRGeometry *) );
+        if( papoResults == NULL )
+        {
+            PyErr_NoMemory();
+            goto end;
+        }
+    }
+
+    if( nThreads <= 0 )
+        nThreads = CPLGetNumCPUs();
+    /* Not worth spawning threads for a handful of geometries */
+    if( (size_t) nThreads > nCount / 1000 + 1 )
+        nThreads = (int) (nCount / 1000 + 1);
+
+    {
+        OGRBatchOperationJob *pasJobs = (OGRBatchOperationJob *)
+            CPLCalloc( nThreads, sizeof(OGRBatchOperationJob) );
+        CPLJoinableThread **pahThreads = (CPLJoinableThread **)
+            CPLCalloc( nThreads, sizeof(CPLJoinableThread *) );
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            pasJobs[i].nOp = nOp;
+            pasJobs[i].poLeft = poLeft;
+            pasJobs[i].pabyLeftData = bLeftAcquired ? (const GByte *) sLeftData.buf : NULL;
+            pasJobs[i].panLeftOffsets = bLeftAcquired ? (const GIntBig *) sLeftOffsets.buf : NULL;
+            pasJobs[i].pabyRightData = (const GByte *) sRightData.buf;
+            pasJobs[i].panRightOffsets = (const GIntBig *) sRightOffsets.buf;
+            pasJobs[i].nStart = (nCount / nThreads) * i;
+            pasJobs[i].nCount = (i == nThreads - 1) ?
+                nCount - pasJobs[i].nStart : nCount / nThreads;
+            if( nOp < OGR_BATCH_DISTANCE )
+                pasJobs[i].pabyPredicateOut = (GByte *) sOut.buf;
+            else if( nOp == OGR_BATCH_DISTANCE )
+                pasJobs[i].padfDistanceOut = (double *) sOut.buf;
+            else
+                pasJobs[i].papoGeometryOut = papoResults;
+        }
+
+        Py_BEGIN_ALLOW_THREADS
+
+        if ( bUseExceptions ) {
+            CPLErrorReset();
+        }
+
+        for( i = 1; i < nThreads; i++ )
+            pahThreads[i] = CPLCreateJoinableThread(
+                OGRBatchOperationWorker, &pasJobs[i] );
+        OGRBatchOperationWorker( &pasJobs[0] );
+
+        for( i = 1; i < nThreads; i++ )
+        {
+            if( pahThreads[i] != NULL )
+                CPLJoinThread( pahThreads[i] );
+            else
+                OGRBatchOperationWorker( &pasJobs[i] );
+        }
+
+        Py_END_ALLOW_THREADS
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            if( pasJobs[i].nFailureIndex >= 0 )
+            {
+                nFailureIndex = pasJobs[i].nFailureIndex;
+                break;
+            }
+        }
+
+        CPLFree( pahThreads );
+        CPLFree( pasJobs );
+    }
+
+    if( nFailureIndex >= 0 )
+    {
+        PyErr_Format( PyExc_RuntimeError,
+                      "corrupt WKB geometry at index %d", (int) nFailureIndex );
+        goto end;
+    }
+
+    if( papoResults == NULL )
+    {
+        Py_INCREF(Py_None);
+        poRet = Py_None;
+    }
+    else
+    {
+        /* Export the resulting geometries as a WKB array */
+        PyObject *poOffsets = PyByteArray_FromStringAndSize( NULL, (nCount + 1) * sizeof(GIntBig) );
+        if( poOffsets == NULL )
+            goto end;
+        GIntBig *panOffsets = (GIntBig *) PyByteArray_AS_STRING( poOffsets );
+        size_t nTotalSize = 0;
+        size_t j;
+        for( j = 0; j < nCount; j++ )
+        {
+            panOffsets[j] = (GIntBig) nTotalSize;
+            if( papoResults[j] != NULL )
+                nTotalSize += papoResults[j]->WkbSize();
+        }
+        panOffsets[nCount] = (GIntBig) nTotalSize;
+
+        PyObject *poData = PyByteArray_FromStringAndSize( NULL, nTotalSize );
+        if( poData == NULL )
+        {
+            Py_DECREF( poOffsets );
+            goto end;
+        }
+        GByte *pabyData = (GByte *) PyByteArray_AS_STRING( poData );
+        for( j = 0; j < nCount; j++ )
+        {
+            if( papoResults[j] != NULL )
+                papoResults[j]->exportToWkb( wkbNDR, pabyData + panOffsets[j] );
+        }
+        poRet = Py_BuildValue( "(NN)", poData, poOffsets );
+    }
+
+end:
+    if( papoResults != NULL )
+    {
+        for( size_t j = 0; j < nCount; j++ )
+            delete papoResults[j];
+        VSIFree( papoResults );
+    }
+    if( bLeftAcquired )
+    {
+        PyBuffer_Release( &sLeftData );
+        PyBuffer_Release( &sLeftOffsets );
+    }
+    if( bRightAcquired )
+    {
+        PyBuffer_Release( &sRightData );
+        PyBuffer_Release( &sRightOffsets );
+    }
+    if( bOutAcquired )
+        PyBuffer_Release( &sOut );
+    return poRet;
+}
+%}
+%native(BatchOperation) py_OGR_G_BatchOperation;
+
+%pythoncode %{
+
+def ExportToWkbArray(geometries, byte_order = wkbNDR):
+    """ExportToWkbArray(geometries, byte_order = wkbNDR) -> (data, offsets)
+
+       Export a sequence of geometries (None items allowed) as WKB into a
+       single contiguous buffer. Returns a uint8 numpy array with the WKB
+       of all geometries, and an int64 numpy array of len(geometries) + 1
+       offsets: the WKB of geometries[i] is data[offsets[i]:offsets[i+1]],
+       empty for None items."""
+
+    import numpy
+    (data, offsets) = _ogr.ExportToWkbArrayBuffers(geometries, byte_order)
+    return (numpy.frombuffer(data, dtype = numpy.uint8),
+            numpy.frombuffer(offsets, dtype = numpy.int64))
+
+def CreateGeometriesFromWkbArray(data, offsets, reference = None):
+    """CreateGeometriesFromWkbArray(data, offsets, reference = None) -> list
+
+       Create the geometries stored as WKB in a contiguous buffer, as
+       returned by ExportToWkbArray(): the WKB of the i-th geometry is
+       data[offsets[i]:offsets[i+1]]. Empty ranges give None items.
+       reference is an optional SpatialReference assigned to all the
+       geometries."""
+
+    import numpy
+    offsets = numpy.ascontiguousarray(offsets, dtype = numpy.int64)
+    return _ogr.CreateGeometriesFromWkbArrayBuffers(data, offsets, reference)
+
+_BATCH_INTERSECTS = 0
+_BATCH_DISJOINT = 1
+_BATCH_CONTAINS = 2
+_BATCH_WITHIN = 3
+_BATCH_TOUCHES = 4
+_BATCH_CROSSES = 5
+_BATCH_OVERLAPS = 6
+_BATCH_EQUALS = 7
+_BATCH_DISTANCE = 8
+_BATCH_INTERSECTION = 9
+_BATCH_UNION = 10
+_BATCH_DIFFERENCE = 11
+_BATCH_SYMDIFFERENCE = 12
+
+def _AsWkbArray(geometries):
+    import numpy
+    if isinstance(geometries, tuple) and len(geometries) == 2 and \
+       not isinstance(geometries[0], Geometry):
+        (data, offsets) = geometries
+        return (data, numpy.ascontiguousarray(offsets, dtype = numpy.int64))
+    return ExportToWkbArray(geometries)
+
+def _BatchOperation(op, geometry, others, num_threads):
+    import numpy
+    (data, offsets) = _AsWkbArray(others)
+    count = max(len(offsets) - 1, 0)
+    if isinstance(geometry, Geometry):
+        left = geometry
+        (left_data, left_offsets) = (None, None)
+    else:
+        left = None
+        (left_data, left_offsets) = _AsWkbArray(geometry)
+
+    if op < _BATCH_DISTANCE:
+        out = numpy.zeros(count, dtype = numpy.bool_)
+    elif op == _BATCH_DISTANCE:
+        out = numpy.empty(count, dtype = numpy.float64)
+    else:
+        out = None
+    ret = _ogr.BatchOperation(op, left, left_data, left_offsets,
+                              data, offsets, out, num_threads)
+    if out is not None:
+        return out
+    return (numpy.frombuffer(ret[0], dtype = numpy.uint8),
+            numpy.frombuffer(ret[1], dtype = numpy.int64))
+
+def IntersectsArray(geometry, others, num_threads = 1):
+    """IntersectsArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Evaluate geometry.Intersects() against many geometries at once.
+
+       others is either a sequence of geometries or a (data, offsets) WKB
+       array as returned by ExportToWkbArray(). geometry is either a single
+       Geometry, tested against all items of others (envelope prefiltering
+       and a prepared geometry are then used when GEOS allows it), or a
+       sequence / WKB array of the same length as others, in which case
+       items are compared pairwise. The GIL is released during the
+       computation, which is split across num_threads threads (0 means the
+       number of CPUs). Returns a numpy boolean array, False for None or
+       empty items."""
+    return _BatchOperation(_BATCH_INTERSECTS, geometry, others, num_threads)
+
+def DisjointArray(geometry, others, num_threads = 1):
+    """DisjointArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Disjoint(). See IntersectsArray()."""
+    return _BatchOperation(_BATCH_DISJOINT, geometry, others, num_threads)
+
+def ContainsArray(geometry, others, num_threads = 1):
+    """ContainsArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Contains(). See IntersectsArray()."""
+    return _BatchOperation(_BATCH_CONTAINS, geometry, others, num_threads)
+
+def WithinArray(geometry, others, num_threads = 1):
+    """WithinArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Within(). See IntersectsArray()."""
+    return _BatchOperation(_BATCH_WITHIN, geometry, others, num_threads)
+
+def TouchesArray(geometry, others, num_threads = 1):
+    """TouchesArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Touches(). See IntersectsArray()."""
+    return _BatchOperation(_BATCH_TOUCHES, geometry, others, num_threads)
+
+def CrossesArray(geometry, others, num_threads = 1):
+    """CrossesArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Crosses(). See IntersectsArray()."""
+    return _BatchOperation(_BATCH_CROSSES, geometry, others, num_threads)
+
+def OverlapsArray(geometry, others, num_threads = 1):
+    """OverlapsArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Overlaps(). See IntersectsArray()."""
+    return _BatchOperation(_BATCH_OVERLAPS, geometry, others, num_threads)
+
+def EqualsArray(geometry, others, num_threads = 1):
+    """EqualsArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Equals(). See IntersectsArray()."""
+    return _BatchOperation(_BATCH_EQUALS, geometry, others, num_threads)
+
+def DistanceArray(geometry, others, num_threads = 1):
+    """DistanceArray(geometry, others, num_threads = 1) -> numpy.ndarray
+
+       Batch version of Geometry.Distance(). Returns a numpy float64 array,
+       with -1 for None or empty items. See IntersectsArray()."""
+    return _BatchOperation(_BATCH_DISTANCE, geometry, others, num_threads)
+
+def IntersectionArray(geometry, others, num_threads = 1):
+    """IntersectionArray(geometry, others, num_threads = 1) -> (data, offsets)
+
+       Batch version of Geometry.Intersection(). The results are returned
+       as a WKB array (see ExportToWkbArray()), with empty ranges for empty
+       results. See IntersectsArray() for the arguments."""
+    return _BatchOperation(_BATCH_INTERSECTION, geometry, others, num_threads)
+
+def UnionArray(geometry, others, num_threads = 1):
+    """UnionArray(geometry, others, num_threads = 1) -> (data, offsets)
+
+       Batch version of Geometry.Union(). See IntersectionArray()."""
+    return _BatchOperation(_BATCH_UNION, geometry, others, num_threads)
+
+def DifferenceArray(geometry, others, num_threads = 1):
+    """DifferenceArray(geometry, others, num_threads = 1) -> (data, offsets)
+
+       Batch version of Geometry.Difference(). See IntersectionArray()."""
+    return _BatchOperation(_BATCH_DIFFERENCE, geometry, others, num_threads)
+
+def SymDifferenceArray(geometry, others, num_threads = 1):
+    """SymDifferenceArray(geometry, others, num_threads = 1) -> (data, offsets)
+
+       Batch version of Geometry.SymDifference(). See IntersectionArray()."""
+    return _BatchOperation(_BATCH_SYMDIFFERENCE, geometry, others, num_threads)
+
+class SpatialIndex(object):
+    """In-memory R-tree of feature envelopes, packed with the
+       Sort-Tile-Recursive algorithm.
+
+       This is useful to run many spatial queries against a layer without
+       re-iterating it with SetSpatialFilterRect(), in particular for
+       drivers without a native spatial index (GeoJSON, CSV, Memory...).
+       Queries return numpy int64 arrays of FIDs, and only test the
+       envelopes of the features: candidates must be refined with the
+       exact geometries when needed.
+
+       Build it with SpatialIndex.FromLayer() or directly from envelope
+       arrays:
+
+         index = ogr.SpatialIndex(minx, miny, maxx, maxy, fids)
+    """
+
+    def __init__(self, minx, miny, maxx, maxy, fids = None, node_capacity = 16):
+        import numpy
+        if node_capacity < 2:
+            raise ValueError('node_capacity must be at least 2')
+        self.node_capacity = node_capacity
+
+        minx = numpy.asarray(minx, dtype = numpy.float64).ravel()
+        miny = numpy.asarray(miny, dtype = numpy.float64).ravel()
+        maxx = numpy.asarray(maxx, dtype = numpy.float64).ravel()
+        maxy = numpy.asarray(maxy, dtype = numpy.float64).ravel()
+        count = len(minx)
+        if len(miny) != count or len(maxx) != count or len(maxy) != count:
+            raise ValueError('envelope arrays must have the same length')
+        if fids is None:
+            fids = numpy.arange(count, dtype = numpy.int64)
+        else:
+            fids = numpy.asarray(fids, dtype = numpy.int64).ravel()
+            if len(fids) != count:
+                raise ValueError('fids must have the length of the envelope arrays')
+
+        # Leaf entries, in tree order
+        order = self._STROrder(minx, miny, maxx, maxy)
+        self.fids = fids[order]
+        boxes = numpy.empty((count, 4), dtype = numpy.float64)
+        boxes[:,0] = minx[order]
+        boxes[:,1] = miny[order]
+        boxes[:,2] = maxx[order]
+        boxes[:,3] = maxy[order]
+        self.boxes = boxes
+
+        # Nodes, from the leaves to the root. Children of node i of
+        # self.levels[l] are entries children_start[i]:children_end[i] of
+        # self.levels[l-1] (of the leaf entries for l = 0)
+        self.levels = []
+        starts = numpy.arange(0, count, node_capacity, dtype = numpy.int64)
+        ends = numpy.minimum(starts + node_capacity, count)
+        while len(starts) > 0:
+            node_boxes = numpy.empty((len(starts), 4), dtype = numpy.float64)
+            node_boxes[:,0] = numpy.minimum.reduceat(boxes[:,0], starts)
+            node_boxes[:,1] = numpy.minimum.reduceat(boxes[:,1], starts)
+            node_boxes[:,2] = numpy.maximum.reduceat(boxes[:,2], starts)
+            node_boxes[:,3] = numpy.maximum.reduceat(boxes[:,3], starts)
+            order = self._STROrder(node_boxes[:,0], node_boxes[:,1],
+                                   node_boxes[:,2], node_boxes[:,3])
+            boxes = node_boxes[order]
+            self.levels.append((boxes, starts[order], ends[order]))
+            if len(starts) == 1:
+                break
+            starts = numpy.arange(0, len(boxes), node_capacity, dtype = numpy.int64)
+            ends = numpy.minimum(starts + node_capacity, len(boxes))
+
+    def _STROrder(self, minx, miny, maxx, maxy):
+        import numpy
+        count = len(minx)
+        if count == 0:
+            return numpy.zeros(0, dtype = numpy.int64)
+        cx = (minx + maxx) * 0.5
+        cy = (miny + maxy) * 0.5
+        leaf_count = (count + self.node_capacity - 1) // self.node_capacity
+        slice_count = int(numpy.ceil(numpy.sqrt(leaf_count)))
+        slice_size = slice_count * self.node_capacity
+        slice_id = numpy.empty(count, dtype = numpy.int64)
+        slice_id[numpy.argsort(cx, kind = 'mergesort')] = \
+            numpy.arange(count, dtype = numpy.int64) // slice_size
+        return numpy.lexsort((cy, slice_id))
+
+    @staticmethod
+    def FromLayer(layer, node_capacity = 16, geom_field = 0):
+        """FromLayer(layer, node_capacity = 16, geom_field = 0) -> SpatialIndex
+
+           Build an index from the envelopes of the geometries of a layer,
+           read in a single pass. Features without geometry are not
+           indexed. The current spatial and attribute filters of the layer
+           apply."""
+        import numpy
+        fids = []
+        envelopes = []
+        layer.ResetReading()
+        for feat in layer:
+            geom = feat.GetGeomFieldRef(geom_field)
+            if geom is None or geom.IsEmpty():
+                continue
+            fids.append(feat.GetFID())
+            envelopes.append(geom.GetEnvelope())
+        layer.ResetReading()
+        envelopes = numpy.array(envelopes, dtype = numpy.float64).reshape(-1, 4)
+        return SpatialIndex(envelopes[:,0], envelopes[:,2],
+                            envelopes[:,1], envelopes[:,3],
+                            fids, node_capacity)
+
+    def __len__(self):
+        return len(self.fids)
+
+    def GetExtent(self):
+        """GetExtent() -> (minx, maxx, miny, maxy)
+
+           Extent of all the indexed envelopes, in the order of
+           Layer.GetExtent(), or None for an empty index."""
+        if len(self.fids) == 0:
+            return None
+        root = self.levels[-1][0][0]
+        return (float(root[0]), float(root[2]), float(root[1]), float(root[3]))
+
+    def QueryMany(self, minx, miny, maxx, maxy):
+        """QueryMany(minx, miny, maxx, maxy) -> (fids, offsets)
+
+           Run many rectangle queries at once. The arguments are arrays of
+           the same length. The FIDs of the features whose envelope
+           intersects the i-th rectangle are fids[offsets[i]:offsets[i+1]],
+           in increasing order."""
+        import numpy
+        q_minx = numpy.asarray(minx, dtype = numpy.float64).ravel()
+        q_miny = numpy.asarray(miny, dtype = numpy.float64).ravel()
+        q_maxx = numpy.asarray(maxx, dtype = numpy.float64).ravel()
+        q_maxy = numpy.asarray(maxy, dtype = numpy.float64).ravel()
+        query_count = len(q_minx)
+
+        # Walk the tree level by level, with (query, node) candidate pairs
+        if len(self.fids) == 0 or query_count == 0:
+            queries = numpy.zeros(0, dtype = numpy.int64)
+            entries = numpy.zeros(0, dtype = numpy.int64)
+        else:
+            queries = numpy.arange(query_count, dtype = numpy.int64)
+            entries = numpy.zeros(query_count, dtype = numpy.int64)
+            for level in range(len(self.levels) - 1, -2, -1):
+                if level >= 0:
+                    boxes = self.levels[level][0]
+                else:
+                    boxes = self.boxes
+                b = boxes[entries]
+                mask = (b[:,0] <= q_maxx[queries]) & (b[:,2] >= q_minx[queries]) & \
+                       (b[:,1] <= q_maxy[queries]) & (b[:,3] >= q_miny[queries])
+                queries = queries[mask]
+                entries = entries[mask]
+                if level < 0:
+                    break
+                starts = self.levels[level][1][entries]
+                counts = self.levels[level][2][entries] - starts
+                queries = numpy.repeat(queries, counts)
+                total = int(counts.sum())
+                first = numpy.cumsum(counts) - counts
+                entries = numpy.arange(total, dtype = numpy.int64) + \
+                    numpy.repeat(starts - first, counts)
+
+        fids = self.fids[entries]
+        order = numpy.lexsort((fids, queries))
+        offsets = numpy.zeros(query_count + 1, dtype = numpy.int64)
+        offsets[1:] = numpy.cumsum(numpy.bincount(queries, minlength = query_count))
+        return (fids[order], offsets)
+
+    def Query(self, minx, miny, maxx, maxy):
+        """Query(minx, miny, maxx, maxy) -> numpy.ndarray
+
+           Return the FIDs of the features whose envelope intersects the
+           rectangle, in increasing order."""
+        return self.QueryMany([minx], [miny], [maxx], [maxy])[0]
+
+    def Nearest(self, x, y, k = 1):
+        """Nearest(x, y, k = 1) -> numpy.ndarray
+
+           Return the FIDs of the k features whose envelope is the closest
+           to (x, y), closest first. This is the exact distance for points,
+           a lower bound otherwise."""
+        import heapq
+        import numpy
+
+        def box_distances(boxes):
+            dx = numpy.maximum(numpy.maximum(boxes[:,0] - x, x - boxes[:,2]), 0)
+            dy = numpy.maximum(numpy.maximum(boxes[:,1] - y, y - boxes[:,3]), 0)
+            return numpy.sqrt(dx * dx + dy * dy)
+
+        result = []
+        if len(self.fids) == 0 or k <= 0:
+            return numpy.array(result, dtype = numpy.int64)
+
+        # Best-first search: the heap has (distance, level, entry) items,
+        # level -1 being the leaf entries
+        heap = [(0.0, len(self.levels) - 1, 0)]
+        while heap and len(result) < k:
+            (dist, level, entry) = heapq.heappop(heap)
+            if level < 0:
+                result.append(self.fids[entry])
+                continue
+            start = self.levels[level][1][entry]
+            end = self.levels[level][2][entry]
+            if level > 0:
+                boxes = self.levels[level-1][0][start:end]
+            else:
+                boxes = self.boxes[start:end]
+            for (i, d) in enumerate(box_distances(boxes)):
+                heapq.heappush(heap, (float(d), level - 1, int(start + i)))
+        return numpy.array(result, dtype = numpy.int64)
+
+    def Save(self, filename):
+        """Save(filename)
+
+           Save the index to a file (or a file object), that can be read back
+           with SpatialIndex.Load()."""
+        import numpy
+        arrays = { 'node_capacity': numpy.array([self.node_capacity]),
+                   'fids': self.fids, 'boxes': self.boxes }
+        for (i, (boxes, starts, ends)) in enumerate(self.levels):
+            arrays['level%d_boxes' % i] = boxes
+            arrays['level%d_starts' % i] = starts
+            arrays['level%d_ends' % i] = ends
+        if isinstance(filename, str):
+            # numpy.savez() would append .npz to the file name
+            f = open(filename, 'wb')
+            try:
+                numpy.savez(f, **arrays)
+            finally:
+                f.close()
+        else:
+            numpy.savez(filename, **arrays)
+
+    @staticmethod
+    def Load(filename):
+        """Load(filename) -> SpatialIndex
+
+           Read an index saved with Save()."""
+        import numpy
+        arrays = numpy.load(filename)
+        try:
+            names = arrays.files
+            index = SpatialIndex.__new__(SpatialIndex)
+            index.node_capacity = int(arrays['node_capacity'][0])
+            index.fids = arrays['fids']
+            index.boxes = arrays['boxes']
+            index.levels = []
+            while 'level%d_boxes' % len(index.levels) in names:
+                i = len(index.levels)
+                index.levels.append((arrays['level%d_boxes' % i],
+                                     arrays['level%d_starts' % i],
+                                     arrays['level%d_ends' % i]))
+        finally:
+            # Otherwise the file stays open, and locked on Windows
+            arrays.close()
+        return index
+
+def _GetFieldAsStringOrBinary(feature, fld_index):
+    try:
+        return _ogr.Feature_GetFieldAsString(feature, fld_index)
+    except:
+        # For Python3 on non-UTF8 strings
+        return _ogr.Feature_GetFieldAsBinary(feature, fld_index)
+
+# Feature.GetField() implementation for each field type, strings and
+# date/time fields being returned as strings
+_FIELD_GETTERS = {
+    OFTInteger: _ogr.Feature_GetFieldAsInteger,
+    OFTInteger64: _ogr.Feature_GetFieldAsInteger64,
+    OFTReal: _ogr.Feature_GetFieldAsDouble,
+    OFTStringList: _ogr.Feature_GetFieldAsStringList,
+    OFTIntegerList: _ogr.Feature_GetFieldAsIntegerList,
+    OFTInteger64List: _ogr.Feature_GetFieldAsInteger64List,
+    OFTRealList: _ogr.Feature_GetFieldAsDoubleList }
+
+_INTEGER_TYPES = (type(1), type(12345678901234), bool)
+
+# numpy dtype kinds that Layer.WriteArrays() accepts for each field type,
+# object arrays being accepted for all field types
+_ARRAY_FIELD_KINDS = {
+    OFTInteger: 'iub',
+    OFTInteger64: 'iub',
+    OFTReal: 'iubf',
+    OFTString: 'iubfSUM',
+    OFTDate: 'SUM',
+    OFTTime: 'SU',
+    OFTDateTime: 'SUM' }
+
+# Field types that Feature.SetField2() sets from the string representation
+# of values of other types
+_STRING_SET_FIELD_TYPES = (OFTString, OFTDate, OFTTime, OFTDateTime)
+
+# Incremented by the Python calls that may add, remove, alter or reorder the
+# fields of a definition, so that the cached _FieldSchema objects are rebuilt
+_field_schema_generation = 0
+
+def _AltersFieldSchema(method):
+    def wrapper(*args, **kwargs):
+        global _field_schema_generation
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _field_schema_generation += 1
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+# First keywords of the SQL statements that may alter the fields of a layer
+_FIELD_SCHEMA_SQL_KEYWORDS = ('ALTER', 'CREATE', 'DROP')
+
+def _SQLAltersFieldSchema(method):
+    def wrapper(self, *args, **kwargs):
+        global _field_schema_generation
+        if args:
+            statement = args[0]
+        else:
+            statement = kwargs.get('statement')
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if statement:
+                words = statement.split(None, 1)
+                if words and words[0].upper() in _FIELD_SCHEMA_SQL_KEYWORDS:
+                    _field_schema_generation += 1
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+def _AttachesFieldSchema(method):
+    # For methods returning a Feature or a FeatureDefn
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        if result is not None:
+            result.__dict__['_field_schema'] = self._GetFieldSchema()
+        return result
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+def _AttachesDefnFieldSchema(init):
+    def wrapper(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        if args:
+            defn = args[0]
+        else:
+            defn = kwargs.get('feature_def')
+        self.__dict__['_field_schema'] = defn.GetFieldSchema()
+    wrapper.__name__ = init.__name__
+    wrapper.__doc__ = init.__doc__
+    return wrapper
+
+class _FieldSchema(object):
+    """Names, types and subtypes of the fields of a FeatureDefn."""
+
+    def __init__(self, defn):
+        self.generation = _field_schema_generation
+        self.field_count = defn.GetFieldCount()
+        names = []
+        types = []
+        subtypes = []
+        for i in range(self.field_count):
+            fld_defn = defn.GetFieldDefn(i)
+            names.append(fld_defn.GetName())
+            types.append(fld_defn.GetType())
+            subtypes.append(fld_defn.GetSubType())
+        self.names = tuple(names)
+        self.types = tuple(types)
+        self.subtypes = tuple(subtypes)
+        # Cache of the pickled state of the definition
+        self.defn_state = None
+        self.getters = tuple([_FIELD_GETTERS.get(fld_type, _GetFieldAsStringOrBinary)
+                              for fld_type in types])
+
+        # Field names are case insensitive. The first field wins in case
+        # of duplicates, as in OGRFeatureDefn::GetFieldIndex()
+        self.indices = {}
+        self.lower_indices = {}
+        for i in range(self.field_count - 1, -1, -1):
+            self.indices[names[i]] = i
+            self.lower_indices[names[i].lower()] = i
+
+    def GetFieldIndex(self, name):
+        idx = self.indices.get(name)
+        if idx is None:
+            idx = self.lower_indices.get(name.lower(), -1)
+        return idx
+
+_json_module = None
+
+def _GetJSONModule():
+    global _json_module
+    if _json_module is None:
+        try:
+            import simplejson as _json_module
+        except ImportError:
+            try:
+                import json as _json_module
+            except ImportError:
+                raise ImportError("Unable to import simplejson or json, needed for ExportToJson.")
+    return _json_module
+
+# Version of the pickled state of FeatureDefn, Feature and FeatureBatch
+_PICKLE_VERSION = 1
+
+def _GetFeatureDefnState(defn):
+    fields = []
+    for i in range(defn.GetFieldCount()):
+        fld_defn = defn.GetFieldDefn(i)
+        fields.append((fld_defn.GetName(), fld_defn.GetType(),
+                       fld_defn.GetSubType(), fld_defn.GetWidth(),
+                       fld_defn.GetPrecision(), fld_defn.IsNullable(),
+                       fld_defn.GetDefault()))
+    geom_fields = []
+    for i in range(defn.GetGeomFieldCount()):
+        gfld_defn = defn.GetGeomFieldDefn(i)
+        srs = gfld_defn.GetSpatialRef()
+        if srs is not None:
+            srs = srs.ExportToWkt()
+        geom_fields.append((gfld_defn.GetName(), gfld_defn.GetType(), srs,
+                            gfld_defn.IsNullable()))
+    return (_PICKLE_VERSION, defn.GetName(), tuple(fields), tuple(geom_fields))
+
+# FeatureDefn objects re-created for unpickled features, so that features
+# with the same definition share a single FeatureDefn
+_unpickled_defns = {}
+
+def _FeatureDefnFromState(state, shared = False):
+    if state[0] > _PICKLE_VERSION:
+        raise ValueError('Unsupported version of pickled FeatureDefn: %d' % state[0])
+    if shared:
+        defn = _unpickled_defns.get(state)
+        if defn is not None:
+            return defn
+
+    (version, name, fields, geom_fields) = state
+    defn = FeatureDefn(name)
+    defn.SetGeomType(wkbNone)
+    for (fld_name, fld_type, subtype, width, precision, nullable, default) in fields:
+        fld_defn = FieldDefn(fld_name, fld_type)
+        fld_defn.SetSubType(subtype)
+        fld_defn.SetWidth(width)
+        fld_defn.SetPrecision(precision)
+        fld_defn.SetNullable(nullable)
+        if default is not None:
+            fld_defn.SetDefault(default)
+        # Not through FeatureDefn.AddFieldDefn(), which invalidates all the
+        # cached field schemas, while this new definition has none
+        _ogr.FeatureDefn_AddFieldDefn(defn, fld_defn)
+    for (gfld_name, gfld_type, srs, nullable) in geom_fields:
+        gfld_defn = GeomFieldDefn(gfld_name, gfld_type)
+        if srs is not None:
+            gfld_defn.SetSpatialRef(osr.SpatialReference(srs))
+        gfld_defn.SetNullable(nullable)
+        _ogr.FeatureDefn_AddGeomFieldDefn(defn, gfld_defn)
+
+    if shared:
+        if len(_unpickled_defns) >= 64:
+            _unpickled_defns.clear()
+        _unpickled_defns[state] = defn
+    return defn
+
+def _GetFeatureState(feature):
+    # The state of the definition is computed once per field schema, and
+    # is thus the same object for all the features read from a layer, so
+    # that pickle only stores it once when they are pickled together
+    schema = feature._GetFieldSchema()
+    if schema.defn_state is None:
+        schema.defn_state = _GetFeatureDefnState(feature.GetDefnRef())
+    geoms = []
+    for i in range(len(schema.defn_state[3])):
+        geom = feature.GetGeomFieldRef(i)
+        if geom is not None:
+            geom = geom.ExportToIsoWkb()
+        geoms.append(geom)
+    return (_PICKLE_VERSION, schema.defn_state, feature.GetFID(),
+            feature.GetFieldsAsTuple(), tuple(geoms), feature.GetStyleString())
+
+def _SetFieldFromString(feature, fld_index, value):
+    if isinstance(value, str):
+        _ogr.Feature_SetFieldString(feature, fld_index, value)
+    else:
+        # For Python3, strings that are not valid UTF-8 are returned by
+        # GetField() as bytes, and are set back as they are
+        import binascii
+        _ogr.Feature_SetFieldBinaryFromHexString(feature, fld_index,
+            binascii.hexlify(value).decode('ascii'))
+
+# Setter of the values returned by GetFieldsAsTuple() for each field type,
+# used to re-create unpickled features
+_FIELD_STATE_SETTERS = {
+    OFTInteger: _ogr.Feature_SetFieldInteger64,
+    OFTInteger64: _ogr.Feature_SetFieldInteger64,
+    OFTReal: _ogr.Feature_SetField,
+    OFTIntegerList: _ogr.Feature_SetFieldIntegerList,
+    OFTInteger64List: _ogr.Feature_SetFieldInteger64List,
+    OFTRealList: _ogr.Feature_SetFieldDoubleList,
+    OFTStringList: _ogr.Feature_SetFieldStringList,
+    OFTBinary: _ogr.Feature_SetFieldBinaryFromHexString }
+
+def _GetFieldStateSetters(defn_state):
+    return tuple([_FIELD_STATE_SETTERS.get(field[1], _SetFieldFromString)
+                  for field in defn_state[2]])
+
+def _SetFeatureValues(feature, setters, values):
+    for i in range(len(values)):
+        value = values[i]
+        if value is not None:
+            setters[i](feature, i, value)
+
+def _FeatureFromState(state):
+    if state[0] > _PICKLE_VERSION:
+        raise ValueError('Unsupported version of pickled Feature: %d' % state[0])
+    (version, defn_state, fid, values, geoms, style) = state
+    feature = Feature(_FeatureDefnFromState(defn_state, shared = True))
+    feature.SetFID(fid)
+    _SetFeatureValues(feature, _GetFieldStateSetters(defn_state), values)
+    for i in range(len(geoms)):
+        if geoms[i] is not None:
+            feature.SetGeomFieldDirectly(i, CreateGeometryFromWkb(geoms[i]))
+    if style is not None:
+        feature.SetStyleString(style)
+    return feature
+
+class FeatureBatch(object):
+    """Compact and picklable container of features sharing the same
+       definition, to send many features to other processes at once.
+
+       FIDs are stored in a numpy array and geometries in one WKB array per
+       geometry field (see ExportToWkbArray()), so that pickling a batch is
+       much cheaper than pickling each Feature. The pickled batch can also
+       be placed in shared memory with ToSharedMemory().
+
+         batch = ogr.FeatureBatch(layer)
+         pool.map(worker, [batch])
+         ...
+         for feature in batch:
+             ...
+    """
+
+    def __init__(self, features):
+        import numpy
+        self.version = _PICKLE_VERSION
+        self.defn_state = None
+        fids = []
+        self.values = []
+        self.styles = []
+        geoms = []
+        for feature in features:
+            schema = feature._GetFieldSchema()
+            if schema.defn_state is None:
+                schema.defn_state = _GetFeatureDefnState(feature.GetDefnRef())
+            if self.defn_state is None:
+                self.defn_state = schema.defn_state
+                geoms = [[] for i in range(len(self.defn_state[3]))]
+            elif schema.defn_state is not self.defn_state and \
+                 schema.defn_state != self.defn_state:
+                raise ValueError('All the features of a FeatureBatch must have the same definition')
+            fids.append(feature.GetFID())
+            self.values.append(feature.GetFieldsAsTuple())
+            self.styles.append(feature.GetStyleString())
+            for i in range(len(geoms)):
+                geoms[i].append(feature.GetGeomFieldRef(i))
+        self.fids = numpy.array(fids, dtype = numpy.int64)
+        self.wkb = [ExportToWkbArray(geom_list) for geom_list in geoms]
+        if not any(self.styles):
+            self.styles = None
+
+    def __setstate__(self, state):
+        if state['version'] > _PICKLE_VERSION:
+            raise ValueError('Unsupported version of pickled FeatureBatch: %d' % state['version'])
+        self.__dict__.update(state)
+
+    def __len__(self):
+        return len(self.fids)
+
+    def __iter__(self):
+        return iter(self.GetFeatures())
+
+    def GetFeatures(self):
+        """GetFeatures() -> list
+
+           Re-create the features of the batch, all sharing one
+           FeatureDefn."""
+        if self.defn_state is None:
+            return []
+        defn = _FeatureDefnFromState(self.defn_state, shared = True)
+        # Feature(defn) attaches the field schema cached on defn, so that
+        # it is computed once for all the features
+        setters = _GetFieldStateSetters(self.defn_state)
+        geoms = [CreateGeometriesFromWkbArray(data, offsets)
+                 for (data, offsets) in self.wkb]
+        features = []
+        for row in range(len(self.fids)):
+            feature = Feature(defn)
+            feature.SetFID(int(self.fids[row]))
+            _SetFeatureValues(feature, setters, self.values[row])
+            for i in range(len(geoms)):
+                if geoms[i][row] is not None:
+                    feature.SetGeomFieldDirectly(i, geoms[i][row])
+            if self.styles is not None and self.styles[row] is not None:
+                feature.SetStyleString(self.styles[row])
+            features.append(feature)
+        return features
+
+    def ToSharedMemory(self):
+        """ToSharedMemory() -> SharedFeatureBatch
+
+           Store the pickle of the batch into a new shared memory block
+           (Python >= 3.8), and return a small handle that can be pickled
+           instead of the batch. Each Load() of the handle unpickles the
+           batch again: this saves sending the batch through a pipe, not
+           its unpickling. The block is not tracked by the resource
+           tracker of the processes and must be released with the Unlink()
+           method of the handle once all the processes are done with it."""
+        import pickle
+        data = pickle.dumps(self, pickle.HIGHEST_PROTOCOL)
+        shm = _OpenUntrackedSharedMemory(size = max(len(data), 1))
+        try:
+            shm.buf[0:len(data)] = data
+        finally:
+            shm.close()
+        return SharedFeatureBatch(shm.name, len(data))
+
+def _OpenUntrackedSharedMemory(name = None, size = 0):
+    # Create (name is None) or attach a shared memory block, without
+    # leaving it registered with the resource tracker, which would destroy
+    # it when the process that created or attached it exits.
+    from multiprocessing import shared_memory
+    try:
+        return shared_memory.SharedMemory(name = name, create = name is None,
+                                          size = size, track = False)
+    except TypeError:
+        # Python < 3.13 registers all the blocks, on POSIX systems
+        shm = shared_memory.SharedMemory(name = name, create = name is None,
+                                         size = size)
+        import os
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+class SharedFeatureBatch(object):
+    """Handle of the pickle of a FeatureBatch stored in shared memory, as
+       returned by FeatureBatch.ToSharedMemory()."""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+    def Load(self):
+        """Load() -> FeatureBatch
+
+           Unpickle the batch from shared memory."""
+        import pickle
+        shm = _OpenUntrackedSharedMemory(self.name)
+        try:
+            return pickle.loads(bytes(shm.buf[0:self.size]))
+        finally:
+            shm.close()
+
+    def GetFeatures(self):
+        """GetFeatures() -> list
+
+           Shortcut for Load().GetFeatures()."""
+        return self.Load().GetFeatures()
+
+    def Unlink(self):
+        """Unlink()
+
+           Release the shared memory block."""
+        from multiprocessing import shared_memory
+        try:
+            shm = shared_memory.SharedMemory(name = self.name, track = False)
+        except TypeError:
+            # Before Python 3.13, unlink() unregisters the block from the
+            # resource tracker, with which attaching it registered it
+            shm = shared_memory.SharedMemory(name = self.name)
+        shm.close()
+        shm.unlink()
+%}
+
 %import typemaps_python.i
 
 #ifndef FROM_GDAL_I
@@ -74,4 +74,446 @@ py_OPTGetProjectionMethods(PyObject *self, PyObject *args) {
 %}
 %native(GetProjectionMethods) py_OPTGetProjectionMethods;
 
+%{
+#include "cpl_multiproc.h"
+#include "ogr_spatialref.h"
+
+typedef struct
+{
+    OGRCoordinateTransformationH hCT;
+    double  *padfX;
+    double  *padfY;
+    double  *padfZ;
+    size_t   nStart;
+    size_t   nCount;
+    size_t   nSuccess;
+} OCTTransformPointsArrayJob;
+
+static void OCTTransformPointsArrayWorker( void *pData )
+{
+    OCTTransformPointsArrayJob *psJob = (OCTTransformPointsArrayJob *) pData;
+    const size_t nBatchSize = 65536;
+    int *pabSuccess = (int *) VSIMalloc( sizeof(int) * nBatchSize );
+
+    psJob->nSuccess = 0;
+    if( pabSuccess == NULL )
+        return;
+
+    /* OCTTransformEx() takes an int count, so feed it bounded batches */
+    const size_t nEnd = psJob->nStart + psJob->nCount;
+    for( size_t iStart = psJob->nStart; iStart < nEnd; iStart += nBatchSize )
+    {
+        const int nThisBatch = (int) MIN( nBatchSize, nEnd - iStart );
+        OCTTransformEx( psJob->hCT, nThisBatch,
+                        psJob->padfX + iStart,
+                        psJob->padfY + iStart,
+                        psJob->padfZ ? psJob->padfZ + iStart : NULL,
+                        pabSuccess );
+        for( int i = 0; i < nThisBatch; i++ )
+        {
+            if( pabSuccess[i] )
+                psJob->nSuccess ++;
+        }
+    }
+
+    VSIFree( pabSuccess );
+}
+
+/* Acquire a C contiguous buffer of native doubles from any object */
+/* implementing the buffer protocol (numpy arrays, array.array, ...) */
+static int OCTGetDoubleBuffer( PyObject *poObj, Py_buffer *psView,
+                               int bWritable, const char *pszName )
+{
+    int nFlags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+    if( bWritable )
+        nFlags |= PyBUF_WRITABLE;
+    if( PyObject_GetBuffer( poObj, psView, nFlags ) != 0 )
+        return FALSE;
+
+    const char *pszFormat = psView->format ? psView->format : "B";
+    if( *pszFormat == '@' || *pszFormat == '=' )
+        pszFormat ++;
+    if( strcmp(pszFormat, "d") != 0 || psView->itemsize != sizeof(double) )
+    {
+        PyErr_Format( PyExc_TypeError,
+                      "%s must be a contiguous buffer of float64 values",
+                      pszName );
+        PyBuffer_Release( psView );
+        return FALSE;
+    }
+    return TRUE;
+}
+
+static PyObject *
+py_OCTTransformPointsArray(PyObject *self, PyObject *args) {
+
+    PyObject *poPyCT = NULL;
+    PyObject *apoIn[3] = { NULL, NULL, NULL };
+    PyObject *apoOut[3] = { NULL, NULL, NULL };
+    static const char * const apszNames[3] = { "xs", "ys", "zs" };
+    Py_buffer asIn[3];
+    Py_buffer asOut[3];
+    int abInAcquired[3] = { FALSE, FALSE, FALSE };
+    int abOutAcquired[3] = { FALSE, FALSE, FALSE };
+    int nThreads = 1;
+    void *pCT = NULL;
+    PyObject *poRet = NULL;
+    size_t nPoints = 0;
+    int i;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args,
+                           "OOOOOOO|i:CoordinateTransformation_TransformPointsArray",
+                           &poPyCT, &apoIn[0], &apoIn[1], &apoIn[2],
+                           &apoOut[0], &apoOut[1], &apoOut[2], &nThreads ) )
+        return NULL;
+
+    if( !SWIG_IsOK(SWIG_ConvertPtr( poPyCT, &pCT,
+                        SWIGTYPE_p_OSRCoordinateTransformationShadow, 0 )) ||
+        pCT == NULL )
+    {
+        PyErr_SetString( PyExc_TypeError,
+                         "argument 1 must be a CoordinateTransformation" );
+        return NULL;
+    }
+
+    for( i = 0; i < 3; i++ )
+    {
+        if( apoIn[i] != Py_None )
+        {
+            if( !OCTGetDoubleBuffer( apoIn[i], &asIn[i], FALSE, apszNames[i] ) )
+                goto end;
+            abInAcquired[i] = TRUE;
+        }
+        if( apoOut[i] != Py_None )
+        {
+            if( !OCTGetDoubleBuffer( apoOut[i], &asOut[i], TRUE, apszNames[i] ) )
+                goto end;
+            abOutAcquired[i] = TRUE;
+        }
+    }
+
+    if( !abInAcquired[0] || !abInAcquired[1] ||
+        !abOutAcquired[0] || !abOutAcquired[1] )
+    {
+        PyErr_SetString( PyExc_TypeError, "xs and ys must be provided" );
+        goto end;
+    }
+
+    nPoints = (size_t) asIn[0].len / sizeof(double);
+    for( i = 0; i < 3; i++ )
+    {
+        if( (abInAcquired[i] && (size_t) asIn[i].len != nPoints * sizeof(double)) ||
+            (abOutAcquired[i] && (size_t) asOut[i].len != nPoints * sizeof(double)) )
+        {
+            PyErr_SetString( PyExc_ValueError,
+                             "all coordinate arrays must have the same length" );
+            goto end;
+        }
+    }
+
+    if( nThreads <= 0 )
+        nThreads = CPLGetNumCPUs();
+    /* Not worth spawning threads for a handful of points */
+    if( (size_t) nThreads > nPoints / 10000 + 1 )
+        nThreads = (int) (nPoints / 10000 + 1);
+
+    {
+        OGRCoordinateTransformation *poCT = (OGRCoordinateTransformation *) pCT;
+        OCTTransformPointsArrayJob *pasJobs = NULL;
+        CPLJoinableThread **pahThreads = NULL;
+        size_t nSuccess = 0;
+
+        Py_BEGIN_ALLOW_THREADS
+
+        for( i = 0; i < 3; i++ )
+        {
+            if( !abOutAcquired[i] )
+                continue;
+            if( !abInAcquired[i] )
+                memset( asOut[i].buf, 0, nPoints * sizeof(double) );
+            else if( asOut[i].buf != asIn[i].buf )
+                memmove( asOut[i].buf, asIn[i].buf, nPoints * sizeof(double) );
+        }
+
+        pasJobs = (OCTTransformPointsArrayJob *)
+            CPLCalloc( nThreads, sizeof(OCTTransformPointsArrayJob) );
+        pahThreads = (CPLJoinableThread **)
+            CPLCalloc( nThreads, sizeof(CPLJoinableThread *) );
+
+        /* A transformation object must not be used concurrently, so every */
+        /* extra thread works on its own instance */
+        pasJobs[0].hCT = (OGRCoordinateTransformationH) pCT;
+        for( i = 1; i < nThreads; i++ )
+        {
+            pasJobs[i].hCT = OCTNewCoordinateTransformation(
+                (OGRSpatialReferenceH) poCT->GetSourceCS(),
+                (OGRSpatialReferenceH) poCT->GetTargetCS() );
+            if( pasJobs[i].hCT == NULL )
+                break;
+        }
+        nThreads = i;
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            pasJobs[i].padfX = (double *) asOut[0].buf;
+            pasJobs[i].padfY = (double *) asOut[1].buf;
+            pasJobs[i].padfZ = abOutAcquired[2] ? (double *) asOut[2].buf : NULL;
+            pasJobs[i].nStart = (nPoints / nThreads) * i;
+            pasJobs[i].nCount = (i == nThreads - 1) ?
+                nPoints - pasJobs[i].nStart : nPoints / nThreads;
+        }
+
+        if ( bUseExceptions ) {
+            CPLErrorReset();
+        }
+
+        for( i = 1; i < nThreads; i++ )
+            pahThreads[i] = CPLCreateJoinableThread(
+                OCTTransformPointsArrayWorker, &pasJobs[i] );
+        OCTTransformPointsArrayWorker( &pasJobs[0] );
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            if( i > 0 )
+            {
+                if( pahThreads[i] != NULL )
+                    CPLJoinThread( pahThreads[i] );
+                else
+                    OCTTransformPointsArrayWorker( &pasJobs[i] );
+                OCTDestroyCoordinateTransformation( pasJobs[i].hCT );
+            }
+            nSuccess += pasJobs[i].nSuccess;
+        }
+
+        CPLFree( pahThreads );
+        CPLFree( pasJobs );
+
+        Py_END_ALLOW_THREADS
+
+        if ( bUseExceptions ) {
+            CPLErr eclass = CPLGetLastErrorType();
+            if ( eclass == CE_Failure || eclass == CE_Fatal ) {
+                PyErr_SetString( PyExc_RuntimeError, CPLGetLastErrorMsg() );
+                goto end;
+            }
+        }
+
+        poRet = PyLong_FromSize_t( nSuccess );
+    }
+
+end:
+    for( i = 0; i < 3; i++ )
+    {
+        if( abInAcquired[i] )
+            PyBuffer_Release( &asIn[i] );
+        if( abOutAcquired[i] )
+            PyBuffer_Release( &asOut[i] );
+    }
+    return poRet;
+}
+%}
+%native(CoordinateTransformation_TransformPointsArray) py_OCTTransformPointsArray;
+
+%extend OSRCoordinateTransformationShadow {
+%pythoncode %{
+  def TransformPointsArray(self, xs, ys, zs = None, out = None, num_threads = 1):
+    """TransformPointsArray(self, xs, ys, zs = None, out = None, num_threads = 1) -> int
+
+       Transform coordinates held in contiguous float64 buffers (numpy
+       arrays, array.array('d'), ...) without creating per-point Python
+       objects. The arrays are modified in place, unless out is a (xs, ys)
+       or (xs, ys, zs) tuple of writable buffers receiving the result.
+       num_threads splits the work across several threads, each using its
+       own transformation object (0 means all CPUs).
+       Points that fail to transform are set to HUGE_VAL.
+       Returns the number of points successfully transformed."""
+
+    if out is None:
+        out = (xs, ys, zs)
+    elif len(out) == 2:
+        if zs is not None:
+            raise ValueError('out must hold a z array when zs is provided')
+        out = (out[0], out[1], None)
+    elif len(out) != 3:
+        raise ValueError('out must be a tuple of 2 or 3 arrays')
+    return _osr.CoordinateTransformation_TransformPointsArray(self, xs, ys, zs,
+                                                              out[0], out[1], out[2],
+                                                              num_threads)
+%}
+}
+
 %include typemaps_python.i
+
+%pythoncode %{
+
+class _SRSCache(object):
+    """Thread-safe LRU cache of SpatialReference and CoordinateTransformation
+       objects, keyed on their canonical definition."""
+
+    def __init__(self, max_size):
+        import threading
+        try:
+            from collections import OrderedDict
+        except ImportError:
+            raise ImportError("collections.OrderedDict (Python >= 2.7) is needed for the osr cache.")
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        self.lock.acquire()
+        try:
+            if key in self.entries:
+                obj = self.entries.pop(key)
+                self.entries[key] = obj
+                self.hits += 1
+                return obj
+            self.misses += 1
+        finally:
+            self.lock.release()
+
+        # Build outside of the lock: parsing a definition can be slow and
+        # must not serialize unrelated lookups.
+        obj = factory()
+
+        self.lock.acquire()
+        try:
+            if key in self.entries:
+                return self.entries[key]
+            self.entries[key] = obj
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+        finally:
+            self.lock.release()
+        return obj
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+        finally:
+            self.lock.release()
+
+    def set_max_size(self, max_size):
+        self.lock.acquire()
+        try:
+            self.max_size = max_size
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+        finally:
+            self.lock.release()
+
+    def statistics(self):
+        self.lock.acquire()
+        try:
+            return { 'hits': self.hits, 'misses': self.misses,
+                     'size': len(self.entries), 'max_size': self.max_size }
+        finally:
+            self.lock.release()
+
+_srs_cache = _SRSCache(256)
+_ct_cache = _SRSCache(256)
+
+if version_info >= (3,0,0):
+    _integer_types = (int,)
+else:
+    _integer_types = (int, long)
+
+def _CheckedImport(srs, method, *args):
+    ret = method(srs, *args)
+    if ret != 0:
+        raise RuntimeError('%s%s failed with error %d' % (method.__name__, str(args), ret))
+    # Cached objects are not modified, so their WKT can be exported once
+    srs.__dict__['_canonical_wkt'] = srs.ExportToWkt()
+    return srs
+
+def _GetCanonicalWkt(srs):
+    wkt = srs.__dict__.get('_canonical_wkt')
+    if wkt is None:
+        wkt = srs.ExportToWkt()
+    return wkt
+
+def GetCachedSpatialReference(definition):
+    """GetCachedSpatialReference(definition) -> SpatialReference
+
+       Return a SpatialReference from a process-wide LRU cache. definition
+       can be an EPSG code (integer or 'EPSG:XXXX' string), a WKT string,
+       a PROJ.4 string (starting with '+') or any other string accepted by
+       SetFromUserInput(). The returned object is shared between all callers
+       and must not be modified: Clone() it first if needed."""
+
+    if isinstance(definition, _integer_types):
+        definition = int(definition)
+        key = ('EPSG', definition)
+        factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromEPSG, definition)
+    else:
+        definition = definition.strip()
+        if definition.upper().startswith('EPSG:') and definition[5:].isdigit():
+            code = int(definition[5:])
+            key = ('EPSG', code)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromEPSG, code)
+        elif definition.startswith('+'):
+            key = ('PROJ4', definition)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromProj4, definition)
+        elif definition[:6] in ('GEOGCS', 'PROJCS', 'GEOCCS', 'COMPD_', 'VERT_C', 'LOCAL_'):
+            key = ('WKT', definition)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromWkt, definition)
+        else:
+            key = ('USER', definition)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.SetFromUserInput, definition)
+
+    return _srs_cache.get(key, factory)
+
+def GetCachedCoordinateTransformation(src, dst):
+    """GetCachedCoordinateTransformation(src, dst) -> CoordinateTransformation
+
+       Return a CoordinateTransformation from a process-wide LRU cache.
+       src and dst can be SpatialReference objects or any definition
+       accepted by GetCachedSpatialReference(). Transformations are keyed
+       on the canonical WKT of both ends. A CoordinateTransformation must
+       not be used concurrently by several threads, so each thread gets
+       its own one."""
+
+    import threading
+
+    if not isinstance(src, SpatialReference):
+        src = GetCachedSpatialReference(src)
+    if not isinstance(dst, SpatialReference):
+        dst = GetCachedSpatialReference(dst)
+
+    # Thread identifiers can be reused, but only once the previous thread
+    # has exited, so that a transformation is never shared by two running
+    # threads.
+    key = (threading.current_thread().ident,
+           _GetCanonicalWkt(src), _GetCanonicalWkt(dst))
+    return _ct_cache.get(key, lambda: CoordinateTransformation(src, dst))
+
+def GetCacheStatistics():
+    """GetCacheStatistics() -> dict
+
+       Return the hit/miss counts, current and maximum size of the
+       SpatialReference ('srs') and CoordinateTransformation ('ct') caches."""
+    return { 'srs': _srs_cache.statistics(), 'ct': _ct_cache.statistics() }
+
+def SetCacheMaxSize(max_size):
+    """SetCacheMaxSize(max_size)
+
+       Set the maximum number of objects kept by each of the caches."""
+    _srs_cache.set_max_size(max_size)
+    _ct_cache.set_max_size(max_size)
+
+def ClearCache():
+    """ClearCache()
+
+       Empty the SpatialReference and CoordinateTransformation caches and
+       reset their statistics."""
+    _srs_cache.clear()
+    _ct_cache.clear()
+
+%}
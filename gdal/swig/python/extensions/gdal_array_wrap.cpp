@@ -3470,6 +3470,33 @@ GDALDataset *NUMPYDataset::Open( GDALOpenInfo * poOpenInfo )
         return NULL;
     }
 
+/* -------------------------------------------------------------------- */
+/*      The array values must be directly usable as values of the      */
+/*      GDAL data type (NPY_LONG is 64 bit on most 64 bit platforms).   */
+/* -------------------------------------------------------------------- */
+    if( PyArray_ITEMSIZE(psArray) != GDALGetDataTypeSize(eType) / 8 )
+    {
+        CPLError( CE_Failure, CPLE_AppDefined, 
+                  "Unable to access numpy arrays of typecode `%c' "
+                  "with %d byte values.\n", 
+                  psArray->descr->type, PyArray_ITEMSIZE(psArray) );
+        return NULL;
+    }
+
+    if( !PyArray_ISNOTSWAPPED(psArray) )
+    {
+        CPLError( CE_Failure, CPLE_AppDefined, 
+                  "Unable to access numpy arrays in non native byte order.\n" );
+        return NULL;
+    }
+
+    if( poOpenInfo->eAccess == GA_Update && !PyArray_ISWRITEABLE(psArray) )
+    {
+        CPLError( CE_Failure, CPLE_AppDefined, 
+                  "Unable to open a read-only numpy array in update mode.\n" );
+        return NULL;
+    }
+
 /* -------------------------------------------------------------------- */
 /*      Create the new NUMPYDataset object.                             */
 /* -------------------------------------------------------------------- */
@@ -3479,7 +3506,7 @@ GDALDataset *NUMPYDataset::Open( GDALOpenInfo * poOpenInfo )
 
     poDS->psArray = psArray;
 
-    poDS->eAccess = GA_ReadOnly;
+    poDS->eAccess = poOpenInfo->eAccess;
 
 /* -------------------------------------------------------------------- */
 /*      Add a reference to the array.                                   */
@@ -3512,6 +3539,19 @@ GDALDataset *NUMPYDataset::Open( GDALOpenInfo * poOpenInfo )
         nLineOffset = psArray->strides[0];
     }
 
+/* -------------------------------------------------------------------- */
+/*      A zero stride (broadcast arrays) would be taken as the default  */
+/*      offset by the MEM bands.                                        */
+/* -------------------------------------------------------------------- */
+    if( nPixelOffset == 0 || nLineOffset == 0
+        || (nBands > 1 && nBandOffset == 0) )
+    {
+        CPLError( CE_Failure, CPLE_AppDefined, 
+                  "Unable to access numpy arrays with zero strides.\n" );
+        delete poDS;
+        return NULL;
+    }
+
 /* -------------------------------------------------------------------- */
 /*      Create band information objects.                                */
 /* -------------------------------------------------------------------- */
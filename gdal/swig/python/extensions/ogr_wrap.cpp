@@ -3054,6 +3054,912 @@ static void GDALPythonFreeCStr(void* ptr, int bToFree)
 }
 
 
+#include "ogr_geometry.h"
+
+/* Acquire a C contiguous buffer from any object implementing the buffer */
+/* protocol (numpy arrays, bytearray, array.array, ...), whose items have */
+/* one of the struct formats of pszFormats and are nItemSize bytes large */
+static int OGRGetContiguousBuffer( PyObject *poObj, Py_buffer *psView,
+                                   int bWritable, const char *pszFormats,
+                                   int nItemSize, const char *pszName )
+{
+    int nFlags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+    if( bWritable )
+        nFlags |= PyBUF_WRITABLE;
+    if( PyObject_GetBuffer( poObj, psView, nFlags ) != 0 )
+        return FALSE;
+
+    const char *pszFormat = psView->format ? psView->format : "B";
+    if( *pszFormat == '@' || *pszFormat == '=' || *pszFormat == '<' )
+        pszFormat ++;
+    if( strlen(pszFormat) != 1 || strchr(pszFormats, *pszFormat) == NULL ||
+        psView->itemsize != nItemSize )
+    {
+        PyErr_Format( PyExc_TypeError,
+                      "%s must be a contiguous buffer of %d byte items",
+                      pszName, nItemSize );
+        PyBuffer_Release( psView );
+        return FALSE;
+    }
+    return TRUE;
+}
+
+static int OGRGetPointsGeometry( PyObject *poPyGeom, OGRGeometryH *phGeom )
+{
+    void *pGeom = NULL;
+    if( !SWIG_IsOK(SWIG_ConvertPtr( poPyGeom, &pGeom,
+                                    SWIGTYPE_p_OGRGeometryShadow, 0 )) ||
+        pGeom == NULL )
+    {
+        PyErr_SetString( PyExc_TypeError, "argument 1 must be a Geometry" );
+        return FALSE;
+    }
+    OGRwkbGeometryType eType = wkbFlatten(OGR_G_GetGeometryType( (OGRGeometryH) pGeom ));
+    if( eType != wkbPoint && eType != wkbLineString &&
+        eType != wkbCircularString && eType != wkbLinearRing )
+    {
+        PyErr_SetString( PyExc_TypeError,
+                         "geometry must be a point, a line string or a ring" );
+        return FALSE;
+    }
+    *phGeom = (OGRGeometryH) pGeom;
+    return TRUE;
+}
+
+static PyObject *
+py_OGR_G_GetPointsIntoBuffer(PyObject *self, PyObject *args) {
+
+    PyObject *poPyGeom = NULL;
+    PyObject *poBuffer = NULL;
+    int nDim = 2;
+    Py_buffer sView;
+    OGRGeometryH hGeom = NULL;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "OOi:Geometry_GetPointsIntoBuffer",
+                           &poPyGeom, &poBuffer, &nDim ) )
+        return NULL;
+    if( !OGRGetPointsGeometry( poPyGeom, &hGeom ) )
+        return NULL;
+    if( nDim != 2 && nDim != 3 )
+    {
+        PyErr_SetString( PyExc_ValueError, "dimension must be 2 or 3" );
+        return NULL;
+    }
+    if( !OGRGetContiguousBuffer( poBuffer, &sView, TRUE, "d",
+                                 sizeof(double), "buffer" ) )
+        return NULL;
+
+    const int nPoints = OGR_G_GetPointCount( hGeom );
+    const int nStride = nDim * (int) sizeof(double);
+    if( (size_t) sView.len != (size_t) nPoints * nStride )
+    {
+        PyErr_Format( PyExc_ValueError,
+                      "buffer must hold %d x %d values", nPoints, nDim );
+        PyBuffer_Release( &sView );
+        return NULL;
+    }
+
+    if( nPoints > 0 )
+    {
+        GByte *pabyBuffer = (GByte *) sView.buf;
+        Py_BEGIN_ALLOW_THREADS
+        OGR_G_GetPoints( hGeom,
+                         pabyBuffer, nStride,
+                         pabyBuffer + sizeof(double), nStride,
+                         nDim == 3 ? pabyBuffer + 2 * sizeof(double) : NULL,
+                         nStride );
+        Py_END_ALLOW_THREADS
+    }
+
+    PyBuffer_Release( &sView );
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject *
+py_OGR_G_SetPointsFromBuffer(PyObject *self, PyObject *args) {
+
+    PyObject *poPyGeom = NULL;
+    PyObject *poBuffer = NULL;
+    int nDim = 2;
+    Py_buffer sView;
+    OGRGeometryH hGeom = NULL;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "OOi:Geometry_SetPointsFromBuffer",
+                           &poPyGeom, &poBuffer, &nDim ) )
+        return NULL;
+    if( !OGRGetPointsGeometry( poPyGeom, &hGeom ) )
+        return NULL;
+    if( nDim != 2 && nDim != 3 )
+    {
+        PyErr_SetString( PyExc_ValueError, "dimension must be 2 or 3" );
+        return NULL;
+    }
+    if( !OGRGetContiguousBuffer( poBuffer, &sView, FALSE, "d",
+                                 sizeof(double), "buffer" ) )
+        return NULL;
+
+    const size_t nValues = (size_t) sView.len / sizeof(double);
+    if( (nValues % nDim) != 0 || nValues / nDim > INT_MAX )
+    {
+        PyErr_SetString( PyExc_ValueError, "invalid buffer size" );
+        PyBuffer_Release( &sView );
+        return NULL;
+    }
+    const int nPoints = (int) (nValues / nDim);
+    const double *padfValues = (const double *) sView.buf;
+
+    if( wkbFlatten(OGR_G_GetGeometryType( hGeom )) == wkbPoint )
+    {
+        if( nPoints != 1 )
+        {
+            PyErr_SetString( PyExc_ValueError, "a point takes exactly one vertex" );
+            PyBuffer_Release( &sView );
+            return NULL;
+        }
+        if( nDim == 3 )
+            OGR_G_SetPoint( hGeom, 0, padfValues[0], padfValues[1], padfValues[2] );
+        else
+            OGR_G_SetPoint_2D( hGeom, 0, padfValues[0], padfValues[1] );
+        PyBuffer_Release( &sView );
+        Py_INCREF(Py_None);
+        return Py_None;
+    }
+
+    OGRSimpleCurve *poCurve = (OGRSimpleCurve *) hGeom;
+    int bOK = TRUE;
+    Py_BEGIN_ALLOW_THREADS
+    if( nDim == 2 )
+    {
+        /* (N,2) float64 arrays have the layout of OGRRawPoint arrays */
+        poCurve->setPoints( nPoints, (OGRRawPoint *) padfValues, NULL );
+    }
+    else
+    {
+        OGRRawPoint *paoPoints = (OGRRawPoint *)
+            VSIMalloc2( MAX(nPoints, 1), sizeof(OGRRawPoint) );
+        double *padfZ = (double *) VSIMalloc2( MAX(nPoints, 1), sizeof(double) );
+        if( paoPoints != NULL && padfZ != NULL )
+        {
+            for( int i = 0; i < nPoints; i++ )
+            {
+                paoPoints[i].x = padfValues[3 * i];
+                paoPoints[i].y = padfValues[3 * i + 1];
+                padfZ[i] = padfValues[3 * i + 2];
+            }
+            poCurve->setPoints( nPoints, paoPoints, padfZ );
+        }
+        else
+            bOK = FALSE;
+        VSIFree( paoPoints );
+        VSIFree( padfZ );
+    }
+    if( poCurve->getNumPoints() != nPoints )
+        bOK = FALSE;
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release( &sView );
+    if( !bOK )
+    {
+        PyErr_SetString( PyExc_MemoryError, "cannot allocate points" );
+        return NULL;
+    }
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
+static PyObject *
+py_OGR_G_ExportToWkbArray(PyObject *self, PyObject *args) {
+
+    PyObject *poGeometries = NULL;
+    int nByteOrder = wkbNDR;
+    PyObject *poSeq = NULL;
+    PyObject *poData = NULL;
+    PyObject *poOffsets = NULL;
+    OGRGeometryH *pahGeoms = NULL;
+    GIntBig *panOffsets = NULL;
+    Py_ssize_t nCount, i;
+    size_t nTotalSize = 0;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "O|i:ExportToWkbArray",
+                           &poGeometries, &nByteOrder ) )
+        return NULL;
+
+    poSeq = PySequence_Fast( poGeometries, "geometries must be a sequence" );
+    if( poSeq == NULL )
+        return NULL;
+    nCount = PySequence_Fast_GET_SIZE( poSeq );
+
+    poOffsets = PyByteArray_FromStringAndSize( NULL, (nCount + 1) * sizeof(GIntBig) );
+    pahGeoms = (OGRGeometryH *) VSIMalloc2( MAX(nCount, 1), sizeof(OGRGeometryH) );
+    if( poOffsets == NULL || pahGeoms == NULL )
+    {
+        if( poOffsets != NULL )
+            PyErr_NoMemory();
+        goto fail;
+    }
+    panOffsets = (GIntBig *) PyByteArray_AS_STRING( poOffsets );
+
+    for( i = 0; i < nCount; i++ )
+    {
+        PyObject *poItem = PySequence_Fast_GET_ITEM( poSeq, i );
+        void *pGeom = NULL;
+        if( poItem != Py_None &&
+            (!SWIG_IsOK(SWIG_ConvertPtr( poItem, &pGeom,
+                                         SWIGTYPE_p_OGRGeometryShadow, 0 ))) )
+        {
+            PyErr_Format( PyExc_TypeError,
+                          "item %d is not a Geometry or None", (int) i );
+            goto fail;
+        }
+        pahGeoms[i] = (OGRGeometryH) pGeom;
+        panOffsets[i] = (GIntBig) nTotalSize;
+        if( pGeom != NULL )
+            nTotalSize += OGR_G_WkbSize( pahGeoms[i] );
+    }
+    panOffsets[nCount] = (GIntBig) nTotalSize;
+
+    poData = PyByteArray_FromStringAndSize( NULL, nTotalSize );
+    if( poData == NULL )
+        goto fail;
+
+    {
+        GByte *pabyData = (GByte *) PyByteArray_AS_STRING( poData );
+        Py_BEGIN_ALLOW_THREADS
+        for( i = 0; i < nCount; i++ )
+        {
+            if( pahGeoms[i] != NULL )
+                OGR_G_ExportToWkb( pahGeoms[i], (OGRwkbByteOrder) nByteOrder,
+                                   pabyData + panOffsets[i] );
+        }
+        Py_END_ALLOW_THREADS
+    }
+
+    VSIFree( pahGeoms );
+    Py_DECREF( poSeq );
+    return Py_BuildValue( "(NN)", poData, poOffsets );
+
+fail:
+    VSIFree( pahGeoms );
+    Py_XDECREF( poOffsets );
+    Py_XDECREF( poData );
+    Py_DECREF( poSeq );
+    return NULL;
+}
+
+static PyObject *
+py_OGR_G_CreateGeometriesFromWkbArray(PyObject *self, PyObject *args) {
+
+    PyObject *poData = NULL;
+    PyObject *poOffsets = NULL;
+    PyObject *poPySRS = Py_None;
+    OGRSpatialReferenceH hSRS = NULL;
+    Py_buffer sData, sOffsets;
+    OGRGeometryH *pahGeoms = NULL;
+    PyObject *poList = NULL;
+    Py_ssize_t nCount, i;
+    Py_ssize_t nFailure = -1;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "OO|O:CreateGeometriesFromWkbArray",
+                           &poData, &poOffsets, &poPySRS ) )
+        return NULL;
+
+    if( poPySRS != Py_None )
+    {
+        void *pSRS = NULL;
+        if( !SWIG_IsOK(SWIG_ConvertPtr( poPySRS, &pSRS,
+                            SWIGTYPE_p_OSRSpatialReferenceShadow, 0 )) )
+        {
+            PyErr_SetString( PyExc_TypeError,
+                             "reference must be a SpatialReference or None" );
+            return NULL;
+        }
+        hSRS = (OGRSpatialReferenceH) pSRS;
+    }
+
+    if( !OGRGetContiguousBuffer( poData, &sData, FALSE, "Bbc", 1, "data" ) )
+        return NULL;
+    if( !OGRGetContiguousBuffer( poOffsets, &sOffsets, FALSE, "qlL",
+                                 sizeof(GIntBig), "offsets" ) )
+    {
+        PyBuffer_Release( &sData );
+        return NULL;
+    }
+
+    const GIntBig *panOffsets = (const GIntBig *) sOffsets.buf;
+    nCount = sOffsets.len / (Py_ssize_t) sizeof(GIntBig) - 1;
+    if( nCount < 0 )
+        nCount = 0;
+    for( i = 0; i < nCount; i++ )
+    {
+        if( panOffsets[i] < 0 || panOffsets[i] > panOffsets[i+1] ||
+            panOffsets[i+1] > (GIntBig) sData.len ||
+            panOffsets[i+1] - panOffsets[i] > INT_MAX )
+        {
+            PyErr_Format( PyExc_ValueError, "invalid offsets at index %d", (int) i );
+            goto end;
+        }
+    }
+
+    pahGeoms = (OGRGeometryH *) VSICalloc( MAX(nCount, 1), sizeof(OGRGeometryH) );
+    if( pahGeoms == NULL )
+    {
+        PyErr_NoMemory();
+        goto end;
+    }
+
+    Py_BEGIN_ALLOW_THREADS
+    for( i = 0; i < nCount; i++ )
+    {
+        const int nSize = (int) (panOffsets[i+1] - panOffsets[i]);
+        if( nSize == 0 )
+            continue;
+        if( OGR_G_CreateFromWkb( (unsigned char *) sData.buf + panOffsets[i],
+                                 hSRS, &pahGeoms[i], nSize ) != OGRERR_NONE )
+        {
+            pahGeoms[i] = NULL;
+            nFailure = i;
+            break;
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    if( nFailure >= 0 )
+    {
+        PyErr_Format( PyExc_RuntimeError,
+                      "corrupt WKB geometry at index %d", (int) nFailure );
+        for( i = 0; i < nCount; i++ )
+        {
+            if( pahGeoms[i] != NULL )
+                OGR_G_DestroyGeometry( pahGeoms[i] );
+        }
+        goto end;
+    }
+
+    poList = PyList_New( nCount );
+    for( i = 0; i < nCount; i++ )
+    {
+        PyObject *poItem;
+        if( pahGeoms[i] == NULL )
+        {
+            Py_INCREF(Py_None);
+            poItem = Py_None;
+        }
+        else
+            poItem = SWIG_NewPointerObj( (void *) pahGeoms[i],
+                                         SWIGTYPE_p_OGRGeometryShadow,
+                                         SWIG_POINTER_OWN );
+        PyList_SET_ITEM( poList, i, poItem );
+    }
+
+end:
+    VSIFree( pahGeoms );
+    PyBuffer_Release( &sData );
+    PyBuffer_Release( &sOffsets );
+    return poList;
+}
+
+#include "cpl_multiproc.h"
+
+/* Operations of py_OGR_G_BatchOperation(), keep in sync with _BATCH_xxx */
+/* constants of the Python side */
+#define OGR_BATCH_INTERSECTS     0
+#define OGR_BATCH_DISJOINT       1
+#define OGR_BATCH_CONTAINS       2
+#define OGR_BATCH_WITHIN         3
+#define OGR_BATCH_TOUCHES        4
+#define OGR_BATCH_CROSSES        5
+#define OGR_BATCH_OVERLAPS       6
+#define OGR_BATCH_EQUALS         7
+#define OGR_BATCH_DISTANCE       8
+#define OGR_BATCH_INTERSECTION   9
+#define OGR_BATCH_UNION         10
+#define OGR_BATCH_DIFFERENCE    11
+#define OGR_BATCH_SYMDIFFERENCE 12
+
+typedef struct
+{
+    int                 nOp;
+    const OGRGeometry  *poLeft;
+    const GByte        *pabyLeftData;
+    const GIntBig      *panLeftOffsets;
+    const GByte        *pabyRightData;
+    const GIntBig      *panRightOffsets;
+    size_t              nStart;
+    size_t              nCount;
+    GByte              *pabyPredicateOut;
+    double             *padfDistanceOut;
+    OGRGeometry       **papoGeometryOut;
+    GIntBig             nFailureIndex;
+} OGRBatchOperationJob;
+
+/* Envelope of a 2D or 3D point WKB, without instantiating the geometry */
+static int OGRGetWkbPointEnvelope( const GByte *pabyWkb, size_t nSize,
+                                   OGREnvelope *psEnvelope )
+{
+    if( nSize < 21 || pabyWkb[0] > 1 )
+        return FALSE;
+
+    const int bNeedSwap = (pabyWkb[0] == wkbNDR) != (CPL_IS_LSB != 0);
+    GUInt32 nType;
+    memcpy( &nType, pabyWkb + 1, 4 );
+    if( bNeedSwap )
+        CPL_SWAP32PTR( &nType );
+    if( nType != wkbPoint && nType != wkbPoint25D && nType != 1001 )
+        return FALSE;
+
+    double dfX, dfY;
+    memcpy( &dfX, pabyWkb + 5, 8 );
+    memcpy( &dfY, pabyWkb + 13, 8 );
+    if( bNeedSwap )
+    {
+        CPL_SWAPDOUBLE( &dfX );
+        CPL_SWAPDOUBLE( &dfY );
+    }
+    psEnvelope->MinX = psEnvelope->MaxX = dfX;
+    psEnvelope->MinY = psEnvelope->MaxY = dfY;
+    return TRUE;
+}
+
+static OGRGeometry *OGRBatchGetGeometry( const GByte *pabyData,
+                                         const GIntBig *panOffsets,
+                                         size_t i, int *pbFailure )
+{
+    const int nSize = (int) (panOffsets[i+1] - panOffsets[i]);
+    OGRGeometry *poGeom = NULL;
+    *pbFailure = FALSE;
+    if( nSize == 0 )
+        return NULL;
+    if( OGRGeometryFactory::createFromWkb( (unsigned char *) pabyData + panOffsets[i],
+                                           NULL, &poGeom, nSize ) != OGRERR_NONE )
+    {
+        *pbFailure = TRUE;
+        return NULL;
+    }
+    return poGeom;
+}
+
+static void OGRBatchOperationWorker( void *pData )
+{
+    OGRBatchOperationJob *psJob = (OGRBatchOperationJob *) pData;
+    const int nOp = psJob->nOp;
+    OGRPreparedGeometry *poPrepared = NULL;
+    OGREnvelope sLeftEnvelope;
+
+    psJob->nFailureIndex = -1;
+
+    if( psJob->poLeft != NULL )
+    {
+        psJob->poLeft->getEnvelope( &sLeftEnvelope );
+        /* Prepared geometries are not thread-safe, so each job has its own */
+        if( (nOp == OGR_BATCH_INTERSECTS || nOp == OGR_BATCH_DISJOINT ||
+             nOp == OGR_BATCH_CONTAINS) && OGRHasPreparedGeometrySupport() )
+            poPrepared = OGRCreatePreparedGeometry( psJob->poLeft );
+    }
+
+    for( size_t i = psJob->nStart; i < psJob->nStart + psJob->nCount; i++ )
+    {
+        const OGRGeometry *poLeft = psJob->poLeft;
+        OGRGeometry *poLeftOwned = NULL;
+        OGRGeometry *poRight = NULL;
+        OGREnvelope sRightEnvelope;
+        int bFailure = FALSE;
+        int bResult = FALSE;
+        double dfDistance = -1.0;
+        OGRGeometry *poResult = NULL;
+
+        if( poLeft == NULL )
+        {
+            poLeftOwned = OGRBatchGetGeometry( psJob->pabyLeftData,
+                                               psJob->panLeftOffsets, i,
+                                               &bFailure );
+            poLeft = poLeftOwned;
+            if( poLeft != NULL )
+                poLeft->getEnvelope( &sLeftEnvelope );
+        }
+
+        /* Envelope prefiltering: most candidates of a join are rejected */
+        /* there, and points are not even instantiated for that */
+        int bEnvelopeKnown = FALSE;
+        int bSkip = (poLeft == NULL);
+        if( !bSkip && nOp != OGR_BATCH_DISTANCE && nOp != OGR_BATCH_UNION &&
+            nOp != OGR_BATCH_DIFFERENCE && nOp != OGR_BATCH_SYMDIFFERENCE )
+        {
+            const GIntBig nOffset = psJob->panRightOffsets[i];
+            bEnvelopeKnown = OGRGetWkbPointEnvelope(
+                psJob->pabyRightData + nOffset,
+                (size_t) (psJob->panRightOffsets[i+1] - nOffset),
+                &sRightEnvelope );
+        }
+        if( bEnvelopeKnown )
+            bSkip = !sLeftEnvelope.Intersects( sRightEnvelope );
+        if( !bSkip && !bFailure )
+        {
+            poRight = OGRBatchGetGeometry( psJob->pabyRightData,
+                                           psJob->panRightOffsets, i,
+                                           &bFailure );
+            if( poRight == NULL )
+                bSkip = TRUE;
+            else if( !bEnvelopeKnown )
+            {
+                poRight->getEnvelope( &sRightEnvelope );
+                bEnvelopeKnown = TRUE;
+            }
+        }
+        if( bFailure )
+        {
+            psJob->nFailureIndex = (GIntBig) i;
+            delete poLeftOwned;
+            break;
+        }
+
+        const int bEnvelopesIntersect =
+            bEnvelopeKnown && sLeftEnvelope.Intersects( sRightEnvelope );
+
+        switch( nOp )
+        {
+          case OGR_BATCH_INTERSECTS:
+          case OGR_BATCH_DISJOINT:
+            if( !bSkip && bEnvelopesIntersect )
+            {
+                if( poPrepared != NULL )
+                    bResult = OGRPreparedGeometryIntersects( poPrepared, poRight );
+                else
+                    bResult = poLeft->Intersects( poRight );
+            }
+            if( nOp == OGR_BATCH_DISJOINT && poLeft != NULL &&
+                (poRight != NULL || bEnvelopeKnown) )
+                bResult = !bResult;
+            break;
+
+          case OGR_BATCH_CONTAINS:
+            if( !bSkip && sLeftEnvelope.Contains( sRightEnvelope ) )
+            {
+                if( poPrepared != NULL )
+                    bResult = OGRPreparedGeometryContains( poPrepared, poRight );
+                else
+                    bResult = poLeft->Contains( poRight );
+            }
+            break;
+
+          case OGR_BATCH_WITHIN:
+            if( !bSkip && sRightEnvelope.Contains( sLeftEnvelope ) )
+                bResult = poLeft->Within( poRight );
+            break;
+
+          case OGR_BATCH_TOUCHES:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Touches( poRight );
+            break;
+
+          case OGR_BATCH_CROSSES:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Crosses( poRight );
+            break;
+
+          case OGR_BATCH_OVERLAPS:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Overlaps( poRight );
+            break;
+
+          case OGR_BATCH_EQUALS:
+            if( !bSkip && bEnvelopesIntersect )
+                bResult = poLeft->Equals( poRight );
+            break;
+
+          case OGR_BATCH_DISTANCE:
+            if( !bSkip )
+                dfDistance = poLeft->Distance( poRight );
+            break;
+
+          case OGR_BATCH_INTERSECTION:
+            if( !bSkip && bEnvelopesIntersect )
+                poResult = poLeft->Intersection( poRight );
+            break;
+
+          case OGR_BATCH_UNION:
+            if( !bSkip )
+                poResult = poLeft->Union( poRight );
+            break;
+
+          case OGR_BATCH_DIFFERENCE:
+            if( !bSkip )
+                poResult = poLeft->Difference( poRight );
+            break;
+
+          case OGR_BATCH_SYMDIFFERENCE:
+            if( !bSkip )
+                poResult = poLeft->SymDifference( poRight );
+            break;
+
+          default:
+            break;
+        }
+
+        if( psJob->pabyPredicateOut != NULL )
+            psJob->pabyPredicateOut[i] = (GByte) (bResult != 0);
+        if( psJob->padfDistanceOut != NULL )
+            psJob->padfDistanceOut[i] = dfDistance;
+        if( psJob->papoGeometryOut != NULL )
+        {
+            if( poResult != NULL && poResult->IsEmpty() )
+            {
+                delete poResult;
+                poResult = NULL;
+            }
+            psJob->papoGeometryOut[i] = poResult;
+        }
+
+        delete poRight;
+        delete poLeftOwned;
+    }
+
+    OGRDestroyPreparedGeometry( poPrepared );
+}
+
+static int OGRGetWkbArrayBuffers( PyObject *poData, PyObject *poOffsets,
+                                  Py_buffer *psData, Py_buffer *psOffsets,
+                                  size_t *pnCount, const char *pszName )
+{
+    if( !OGRGetContiguousBuffer( poData, psData, FALSE, "Bbc", 1, pszName ) )
+        return FALSE;
+    if( !OGRGetContiguousBuffer( poOffsets, psOffsets, FALSE, "qlL",
+                                 sizeof(GIntBig), pszName ) )
+    {
+        PyBuffer_Release( psData );
+        return FALSE;
+    }
+
+    const GIntBig *panOffsets = (const GIntBig *) psOffsets->buf;
+    const Py_ssize_t nCount = psOffsets->len / (Py_ssize_t) sizeof(GIntBig) - 1;
+    for( Py_ssize_t i = 0; i < nCount; i++ )
+    {
+        if( panOffsets[i] < 0 || panOffsets[i] > panOffsets[i+1] ||
+            panOffsets[i+1] > (GIntBig) psData->len ||
+            panOffsets[i+1] - panOffsets[i] > INT_MAX )
+        {
+            PyErr_Format( PyExc_ValueError, "invalid %s offsets at index %d",
+                          pszName, (int) i );
+            PyBuffer_Release( psData );
+            PyBuffer_Release( psOffsets );
+            return FALSE;
+        }
+    }
+    *pnCount = nCount < 0 ? 0 : (size_t) nCount;
+    return TRUE;
+}
+
+static PyObject *
+py_OGR_G_BatchOperation(PyObject *self, PyObject *args) {
+
+    int nOp = 0;
+    PyObject *poPyLeft = NULL;
+    PyObject *apoLeft[2] = { NULL, NULL };
+    PyObject *apoRight[2] = { NULL, NULL };
+    PyObject *poOut = NULL;
+    int nThreads = 1;
+    const OGRGeometry *poLeft = NULL;
+    Py_buffer sLeftData, sLeftOffsets, sRightData, sRightOffsets, sOut;
+    int bLeftAcquired = FALSE, bRightAcquired = FALSE, bOutAcquired = FALSE;
+    size_t nLeftCount = 0, nCount = 0;
+    OGRGeometry **papoResults = NULL;
+    PyObject *poRet = NULL;
+    GIntBig nFailureIndex = -1;
+    int i;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args, "iOOOOOOi:BatchOperation", &nOp,
+                           &poPyLeft, &apoLeft[0], &apoLeft[1],
+                           &apoRight[0], &apoRight[1], &poOut, &nThreads ) )
+        return NULL;
+
+    if( nOp < OGR_BATCH_INTERSECTS || nOp > OGR_BATCH_SYMDIFFERENCE )
+    {
+        PyErr_SetString( PyExc_ValueError, "invalid operation" );
+        return NULL;
+    }
+
+    if( poPyLeft != Py_None )
+    {
+        void *pGeom = NULL;
+        if( !SWIG_IsOK(SWIG_ConvertPtr( poPyLeft, &pGeom,
+                                        SWIGTYPE_p_OGRGeometryShadow, 0 )) ||
+            pGeom == NULL )
+        {
+            PyErr_SetString( PyExc_TypeError, "geometry must be a Geometry" );
+            return NULL;
+        }
+        poLeft = (const OGRGeometry *) pGeom;
+    }
+    else
+    {
+        if( !OGRGetWkbArrayBuffers( apoLeft[0], apoLeft[1], &sLeftData,
+                                    &sLeftOffsets, &nLeftCount, "geometries" ) )
+            return NULL;
+        bLeftAcquired = TRUE;
+    }
+
+    if( !OGRGetWkbArrayBuffers( apoRight[0], apoRight[1], &sRightData,
+                                &sRightOffsets, &nCount, "others" ) )
+        goto end;
+    bRightAcquired = TRUE;
+
+    if( bLeftAcquired && nLeftCount != nCount )
+    {
+        PyErr_SetString( PyExc_ValueError,
+                         "geometries and others must have the same length" );
+        goto end;
+    }
+
+    if( nOp < OGR_BATCH_DISTANCE )
+    {
+        if( !OGRGetContiguousBuffer( poOut, &sOut, TRUE, "B?b", 1, "out" ) )
+            goto end;
+        bOutAcquired = TRUE;
+    }
+    else if( nOp == OGR_BATCH_DISTANCE )
+    {
+        if( !OGRGetContiguousBuffer( poOut, &sOut, TRUE, "d", sizeof(double), "out" ) )
+            goto end;
+        bOutAcquired = TRUE;
+    }
+    if( bOutAcquired && (size_t) sOut.len != nCount * sOut.itemsize )
+    {
+        PyErr_SetString( PyExc_ValueError, "out must have the length of others" );
+        goto end;
+    }
+
+    if( nOp >= OGR_BATCH_INTERSECTION )
+    {
+        papoResults = (OGRGeometry **) VSICalloc( MAX(nCount, 1), sizeof(OGRGeometry *) );
+        if( papoResults == NULL )
+        {
+            PyErr_NoMemory();
+            goto end;
+        }
+    }
+
+    if( nThreads <= 0 )
+        nThreads = CPLGetNumCPUs();
+    /* Not worth spawning threads for a handful of geometries */
+    if( (size_t) nThreads > nCount / 1000 + 1 )
+        nThreads = (int) (nCount / 1000 + 1);
+
+    {
+        OGRBatchOperationJob *pasJobs = (OGRBatchOperationJob *)
+            CPLCalloc( nThreads, sizeof(OGRBatchOperationJob) );
+        CPLJoinableThread **pahThreads = (CPLJoinableThread **)
+            CPLCalloc( nThreads, sizeof(CPLJoinableThread *) );
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            pasJobs[i].nOp = nOp;
+            pasJobs[i].poLeft = poLeft;
+            pasJobs[i].pabyLeftData = bLeftAcquired ? (const GByte *) sLeftData.buf : NULL;
+            pasJobs[i].panLeftOffsets = bLeftAcquired ? (const GIntBig *) sLeftOffsets.buf : NULL;
+            pasJobs[i].pabyRightData = (const GByte *) sRightData.buf;
+            pasJobs[i].panRightOffsets = (const GIntBig *) sRightOffsets.buf;
+            pasJobs[i].nStart = (nCount / nThreads) * i;
+            pasJobs[i].nCount = (i == nThreads - 1) ?
+                nCount - pasJobs[i].nStart : nCount / nThreads;
+            if( nOp < OGR_BATCH_DISTANCE )
+                pasJobs[i].pabyPredicateOut = (GByte *) sOut.buf;
+            else if( nOp == OGR_BATCH_DISTANCE )
+                pasJobs[i].padfDistanceOut = (double *) sOut.buf;
+            else
+                pasJobs[i].papoGeometryOut = papoResults;
+        }
+
+        Py_BEGIN_ALLOW_THREADS
+
+        if ( bUseExceptions ) {
+            CPLErrorReset();
+        }
+
+        for( i = 1; i < nThreads; i++ )
+            pahThreads[i] = CPLCreateJoinableThread(
+                OGRBatchOperationWorker, &pasJobs[i] );
+        OGRBatchOperationWorker( &pasJobs[0] );
+
+        for( i = 1; i < nThreads; i++ )
+        {
+            if( pahThreads[i] != NULL )
+                CPLJoinThread( pahThreads[i] );
+            else
+                OGRBatchOperationWorker( &pasJobs[i] );
+        }
+
+        Py_END_ALLOW_THREADS
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            if( pasJobs[i].nFailureIndex >= 0 )
+            {
+                nFailureIndex = pasJobs[i].nFailureIndex;
+                break;
+            }
+        }
+
+        CPLFree( pahThreads );
+        CPLFree( pasJobs );
+    }
+
+    if( nFailureIndex >= 0 )
+    {
+        PyErr_Format( PyExc_RuntimeError,
+                      "corrupt WKB geometry at index %d", (int) nFailureIndex );
+        goto end;
+    }
+
+    if( papoResults == NULL )
+    {
+        Py_INCREF(Py_None);
+        poRet = Py_None;
+    }
+    else
+    {
+        /* Export the resulting geometries as a WKB array */
+        PyObject *poOffsets = PyByteArray_FromStringAndSize( NULL, (nCount + 1) * sizeof(GIntBig) );
+        if( poOffsets == NULL )
+            goto end;
+        GIntBig *panOffsets = (GIntBig *) PyByteArray_AS_STRING( poOffsets );
+        size_t nTotalSize = 0;
+        size_t j;
+        for( j = 0; j < nCount; j++ )
+        {
+            panOffsets[j] = (GIntBig) nTotalSize;
+            if( papoResults[j] != NULL )
+                nTotalSize += papoResults[j]->WkbSize();
+        }
+        panOffsets[nCount] = (GIntBig) nTotalSize;
+
+        PyObject *poData = PyByteArray_FromStringAndSize( NULL, nTotalSize );
+        if( poData == NULL )
+        {
+            Py_DECREF( poOffsets );
+            goto end;
+        }
+        GByte *pabyData = (GByte *) PyByteArray_AS_STRING( poData );
+        for( j = 0; j < nCount; j++ )
+        {
+            if( papoResults[j] != NULL )
+                papoResults[j]->exportToWkb( wkbNDR, pabyData + panOffsets[j] );
+        }
+        poRet = Py_BuildValue( "(NN)", poData, poOffsets );
+    }
+
+end:
+    if( papoResults != NULL )
+    {
+        for( size_t j = 0; j < nCount; j++ )
+            delete papoResults[j];
+        VSIFree( papoResults );
+    }
+    if( bLeftAcquired )
+    {
+        PyBuffer_Release( &sLeftData );
+        PyBuffer_Release( &sLeftOffsets );
+    }
+    if( bRightAcquired )
+    {
+        PyBuffer_Release( &sRightData );
+        PyBuffer_Release( &sRightOffsets );
+    }
+    if( bOutAcquired )
+        PyBuffer_Release( &sOut );
+    return poRet;
+}
+
+
 
 
 typedef struct {
@@ -23585,6 +24491,11 @@ static PyMethodDef SwigMethods[] = {
 	 { (char *)"GetUseExceptions", _wrap_GetUseExceptions, METH_VARARGS, (char *)"GetUseExceptions() -> int"},
 	 { (char *)"UseExceptions", _wrap_UseExceptions, METH_VARARGS, (char *)"UseExceptions()"},
 	 { (char *)"DontUseExceptions", _wrap_DontUseExceptions, METH_VARARGS, (char *)"DontUseExceptions()"},
+	 { (char *)"Geometry_GetPointsIntoBuffer", py_OGR_G_GetPointsIntoBuffer, METH_VARARGS, NULL},
+	 { (char *)"Geometry_SetPointsFromBuffer", py_OGR_G_SetPointsFromBuffer, METH_VARARGS, NULL},
+	 { (char *)"ExportToWkbArrayBuffers", py_OGR_G_ExportToWkbArray, METH_VARARGS, NULL},
+	 { (char *)"CreateGeometriesFromWkbArrayBuffers", py_OGR_G_CreateGeometriesFromWkbArray, METH_VARARGS, NULL},
+	 { (char *)"BatchOperation", py_OGR_G_BatchOperation, METH_VARARGS, NULL},
 	 { (char *)"MajorObject_GetDescription", _wrap_MajorObject_GetDescription, METH_VARARGS, (char *)"MajorObject_GetDescription(MajorObject self) -> char"},
 	 { (char *)"MajorObject_SetDescription", _wrap_MajorObject_SetDescription, METH_VARARGS, (char *)"MajorObject_SetDescription(MajorObject self, char pszNewDesc)"},
 	 { (char *)"MajorObject_GetMetadataDomainList", _wrap_MajorObject_GetMetadataDomainList, METH_VARARGS, (char *)"MajorObject_GetMetadataDomainList(MajorObject self) -> char"},
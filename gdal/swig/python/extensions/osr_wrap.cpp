@@ -3082,6 +3082,246 @@ py_OPTGetProjectionMethods(PyObject *self, PyObject *args) {
 }
 
 
+#include "cpl_multiproc.h"
+#include "ogr_spatialref.h"
+
+typedef struct
+{
+    OGRCoordinateTransformationH hCT;
+    double  *padfX;
+    double  *padfY;
+    double  *padfZ;
+    size_t   nStart;
+    size_t   nCount;
+    size_t   nSuccess;
+} OCTTransformPointsArrayJob;
+
+static void OCTTransformPointsArrayWorker( void *pData )
+{
+    OCTTransformPointsArrayJob *psJob = (OCTTransformPointsArrayJob *) pData;
+    const size_t nBatchSize = 65536;
+    int *pabSuccess = (int *) VSIMalloc( sizeof(int) * nBatchSize );
+
+    psJob->nSuccess = 0;
+    if( pabSuccess == NULL )
+        return;
+
+    /* OCTTransformEx() takes an int count, so feed it bounded batches */
+    const size_t nEnd = psJob->nStart + psJob->nCount;
+    for( size_t iStart = psJob->nStart; iStart < nEnd; iStart += nBatchSize )
+    {
+        const int nThisBatch = (int) MIN( nBatchSize, nEnd - iStart );
+        OCTTransformEx( psJob->hCT, nThisBatch,
+                        psJob->padfX + iStart,
+                        psJob->padfY + iStart,
+                        psJob->padfZ ? psJob->padfZ + iStart : NULL,
+                        pabSuccess );
+        for( int i = 0; i < nThisBatch; i++ )
+        {
+            if( pabSuccess[i] )
+                psJob->nSuccess ++;
+        }
+    }
+
+    VSIFree( pabSuccess );
+}
+
+/* Acquire a C contiguous buffer of native doubles from any object */
+/* implementing the buffer protocol (numpy arrays, array.array, ...) */
+static int OCTGetDoubleBuffer( PyObject *poObj, Py_buffer *psView,
+                               int bWritable, const char *pszName )
+{
+    int nFlags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT;
+    if( bWritable )
+        nFlags |= PyBUF_WRITABLE;
+    if( PyObject_GetBuffer( poObj, psView, nFlags ) != 0 )
+        return FALSE;
+
+    const char *pszFormat = psView->format ? psView->format : "B";
+    if( *pszFormat == '@' || *pszFormat == '=' )
+        pszFormat ++;
+    if( strcmp(pszFormat, "d") != 0 || psView->itemsize != sizeof(double) )
+    {
+        PyErr_Format( PyExc_TypeError,
+                      "%s must be a contiguous buffer of float64 values",
+                      pszName );
+        PyBuffer_Release( psView );
+        return FALSE;
+    }
+    return TRUE;
+}
+
+static PyObject *
+py_OCTTransformPointsArray(PyObject *self, PyObject *args) {
+
+    PyObject *poPyCT = NULL;
+    PyObject *apoIn[3] = { NULL, NULL, NULL };
+    PyObject *apoOut[3] = { NULL, NULL, NULL };
+    static const char * const apszNames[3] = { "xs", "ys", "zs" };
+    Py_buffer asIn[3];
+    Py_buffer asOut[3];
+    int abInAcquired[3] = { FALSE, FALSE, FALSE };
+    int abOutAcquired[3] = { FALSE, FALSE, FALSE };
+    int nThreads = 1;
+    void *pCT = NULL;
+    PyObject *poRet = NULL;
+    size_t nPoints = 0;
+    int i;
+
+    self = self;
+
+    if( !PyArg_ParseTuple( args,
+                           "OOOOOOO|i:CoordinateTransformation_TransformPointsArray",
+                           &poPyCT, &apoIn[0], &apoIn[1], &apoIn[2],
+                           &apoOut[0], &apoOut[1], &apoOut[2], &nThreads ) )
+        return NULL;
+
+    if( !SWIG_IsOK(SWIG_ConvertPtr( poPyCT, &pCT,
+                        SWIGTYPE_p_OSRCoordinateTransformationShadow, 0 )) ||
+        pCT == NULL )
+    {
+        PyErr_SetString( PyExc_TypeError,
+                         "argument 1 must be a CoordinateTransformation" );
+        return NULL;
+    }
+
+    for( i = 0; i < 3; i++ )
+    {
+        if( apoIn[i] != Py_None )
+        {
+            if( !OCTGetDoubleBuffer( apoIn[i], &asIn[i], FALSE, apszNames[i] ) )
+                goto end;
+            abInAcquired[i] = TRUE;
+        }
+        if( apoOut[i] != Py_None )
+        {
+            if( !OCTGetDoubleBuffer( apoOut[i], &asOut[i], TRUE, apszNames[i] ) )
+                goto end;
+            abOutAcquired[i] = TRUE;
+        }
+    }
+
+    if( !abInAcquired[0] || !abInAcquired[1] ||
+        !abOutAcquired[0] || !abOutAcquired[1] )
+    {
+        PyErr_SetString( PyExc_TypeError, "xs and ys must be provided" );
+        goto end;
+    }
+
+    nPoints = (size_t) asIn[0].len / sizeof(double);
+    for( i = 0; i < 3; i++ )
+    {
+        if( (abInAcquired[i] && (size_t) asIn[i].len != nPoints * sizeof(double)) ||
+            (abOutAcquired[i] && (size_t) asOut[i].len != nPoints * sizeof(double)) )
+        {
+            PyErr_SetString( PyExc_ValueError,
+                             "all coordinate arrays must have the same length" );
+            goto end;
+        }
+    }
+
+    if( nThreads <= 0 )
+        nThreads = CPLGetNumCPUs();
+    /* Not worth spawning threads for a handful of points */
+    if( (size_t) nThreads > nPoints / 10000 + 1 )
+        nThreads = (int) (nPoints / 10000 + 1);
+
+    {
+        OGRCoordinateTransformation *poCT = (OGRCoordinateTransformation *) pCT;
+        OCTTransformPointsArrayJob *pasJobs = NULL;
+        CPLJoinableThread **pahThreads = NULL;
+        size_t nSuccess = 0;
+
+        Py_BEGIN_ALLOW_THREADS
+
+        for( i = 0; i < 3; i++ )
+        {
+            if( !abOutAcquired[i] )
+                continue;
+            if( !abInAcquired[i] )
+                memset( asOut[i].buf, 0, nPoints * sizeof(double) );
+            else if( asOut[i].buf != asIn[i].buf )
+                memmove( asOut[i].buf, asIn[i].buf, nPoints * sizeof(double) );
+        }
+
+        pasJobs = (OCTTransformPointsArrayJob *)
+            CPLCalloc( nThreads, sizeof(OCTTransformPointsArrayJob) );
+        pahThreads = (CPLJoinableThread **)
+            CPLCalloc( nThreads, sizeof(CPLJoinableThread *) );
+
+        /* A transformation object must not be used concurrently, so every */
+        /* extra thread works on its own instance */
+        pasJobs[0].hCT = (OGRCoordinateTransformationH) pCT;
+        for( i = 1; i < nThreads; i++ )
+        {
+            pasJobs[i].hCT = OCTNewCoordinateTransformation(
+                (OGRSpatialReferenceH) poCT->GetSourceCS(),
+                (OGRSpatialReferenceH) poCT->GetTargetCS() );
+            if( pasJobs[i].hCT == NULL )
+                break;
+        }
+        nThreads = i;
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            pasJobs[i].padfX = (double *) asOut[0].buf;
+            pasJobs[i].padfY = (double *) asOut[1].buf;
+            pasJobs[i].padfZ = abOutAcquired[2] ? (double *) asOut[2].buf : NULL;
+            pasJobs[i].nStart = (nPoints / nThreads) * i;
+            pasJobs[i].nCount = (i == nThreads - 1) ?
+                nPoints - pasJobs[i].nStart : nPoints / nThreads;
+        }
+
+        if ( bUseExceptions ) {
+            CPLErrorReset();
+        }
+
+        for( i = 1; i < nThreads; i++ )
+            pahThreads[i] = CPLCreateJoinableThread(
+                OCTTransformPointsArrayWorker, &pasJobs[i] );
+        OCTTransformPointsArrayWorker( &pasJobs[0] );
+
+        for( i = 0; i < nThreads; i++ )
+        {
+            if( i > 0 )
+            {
+                if( pahThreads[i] != NULL )
+                    CPLJoinThread( pahThreads[i] );
+                else
+                    OCTTransformPointsArrayWorker( &pasJobs[i] );
+                OCTDestroyCoordinateTransformation( pasJobs[i].hCT );
+            }
+            nSuccess += pasJobs[i].nSuccess;
+        }
+
+        CPLFree( pahThreads );
+        CPLFree( pasJobs );
+
+        Py_END_ALLOW_THREADS
+
+        if ( bUseExceptions ) {
+            CPLErr eclass = CPLGetLastErrorType();
+            if ( eclass == CE_Failure || eclass == CE_Fatal ) {
+                PyErr_SetString( PyExc_RuntimeError, CPLGetLastErrorMsg() );
+                goto end;
+            }
+        }
+
+        poRet = PyLong_FromSize_t( nSuccess );
+    }
+
+end:
+    for( i = 0; i < 3; i++ )
+    {
+        if( abInAcquired[i] )
+            PyBuffer_Release( &asIn[i] );
+        if( abOutAcquired[i] )
+            PyBuffer_Release( &asOut[i] );
+    }
+    return poRet;
+}
+
+
 OGRErr GetWellKnownGeogCSAsWKT( const char *name, char **argout ) {
   OGRSpatialReferenceH srs = OSRNewSpatialReference("");
   OGRErr rcode = OSRSetWellKnownGeogCS( srs, name );
@@ -12950,6 +13190,7 @@ static PyMethodDef SwigMethods[] = {
 	 { (char *)"UseExceptions", _wrap_UseExceptions, METH_VARARGS, (char *)"UseExceptions()"},
 	 { (char *)"DontUseExceptions", _wrap_DontUseExceptions, METH_VARARGS, (char *)"DontUseExceptions()"},
 	 { (char *)"GetProjectionMethods", py_OPTGetProjectionMethods, METH_VARARGS, NULL},
+	 { (char *)"CoordinateTransformation_TransformPointsArray", py_OCTTransformPointsArray, METH_VARARGS, NULL},
 	 { (char *)"GetWellKnownGeogCSAsWKT", _wrap_GetWellKnownGeogCSAsWKT, METH_VARARGS, (char *)"GetWellKnownGeogCSAsWKT(char name) -> OGRErr"},
 	 { (char *)"GetUserInputAsWKT", _wrap_GetUserInputAsWKT, METH_VARARGS, (char *)"GetUserInputAsWKT(char name) -> OGRErr"},
 	 { (char *)"new_SpatialReference", (PyCFunction) _wrap_new_SpatialReference, METH_VARARGS | METH_KEYWORDS, (char *)"new_SpatialReference(char wkt = \"\") -> SpatialReference"},
@@ -164,16 +164,55 @@ codes = {   gdalconst.GDT_Byte      :   numpy.uint8,
             gdalconst.GDT_CFloat64  :   numpy.complex128
         }
 
-def OpenArray( array, prototype_ds = None ):
-
-    ds = gdal.Open( GetArrayFilename(array) )
+def OpenArray( array, prototype_ds = None, interleave = 'band',
+               geotransform = None, srs = None, nodata = None, update = False ):
+    """Open a numpy array as a GDAL dataset, without copying the values.
+
+    A 2-D array gives a single band dataset. A 3-D array is in
+    [band, line, pixel] order with interleave = 'band', and in
+    [line, pixel, band] order with interleave = 'pixel'. Any strides are
+    accepted, so views of larger arrays can be opened directly.
+
+    geotransform, srs (WKT or osr.SpatialReference) and nodata (a value, or
+    a value per band) are set on the dataset, after the information copied
+    from prototype_ds. With update = True, writing in the dataset writes in
+    the array (after FlushCache() for writes going through the block cache).
+    The dataset keeps a reference to the array."""
+
+    if interleave == 'pixel':
+        if len(array.shape) != 3:
+            raise ValueError("pixel interleaving requires an array of dim 3")
+        # Same memory, seen in [band, line, pixel] order
+        array = array.transpose(2, 0, 1)
+    elif interleave != 'band':
+        raise ValueError("interleave must be 'band' or 'pixel'")
+
+    if update:
+        ds = gdal.Open( GetArrayFilename(array), gdal.GA_Update )
+    else:
+        ds = gdal.Open( GetArrayFilename(array) )
+    if ds is None:
+        return None
 
-    if ds is not None and prototype_ds is not None:
+    if prototype_ds is not None:
         if type(prototype_ds).__name__ == 'str':
             prototype_ds = gdal.Open( prototype_ds )
         if prototype_ds is not None:
             CopyDatasetInfo( prototype_ds, ds )
-            
+
+    if geotransform is not None:
+        ds.SetGeoTransform( geotransform )
+    if srs is not None:
+        if hasattr(srs, 'ExportToWkt'):
+            srs = srs.ExportToWkt()
+        ds.SetProjection( srs )
+    if nodata is not None:
+        if not isinstance(nodata, (list, tuple)):
+            nodata = [ nodata ] * ds.RasterCount
+        for i in range(ds.RasterCount):
+            if nodata[i] is not None:
+                ds.GetRasterBand(i + 1).SetNoDataValue( nodata[i] )
+
     return ds
     
     
@@ -379,6 +418,377 @@ def BandWriteArray( band, array, xoff=0, yoff=0,
     return BandRasterIONumPy( band, 1, xoff, yoff, xsize, ysize,
                                 array, datatype, resample_alg, callback, callback_data )
 
+_CHECKSUM_PRIMES = numpy.array([7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43],
+                               dtype = numpy.int64)
+
+def _AllStatsValidMask(values, nodata):
+    """Mask of the values taken into account by the statistics and the
+    histogram, or None if they all are: NaN values and values equal to the
+    nodata value (with the tolerance of GDALRasterBand::ComputeStatistics())
+    are ignored."""
+    valid = None
+    if values.dtype.kind == 'f':
+        valid = ~numpy.isnan(values)
+    if nodata is not None:
+        values = values.astype(numpy.float64)
+        err = numpy.seterr(divide = 'ignore', invalid = 'ignore')
+        try:
+            equal = (values == nodata) | (numpy.abs(values - nodata) < 1e-10)
+            if nodata != 0:
+                equal |= numpy.abs(1 - values / nodata) < 1e-10
+        finally:
+            numpy.seterr(**err)
+        if valid is None:
+            valid = ~equal
+        else:
+            valid &= ~equal
+    return valid
+
+def _HistogramBuckets(values, hist_min, hist_max, buckets):
+    """Bucket of each value, with the formula of GDALRasterBand::GetHistogram()
+    and out of range values counted in the first or last bucket."""
+    if hist_max == hist_min:
+        return numpy.zeros(values.shape, dtype = numpy.int64)
+    scale = buckets / (hist_max - hist_min)
+    index = numpy.floor((values - hist_min) * scale)
+    return numpy.clip(index, 0, buckets - 1).astype(numpy.int64)
+
+class _AllStatsAccumulator(object):
+    """Statistics, histogram and checksum of a band being computed by
+    BandsComputeAllStats(). The *Chunk() methods only depend on the data
+    they are given and run in the worker threads, Add() merges their
+    results in the calling thread."""
+
+    def __init__(self, band, want_stats, hist_buckets, want_checksum):
+        self.band = band
+        self.want_stats = want_stats or hist_buckets > 0
+        self.hist_buckets = hist_buckets
+        self.want_checksum = want_checksum
+
+        datatype = band.DataType
+        self.buf_type = datatype
+        if datatype == gdalconst.GDT_CInt32:
+            # complex64 would not hold all the values exactly
+            self.buf_type = gdalconst.GDT_CFloat64
+        self.is_complex = gdal.DataTypeIsComplex(datatype)
+        self.float_checksum = datatype in (gdalconst.GDT_Float32,
+                                           gdalconst.GDT_Float64,
+                                           gdalconst.GDT_CFloat32,
+                                           gdalconst.GDT_CFloat64)
+        self.nodata = band.GetNoDataValue()
+        self.unsigned_byte = False
+
+        # Histograms of 8 and 16 bit bands are computed in the first pass
+        # by counting each value, other data types need a second pass once
+        # the range of the values is known
+        self.value_offset = None
+        if hist_buckets > 0:
+            if datatype == gdalconst.GDT_Byte:
+                if band.GetMetadataItem('PIXELTYPE', 'IMAGE_STRUCTURE') == 'SIGNEDBYTE':
+                    self.value_offset = -128
+                else:
+                    self.value_offset = 0
+                    self.unsigned_byte = True
+                self.value_counts = numpy.zeros(256, dtype = numpy.int64)
+            elif datatype == gdalconst.GDT_UInt16:
+                self.value_offset = 0
+                self.value_counts = numpy.zeros(65536, dtype = numpy.int64)
+            elif datatype == gdalconst.GDT_Int16:
+                self.value_offset = -32768
+                self.value_counts = numpy.zeros(65536, dtype = numpy.int64)
+        self.bucket_counts = None
+
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.checksum = 0
+
+    def NeedsHistogramPass(self):
+        return self.hist_buckets > 0 and self.value_offset is None and \
+            self.count > 0
+
+    def GetHistogramRange(self):
+        """Range of the default histogram, as in
+        GDALRasterBand::GetDefaultHistogram()"""
+        if self.unsigned_byte:
+            return (-0.5, 255.5)
+        if self.count == 0:
+            return None
+        # GetDefaultHistogram() gets the statistics from the metadata items
+        # written by SetStatistics()
+        min_value = float('%.14g' % self.min)
+        max_value = float('%.14g' % self.max)
+        half_bucket = (max_value - min_value) / (2 * (self.hist_buckets - 1))
+        return (min_value - half_bucket, max_value + half_bucket)
+
+    def FirstPassChunk(self, data, yoff):
+        stats = None
+        value_counts = None
+        checksum = None
+
+        if self.want_stats:
+            values = data
+            if self.is_complex:
+                values = data.real
+            valid = _AllStatsValidMask(values, self.nodata)
+            if valid is None:
+                values = values.ravel()
+            else:
+                values = values[valid]
+            if values.size > 0:
+                as_double = values.astype(numpy.float64)
+                mean = as_double.mean()
+                stats = (values.size, float(as_double.min()),
+                         float(as_double.max()), float(mean),
+                         float(numpy.square(as_double - mean).sum()))
+                if self.value_offset is not None:
+                    value_counts = numpy.bincount(
+                        values.astype(numpy.int64) - self.value_offset,
+                        minlength = len(self.value_counts))
+
+        if self.want_checksum:
+            # Same as GDALChecksumImage(): values are converted to Int32
+            # and the prime is selected by the position of the value in
+            # the band (real and imaginary parts counting for two)
+            if self.is_complex:
+                data = data.view(data.real.dtype)
+            elif data.dtype == numpy.int8:
+                # RasterIO() does not know about signed bytes
+                data = data.view(numpy.uint8)
+            flat = data.ravel()
+            if self.float_checksum:
+                flat = flat.astype(numpy.float64)
+                invalid = ~numpy.isfinite(flat)
+                flat[invalid] = 0
+                ints = numpy.floor(numpy.clip(flat + 0.5, -2147483647.0,
+                                              2147483647.0)).astype(numpy.int64)
+                ints[invalid] = -2147483648
+            else:
+                ints = numpy.clip(flat.astype(numpy.int64),
+                                  -2147483648, 2147483647)
+            first = yoff * data.shape[1]
+            primes = _CHECKSUM_PRIMES[numpy.arange(first, first + ints.size) % 11]
+            checksum = int(numpy.fmod(ints, primes).sum())
+
+        return (stats, value_counts, None, checksum)
+
+    def HistogramChunk(self, data, yoff):
+        values = data
+        if self.is_complex:
+            values = numpy.abs(data)
+        valid = _AllStatsValidMask(values, self.nodata)
+        if valid is None:
+            values = values.ravel()
+        else:
+            values = values[valid]
+        (hist_min, hist_max) = self.GetHistogramRange()
+        buckets = _HistogramBuckets(values.astype(numpy.float64),
+                                    hist_min, hist_max, self.hist_buckets)
+        return (None, None,
+                numpy.bincount(buckets, minlength = self.hist_buckets), None)
+
+    def Add(self, result):
+        (stats, value_counts, bucket_counts, checksum) = result
+        if stats is not None:
+            (count, min_value, max_value, mean, m2) = stats
+            if self.count == 0:
+                (self.count, self.min, self.max, self.mean, self.m2) = stats
+            else:
+                total = self.count + count
+                delta = mean - self.mean
+                self.mean += delta * count / total
+                self.m2 += m2 + delta * delta * self.count * count / total
+                self.count = total
+                self.min = min(self.min, min_value)
+                self.max = max(self.max, max_value)
+        if value_counts is not None:
+            self.value_counts += value_counts
+        if bucket_counts is not None:
+            if self.bucket_counts is None:
+                self.bucket_counts = bucket_counts
+            else:
+                self.bucket_counts += bucket_counts
+        if checksum is not None:
+            self.checksum = (self.checksum + checksum) % 65536
+
+    def GetResult(self):
+        result = { 'min': None, 'max': None, 'mean': None, 'stddev': None,
+                   'histogram': None, 'checksum': None }
+        if self.want_checksum:
+            result['checksum'] = self.checksum
+        if not self.want_stats or self.count == 0:
+            return result
+
+        result['min'] = self.min
+        result['max'] = self.max
+        result['mean'] = self.mean
+        result['stddev'] = (self.m2 / self.count) ** 0.5
+        if self.hist_buckets > 0:
+            (hist_min, hist_max) = self.GetHistogramRange()
+            if self.value_offset is not None:
+                values = numpy.arange(len(self.value_counts)) + self.value_offset
+                buckets = _HistogramBuckets(values.astype(numpy.float64),
+                                            hist_min, hist_max, self.hist_buckets)
+                counts = numpy.bincount(buckets, weights = self.value_counts,
+                                        minlength = self.hist_buckets)
+            elif self.bucket_counts is not None:
+                counts = self.bucket_counts
+            else:
+                counts = numpy.zeros(self.hist_buckets)
+            result['histogram'] = (hist_min, hist_max, self.hist_buckets,
+                                   [int(c) for c in counts])
+        return result
+
+def _AllStatsPass(accumulators, method, pool, num_threads, progress):
+    """Read the bands of the accumulators (all of the same size) by chunks
+    of lines, and add the result of method(accumulator, data, yoff) for each
+    of them. Reading stays in the calling thread, the computations run in
+    the thread pool if there is one. Returns False on a read error or when
+    interrupted by the progress function."""
+    import collections
+
+    band = accumulators[0].band
+    xsize = band.XSize
+    ysize = band.YSize
+    block_ysize = max(1, band.GetBlockSize()[1])
+    chunk_lines = max(1, (1024 * 1024 // max(1, xsize)) // block_ysize) * block_ysize
+
+    pending = collections.deque()
+    for yoff in range(0, ysize, chunk_lines):
+        lines = min(chunk_lines, ysize - yoff)
+        for accumulator in accumulators:
+            data = BandReadAsArray(accumulator.band, 0, yoff, xsize, lines,
+                                   buf_type = accumulator.buf_type)
+            if data is None:
+                return False
+            if pool is None:
+                accumulator.Add(method(accumulator, data, yoff))
+            else:
+                pending.append((accumulator,
+                                pool.apply_async(method, (accumulator, data, yoff))))
+        # Bound the number of chunks held in memory
+        while len(pending) > 2 * num_threads:
+            (accumulator, job) = pending.popleft()
+            accumulator.Add(job.get())
+        if not progress(float(yoff + lines) / ysize):
+            return False
+
+    while pending:
+        (accumulator, job) = pending.popleft()
+        accumulator.Add(job.get())
+    return True
+
+def _GetSampleOverview(band):
+    """Smallest overview of a band, or the band itself, as
+    GDALRasterBand::GetRasterSampleOverview(0)"""
+    best = band
+    for i in range(band.GetOverviewCount()):
+        overview = band.GetOverview(i)
+        if overview is not None and \
+           overview.XSize * overview.YSize < best.XSize * best.YSize:
+            best = overview
+    return best
+
+def BandsComputeAllStats( bands, approx_ok = False, hist_buckets = 256,
+                          checksum = True, callback = None, callback_data = None,
+                          num_threads = 0 ):
+    """Pure python implementation of the computation of the statistics,
+    default histogram and checksum of bands of the same size, reading them
+    once. Used by the gdal.Band.ComputeAllStats and
+    gdal.Dataset.ComputeAllStats methods.
+
+    Returns a list with a dictionary per band, with 'min', 'max', 'mean',
+    'stddev', 'histogram' (as returned by gdal.Band.GetDefaultHistogram())
+    and 'checksum' keys, or None on failure. The statistics and histogram
+    are set on the bands, as gdal.Band.ComputeStatistics() and
+    gdal.Band.GetDefaultHistogram() do."""
+    from multiprocessing.pool import ThreadPool
+
+    if hist_buckets == 1 or hist_buckets < 0:
+        raise ValueError('hist_buckets must be 0 or at least 2')
+    if len(bands) == 0:
+        return []
+    for band in bands:
+        if band.XSize != bands[0].XSize or band.YSize != bands[0].YSize:
+            raise ValueError('bands must have the same size')
+
+    if callback == gdal.TermProgress:
+        callback = gdal.TermProgress_nocb
+
+    if num_threads <= 0:
+        import multiprocessing
+        num_threads = multiprocessing.cpu_count()
+
+    # With approx_ok, the statistics and histogram come from the smallest
+    # overview, but the checksum is always computed on the full resolution
+    stats_bands = list(bands)
+    if approx_ok:
+        stats_bands = [_GetSampleOverview(band) for band in bands]
+    if all([a is b for (a, b) in zip(stats_bands, bands)]):
+        groups = [[_AllStatsAccumulator(band, True, hist_buckets, checksum)
+                   for band in bands]]
+        stats_accumulators = groups[0]
+        checksum_accumulators = groups[0]
+    else:
+        groups = [[_AllStatsAccumulator(band, True, hist_buckets, False)]
+                  for band in stats_bands]
+        stats_accumulators = [group[0] for group in groups]
+        checksum_accumulators = []
+        if checksum:
+            checksum_accumulators = [_AllStatsAccumulator(band, False, 0, True)
+                                     for band in bands]
+            groups.append(checksum_accumulators)
+
+    # Passes, with their relative cost for the progress report
+    passes = [(group, _AllStatsAccumulator.FirstPassChunk) for group in groups]
+    second_passes = [[accumulator] for accumulator in stats_accumulators
+                     if accumulator.hist_buckets > 0 and
+                        accumulator.value_offset is None]
+    total = float(len(passes) + len(second_passes))
+
+    pool = None
+    if num_threads > 1:
+        pool = ThreadPool(num_threads)
+    try:
+        done = 0
+        for (group, method) in passes + [(group, None) for group in second_passes]:
+            if method is None:
+                if not group[0].NeedsHistogramPass():
+                    done += 1
+                    continue
+                method = _AllStatsAccumulator.HistogramChunk
+
+            def progress(complete, done = done):
+                if callback is None:
+                    return True
+                return callback((done + complete) / total, '',
+                                callback_data) != 0
+
+            if not _AllStatsPass(group, method, pool, num_threads, progress):
+                return None
+            done += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    results = []
+    for (i, band) in enumerate(bands):
+        result = stats_accumulators[i].GetResult()
+        if checksum:
+            result['checksum'] = checksum_accumulators[i].checksum
+        if result['min'] is not None:
+            band.SetStatistics(result['min'], result['max'],
+                               result['mean'], result['stddev'])
+        if result['histogram'] is not None:
+            band.SetDefaultHistogram(result['histogram'][0],
+                                     result['histogram'][1],
+                                     result['histogram'][3])
+        results.append(result)
+    return results
+
 def RATWriteArray(rat, array, field, start=0):
     """
     Pure Python implementation of writing a chunk of the RAT
@@ -807,12 +807,204 @@ class CoordinateTransformation(_object):
         """TransformPoints(self, int nCount)"""
         return _osr.CoordinateTransformation_TransformPoints(self, *args)
 
+    def TransformPointsArray(self, xs, ys, zs = None, out = None, num_threads = 1):
+      """TransformPointsArray(self, xs, ys, zs = None, out = None, num_threads = 1) -> int
+
+         Transform coordinates held in contiguous float64 buffers (numpy
+         arrays, array.array('d'), ...) without creating per-point Python
+         objects. The arrays are modified in place, unless out is a (xs, ys)
+         or (xs, ys, zs) tuple of writable buffers receiving the result.
+         num_threads splits the work across several threads, each using its
+         own transformation object (0 means all CPUs).
+         Points that fail to transform are set to HUGE_VAL.
+         Returns the number of points successfully transformed."""
+
+      if out is None:
+          out = (xs, ys, zs)
+      elif len(out) == 2:
+          if zs is not None:
+              raise ValueError('out must hold a z array when zs is provided')
+          out = (out[0], out[1], None)
+      elif len(out) != 3:
+          raise ValueError('out must be a tuple of 2 or 3 arrays')
+      return _osr.CoordinateTransformation_TransformPointsArray(self, xs, ys, zs,
+                                                                out[0], out[1], out[2],
+                                                                num_threads)
+
 CoordinateTransformation_swigregister = _osr.CoordinateTransformation_swigregister
 CoordinateTransformation_swigregister(CoordinateTransformation)
+CoordinateTransformation_TransformPointsArray = _osr.CoordinateTransformation_TransformPointsArray
 
 
 def CreateCoordinateTransformation(*args):
   """CreateCoordinateTransformation(SpatialReference src, SpatialReference dst) -> CoordinateTransformation"""
   return _osr.CreateCoordinateTransformation(*args)
 
+class _SRSCache(object):
+    """Thread-safe LRU cache of SpatialReference and CoordinateTransformation
+       objects, keyed on their canonical definition."""
+
+    def __init__(self, max_size):
+        import threading
+        try:
+            from collections import OrderedDict
+        except ImportError:
+            raise ImportError("collections.OrderedDict (Python >= 2.7) is needed for the osr cache.")
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, factory):
+        self.lock.acquire()
+        try:
+            if key in self.entries:
+                obj = self.entries.pop(key)
+                self.entries[key] = obj
+                self.hits += 1
+                return obj
+            self.misses += 1
+        finally:
+            self.lock.release()
+
+        # Build outside of the lock: parsing a definition can be slow and
+        # must not serialize unrelated lookups.
+        obj = factory()
+
+        self.lock.acquire()
+        try:
+            if key in self.entries:
+                return self.entries[key]
+            self.entries[key] = obj
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+        finally:
+            self.lock.release()
+        return obj
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+        finally:
+            self.lock.release()
+
+    def set_max_size(self, max_size):
+        self.lock.acquire()
+        try:
+            self.max_size = max_size
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last = False)
+        finally:
+            self.lock.release()
+
+    def statistics(self):
+        self.lock.acquire()
+        try:
+            return { 'hits': self.hits, 'misses': self.misses,
+                     'size': len(self.entries), 'max_size': self.max_size }
+        finally:
+            self.lock.release()
+
+_srs_cache = _SRSCache(256)
+_ct_cache = _SRSCache(256)
+
+if version_info >= (3,0,0):
+    _integer_types = (int,)
+else:
+    _integer_types = (int, long)
+
+def _CheckedImport(srs, method, *args):
+    ret = method(srs, *args)
+    if ret != 0:
+        raise RuntimeError('%s%s failed with error %d' % (method.__name__, str(args), ret))
+    # Cached objects are not modified, so their WKT can be exported once
+    srs.__dict__['_canonical_wkt'] = srs.ExportToWkt()
+    return srs
+
+def _GetCanonicalWkt(srs):
+    wkt = srs.__dict__.get('_canonical_wkt')
+    if wkt is None:
+        wkt = srs.ExportToWkt()
+    return wkt
+
+def GetCachedSpatialReference(definition):
+    """GetCachedSpatialReference(definition) -> SpatialReference
+
+       Return a SpatialReference from a process-wide LRU cache. definition
+       can be an EPSG code (integer or 'EPSG:XXXX' string), a WKT string,
+       a PROJ.4 string (starting with '+') or any other string accepted by
+       SetFromUserInput(). The returned object is shared between all callers
+       and must not be modified: Clone() it first if needed."""
+
+    if isinstance(definition, _integer_types):
+        definition = int(definition)
+        key = ('EPSG', definition)
+        factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromEPSG, definition)
+    else:
+        definition = definition.strip()
+        if definition.upper().startswith('EPSG:') and definition[5:].isdigit():
+            code = int(definition[5:])
+            key = ('EPSG', code)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromEPSG, code)
+        elif definition.startswith('+'):
+            key = ('PROJ4', definition)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromProj4, definition)
+        elif definition[:6] in ('GEOGCS', 'PROJCS', 'GEOCCS', 'COMPD_', 'VERT_C', 'LOCAL_'):
+            key = ('WKT', definition)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.ImportFromWkt, definition)
+        else:
+            key = ('USER', definition)
+            factory = lambda: _CheckedImport(SpatialReference(), SpatialReference.SetFromUserInput, definition)
+
+    return _srs_cache.get(key, factory)
+
+def GetCachedCoordinateTransformation(src, dst):
+    """GetCachedCoordinateTransformation(src, dst) -> CoordinateTransformation
+
+       Return a CoordinateTransformation from a process-wide LRU cache.
+       src and dst can be SpatialReference objects or any definition
+       accepted by GetCachedSpatialReference(). Transformations are keyed
+       on the canonical WKT of both ends. A CoordinateTransformation must
+       not be used concurrently by several threads, so each thread gets
+       its own one."""
+
+    import threading
+
+    if not isinstance(src, SpatialReference):
+        src = GetCachedSpatialReference(src)
+    if not isinstance(dst, SpatialReference):
+        dst = GetCachedSpatialReference(dst)
+
+    # Thread identifiers can be reused, but only once the previous thread
+    # has exited, so that a transformation is never shared by two running
+    # threads.
+    key = (threading.current_thread().ident,
+           _GetCanonicalWkt(src), _GetCanonicalWkt(dst))
+    return _ct_cache.get(key, lambda: CoordinateTransformation(src, dst))
+
+def GetCacheStatistics():
+    """GetCacheStatistics() -> dict
+
+       Return the hit/miss counts, current and maximum size of the
+       SpatialReference ('srs') and CoordinateTransformation ('ct') caches."""
+    return { 'srs': _srs_cache.statistics(), 'ct': _ct_cache.statistics() }
+
+def SetCacheMaxSize(max_size):
+    """SetCacheMaxSize(max_size)
+
+       Set the maximum number of objects kept by each of the caches."""
+    _srs_cache.set_max_size(max_size)
+    _ct_cache.set_max_size(max_size)
+
+def ClearCache():
+    """ClearCache()
+
+       Empty the SpatialReference and CoordinateTransformation caches and
+       reset their statistics."""
+    _srs_cache.clear()
+    _ct_cache.clear()
 
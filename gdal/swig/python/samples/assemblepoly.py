@@ -35,57 +35,74 @@ try:
 except ImportError:
     import ogr
 
-#############################################################################-
-# Open the datasource to operate on.
-
-#ds = ogr.Open( '/u/data/ntf/bl2000/HALTON.NTF' )
-ds = ogr.Open( 'PG:dbname=test', update = 1 )
-
-layer_count = ds.GetLayerCount()
-
-#############################################################################-
-# Establish access to the line and polygon layers.  Eventually we shouldn't
-# hardcode this.
-
-line_layer = ds.GetLayer(0)
-poly_layer = ds.GetLayer(1)
+import json
+import os
+import sqlite3
+import sys
 
 #############################################################################
-# Read all features in the line layer, holding just the geometry in a hash
-# for fast lookup by GEOM_ID.
+class LineStore:
+    """ Disk-backed store of the line geometries (as WKB) and of the link
+        lists of the polygons, keyed by tile, so that only the lines of the
+        tile being assembled are in memory. """
 
-lines_hash = {}
+    def __init__( self, filename, create = False ):
+        if create and os.path.exists( filename ):
+            os.unlink( filename )
+        self.conn = sqlite3.connect( filename )
+        if create:
+            self.conn.execute( 'CREATE TABLE lines (tile_ref TEXT, geom_id INTEGER, wkb BLOB)' )
+            self.conn.execute( 'CREATE TABLE polygons (tile_ref TEXT, fid INTEGER, links TEXT)' )
 
-feat = line_layer.GetNextFeature()
-geom_id_field = feat.GetFieldIndex( 'GEOM_ID' )
-tile_ref_field = feat.GetFieldIndex( 'TILE_REF' )
-while feat is not None:
-    geom_id = feat.GetField( geom_id_field )
-    tile_ref = feat.GetField( tile_ref_field )
+    def create_indexes( self ):
+        self.conn.execute( 'CREATE INDEX lines_tile_ref ON lines (tile_ref)' )
+        self.conn.execute( 'CREATE INDEX polygons_tile_ref ON polygons (tile_ref)' )
+        self.conn.commit()
 
-    if tile_ref not in lines_hash:
-        lines_hash[tile_ref] = {}
+    def add_lines( self, rows ):
+        self.conn.executemany( 'INSERT INTO lines VALUES (?, ?, ?)',
+                               [ (tile_ref, geom_id, sqlite3.Binary(wkb)) for (tile_ref, geom_id, wkb) in rows ] )
+        self.conn.commit()
 
-    sub_hash = lines_hash[tile_ref]
-    sub_hash[geom_id] = feat.GetGeometryRef().Clone()
+    def add_polygons( self, rows ):
+        self.conn.executemany( 'INSERT INTO polygons VALUES (?, ?, ?)',
+                               [ (tile_ref, fid, json.dumps(links)) for (tile_ref, fid, links) in rows ] )
+        self.conn.commit()
 
-    feat.Destroy()
+    def get_tile_refs( self ):
+        return [ row[0] for row in
+                 self.conn.execute( 'SELECT DISTINCT tile_ref FROM polygons ORDER BY tile_ref' ) ]
 
-    feat = line_layer.GetNextFeature()
+    def get_tile_lines( self, tile_ref ):
+        lines = {}
+        for (geom_id, wkb) in self.conn.execute( 'SELECT geom_id, wkb FROM lines WHERE tile_ref = ?', (tile_ref,) ):
+            lines[geom_id] = bytes(wkb)
+        return lines
 
-print('Got %d lines.' % len(lines_hash))
+    def get_tile_polygons( self, tile_ref ):
+        return [ (fid, json.loads(links)) for (fid, links) in
+                 self.conn.execute( 'SELECT fid, links FROM polygons WHERE tile_ref = ? ORDER BY rowid', (tile_ref,) ) ]
 
+    def close( self ):
+        self.conn.close()
 
 #############################################################################
-# Read all polygon features. 
+def Usage():
+    print('Usage: assemblepoly.py [-stream] [-store filename] [-j num_processes] [-gt n]')
+    print('                       [-update] [datasource]')
+    print('')
+    print('-stream: store the line geometries on disk and assemble the polygons one')
+    print('         tile at a time, to limit memory use on large datasets.')
+    print('-store: filename of the temporary line store (default assemblepoly.sqlite).')
+    print('-j: number of processes assembling tiles in -stream mode (default 1).')
+    print('-gt: number of polygons written per transaction (default 20000).')
+    print('-update: write the assembled polygons back to the polygon layer instead')
+    print('         of printing them.')
+    print('')
+    sys.exit(1)
 
-feat = poly_layer.GetNextFeature()
-link_field = feat.GetFieldIndex( 'GEOM_ID_OF_LINK' )
-tile_ref_field = feat.GetFieldIndex( 'TILE_REF' )
-
-while feat is not None:
-    tile_ref = feat.GetField( tile_ref_field )
-    link_list = feat.GetField( link_field )
+#############################################################################
+def parse_link_list( link_list ):
 
     # If the list is in string form we need to convert it.
     if type(link_list).__name__ == 'str':
@@ -98,21 +115,269 @@ while feat is not None:
             except:
                 print('item failed to translate: ', item)
 
-    link_coll = ogr.Geometry( type = ogr.wkbGeometryCollection )
-    for geom_id in link_list:
-        geom = lines_hash[tile_ref][geom_id]
-        link_coll.AddGeometry( geom )
+    return link_list
 
-    try:
-        poly = ogr.BuildPolygonFromEdges( link_coll )
-        print(poly.ExportToWkt())
-        feat.SetGeometryDirectly( poly )
-    except:
-        print('BuildPolygonFromEdges failed.') 
+#############################################################################
+def assemblepoly_in_memory( line_layer, poly_layer, update = False ):
+
+    #########################################################################
+    # Read all features in the line layer, holding just the geometry in a hash
+    # for fast lookup by GEOM_ID.
 
-# For now we don't actually write back the assembled polygons.
-#    poly_layer.SetFeature( feat )
-    feat.Destroy()
+    lines_hash = {}
+
+    feat = line_layer.GetNextFeature()
+    geom_id_field = feat.GetFieldIndex( 'GEOM_ID' )
+    tile_ref_field = feat.GetFieldIndex( 'TILE_REF' )
+    while feat is not None:
+        geom_id = feat.GetField( geom_id_field )
+        tile_ref = feat.GetField( tile_ref_field )
+
+        if tile_ref not in lines_hash:
+            lines_hash[tile_ref] = {}
+
+        sub_hash = lines_hash[tile_ref]
+        sub_hash[geom_id] = feat.GetGeometryRef().Clone()
+
+        feat.Destroy()
+
+        feat = line_layer.GetNextFeature()
+
+    print('Got %d lines.' % len(lines_hash))
+
+
+    #########################################################################
+    # Read all polygon features.
 
     feat = poly_layer.GetNextFeature()
+    link_field = feat.GetFieldIndex( 'GEOM_ID_OF_LINK' )
+    tile_ref_field = feat.GetFieldIndex( 'TILE_REF' )
+
+    while feat is not None:
+        tile_ref = feat.GetField( tile_ref_field )
+        link_list = parse_link_list( feat.GetField( link_field ) )
+
+        link_coll = ogr.Geometry( type = ogr.wkbGeometryCollection )
+        for geom_id in link_list:
+            geom = lines_hash[tile_ref][geom_id]
+            link_coll.AddGeometry( geom )
+
+        try:
+            poly = ogr.BuildPolygonFromEdges( link_coll )
+            if not update:
+                print(poly.ExportToWkt())
+            feat.SetGeometryDirectly( poly )
+        except:
+            print('BuildPolygonFromEdges failed.')
+
+        if update:
+            poly_layer.SetFeature( feat )
+        feat.Destroy()
+
+        feat = poly_layer.GetNextFeature()
+
+#############################################################################
+# Streaming mode: first pass loading the line store.
+
+def load_line_store( line_layer, poly_layer, store, batch_size = 10000 ):
+
+    line_defn = line_layer.GetLayerDefn()
+    geom_id_field = line_defn.GetFieldIndex( 'GEOM_ID' )
+    tile_ref_field = line_defn.GetFieldIndex( 'TILE_REF' )
+
+    line_count = 0
+    rows = []
+    for feat in line_layer:
+        rows.append( (feat.GetField( tile_ref_field ), feat.GetField( geom_id_field ),
+                      feat.GetGeometryRef().ExportToWkb()) )
+        if len(rows) == batch_size:
+            store.add_lines( rows )
+            line_count = line_count + len(rows)
+            rows = []
+    store.add_lines( rows )
+    line_count = line_count + len(rows)
+
+    print('Stored %d lines.' % line_count)
+
+    poly_defn = poly_layer.GetLayerDefn()
+    link_field = poly_defn.GetFieldIndex( 'GEOM_ID_OF_LINK' )
+    tile_ref_field = poly_defn.GetFieldIndex( 'TILE_REF' )
+
+    rows = []
+    for feat in poly_layer:
+        rows.append( (feat.GetField( tile_ref_field ), feat.GetFID(),
+                      parse_link_list( feat.GetField( link_field ) )) )
+        if len(rows) == batch_size:
+            store.add_polygons( rows )
+            rows = []
+    store.add_polygons( rows )
+
+    store.create_indexes()
+
+#############################################################################
+# Streaming mode: assembly of the polygons of one tile, from the line
+# store. Run in worker processes.
+
+def assemble_tile( args ):
+
+    (store_filename, tile_ref) = args
+
+    store = LineStore( store_filename )
+    lines = store.get_tile_lines( tile_ref )
+    polygons = store.get_tile_polygons( tile_ref )
+    store.close()
+
+    geoms = {}
+    results = []
+    failed_count = 0
+
+    for (fid, link_list) in polygons:
+        link_coll = ogr.Geometry( type = ogr.wkbGeometryCollection )
+        try:
+            for geom_id in link_list:
+                geom = geoms.get( geom_id )
+                if geom is None:
+                    geom = ogr.CreateGeometryFromWkb( lines[geom_id] )
+                    geoms[geom_id] = geom
+                link_coll.AddGeometry( geom )
+
+            poly = ogr.BuildPolygonFromEdges( link_coll )
+        except:
+            failed_count = failed_count + 1
+            continue
+
+        results.append( (fid, poly.ExportToWkb()) )
+
+    return (tile_ref, results, failed_count)
+
+#############################################################################
+def assemblepoly_stream( line_layer, poly_layer, store_filename,
+                         num_processes = 1, group_transaction = 20000,
+                         update = False ):
+
+    store = LineStore( store_filename, create = True )
+    load_line_store( line_layer, poly_layer, store )
+    tile_refs = store.get_tile_refs()
+    store.close()
+
+    print('Assembling polygons of %d tiles.' % len(tile_refs))
+
+    tasks = [ (store_filename, tile_ref) for tile_ref in tile_refs ]
+    if num_processes > 1 and len(tasks) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool( num_processes )
+        tile_results = pool.imap( assemble_tile, tasks )
+    else:
+        pool = None
+        tile_results = (assemble_tile( task ) for task in tasks)
+
+    poly_count = 0
+    in_transaction = False
+
+    try:
+        for (tile_ref, results, failed_count) in tile_results:
+            for i in range(failed_count):
+                print('BuildPolygonFromEdges failed.')
+
+            for (fid, wkb) in results:
+                poly_count = poly_count + 1
+                if not update:
+                    print(ogr.CreateGeometryFromWkb( wkb ).ExportToWkt())
+                    continue
+
+                if not in_transaction:
+                    poly_layer.StartTransaction()
+                    in_transaction = True
+
+                feat = poly_layer.GetFeature( fid )
+                feat.SetGeometryDirectly( ogr.CreateGeometryFromWkb( wkb ) )
+                poly_layer.SetFeature( feat )
+                feat = None
+
+                if (poly_count % group_transaction) == 0:
+                    poly_layer.CommitTransaction()
+                    in_transaction = False
+
+        if in_transaction:
+            poly_layer.CommitTransaction()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    os.unlink( store_filename )
+
+    print('Built %d polygons.' % poly_count)
+
+#############################################################################
+def main( argv ):
+
+    datasource = 'PG:dbname=test'
+    stream = False
+    store_filename = 'assemblepoly.sqlite'
+    num_processes = 1
+    group_transaction = 20000
+    update = False
+
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == '-stream':
+            stream = True
+
+        elif arg == '-store' and i < len(argv) - 1:
+            stream = True
+            store_filename = argv[i+1]
+            i = i + 1
+
+        elif arg == '-j' and i < len(argv) - 1:
+            num_processes = int(argv[i+1])
+            i = i + 1
+
+        elif arg == '-gt' and i < len(argv) - 1:
+            group_transaction = int(argv[i+1])
+            i = i + 1
+
+        elif arg == '-update':
+            update = True
+
+        elif arg[0] == '-':
+            Usage()
+
+        else:
+            datasource = arg
+
+        i = i + 1
+
+    if group_transaction < 1:
+        print('-gt should be at least 1.')
+        Usage()
+
+    #########################################################################
+    # Open the datasource to operate on.
+
+    #ds = ogr.Open( '/u/data/ntf/bl2000/HALTON.NTF' )
+    ds = ogr.Open( datasource, update = update )
+
+    layer_count = ds.GetLayerCount()
+
+    #########################################################################
+    # Establish access to the line and polygon layers.  Eventually we shouldn't
+    # hardcode this.
+
+    line_layer = ds.GetLayer(0)
+    poly_layer = ds.GetLayer(1)
+
+    if stream:
+        assemblepoly_stream( line_layer, poly_layer, store_filename,
+                             num_processes, group_transaction, update )
+    else:
+        assemblepoly_in_memory( line_layer, poly_layer, update )
+
+    ds = None
+
+    return 0
 
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -32,14 +32,31 @@ from osgeo import gdal
 import sys
 import os
 import fnmatch
+import hashlib
+import multiprocessing
+
+MIN_BUFFER_SIZE = 256 * 1024
+MAX_BUFFER_SIZE = 16 * 1024 * 1024
+
+# Files larger than that are split in ranges copied concurrently with -j
+MIN_RANGE_SIZE = 16 * 1024 * 1024
 
 def needsVSICurl(filename):
     return filename.startswith('http://') or filename.startswith('https://') or filename.startswith('ftp://')
 
 def Usage():
-    print('Usage: gdal_cp [-progress] [-r] [-skipfailures] source_file target_file')
+    print('Usage: gdal_cp [-progress] [-r] [-skipfailures] [-j num_jobs] [-bs buffer_size]')
+    print('               [-resume [-checksum]] source_file target_file')
     return -1
 
+class CopyOptions:
+    def __init__(self, buffer_size = None, resume = False, checksum = False, num_jobs = 1):
+        # None means adaptive buffer size
+        self.buffer_size = buffer_size
+        self.resume = resume
+        self.checksum = checksum
+        self.num_jobs = num_jobs
+
 class TermProgress:
     def __init__(self):
         self.nLastTick = -1
@@ -82,7 +99,167 @@ class ScaledProgress:
         return self.UnderlyingProgress.Progress( dfComplete * (self.dfMax - self.dfMin) + self.dfMin,
                                                  message )
 
-def gdal_cp_single(srcfile, targetfile, progress):
+def GetFileSize(fp):
+    gdal.VSIFSeekL(fp, 0, 2)
+    size = gdal.VSIFTellL(fp)
+    gdal.VSIFSeekL(fp, 0, 0)
+    return size
+
+def GetBufferSize(total_size):
+    # Large buffers limit the number of Python round trips, but keep
+    # about 40 steps per file so that progress reporting remains useful.
+    if total_size is None:
+        return MIN_BUFFER_SIZE
+    return min(max(total_size // 40, MIN_BUFFER_SIZE), MAX_BUFFER_SIZE)
+
+def SupportsRangeCopy(srcfile, targetfile):
+    # The source must be cheap to seek, and the target must be a real file
+    # that several processes can update in place.
+    for prefix in ['/vsizip/', '/vsigzip/', '/vsitar/', '/vsistdin/', '/vsimem/']:
+        if srcfile.startswith(prefix):
+            return False
+    return not targetfile.startswith('/vsi')
+
+def ComputeChecksum(fp, size):
+    md5 = hashlib.md5()
+    gdal.VSIFSeekL(fp, 0, 0)
+    remaining = size
+    while remaining > 0:
+        buffer = gdal.VSIFReadL(1, min(MAX_BUFFER_SIZE, remaining), fp)
+        if buffer is None or len(buffer) == 0:
+            return None
+        md5.update(buffer)
+        remaining -= len(buffer)
+    return md5.hexdigest()
+
+def copy_loop(fin, fout, srcfile, copied, total_size, buffer_size, progress):
+    """ Copy from the current position of fin into fout, until total_size
+        bytes have been copied, or up to the end of file if total_size is
+        None. If buffer_size is None, it is derived from total_size, or
+        grows while the copy goes on when the size is unknown. Returns
+        the error code and the updated count of copied bytes. """
+
+    adaptive = buffer_size is None and total_size is None
+    if buffer_size is None:
+        buffer_size = GetBufferSize(total_size)
+
+    ret = 0
+    while True:
+        if total_size is not None:
+            if copied >= total_size:
+                break
+            to_read = min(buffer_size, total_size - copied)
+        else:
+            to_read = buffer_size
+        buffer = gdal.VSIFReadL(1, to_read, fin)
+        if buffer is None:
+            if copied == 0:
+                print('Cannot read %d bytes in %s' % (to_read, srcfile))
+                ret = -1
+            break
+        buffer_read = len(buffer)
+        if gdal.VSIFWriteL(buffer, 1, buffer_read, fout) != buffer_read:
+            print('Error writing %d bytes' % buffer_read)
+            ret = -1
+            break
+        copied += buffer_read
+        if progress is not None and total_size:
+            if not progress.Progress(copied * 1.0 / total_size, 'Copying %s' % srcfile):
+                print('Copy stopped by user')
+                ret = -2
+                break
+        if buffer_read != to_read:
+            break
+        if adaptive and buffer_size < MAX_BUFFER_SIZE:
+            buffer_size = buffer_size * 2
+
+    return (ret, copied)
+
+def copy_range_worker(args):
+    (srcfile, targetfile, offset, size, buffer_size) = args
+
+    fin = gdal.VSIFOpenL(srcfile, "rb")
+    if fin is None:
+        print('Cannot open %s' % srcfile)
+        return (-1, 0)
+    fout = gdal.VSIFOpenL(targetfile, "r+b")
+    if fout is None:
+        print('Cannot open %s in update mode' % targetfile)
+        gdal.VSIFCloseL(fin)
+        return (-1, 0)
+
+    gdal.VSIFSeekL(fin, offset, 0)
+    gdal.VSIFSeekL(fout, offset, 0)
+    (ret, copied) = copy_loop(fin, fout, srcfile, 0, size, buffer_size, None)
+
+    gdal.VSIFCloseL(fin)
+    gdal.VSIFCloseL(fout)
+
+    # A short range would leave a zero filled hole in the target
+    if ret == 0 and copied != size:
+        print('Cannot read %d bytes at offset %d in %s' % (size - copied, offset + copied, srcfile))
+        ret = -1
+
+    return (ret, copied)
+
+def gdal_cp_ranges(srcfile, targetfile, total_size, progress, options):
+
+    # The ranges are copied into a temporary file that has its final size
+    # from the start, and that is only renamed into targetfile once all the
+    # ranges are copied. Otherwise an interrupted copy would leave a target
+    # of the right size that -resume would consider as complete.
+    tmpfile = targetfile + '.gdal_cp_tmp'
+    fout = gdal.VSIFOpenL(tmpfile, "wb")
+    if fout is None:
+        print('Cannot create %s' % tmpfile)
+        return -1
+    gdal.VSIFTruncateL(fout, total_size)
+    gdal.VSIFCloseL(fout)
+
+    # A few ranges per job so that a slow range does not leave the other
+    # jobs idle.
+    range_size = max(MIN_RANGE_SIZE, total_size // (4 * options.num_jobs) + 1)
+    ranges = []
+    offset = 0
+    while offset < total_size:
+        size = min(range_size, total_size - offset)
+        ranges.append((srcfile, tmpfile, offset, size, options.buffer_size))
+        offset += size
+
+    ret = 0
+    copied = 0
+    pool = multiprocessing.Pool(options.num_jobs)
+    try:
+        for (range_ret, size) in pool.imap_unordered(copy_range_worker, ranges):
+            if range_ret != 0:
+                ret = range_ret
+                break
+            copied += size
+            if progress is not None:
+                if not progress.Progress(copied * 1.0 / total_size, 'Copying %s' % srcfile):
+                    print('Copy stopped by user')
+                    ret = -2
+                    break
+    finally:
+        pool.terminate()
+        pool.join()
+
+    if ret == 0:
+        # Rename() does not overwrite an existing file on all platforms
+        if gdal.VSIStatL(targetfile) is not None:
+            gdal.Unlink(targetfile)
+        if gdal.Rename(tmpfile, targetfile) != 0:
+            print('Cannot rename %s into %s' % (tmpfile, targetfile))
+            ret = -1
+    if ret != 0:
+        gdal.Unlink(tmpfile)
+
+    return ret
+
+def gdal_cp_single(srcfile, targetfile, progress, options = None):
+    if options is None:
+        options = CopyOptions()
+
     try:
         if os.path.isdir(targetfile):
             (head, tail) = os.path.split(srcfile)
@@ -95,21 +272,50 @@ def gdal_cp_single(srcfile, targetfile, progress):
         print('Cannot open %s' % srcfile)
         return -1
 
-    fout = gdal.VSIFOpenL(targetfile, "wb")
+    version_num = int(gdal.VersionInfo('VERSION_NUM'))
+    total_size = None
+    # Avoid seeking to the end of the file when not needed, as this is
+    # costly for streamed sources such as /vsigzip/
+    if version_num < 1900 or progress is not None or options.resume or options.num_jobs > 1:
+        total_size = GetFileSize(fin)
+
+    copied = 0
+    if options.resume:
+        statBuf = gdal.VSIStatL(targetfile)
+        if statBuf is not None and statBuf.size <= total_size:
+            copied = statBuf.size
+            if options.checksum and copied > 0:
+                fexisting = gdal.VSIFOpenL(targetfile, "rb")
+                if fexisting is None or \
+                   ComputeChecksum(fexisting, copied) != ComputeChecksum(fin, copied):
+                    print('%s differs from %s. Copying it again' % (targetfile, srcfile))
+                    copied = 0
+                if fexisting is not None:
+                    gdal.VSIFCloseL(fexisting)
+
+    if options.resume and copied == total_size:
+        gdal.VSIFCloseL(fin)
+        if progress is not None:
+            progress.Progress(1.0, 'Copying %s' % srcfile)
+        return 0
+
+    if options.num_jobs > 1 and copied == 0 and total_size >= 2 * MIN_RANGE_SIZE and \
+       SupportsRangeCopy(srcfile, targetfile):
+        gdal.VSIFCloseL(fin)
+        return gdal_cp_ranges(srcfile, targetfile, total_size, progress, options)
+
+    if copied > 0:
+        fout = gdal.VSIFOpenL(targetfile, "r+b")
+    else:
+        fout = gdal.VSIFOpenL(targetfile, "wb")
     if fout is None:
         print('Cannot create %s' % targetfile)
         gdal.VSIFCloseL(fin)
         return -1
+    gdal.VSIFSeekL(fin, copied, 0)
+    if copied > 0:
+        gdal.VSIFSeekL(fout, copied, 0)
 
-    version_num = int(gdal.VersionInfo('VERSION_NUM'))
-    total_size = 0
-    if version_num < 1900 or progress is not None:
-        gdal.VSIFSeekL(fin, 0, 2)
-        total_size = gdal.VSIFTellL(fin)
-        gdal.VSIFSeekL(fin, 0, 0)
-
-    buffer_max_size = 4096
-    copied = 0
     ret = 0
     #print('Copying %s...' % srcfile)
     if progress is not None:
@@ -117,37 +323,56 @@ def gdal_cp_single(srcfile, targetfile, progress):
             print('Copy stopped by user')
             ret = -2
 
-    while ret == 0:
-        if total_size != 0 and copied + buffer_max_size > total_size:
-            to_read = total_size - copied
-        else:
-            to_read = buffer_max_size
-        buffer = gdal.VSIFReadL(1, to_read, fin)
-        if buffer is None:
-            if copied == 0:
-                print('Cannot read %d bytes in %s' % (to_read, srcfile))
-                ret = -1
-            break
-        buffer_size = len(buffer)
-        if gdal.VSIFWriteL(buffer, 1, buffer_size, fout) != buffer_size:
-            print('Error writing %d bytes' % buffer_size)
-            ret = -1
-            break
-        copied += buffer_size
-        if progress is not None and total_size != 0:
-            if not progress.Progress(copied * 1.0 / total_size, 'Copying %s' % srcfile):
-                print('Copy stopped by user')
-                ret = -2
-                break
-        if to_read < buffer_max_size or buffer_size != buffer_max_size:
-            break
+    if ret == 0:
+        (ret, copied) = copy_loop(fin, fout, srcfile, copied, total_size, options.buffer_size, progress)
 
     gdal.VSIFCloseL(fin)
     gdal.VSIFCloseL(fout)
 
     return ret
 
-def gdal_cp_recurse(srcdir, targetdir, progress, skip_failure):
+def copy_file_worker(args):
+    (srcfile, targetfile, options) = args
+    # Worker processes cannot spawn other pools
+    options = CopyOptions(options.buffer_size, options.resume, options.checksum, 1)
+    return gdal_cp_single(srcfile, targetfile, None, options)
+
+def gdal_cp_parallel(jobs, progress, skip_failure, options):
+
+    if len(jobs) == 0:
+        return 0
+
+    ret = 0
+    done = 0
+    pool = multiprocessing.Pool(options.num_jobs)
+    try:
+        args = [ (srcfile, targetfile, options) for (srcfile, targetfile) in jobs ]
+        for job_ret in pool.imap_unordered(copy_file_worker, args):
+            if job_ret == -2 or (job_ret == -1 and not skip_failure):
+                ret = job_ret
+                break
+            done = done + 1
+            if progress is not None:
+                if not progress.Progress(done * 1.0 / len(jobs), ''):
+                    print('Copy stopped by user')
+                    ret = -2
+                    break
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return ret
+
+def gdal_cp_recurse(srcdir, targetdir, progress, skip_failure, options = None, jobs = None):
+    if options is None:
+        options = CopyOptions()
+    if jobs is None and options.num_jobs > 1:
+        # Walk the tree first, and then copy files concurrently
+        jobs = []
+        ret = gdal_cp_recurse(srcdir, targetdir, progress, skip_failure, options, jobs)
+        if ret != 0:
+            return ret
+        return gdal_cp_parallel(jobs, progress, skip_failure, options)
 
     if srcdir[-1] == '/':
         srcdir = srcdir[0:len(srcdir)-1]
@@ -167,14 +392,19 @@ def gdal_cp_recurse(srcdir, targetdir, progress, skip_failure):
         fullsrcfile = srcdir + '/' + srcfile
         statBuf = gdal.VSIStatL(fullsrcfile, gdal.VSI_STAT_EXISTS_FLAG | gdal.VSI_STAT_NATURE_FLAG)
         if statBuf.IsDirectory():
-            ret = gdal_cp_recurse(fullsrcfile, targetdir + '/' + srcfile, progress, skip_failure)
+            ret = gdal_cp_recurse(fullsrcfile, targetdir + '/' + srcfile, progress, skip_failure, options, jobs)
+        elif jobs is not None:
+            jobs.append((fullsrcfile, targetdir))
+            ret = 0
         else:
-            ret = gdal_cp_single(fullsrcfile, targetdir, progress)
+            ret = gdal_cp_single(fullsrcfile, targetdir, progress, options)
         if ret == -2 or (ret == -1 and not skip_failure):
             return ret
     return 0
 
-def gdal_cp_pattern_match(srcdir, pattern, targetfile, progress, skip_failure):
+def gdal_cp_pattern_match(srcdir, pattern, targetfile, progress, skip_failure, options = None):
+    if options is None:
+        options = CopyOptions()
 
     if srcdir == '':
         srcdir = '.'
@@ -193,6 +423,10 @@ def gdal_cp_pattern_match(srcdir, pattern, targetfile, progress, skip_failure):
         else:
             lst2.append(filename)
 
+    if options.num_jobs > 1:
+        jobs = [ (srcfile, targetfile) for srcfile in lst2 if fnmatch.fnmatch(srcfile, pattern) ]
+        return gdal_cp_parallel(jobs, progress, skip_failure, options)
+
     if progress is not None:
         total_size = 0
         filesizelst = []
@@ -219,7 +453,7 @@ def gdal_cp_pattern_match(srcdir, pattern, targetfile, progress, skip_failure):
                 dfMax = (cursize + filesizelst[i]) * 1.0 / total_size
                 scaled_progress = ScaledProgress(dfMin, dfMax, progress)
 
-                ret = gdal_cp_single(srcfile, targetfile, scaled_progress)
+                ret = gdal_cp_single(srcfile, targetfile, scaled_progress, options)
                 if ret == -2 or (ret == -1 and not skip_failure):
                     return ret
 
@@ -230,7 +464,7 @@ def gdal_cp_pattern_match(srcdir, pattern, targetfile, progress, skip_failure):
     else:
         for srcfile in lst2:
             if fnmatch.fnmatch(srcfile, pattern):
-                ret = gdal_cp_single(srcfile, targetfile, progress)
+                ret = gdal_cp_single(srcfile, targetfile, progress, options)
                 if ret == -2 or (ret == -1 and not skip_failure):
                     return ret
     return 0
@@ -241,12 +475,14 @@ def gdal_cp(argv, progress = None):
     targetfile = None
     recurse = False
     skip_failure = False
+    options = CopyOptions()
 
     argv = gdal.GeneralCmdLineProcessor( argv )
     if argv is None:
         return -1
 
-    for i in range(1, len(argv)):
+    i = 1
+    while i < len(argv):
         if argv[i] == '-progress':
             progress = TermProgress()
         elif argv[i] == '-r':
@@ -257,6 +493,16 @@ def gdal_cp(argv, progress = None):
             recurse = True
         elif len(argv[i]) >= 5 and argv[i][0:5] == '-skip':
             skip_failure = True
+        elif argv[i] == '-j' and i + 1 < len(argv):
+            i = i + 1
+            options.num_jobs = max(1, int(argv[i]))
+        elif argv[i] == '-bs' and i + 1 < len(argv):
+            i = i + 1
+            options.buffer_size = int(argv[i])
+        elif argv[i] == '-resume':
+            options.resume = True
+        elif argv[i] == '-checksum':
+            options.checksum = True
         elif argv[i][0] == '-':
             print('Unrecognized option : %s' % argv[i])
             return Usage()
@@ -267,10 +513,15 @@ def gdal_cp(argv, progress = None):
         else:
             print('Unexpected option : %s' % argv[i])
             return Usage()
+        i = i + 1
 
     if srcfile is None or targetfile is None:
         return Usage()
 
+    if options.checksum and not options.resume:
+        print('-checksum can only be used with -resume')
+        return Usage()
+
     if needsVSICurl(srcfile):
         srcfile = '/vsicurl/' + srcfile
 
@@ -291,13 +542,13 @@ def gdal_cp(argv, progress = None):
                     os.stat(targetfile)
                 except:
                     os.mkdir(targetfile)
-        return gdal_cp_recurse(srcfile, targetfile, progress, skip_failure)
+        return gdal_cp_recurse(srcfile, targetfile, progress, skip_failure, options)
 
     (srcdir, pattern) = os.path.split(srcfile)
     if pattern.find('*') != -1 or pattern.find('?') != -1:
-        return gdal_cp_pattern_match(srcdir, pattern, targetfile, progress, skip_failure)
+        return gdal_cp_pattern_match(srcdir, pattern, targetfile, progress, skip_failure, options)
     else:
-        return gdal_cp_single(srcfile, targetfile, progress)
+        return gdal_cp_single(srcfile, targetfile, progress, options)
 
 if __name__ == '__main__':
     version_num = int(gdal.VersionInfo('VERSION_NUM'))
@@ -32,6 +32,9 @@
 from osgeo import gdal
 import sys
 import os
+import json
+import time
+import multiprocessing
 
 def needsVSICurl(filename):
     return filename.startswith('http://') or filename.startswith('https://') or filename.startswith('ftp://')
@@ -66,30 +69,37 @@ def display_file(fout, dirname, prefix, filename, longformat, check_open = False
             return
         gdal.VSIFCloseL(f)
 
-    if statBuf is not None and statBuf.IsDirectory():
+    if statBuf is not None:
+        statBuf = (statBuf.IsDirectory(), statBuf.size, statBuf.mtime)
+
+    write_line(fout, format_line(filename_displayed, statBuf, longformat))
+
+def format_line(filename_displayed, stat, longformat):
+
+    # stat is None or a (is_directory, size, mtime) tuple
+    if stat is not None and stat[0]:
         filename_displayed = filename_displayed + "/"
 
-    if longformat and statBuf is not None:
-        import time
-        bdt = time.gmtime(statBuf.mtime)
-        if statBuf.IsDirectory():
+    if longformat and stat is not None:
+        bdt = time.gmtime(stat[2])
+        if stat[0]:
             permissions = "dr-xr-xr-x"
         else:
             permissions = "-r--r--r--"
         line = "%s  1 unknown unknown %12d %04d-%02d-%02d %02d:%02d %s\n" % \
-            (permissions, statBuf.size, bdt.tm_year, bdt.tm_mon, bdt.tm_mday, bdt.tm_hour, bdt.tm_min, filename_displayed)
+            (permissions, stat[1], bdt.tm_year, bdt.tm_mon, bdt.tm_mday, bdt.tm_hour, bdt.tm_min, filename_displayed)
     else:
         line = filename_displayed + "\n"
 
+    return line
+
+def write_line(fout, line):
     try:
         fout.write(line.encode('utf-8'))
     except:
         fout.write(line)
 
-def readDir(fout, dirname, prefix, longformat, recurse, depth, recurseInZip, recurseInTGZ, first = False):
-
-    if depth <= 0:
-        return
+def vsi_dirname(dirname, prefix, recurseInZip, recurseInTGZ):
 
     if needsVSICurl(dirname):
         dirname = '/vsicurl/' + dirname
@@ -103,6 +113,15 @@ def readDir(fout, dirname, prefix, longformat, recurse, depth, recurseInZip, rec
         dirname = '/vsitar/' + dirname
         prefix = '/vsitar/' + prefix
 
+    return (dirname, prefix)
+
+def readDir(fout, dirname, prefix, longformat, recurse, depth, recurseInZip, recurseInTGZ, first = False):
+
+    if depth <= 0:
+        return
+
+    (dirname, prefix) = vsi_dirname(dirname, prefix, recurseInZip, recurseInTGZ)
+
     lst = gdal.ReadDir(dirname)
     if lst is None:
         if first:
@@ -128,8 +147,248 @@ def readDir(fout, dirname, prefix, longformat, recurse, depth, recurseInZip, rec
                 readDir(fout, dirname + '/' + filename, prefix + filename + '/', \
                         longformat, recurse, depth - 1, recurseInZip, recurseInTGZ)
 
+class StatCache:
+    """ Results of VSIStatL(), ReadDir() and IdentifyDriver() persisted
+        between runs in a JSON file, so that listing again a slow (remote)
+        file system does not go through it again. Entries older than
+        max_age seconds are ignored. """
+
+    def __init__(self, filename, max_age):
+        self.filename = filename
+        self.max_age = max_age
+        self.entries = {}
+        self.modified = False
+        f = gdal.VSIFOpenL(filename, 'rb')
+        if f is not None:
+            content = b''
+            while True:
+                chunk = gdal.VSIFReadL(1, 1024 * 1024, f)
+                if chunk is None or len(chunk) == 0:
+                    break
+                content = content + chunk
+            gdal.VSIFCloseL(f)
+            try:
+                self.entries = json.loads(content.decode('utf-8'))
+            except ValueError:
+                sys.stderr.write('Warning: ignoring corrupted cache %s\n' % filename)
+
+    def get(self, kind, path):
+        entry = self.entries.get(kind + ':' + path)
+        if entry is None or time.time() - entry[0] > self.max_age:
+            return (False, None)
+        return (True, entry[1])
+
+    def put(self, kind, path, value):
+        self.entries[kind + ':' + path] = [ time.time(), value ]
+        self.modified = True
+
+    def save(self):
+        if not self.modified:
+            return
+        content = json.dumps(self.entries)
+        f = gdal.VSIFOpenL(self.filename, 'wb')
+        if f is None:
+            sys.stderr.write('Cannot write %s\n' % self.filename)
+            return
+        gdal.VSIFWriteL(content, 1, len(content), f)
+        gdal.VSIFCloseL(f)
+
+def ReadDirJob(dirname):
+    try:
+        return gdal.ReadDir(dirname)
+    except Exception:
+        return None
+
+def DescribeJob(path, flags, identify):
+    """ Returns the (is_directory, size, mtime) stat tuple of a path, and
+        with identify, the driver name of a regular file """
+    try:
+        statBuf = gdal.VSIStatL(path, flags)
+        if statBuf is None:
+            return (None, None)
+        stat = (bool(statBuf.IsDirectory()), statBuf.size, statBuf.mtime)
+        driver_name = None
+        if identify and not stat[0]:
+            driver = gdal.IdentifyDriver(path)
+            if driver is not None:
+                driver_name = driver.ShortName
+        return (stat, driver_name)
+    except Exception:
+        return (None, None)
+
+class Result:
+    """ Result of a ReadDir(), VSIStatL() or IdentifyDriver() job, taken
+        from the stat cache, computed in the calling process, or computed
+        asynchronously by the pool of worker processes. """
+
+    def __init__(self, crawler, kind, path, func, args):
+        self.stat_cache = crawler.stat_cache
+        self.kind = kind
+        self.path = path
+        self.async_result = None
+        if self.stat_cache is not None:
+            (found, value) = self.stat_cache.get(kind, path)
+            if found:
+                self.value = value
+                return
+        if crawler.pool is None:
+            self.set(func(*args))
+        else:
+            self.async_result = crawler.pool.apply_async(func, args)
+
+    def set(self, value):
+        self.value = value
+        if self.stat_cache is not None:
+            self.stat_cache.put(self.kind, self.path, value)
+
+    def get(self):
+        if self.async_result is not None:
+            self.set(self.async_result.get())
+            self.async_result = None
+        return self.value
+
+class Entry:
+    """ Entry of a listed directory """
+
+    def __init__(self, dirname, prefix, filename, depth):
+        self.path = dirname + '/' + filename
+        self.displayed = prefix + filename
+        self.child_prefix = prefix + filename + '/'
+        self.depth = depth
+        self.scheduled = False
+        self.description = None
+        self.children = None
+
+class Crawler:
+    """ Walks a virtual directory tree. With more than one job, the
+        directory listings, stats and driver identifications of the next
+        entries to output are run ahead by a pool of worker processes, at
+        most 4 entries per job at a time, while the calling process outputs
+        the entries in the same depth-first order as the sequential
+        listing. """
+
+    def __init__(self, fout, longformat, recurse, recurseInZip, recurseInTGZ,
+                 num_jobs = 1, json_output = False, stat_cache = None):
+        self.fout = fout
+        self.longformat = longformat
+        self.recurse = recurse
+        self.recurseInZip = recurseInZip
+        self.recurseInTGZ = recurseInTGZ
+        self.json_output = json_output
+        self.stat_cache = stat_cache
+        self.stat_flags = gdal.VSI_STAT_EXISTS_FLAG | gdal.VSI_STAT_NATURE_FLAG
+        if longformat or json_output:
+            self.stat_flags = self.stat_flags | gdal.VSI_STAT_SIZE_FLAG
+        self.pool = None
+        if num_jobs > 1:
+            self.pool = multiprocessing.Pool(num_jobs)
+        self.max_scheduled = 4 * max(1, num_jobs)
+        self.scheduled = 0
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+    def read_dir(self, dirname):
+        return Result(self, 'dir', dirname, ReadDirJob, (dirname,))
+
+    def schedule(self, entry):
+        entry.scheduled = True
+        self.scheduled = self.scheduled + 1
+        if self.json_output:
+            kind = 'describe'
+        else:
+            kind = 'stat'
+        entry.description = Result(self, kind, entry.path, DescribeJob,
+                                   (entry.path, self.stat_flags, self.json_output))
+        if self.recurse and entry.depth > 1:
+            (entry.child_dirname, entry.child_prefix) = \
+                vsi_dirname(entry.path, entry.child_prefix,
+                            self.recurseInZip, self.recurseInTGZ)
+            entry.children = self.read_dir(entry.child_dirname)
+
+    def schedule_ahead(self, stack):
+        # The entries are output from the end of the stack
+        for entries in reversed(stack):
+            for entry in entries:
+                if self.scheduled >= self.max_scheduled:
+                    return
+                if not entry.scheduled:
+                    self.schedule(entry)
+
+    def list_entries(self, dirname, prefix, lst, depth):
+        if lst is None:
+            return []
+        return [ Entry(dirname, prefix, filename, depth)
+                 for filename in lst if filename != '.' and filename != '..' ]
+
+    def output(self, filename_displayed, stat, driver_name):
+        if self.json_output:
+            item = { 'name': filename_displayed }
+            if stat is not None:
+                if stat[0]:
+                    item['type'] = 'directory'
+                else:
+                    item['type'] = 'file'
+                item['size'] = stat[1]
+                item['mtime'] = stat[2]
+            if driver_name is not None:
+                item['driver'] = driver_name
+            write_line(self.fout, json.dumps(item) + '\n')
+        else:
+            write_line(self.fout, format_line(filename_displayed, stat, self.longformat))
+
+    def run(self, dirname, prefix, depth):
+
+        if depth <= 0:
+            return
+
+        (dirname, prefix) = vsi_dirname(dirname, prefix, self.recurseInZip, self.recurseInTGZ)
+        lst = self.read_dir(dirname).get()
+        if lst is None:
+            # Single file
+            original_dirname = dirname
+            (dirname, filename) = os.path.split(dirname)
+            if gdal.ReadDir(dirname) is None:
+                sys.stderr.write('Cannot open %s\n' % original_dirname)
+                return
+            if dirname == '':
+                dirname = '.'
+                prefix = ''
+            else:
+                prefix = dirname + '/'
+            entry = Entry(dirname, prefix, filename, 1)
+            self.schedule(entry)
+            (stat, driver_name) = entry.description.get()
+            if stat is None:
+                sys.stderr.write('Cannot open %s\n' % entry.path)
+                return
+            self.output(entry.displayed, stat, driver_name)
+            return
+
+        # Depth-first output, waiting for the results in order
+        stack = [ self.list_entries(dirname, prefix, lst, depth) ]
+        while len(stack) > 0:
+            if len(stack[-1]) == 0:
+                stack.pop()
+                continue
+            self.schedule_ahead(stack)
+            entry = stack[-1].pop(0)
+            if not entry.scheduled:
+                self.schedule(entry)
+            self.scheduled = self.scheduled - 1
+
+            (stat, driver_name) = entry.description.get()
+            self.output(entry.displayed, stat, driver_name)
+            if entry.children is not None:
+                stack.append(self.list_entries(entry.child_dirname, entry.child_prefix,
+                                               entry.children.get(), entry.depth - 1))
+
 def Usage():
-    print('Usage: gdal_ls [-l] [-R] [-depth d] [-Rzip] [-Rtgz] name_of_virtual_directory')
+    print('Usage: gdal_ls [-l] [-R] [-depth d] [-Rzip] [-Rtgz] [-j num_jobs] [-json]')
+    print('               [-stat-cache filename] [-stat-cache-max-age seconds]')
+    print('               name_of_virtual_directory')
     print('')
     print('Display the list of files in a virtual directory, like /vsicurl or /vsizip')
     print('')
@@ -139,6 +398,11 @@ def Usage():
     print(' -depth d : recurse until depth d')
     print(' -Rzip : list content of .zip archives')
     print(' -Rtgz : list content of .tar.gz/.tgz archives (potentially slow on /vsicurl/)')
+    print(' -j num_jobs : number of worker processes used to list directories and stat files')
+    print(' -json : output one JSON object per entry, including the identified driver')
+    print(' -stat-cache filename : keep the directory listings, stat and driver')
+    print('                        identification results in this file between runs')
+    print(' -stat-cache-max-age seconds : maximum age of cached results (default 86400)')
     return -1
 
 def gdal_ls(argv, fout = sys.stdout):
@@ -149,6 +413,10 @@ def gdal_ls(argv, fout = sys.stdout):
     display_prefix = True
     dirname = None
     depth = 1024
+    num_jobs = 1
+    json_output = False
+    stat_cache_filename = None
+    stat_cache_max_age = 86400
 
     argv = gdal.GeneralCmdLineProcessor( argv )
     if argv is None:
@@ -170,6 +438,17 @@ def gdal_ls(argv, fout = sys.stdout):
         elif argv[i] == '-depth' and i < len(argv)-1:
             depth = int(argv[i+1])
             i = i + 1
+        elif argv[i] == '-j' and i < len(argv)-1:
+            num_jobs = int(argv[i+1])
+            i = i + 1
+        elif argv[i] == '-json':
+            json_output = True
+        elif argv[i] == '-stat-cache' and i < len(argv)-1:
+            stat_cache_filename = argv[i+1]
+            i = i + 1
+        elif argv[i] == '-stat-cache-max-age' and i < len(argv)-1:
+            stat_cache_max_age = float(argv[i+1])
+            i = i + 1
         elif argv[i][0] == '-':
             sys.stderr.write('Unrecognized option : %s\n' % argv[i])
             return Usage()
@@ -200,7 +479,25 @@ def gdal_ls(argv, fout = sys.stdout):
     prefix = ''
     if display_prefix:
         prefix = dirname + '/'
-    readDir(fout, dirname, prefix, longformat, recurse, depth, recurseInZip, recurseInTGZ, True)
+
+    if num_jobs <= 1 and not json_output and stat_cache_filename is None:
+        readDir(fout, dirname, prefix, longformat, recurse, depth, recurseInZip, recurseInTGZ, True)
+        return 0
+
+    stat_cache = None
+    if stat_cache_filename is not None:
+        stat_cache = StatCache(stat_cache_filename, stat_cache_max_age)
+
+    crawler = Crawler(fout, longformat, recurse, recurseInZip, recurseInTGZ,
+                      num_jobs, json_output, stat_cache)
+    try:
+        crawler.run(dirname, prefix, depth)
+    finally:
+        crawler.stop()
+
+    if stat_cache is not None:
+        stat_cache.save()
+
     return 0
 
 if __name__ == '__main__':
@@ -52,6 +52,21 @@ def Usage():
 def EQUAL(a, b):
     return a.lower() == b.lower()
 
+#/************************************************************************/
+#/*                         HasExactStatistics()                         */
+#/*                                                                      */
+#/*      Whether exact statistics are already stored for the band, in    */
+#/*      which case GetStatistics() does not read it again.              */
+#/************************************************************************/
+
+def HasExactStatistics( hBand ):
+    for item in [ 'STATISTICS_MINIMUM', 'STATISTICS_MAXIMUM',
+                  'STATISTICS_MEAN', 'STATISTICS_STDDEV' ]:
+        if hBand.GetMetadataItem( item ) is None:
+            return False
+    approx = hBand.GetMetadataItem( 'STATISTICS_APPROXIMATE' )
+    return approx is None or not EQUAL(approx, 'YES')
+
 #/************************************************************************/
 #/*                                main()                                */
 #/************************************************************************/
@@ -337,6 +352,30 @@ def main( argv = None ):
                           hDataset.RasterXSize/2.0, \
                           hDataset.RasterYSize/2.0 );
 
+#/* ==================================================================== */
+#/*      When computing exact statistics, compute the histograms,        */
+#/*      checksums and min/max in the same read of the bands. Bands      */
+#/*      with exact statistics already stored are not read again.        */
+#/* ==================================================================== */
+    all_stats = {}
+    if bStats and not bApproxStats:
+        band_numbers = [ iBand for iBand in range(hDataset.RasterCount)
+                         if not HasExactStatistics(hDataset.GetRasterBand(iBand+1)) ]
+        if len(band_numbers) > 0:
+            bands = [ hDataset.GetRasterBand(iBand+1) for iBand in band_numbers ]
+            try:
+                from osgeo import gdal_array
+                if bReportHistograms:
+                    results = gdal_array.BandsComputeAllStats( bands, False, 256, bComputeChecksum,
+                                                               callback = gdal.TermProgress )
+                else:
+                    results = gdal_array.BandsComputeAllStats( bands, False, 0, bComputeChecksum )
+            except ImportError:
+                # No NumPy
+                results = None
+            if results is not None:
+                all_stats = dict( zip(band_numbers, results) )
+
 #/* ==================================================================== */
 #/*      Loop over bands.                                                */
 #/* ==================================================================== */
@@ -364,6 +403,8 @@ def main( argv = None ):
             and len(hBand.GetDescription()) > 0 :
             print( "  Description = %s" % hBand.GetDescription() )
 
+        band_stats = all_stats.get(iBand)
+
         dfMin = hBand.GetMinimum()
         dfMax = hBand.GetMaximum()
         if dfMin is not None or dfMax is not None or bComputeMinMax:
@@ -374,7 +415,10 @@ def main( argv = None ):
             if dfMax is not None:
                 line = line + ("Max=%.3f " % dfMax)
 
-            if bComputeMinMax:
+            if bComputeMinMax and band_stats is not None and band_stats['min'] is not None:
+                line = line + ( "  Computed Min/Max=%.3f,%.3f" % ( \
+                        band_stats['min'], band_stats['max'] ))
+            elif bComputeMinMax:
                 gdal.ErrorReset()
                 adfCMinMax = hBand.ComputeRasterMinMax(False)
                 if gdal.GetLastErrorType() == gdal.CE_None:
@@ -383,7 +427,11 @@ def main( argv = None ):
 
             print( line )
 
-        stats = hBand.GetStatistics( bApproxStats, bStats)
+        if band_stats is not None and band_stats['min'] is not None:
+            stats = [ band_stats['min'], band_stats['max'],
+                      band_stats['mean'], band_stats['stddev'] ]
+        else:
+            stats = hBand.GetStatistics( bApproxStats, bStats)
         # Dirty hack to recognize if stats are valid. If invalid, the returned
         # stddev is negative
         if stats[3] >= 0.0:
@@ -392,7 +440,10 @@ def main( argv = None ):
 
         if bReportHistograms:
 
-            hist = hBand.GetDefaultHistogram(force = True, callback = gdal.TermProgress)
+            if band_stats is not None and band_stats['histogram'] is not None:
+                hist = band_stats['histogram']
+            else:
+                hist = hBand.GetDefaultHistogram(force = True, callback = gdal.TermProgress)
             if hist is not None:
                 dfMin = hist[0]
                 dfMax = hist[1]
@@ -407,7 +458,9 @@ def main( argv = None ):
 
                 print(line)
 
-        if bComputeChecksum:
+        if bComputeChecksum and band_stats is not None:
+            print( "  Checksum=%d" % band_stats['checksum'])
+        elif bComputeChecksum:
             print( "  Checksum=%d" % hBand.Checksum())
 
         dfNoData = hBand.GetNoDataValue()
@@ -30,115 +30,249 @@
 ###############################################################################
 
 from osgeo import gdal
+import binascii
+import multiprocessing
 import sys
 
 ###############################################################
 # Usage()
 
 def Usage():
-    print('Usage: jpeg_in_tiff_extract.py in.tif out.jpg [tile_x tile_y [band_nbr]]')
+    print('Usage: jpeg_in_tiff_extract.py [-bulk] [-j num_jobs] in.tif out.jpg [tile_x tile_y [band_nbr]]')
     print('')
     print('Extract a JPEG file from a JPEG-in-TIFF tile/strip.')
     print('If tile_x tile_y are not specified, then all tiles/strips are extracted')
     print('in filenames out_[bandnbr_]tx_ty.jpg')
     print('')
+    print('-bulk: when extracting all tiles, open the TIFF file once and read the')
+    print('       tiles in the order of their offsets in the file.')
+    print('-j num_jobs: extract all tiles with several worker processes (implies -bulk).')
+    print('')
 
     return 1
 
 ###############################################################
-def extract_tile(ds, src_band_nbr, tile_x, tile_y, jpg_filename):
+# Adobe APP14 marker, needed for 3-band pixel-interleaved JPEG-in-TIFF
+# whose codestreams are not YCbCr
 
-    block_offset = ds.GetRasterBand(src_band_nbr).GetMetadataItem('BLOCK_OFFSET_%d_%d' % (tile_x, tile_y), 'TIFF')
-    block_size = ds.GetRasterBand(src_band_nbr).GetMetadataItem('BLOCK_SIZE_%d_%d' % (tile_x, tile_y), 'TIFF')
-    if block_offset is None or block_size is None:
-        print('ERROR: Cannot find block (%d,%d)' % (tile_x, tile_y))
-        return 1
+ADOBE_APP14 = b'\xFF\xEE\x00\x0E\x41\x64\x6F\x62\x65\x00\x64\x00\x00\x00\x00\x00'
+
+###############################################################
+def get_jpeg_header(ds, src_band_nbr):
+    """ Return the bytes to prepend to the codestream of a tile (without
+        its leading 0xFF 0xD8) to make it a standalone JPEG file, or None
+        if the JPEG tables are invalid. """
 
     jpegtables = ds.GetRasterBand(src_band_nbr).GetMetadataItem('JPEGTABLES', 'TIFF')
     if jpegtables is not None:
         if (len(jpegtables) % 2) != 0 or jpegtables[0:4] != 'FFD8' or jpegtables[-2:] != 'D9':
             print('ERROR: Invalid JPEG tables')
             print(jpegtables)
-            return 1
+            return None
 
         # Remove final D9
-        jpegtables = jpegtables[0:-2]
-
-    tiff_f = gdal.VSIFOpenL(ds.GetDescription(), 'rb')
-    if tiff_f is None:
-        print('ERROR: Cannot reopen %s' % ds.GetDescription())
-        return 1
-
-    out_f = gdal.VSIFOpenL(jpg_filename, 'wb')
-    if out_f is None:
-        print('ERROR: Cannot create %s' % jpg_filename)
-        gdal.VSIFCloseL(tiff_f)
-        return 1
-
-    # Write JPEG tables
-    if jpegtables is not None:
-        for i in range(int(len(jpegtables)/2)):
-            c1 = ord(jpegtables[2*i])
-            c2 = ord(jpegtables[2*i+1])
-            if c1 >= ord('0') and c1 <= ord('9'):
-                val = c1 - ord('0')
-            else:
-                val = (c1 - ord('A')) + 10
-            val = val * 16
-            if c2 >= ord('0') and c2 <= ord('9'):
-                val = val + (c2 - ord('0'))
-            else:
-                val = val + (c2 - ord('A')) + 10
-            gdal.VSIFWriteL(chr(val), 1, 1, out_f)
+        try:
+            header = binascii.unhexlify(jpegtables[0:-2])
+        except (TypeError, ValueError):
+            print('ERROR: Invalid JPEG tables')
+            print(jpegtables)
+            return None
     else:
-        gdal.VSIFWriteL(chr(0xFF), 1, 1, out_f)
-        gdal.VSIFWriteL(chr(0xD8), 1, 1, out_f)
+        header = b'\xFF\xD8'
 
-    # Write Adobe APP14 marker if necessary
     interleave = ds.GetMetadataItem('INTERLEAVE', 'IMAGE_STRUCTURE')
     photometric = ds.GetMetadataItem('COMPRESSION', 'IMAGE_STRUCTURE')
     if interleave == 'PIXEL' and photometric == 'JPEG' and ds.RasterCount == 3:
-        adobe_app14 = [ 0xFF, 0xEE, 0x00, 0x0E, 0x41, 0x64, 0x6F, 0x62, 0x65, 0x00, 0x64, 0x00, 0x00, 0x00, 0x00, 0x00 ]
-        for c in adobe_app14:
-            gdal.VSIFWriteL(chr(c), 1, 1, out_f)
+        header = header + ADOBE_APP14
+
+    return header
+
+###############################################################
+def get_block_location(ds, src_band_nbr, tile_x, tile_y):
+    """ Return (offset, size) of a tile/strip in the TIFF file, or (0, 0)
+        for a sparse tile/strip, whose location is not reported """
+
+    block_offset = ds.GetRasterBand(src_band_nbr).GetMetadataItem('BLOCK_OFFSET_%d_%d' % (tile_x, tile_y), 'TIFF')
+    block_size = ds.GetRasterBand(src_band_nbr).GetMetadataItem('BLOCK_SIZE_%d_%d' % (tile_x, tile_y), 'TIFF')
+    if block_offset is None or block_size is None:
+        return (0, 0)
+    return (int(block_offset), int(block_size))
+
+###############################################################
+def warn_sparse_block(tile_x, tile_y):
+    print('Warning: Block (%d,%d) is sparse. Nothing extracted' % (tile_x, tile_y))
+
+###############################################################
+def read_jpeg_tile(tiff_f, header, block_offset, block_size):
+    """ Return the standalone JPEG file of the tile/strip at block_offset,
+        read from the already opened TIFF file """
+
+    if block_size < 2:
+        return None
 
-    # Write JPEG codestream
     # skip leading 0xFF 0xD8
-    gdal.VSIFSeekL(tiff_f, int(block_offset) + 2, 0)
-    data = gdal.VSIFReadL(1, int(block_size) - 2, tiff_f)
-    gdal.VSIFCloseL(tiff_f)
-    gdal.VSIFWriteL(data, 1, len(data), out_f)
+    gdal.VSIFSeekL(tiff_f, block_offset + 2, 0)
+    data = gdal.VSIFReadL(1, block_size - 2, tiff_f)
+    if data is None or len(data) != block_size - 2:
+        return None
+    return header + data
+
+###############################################################
+def write_file(filename, content):
 
+    out_f = gdal.VSIFOpenL(filename, 'wb')
+    if out_f is None:
+        print('ERROR: Cannot create %s' % filename)
+        return 1
+    ret = gdal.VSIFWriteL(content, 1, len(content), out_f)
     gdal.VSIFCloseL(out_f)
+    if ret != len(content):
+        print('ERROR: Cannot write %s' % filename)
+        return 1
+    return 0
+
+###############################################################
+def write_aux_xml(jpg_filename, gt, srs, blockxsize, blockysize, tile_x, tile_y):
 
     aux_xml_filename = '%s.aux.xml' % jpg_filename
-    gt = ds.GetGeoTransform()
-    srs = ds.GetProjectionRef()
     if srs is not None and srs != '':
         sub_gt = [ gt[i] for i in range(6) ]
-        (blockxsize, blockysize) = ds.GetRasterBand(1).GetBlockSize()
         sub_gt[0] = gt[0] + tile_x * blockxsize * gt[1]
         sub_gt[3] = gt[3] + tile_y * blockysize * gt[5]
 
-        out_f = gdal.VSIFOpenL(aux_xml_filename, 'wb')
-        if out_f is None:
-            print('ERROR: Cannot create %s' % aux_xml_filename)
-            return 1
         content = """<PAMDataset>
     <SRS>%s</SRS>
     <GeoTransform>%.18g,%.18g,%.18g,%.18g,%.18g,%.18g</GeoTransform>
     </PAMDataset>
     """ % (srs, sub_gt[0], sub_gt[1], sub_gt[2], sub_gt[3], sub_gt[4], sub_gt[5])
-        gdal.VSIFWriteL(content, 1, len(content), out_f)
-        gdal.VSIFCloseL(out_f)
+        return write_file(aux_xml_filename, content)
     else:
-        gdal.Unlink('%s.aux.xml' % jpg_filename)
+        gdal.Unlink(aux_xml_filename)
 
     return 0
 
+###############################################################
+def extract_tile(ds, src_band_nbr, tile_x, tile_y, jpg_filename):
+
+    location = get_block_location(ds, src_band_nbr, tile_x, tile_y)
+    if location[1] == 0:
+        warn_sparse_block(tile_x, tile_y)
+        return 0
+
+    header = get_jpeg_header(ds, src_band_nbr)
+    if header is None:
+        return 1
+
+    tiff_f = gdal.VSIFOpenL(ds.GetDescription(), 'rb')
+    if tiff_f is None:
+        print('ERROR: Cannot reopen %s' % ds.GetDescription())
+        return 1
+
+    content = read_jpeg_tile(tiff_f, header, location[0], location[1])
+    gdal.VSIFCloseL(tiff_f)
+    if content is None:
+        print('ERROR: Cannot read block (%d,%d)' % (tile_x, tile_y))
+        return 1
+
+    if write_file(jpg_filename, content) != 0:
+        return 1
+
+    (blockxsize, blockysize) = ds.GetRasterBand(1).GetBlockSize()
+    return write_aux_xml(jpg_filename, ds.GetGeoTransform(), ds.GetProjectionRef(),
+                         blockxsize, blockysize, tile_x, tile_y)
+
+###############################################################
+def extract_tile_list(tiff_filename, tiles, gt, srs, blockxsize, blockysize):
+    """ Extract a list of (block_offset, block_size, header, tile_x, tile_y,
+        jpg_filename) tuples, sorted by increasing offset, through a single
+        handle on the TIFF file. """
+
+    tiff_f = gdal.VSIFOpenL(tiff_filename, 'rb')
+    if tiff_f is None:
+        print('ERROR: Cannot reopen %s' % tiff_filename)
+        return 1
+
+    ret = 0
+    for (block_offset, block_size, header, tile_x, tile_y, jpg_filename) in tiles:
+        content = read_jpeg_tile(tiff_f, header, block_offset, block_size)
+        if content is None:
+            print('ERROR: Cannot read block (%d,%d)' % (tile_x, tile_y))
+            ret = 1
+            break
+        if write_file(jpg_filename, content) != 0 or \
+           write_aux_xml(jpg_filename, gt, srs, blockxsize, blockysize, tile_x, tile_y) != 0:
+            ret = 1
+            break
+
+    gdal.VSIFCloseL(tiff_f)
+    return ret
+
+###############################################################
+def extract_tile_list_job(args):
+    return extract_tile_list(*args)
+
+###############################################################
+def extract_all_tiles_bulk(ds, tiles, num_jobs = 1):
+    """ Extract a list of (src_band_nbr, tile_x, tile_y, jpg_filename)
+        tuples. The JPEG tables are decoded once per band, the tiles are
+        read in the order of their offsets in the file, and with several
+        jobs each worker process reads a contiguous range of the file
+        through its own handle. """
+
+    headers = {}
+    located_tiles = []
+    for (src_band_nbr, tile_x, tile_y, jpg_filename) in tiles:
+        if src_band_nbr not in headers:
+            headers[src_band_nbr] = get_jpeg_header(ds, src_band_nbr)
+            if headers[src_band_nbr] is None:
+                return 1
+        location = get_block_location(ds, src_band_nbr, tile_x, tile_y)
+        if location[1] == 0:
+            warn_sparse_block(tile_x, tile_y)
+            continue
+        located_tiles.append((location[0], location[1], headers[src_band_nbr],
+                              tile_x, tile_y, jpg_filename))
+    located_tiles.sort(key = lambda tile: tile[0])
+
+    tiff_filename = ds.GetDescription()
+    gt = ds.GetGeoTransform()
+    srs = ds.GetProjectionRef()
+    (blockxsize, blockysize) = ds.GetRasterBand(1).GetBlockSize()
+
+    num_jobs = max(1, min(num_jobs, len(located_tiles)))
+    if num_jobs == 1:
+        return extract_tile_list(tiff_filename, located_tiles, gt, srs, blockxsize, blockysize)
+
+    # The VSIF*L() calls do not release the GIL, hence worker processes
+    chunk_size = (len(located_tiles) + num_jobs - 1) // num_jobs
+    jobs = [ (tiff_filename, located_tiles[i:i+chunk_size], gt, srs, blockxsize, blockysize)
+             for i in range(0, len(located_tiles), chunk_size) ]
+    pool = multiprocessing.Pool(num_jobs)
+    try:
+        rets = pool.map(extract_tile_list_job, jobs)
+    finally:
+        pool.close()
+        pool.join()
+
+    return max(rets)
+
 ###############################################################
 def jpeg_in_tiff_extract(argv):
 
+    bulk = False
+    num_jobs = 1
+    while len(argv) > 0 and argv[0].startswith('-'):
+        if argv[0] == '-bulk':
+            bulk = True
+            argv = argv[1:]
+        elif argv[0] == '-j' and len(argv) > 1:
+            bulk = True
+            num_jobs = int(argv[1])
+            argv = argv[2:]
+        else:
+            print('ERROR: Unhandled option %s' % argv[0])
+            return Usage()
+
     if len(argv) < 2:
         print('ERROR: Not enough arguments')
         return Usage()
@@ -189,8 +323,8 @@ def jpeg_in_tiff_extract(argv):
     (blockxsize, blockysize) = ds.GetRasterBand(1).GetBlockSize()
     if blockysize == 1:
         blockysize = ds.RasterYSize
-    block_in_row = (ds.RasterXSize + blockxsize - 1) / blockxsize
-    block_in_col = (ds.RasterYSize + blockysize - 1) / blockysize
+    block_in_row = (ds.RasterXSize + blockxsize - 1) // blockxsize
+    block_in_col = (ds.RasterYSize + blockysize - 1) // blockysize
 
     # Extract single tile ?
     if tile_x is not None:
@@ -225,6 +359,21 @@ def jpeg_in_tiff_extract(argv):
         return extract_tile(ds, src_band_nbr, tile_x, tile_y, jpg_filename)
 
     # Extract all tiles
+    elif bulk:
+        tiles = []
+        if ds.RasterCount == 1 or interleave == 'PIXEL':
+            for tile_y in range(block_in_col):
+                for tile_x in range(block_in_row):
+                    filename = '%s_%d_%d%s' % (radix_jpg_filename, tile_x, tile_y, extension)
+                    tiles.append((1, tile_x, tile_y, filename))
+        else:
+            for src_band_nbr in range(ds.RasterCount):
+                for tile_y in range(block_in_col):
+                    for tile_x in range(block_in_row):
+                        filename = '%s_%d_%d_%d%s' % (radix_jpg_filename, src_band_nbr+1, tile_x, tile_y, extension)
+                        tiles.append((src_band_nbr+1, tile_x, tile_y, filename))
+        return extract_all_tiles_bulk(ds, tiles, num_jobs)
+
     else:
         if ds.RasterCount == 1 or interleave == 'PIXEL':
             for tile_y in range(block_in_col):
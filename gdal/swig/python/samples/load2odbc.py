@@ -36,13 +36,200 @@ except ImportError:
     import ogr
 
 import sys
+import time
 
 #############################################################################
 def Usage():
-    print('Usage: load2odbc.py [-where attr_filter] infile odbc_dsn layer')
+    print('Usage: load2odbc.py [-where attr_filter]')
+    print('                    [-bulk [-sql] [-gt n] [-batch n]]')
+    print('                    infile odbc_dsn layer')
+    print('')
+    print(' -bulk: load features by groups of -gt (default 20000) per transaction.')
+    print('        If odbc_dsn can be opened by OGR in update mode and can create')
+    print('        layers, features are written with CreateFeature(). Otherwise')
+    print('        multi-row INSERT statements of -batch (default 100) rows are used.')
+    print(' -sql: force the use of multi-row INSERT statements in -bulk mode.')
     print('')
     sys.exit(1)
 
+#############################################################################
+def sql_quote( value ):
+    return "'" + value.replace("'", "''") + "'"
+
+#############################################################################
+def create_table_sql( layername, defn, extents_flag ):
+
+    cmd = 'CREATE TABLE ' + layername + '( OGC_FID INTEGER, WKT_GEOMETRY MEMO' 
+
+    if extents_flag:
+        cmd = cmd + ', XMIN NUMBER, YMIN NUMBER, XMAX NUMBER, YMAX NUMBER'
+
+    for iField in range(defn.GetFieldCount()):
+        fielddef = defn.GetFieldDefn(iField)
+        cmd = cmd + ', ' + fielddef.GetName()
+        if fielddef.GetType() == ogr.OFTInteger:
+            cmd = cmd + ' INTEGER' 
+        elif fielddef.GetType() == ogr.OFTString:
+            cmd = cmd + ' TEXT' 
+        elif fielddef.GetType() == ogr.OFTReal:
+            cmd = cmd + ' NUMBER'
+        else:
+            cmd = cmd + ' TEXT' 
+
+    cmd = cmd + ')'
+
+    return cmd
+
+#############################################################################
+# Bulk load through multi-row INSERT statements.
+
+def bulk_load_sql( in_layer, out_ds, layername, extents_flag,
+                   group_transactions, batch_size ):
+
+    defn = in_layer.GetLayerDefn()
+
+    def execute( cmd ):
+        if out_ds is None:
+            print(cmd)
+        else:
+            result = out_ds.ExecuteSQL( cmd )
+            if result is not None:
+                out_ds.ReleaseResultSet( result )
+
+    try:
+        execute( 'drop table ' + layername )
+    except:
+        pass
+    execute( create_table_sql( layername, defn, extents_flag ) )
+
+    # The column list and the way to format each field are computed once.
+    columns = [ 'OGC_FID', 'WKT_GEOMETRY' ]
+    if extents_flag:
+        columns = columns + [ 'XMIN', 'XMAX', 'YMIN', 'YMAX' ]
+    formats = []
+    for iField in range(defn.GetFieldCount()):
+        fielddef = defn.GetFieldDefn(iField)
+        columns.append( fielddef.GetName() )
+        formats.append( fielddef.GetType() )
+    insert = 'INSERT INTO ' + layername + ' ( ' + ', '.join(columns) + ' ) VALUES '
+
+    rows = []
+    count = 0
+    in_transaction = False
+
+    for feat in in_layer:
+        values = [ '%d' % feat.GetFID() ]
+
+        geom = feat.GetGeometryRef()
+        if geom is not None:
+            values.append( sql_quote( geom.ExportToWkt() ) )
+            if extents_flag:
+                values = values + [ '%.7f' % v for v in geom.GetEnvelope() ]
+        else:
+            values.append( 'NULL' )
+            if extents_flag:
+                values = values + [ 'NULL', 'NULL', 'NULL', 'NULL' ]
+
+        for iField in range(len(formats)):
+            if not feat.IsFieldSet( iField ):
+                values.append( 'NULL' )
+            elif formats[iField] == ogr.OFTInteger:
+                values.append( feat.GetFieldAsString(iField) )
+            elif formats[iField] == ogr.OFTReal:
+                values.append( '%.17g' % feat.GetFieldAsDouble(iField) )
+            else:
+                values.append( sql_quote( feat.GetFieldAsString(iField) ) )
+
+        rows.append( '(' + ', '.join(values) + ')' )
+
+        if not in_transaction and out_ds is not None and group_transactions > 0:
+            in_transaction = out_ds.StartTransaction() == 0
+
+        if len(rows) == batch_size:
+            execute( insert + ', '.join(rows) )
+            rows = []
+
+        count = count + 1
+        if in_transaction and count % group_transactions == 0:
+            if len(rows) > 0:
+                execute( insert + ', '.join(rows) )
+                rows = []
+            out_ds.CommitTransaction()
+            in_transaction = False
+
+    if len(rows) > 0:
+        execute( insert + ', '.join(rows) )
+    if in_transaction:
+        out_ds.CommitTransaction()
+
+    return count
+
+#############################################################################
+# Bulk load through the OGR layer API.
+
+def bulk_load_layer( in_layer, out_ds, layername, extents_flag,
+                     group_transactions ):
+
+    defn = in_layer.GetLayerDefn()
+
+    for iLayer in range(out_ds.GetLayerCount()):
+        if out_ds.GetLayer(iLayer).GetName().lower() == layername.lower():
+            out_ds.DeleteLayer( iLayer )
+            break
+
+    out_layer = out_ds.CreateLayer( layername, geom_type = ogr.wkbNone )
+    if out_layer is None:
+        print('Unable to create layer ' + layername)
+        return -1
+
+    out_layer.CreateField( ogr.FieldDefn( 'WKT_GEOMETRY', ogr.OFTString ) )
+    if extents_flag:
+        for name in [ 'XMIN', 'XMAX', 'YMIN', 'YMAX' ]:
+            out_layer.CreateField( ogr.FieldDefn( name, ogr.OFTReal ) )
+    for iField in range(defn.GetFieldCount()):
+        out_layer.CreateField( defn.GetFieldDefn(iField) )
+
+    # Field indexes are computed once.
+    out_defn = out_layer.GetLayerDefn()
+    wkt_idx = out_defn.GetFieldIndex( 'WKT_GEOMETRY' )
+    extent_idx = [ out_defn.GetFieldIndex(name)
+                   for name in [ 'XMIN', 'XMAX', 'YMIN', 'YMAX' ] ]
+    field_map = [ out_defn.GetFieldIndex( defn.GetFieldDefn(iField).GetName() )
+                  for iField in range(defn.GetFieldCount()) ]
+
+    count = 0
+    in_transaction = False
+
+    for feat in in_layer:
+        out_feat = ogr.Feature( out_defn )
+        out_feat.SetFromWithMap( feat, 1, field_map )
+        out_feat.SetFID( feat.GetFID() )
+
+        geom = feat.GetGeometryRef()
+        if geom is not None:
+            out_feat.SetField( wkt_idx, geom.ExportToWkt() )
+            if extents_flag:
+                extent = geom.GetEnvelope()
+                for i in range(4):
+                    out_feat.SetField( extent_idx[i], extent[i] )
+
+        if not in_transaction and group_transactions > 0:
+            in_transaction = out_ds.StartTransaction() == 0
+
+        if out_layer.CreateFeature( out_feat ) != 0:
+            print('Failed to write feature %d' % feat.GetFID())
+            return -1
+
+        count = count + 1
+        if in_transaction and count % group_transactions == 0:
+            out_ds.CommitTransaction()
+            in_transaction = False
+
+    if in_transaction:
+        out_ds.CommitTransaction()
+
+    return count
+
 #############################################################################
 # Argument processing.
 
@@ -51,12 +238,26 @@ infile = None
 odbc_dsn = None
 layername = None
 attr_filter = None
+bulk = False
+force_sql = False
+group_transactions = 20000
+batch_size = 100
 
 i = 1
 while i < len(sys.argv):
     if sys.argv[i] == '-where':
         i = i + 1
         attr_filter = sys.argv[i]
+    elif sys.argv[i] == '-bulk':
+        bulk = True
+    elif sys.argv[i] == '-sql':
+        force_sql = True
+    elif sys.argv[i] == '-gt':
+        i = i + 1
+        group_transactions = int(sys.argv[i])
+    elif sys.argv[i] == '-batch':
+        i = i + 1
+        batch_size = max(1, int(sys.argv[i]))
     elif infile is None:
         infile = sys.argv[i]
     elif odbc_dsn is None:
@@ -91,14 +292,52 @@ if attr_filter is not None:
 if odbc_dsn == 'stdout':
     out_ds = None
 else:
-    if len(odbc_dsn) < 6 or odbc_dsn[:5] != 'ODBC:':
-        odbc_dsn = 'ODBC:' + odbc_dsn
-
-    out_ds = ogr.Open( odbc_dsn )
+    # In bulk mode, any datasource OGR can update may be used.
+    out_ds = None
+    if bulk and odbc_dsn[:5] != 'ODBC:':
+        out_ds = ogr.Open( odbc_dsn, update = 1 )
 
     if out_ds is None:
-        print('Unable to connect to ' + odbc_dsn) 
-        sys.exit(1)
+        if len(odbc_dsn) < 6 or odbc_dsn[:5] != 'ODBC:':
+            odbc_dsn = 'ODBC:' + odbc_dsn
+
+        out_ds = ogr.Open( odbc_dsn )
+
+        if out_ds is None:
+            print('Unable to connect to ' + odbc_dsn) 
+            sys.exit(1)
+
+#############################################################################
+#	Bulk load.
+
+if bulk:
+    start = time.time()
+
+    if out_ds is not None and not force_sql \
+       and out_ds.TestCapability( ogr.ODsCCreateLayer ):
+        count = bulk_load_layer( in_layer, out_ds, layername, extents_flag,
+                                 group_transactions )
+    else:
+        count = bulk_load_sql( in_layer, out_ds, layername, extents_flag,
+                               group_transactions, batch_size )
+
+    elapsed = time.time() - start
+    if out_ds is not None:
+        out_ds.Destroy()
+    in_ds.Destroy()
+
+    if count < 0:
+        sys.exit( 1 )
+
+    if odbc_dsn != 'stdout':
+        if elapsed > 0:
+            rate = count / elapsed
+        else:
+            rate = 0
+        print('Loaded %d features in %.2f s (%.0f features/s)'
+              % (count, elapsed, rate))
+
+    sys.exit( 0 )
 
 #############################################################################
 #	Fetch layer definition, and defined output table on the same basis.
@@ -114,24 +353,7 @@ except:
 
 defn = in_layer.GetLayerDefn()
 
-cmd = 'CREATE TABLE ' + layername + '( OGC_FID INTEGER, WKT_GEOMETRY MEMO' 
-
-if extents_flag:
-    cmd = cmd + ', XMIN NUMBER, YMIN NUMBER, XMAX NUMBER, YMAX NUMBER'
-
-for iField in range(defn.GetFieldCount()):
-    fielddef = defn.GetFieldDefn(iField)
-    cmd = cmd + ', ' + fielddef.GetName()
-    if fielddef.GetType() == ogr.OFTInteger:
-        cmd = cmd + ' INTEGER' 
-    elif fielddef.GetType() == ogr.OFTString:
-        cmd = cmd + ' TEXT' 
-    elif fielddef.GetType() == ogr.OFTReal:
-        cmd = cmd + ' NUMBER'
-    else:
-        cmd = cmd + ' TEXT' 
-
-cmd = cmd + ')'
+cmd = create_table_sql( layername, defn, extents_flag )
 
 if out_ds is None:
     print(cmd)
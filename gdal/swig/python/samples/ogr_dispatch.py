@@ -42,7 +42,8 @@ def Usage():
     print('                [-25D_as_2D] [-multi_as_single]')
     print('                [-remove_dispatch_fields] [-prefix_with_layer_name]')
     print('                [-dsco KEY=VALUE]* [-lco KEY=VALUE]* [-a_srs srs_def]')
-    print('                [-style_as_field] [-where restricted_where] [-gt n] [-quiet]')
+    print('                [-style_as_field] [-where restricted_where] [-gt n]')
+    print('                [-two_pass] [-quiet]')
     print('')
     print('Dispatch features into layers according to the value of some fields or the')
     print('geometry type.')
@@ -64,7 +65,12 @@ def Usage():
     print(' -a_srs srs_def: assign a SRS to the target layers. Source layer SRS is otherwise used.')
     print(' -style_as_field: add a OGR_STYLE field with the content of the feature style string.')
     print(' -where restricted_where: where clause to filter source features.')
-    print(' -gt n: group n features per transaction (default 200).')
+    print(' -gt n: group n features per transaction (default 200). Each target layer')
+    print('        keeps a transaction open, which is committed every n features. With')
+    print('        drivers that have dataset transactions, such as SQLite, all the')
+    print('        target layers share a single transaction.')
+    print(' -two_pass: first scan the source layer to dispatch its features, and')
+    print('            then write the target layers one after the other.')
     print('')
     print('Example :')
     print('  ogr_dispatch.py -src in.dxf -dst out -field Layer -field OGR_GEOMETRY')
@@ -97,7 +103,11 @@ class Options:
         self.bPrefixWithLayerName = False
         self.bStyleAsField = False
         self.nGroupTransactions = 200
+        self.bTwoPass = False
         self.bQuiet = False
+        # Transaction shared by all the target layers, when the target
+        # dataset has dataset level transactions
+        self.oDSTransaction = None
 
 ###############################################################
 # GeometryTypeToName()
@@ -151,25 +161,43 @@ def GeometryTypeToName(eGeomType, options):
         # Shouldn't happen
         return 'UNKNOWN'
 
+###############################################################
+# get_dispatch_field_indexes()
+
+def get_dispatch_field_indexes(src_lyr, options):
+
+    # None stands for the geometry type, -1 for a missing field
+    src_defn = src_lyr.GetLayerDefn()
+    field_indexes = []
+    for dispatch_field in options.dispatch_fields:
+        if EQUAL(dispatch_field, 'OGR_GEOMETRY'):
+            field_indexes.append(None)
+        else:
+            field_indexes.append(src_defn.GetFieldIndex(dispatch_field))
+    return field_indexes
+
 ###############################################################
 # get_out_lyr_name()
 
-def get_out_lyr_name(src_lyr, feat, options):
+def get_out_lyr_name(src_lyr, feat, options, field_indexes = None):
+    if field_indexes is None:
+        field_indexes = get_dispatch_field_indexes(src_lyr, options)
+
     if options.bPrefixWithLayerName:
         out_lyr_name = src_lyr.GetName()
     else:
         out_lyr_name = ''
 
-    for dispatch_field in options.dispatch_fields:
-        if EQUAL(dispatch_field, 'OGR_GEOMETRY'):
+    for field_index in field_indexes:
+        if field_index is None:
             geom = feat.GetGeometryRef()
             if geom is None:
                 val = 'NONE'
             else:
                 val = GeometryTypeToName(geom.GetGeometryType(), options)
         else:
-            if feat.IsFieldSet(dispatch_field):
-                val = feat.GetFieldAsString(dispatch_field)
+            if field_index >= 0 and feat.IsFieldSet(field_index):
+                val = feat.GetFieldAsString(field_index)
             else:
                 val = 'null'
 
@@ -181,103 +209,210 @@ def get_out_lyr_name(src_lyr, feat, options):
     return out_lyr_name
 
 ###############################################################
-# get_layer_and_map()
+# Transaction
+
+class Transaction:
+    """Transaction of a target dataset or layer, kept open while features
+       are written, and committed every group_size features."""
+
+    def __init__(self, obj, group_size):
+        self.obj = obj
+        self.group_size = group_size
+        self.active = False
+        self.count = 0
+
+    def begin(self):
+        if self.group_size > 0 and not self.active:
+            self.obj.StartTransaction()
+            self.active = True
+
+    def feature_written(self):
+        if not self.active:
+            return
+        self.count = self.count + 1
+        if self.count >= self.group_size:
+            self.commit()
+
+    def commit(self):
+        if not self.active:
+            return
+        self.obj.CommitTransaction()
+        self.active = False
+        self.count = 0
 
-def get_layer_and_map(out_lyr_name, src_lyr, dst_ds, layerMap, geom_type, options):
+###############################################################
+# LayerWriter
+
+class LayerWriter:
+    """Write the features of a target layer within a long-lived transaction,
+       committed every options.nGroupTransactions features, so that features
+       alternating between target layers do not end transactions."""
+
+    def __init__(self, lyr, panMap, options):
+        self.lyr = lyr
+        self.panMap = panMap
+        self.defn = lyr.GetLayerDefn()
+        self.options = options
+        if options.bStyleAsField:
+            self.style_idx = self.defn.GetFieldIndex('OGR_STYLE')
+        else:
+            self.style_idx = -1
+        if options.oDSTransaction is not None:
+            self.transaction = options.oDSTransaction
+        else:
+            self.transaction = Transaction(lyr, options.nGroupTransactions)
 
-    if out_lyr_name not in layerMap:
-        if options.poOutputSRS is not None or options.bNullifyOutputSRS:
-            srs = options.poOutputSRS
+    def write(self, feat):
+        out_feat = ogr.Feature(self.defn)
+        if self.panMap is not None:
+            out_feat.SetFromWithMap( feat, 1, self.panMap )
         else:
-            srs = src_lyr.GetSpatialRef()
-        out_lyr = dst_ds.GetLayerByName(out_lyr_name)
+            out_feat.SetFrom(feat)
+        if self.style_idx >= 0:
+            style = feat.GetStyleString()
+            if style is not None:
+                out_feat.SetField(self.style_idx, style)
+
+        self.transaction.begin()
+        self.lyr.CreateFeature(out_feat)
+        self.transaction.feature_written()
+
+    def flush(self):
+        self.transaction.commit()
+
+###############################################################
+# get_layer_writer()
+
+def get_layer_writer(out_lyr_name, src_lyr, dst_ds, layerMap, geom_type, options):
+
+    if out_lyr_name in layerMap:
+        return layerMap[out_lyr_name]
+
+    if options.poOutputSRS is not None or options.bNullifyOutputSRS:
+        srs = options.poOutputSRS
+    else:
+        srs = src_lyr.GetSpatialRef()
+    out_lyr = dst_ds.GetLayerByName(out_lyr_name)
+    if out_lyr is None:
+        # Create the layer outside of any transaction
+        if options.oDSTransaction is not None:
+            options.oDSTransaction.commit()
+        if not options.bQuiet:
+            print('Creating layer %s' % out_lyr_name)
+        out_lyr = dst_ds.CreateLayer(out_lyr_name, srs = srs, \
+                            geom_type = geom_type, options = options.lco)
         if out_lyr is None:
-            if not options.bQuiet:
-                print('Creating layer %s' % out_lyr_name)
-            out_lyr = dst_ds.CreateLayer(out_lyr_name, srs = srs, \
-                                geom_type = geom_type, options = options.lco)
-            if out_lyr is None:
-                return 1
-            src_field_count = src_lyr.GetLayerDefn().GetFieldCount()
-            panMap = [ -1 for i in range(src_field_count) ]
-            for i in range(src_field_count):
-                field_defn = src_lyr.GetLayerDefn().GetFieldDefn(i)
-                if options.bRemoveDispatchFields:
-                    found = False
-                    for dispatch_field in options.dispatch_fields:
-                        if EQUAL(dispatch_field, field_defn.GetName()):
-                            found = True
-                            break
-                    if found:
-                        continue
-                idx = out_lyr.GetLayerDefn().GetFieldIndex(field_defn.GetName())
-                if idx >= 0:
-                    panMap[i] = idx
-                elif out_lyr.CreateField(field_defn) == 0:
-                    panMap[i] = out_lyr.GetLayerDefn().GetFieldCount() - 1
-            if options.bStyleAsField:
-                out_lyr.CreateField(ogr.FieldDefn('OGR_STYLE', ogr.OFTString))
-        else:
-            panMap = None
-        layerMap[out_lyr_name] = [out_lyr, panMap]
+            return None
+        src_field_count = src_lyr.GetLayerDefn().GetFieldCount()
+        panMap = [ -1 for i in range(src_field_count) ]
+        for i in range(src_field_count):
+            field_defn = src_lyr.GetLayerDefn().GetFieldDefn(i)
+            if options.bRemoveDispatchFields:
+                found = False
+                for dispatch_field in options.dispatch_fields:
+                    if EQUAL(dispatch_field, field_defn.GetName()):
+                        found = True
+                        break
+                if found:
+                    continue
+            idx = out_lyr.GetLayerDefn().GetFieldIndex(field_defn.GetName())
+            if idx >= 0:
+                panMap[i] = idx
+            elif out_lyr.CreateField(field_defn) == 0:
+                panMap[i] = out_lyr.GetLayerDefn().GetFieldCount() - 1
+        if options.bStyleAsField:
+            out_lyr.CreateField(ogr.FieldDefn('OGR_STYLE', ogr.OFTString))
     else:
-        out_lyr = layerMap[out_lyr_name][0]
-        panMap = layerMap[out_lyr_name][1]
+        panMap = None
 
-    return (out_lyr, panMap)
+    writer = LayerWriter(out_lyr, panMap, options)
+    layerMap[out_lyr_name] = writer
+    return writer
+
+###############################################################
+# flush_layers()
+
+def flush_layers(layerMap):
+    for out_lyr_name in layerMap:
+        layerMap[out_lyr_name].flush()
+
+###############################################################
+# get_geom_type()
+
+def get_geom_type(feat):
+    geom = feat.GetGeometryRef()
+    if geom is not None:
+        return geom.GetGeometryType()
+    return ogr.wkbUnknown
 
 ###############################################################
 # convert_layer()
 
 def convert_layer(src_lyr, dst_ds, layerMap, options):
 
-    current_out_lyr = None
-    nFeaturesInTransaction = 0
+    if options.bTwoPass:
+        return convert_layer_two_pass(src_lyr, dst_ds, layerMap, options)
+
+    field_indexes = get_dispatch_field_indexes(src_lyr, options)
 
     for feat in src_lyr:
 
-        out_lyr_name = get_out_lyr_name(src_lyr, feat, options)
+        out_lyr_name = get_out_lyr_name(src_lyr, feat, options, field_indexes)
 
-        geom = feat.GetGeometryRef()
-        if geom is not None:
-            geom_type = geom.GetGeometryType()
-        else:
-            geom_type = ogr.wkbUnknown
-
-        (out_lyr, panMap) = get_layer_and_map(out_lyr_name, src_lyr, dst_ds, \
-                                              layerMap, geom_type, options)
-
-        if options.nGroupTransactions > 0:
-            if out_lyr != current_out_lyr:
-                if current_out_lyr is not None:
-                    current_out_lyr.CommitTransaction()
-                current_out_lyr = out_lyr
-                current_out_lyr.StartTransaction()
-                nFeaturesInTransaction = 0
-
-            if nFeaturesInTransaction == options.nGroupTransactions:
-                current_out_lyr.CommitTransaction()
-                current_out_lyr.StartTransaction()
-        else:
-            current_out_lyr = out_lyr
+        writer = layerMap.get(out_lyr_name)
+        if writer is None:
+            writer = get_layer_writer(out_lyr_name, src_lyr, dst_ds, \
+                                      layerMap, get_geom_type(feat), options)
+            if writer is None:
+                return 1
 
-        out_feat = ogr.Feature(out_lyr.GetLayerDefn())
-        if panMap is not None:
-            out_feat.SetFromWithMap( feat, 1, panMap )
-        else:
-            out_feat.SetFrom(feat)
-        if options.bStyleAsField:
-            style = feat.GetStyleString()
-            if style is not None:
-                out_feat.SetField('OGR_STYLE', style)
-        out_lyr.CreateFeature(out_feat)
+        writer.write(feat)
 
-        nFeaturesInTransaction = nFeaturesInTransaction + 1
+    return 0
 
-    if options.nGroupTransactions > 0 and current_out_lyr is not None:
-        current_out_lyr.CommitTransaction()
+###############################################################
+# convert_layer_two_pass()
 
-    return 1
+def convert_layer_two_pass(src_lyr, dst_ds, layerMap, options):
+
+    field_indexes = get_dispatch_field_indexes(src_lyr, options)
+
+    # First pass: dispatch the features, remembering their FID when the
+    # source layer can fetch them back efficiently.
+    random_read = src_lyr.TestCapability(ogr.OLCRandomRead)
+    out_lyr_names = []
+    dispatch = {}
+    for feat in src_lyr:
+        out_lyr_name = get_out_lyr_name(src_lyr, feat, options, field_indexes)
+        if out_lyr_name not in dispatch:
+            out_lyr_names.append(out_lyr_name)
+            dispatch[out_lyr_name] = [ get_geom_type(feat), [] ]
+        fid = feat.GetFID()
+        if fid < 0:
+            random_read = False
+        if random_read:
+            dispatch[out_lyr_name][1].append(fid)
+
+    # Second pass: write the target layers one after the other
+    for out_lyr_name in out_lyr_names:
+        (geom_type, fids) = dispatch[out_lyr_name]
+        writer = get_layer_writer(out_lyr_name, src_lyr, dst_ds, \
+                                  layerMap, geom_type, options)
+        if writer is None:
+            return 1
+
+        if random_read:
+            for fid in fids:
+                writer.write(src_lyr.GetFeature(fid))
+        else:
+            src_lyr.ResetReading()
+            for feat in src_lyr:
+                if get_out_lyr_name(src_lyr, feat, options, field_indexes) == out_lyr_name:
+                    writer.write(feat)
+
+        writer.flush()
+
+    return 0
 
 ###############################################################
 # ogr_dispatch()
@@ -345,6 +480,8 @@ def ogr_dispatch(argv, progress = None, progress_arg = None):
         elif EQUAL(arg,"-where") and i+1 < len(argv):
             i = i + 1
             pszWHERE = argv[i]
+        elif EQUAL(arg, '-two_pass'):
+            options.bTwoPass = True
         elif EQUAL(arg, '-quiet'):
             options.bQuiet = True
         else:
@@ -380,6 +517,11 @@ def ogr_dispatch(argv, progress = None, progress_arg = None):
         print('Cannot open or create target datasource %s' % dst_filename)
         return 1
 
+    # Drivers such as SQLite or PostgreSQL have a single transaction per
+    # dataset, which cannot be started once per target layer
+    if dst_ds.TestCapability(ogr.ODsCTransactions):
+        options.oDSTransaction = Transaction(dst_ds, options.nGroupTransactions)
+
     layerMap = {}
 
     for src_lyr in src_ds:
@@ -387,8 +529,10 @@ def ogr_dispatch(argv, progress = None, progress_arg = None):
             src_lyr.SetAttributeFilter(pszWHERE)
         ret = convert_layer(src_lyr, dst_ds, layerMap, options)
         if ret != 0:
+            flush_layers(layerMap)
             return ret
 
+    flush_layers(layerMap)
 
     return 0
 
@@ -36,6 +36,9 @@ except ImportError:
     import osr
     import ogr
 
+import json
+import os
+import sqlite3
 import sys
 
 #############################################################################
@@ -45,207 +48,492 @@ class Module:
         self.lines = {}
         self.poly_line_links = {}
 
+#############################################################################
+class EdgeStore:
+    """ Disk-backed store of the line geometries (as WKB), of the
+        polygon/chain links and of the polygon attributes, keyed by module,
+        so that only the edges of the module being assembled are in memory. """
+
+    def __init__( self, filename, create = False ):
+        self.filename = filename
+        if create and os.path.exists( filename ):
+            os.unlink( filename )
+        self.conn = sqlite3.connect( filename )
+        if create:
+            self.conn.execute( 'CREATE TABLE lines (module TEXT, tlid INTEGER, wkb BLOB)' )
+            self.conn.execute( 'CREATE TABLE links (module TEXT, polyid INTEGER, tlid INTEGER)' )
+            self.conn.execute( 'CREATE TABLE polygons (module TEXT, polyid INTEGER, fields TEXT)' )
+
+    def create_indexes( self ):
+        self.conn.execute( 'CREATE INDEX lines_module ON lines (module)' )
+        self.conn.execute( 'CREATE INDEX links_module ON links (module)' )
+        self.conn.execute( 'CREATE INDEX polygons_module ON polygons (module)' )
+        self.conn.commit()
+
+    def add_lines( self, rows ):
+        self.conn.executemany( 'INSERT INTO lines VALUES (?, ?, ?)',
+                               [ (module, tlid, sqlite3.Binary(wkb)) for (module, tlid, wkb) in rows ] )
+        self.conn.commit()
+
+    def add_links( self, rows ):
+        self.conn.executemany( 'INSERT INTO links VALUES (?, ?, ?)', rows )
+        self.conn.commit()
+
+    def add_polygons( self, rows ):
+        self.conn.executemany( 'INSERT INTO polygons VALUES (?, ?, ?)',
+                               [ (module, polyid, json.dumps(fields)) for (module, polyid, fields) in rows ] )
+        self.conn.commit()
+
+    def get_modules( self ):
+        return [ row[0] for row in
+                 self.conn.execute( 'SELECT DISTINCT module FROM polygons ORDER BY module' ) ]
+
+    def get_module_lines( self, module ):
+        lines = {}
+        for (tlid, wkb) in self.conn.execute( 'SELECT tlid, wkb FROM lines WHERE module = ?', (module,) ):
+            lines[tlid] = bytes(wkb)
+        return lines
+
+    def get_module_links( self, module ):
+        poly_line_links = {}
+        for (polyid, tlid) in self.conn.execute( 'SELECT polyid, tlid FROM links WHERE module = ? ORDER BY rowid', (module,) ):
+            try:
+                poly_line_links[polyid].append( tlid )
+            except KeyError:
+                poly_line_links[polyid] = [ tlid ]
+        return poly_line_links
+
+    def get_module_polygons( self, module ):
+        return [ (polyid, json.loads(fields)) for (polyid, fields) in
+                 self.conn.execute( 'SELECT polyid, fields FROM polygons WHERE module = ? ORDER BY rowid', (module,) ) ]
+
+    def close( self ):
+        self.conn.close()
+
 #############################################################################
 def Usage():
-    print('Usage: tigerpoly.py infile [outfile].shp')
+    print('Usage: tigerpoly.py [-stream] [-store filename] [-j num_processes] [-gt n]')
+    print('                    infile [outfile].shp')
+    print('')
+    print('-stream: store the line geometries on disk and assemble the polygons')
+    print('         one module at a time, to limit memory use on large datasets.')
+    print('-store: filename of the temporary edge store (default outfile.edges.sqlite).')
+    print('-j: number of processes assembling modules in -stream mode (default 1).')
+    print('-gt: number of polygons written per transaction (default 20000).')
     print('')
     sys.exit(1)
 
 #############################################################################
-# Argument processing.
+def tigerpoly_in_memory( ds, poly_layer, shp_layer, poly_field_count ):
 
-infile = None
-outfile = None
+    #########################################################################
+    # Read all features in the line layer, holding just the geometry in a hash
+    # for fast lookup by TLID.
 
-i = 1
-while i < len(sys.argv):
-    arg = sys.argv[i]
+    line_layer = ds.GetLayerByName( 'CompleteChain' )
+    line_count = 0
 
-    if infile is None:
-        infile = arg
+    modules_hash = {}
 
-    elif outfile is None:
-        outfile = arg
+    feat = line_layer.GetNextFeature()
+    geom_id_field = feat.GetFieldIndex( 'TLID' )
+    tile_ref_field = feat.GetFieldIndex( 'MODULE' )
+    while feat is not None:
+        geom_id = feat.GetField( geom_id_field )
+        tile_ref = feat.GetField( tile_ref_field )
 
-    else:
-        Usage()
+        try:
+            module = modules_hash[tile_ref]
+        except:
+            module = Module()
+            modules_hash[tile_ref] = module
 
-    i = i + 1
+        module.lines[geom_id] = feat.GetGeometryRef().Clone()
+        line_count = line_count + 1
 
-if outfile is None:
-    outfile = 'poly.shp'
+        feat.Destroy()
 
-if infile is None:
-    Usage()
+        feat = line_layer.GetNextFeature()
 
-#############################################################################
-# Open the datasource to operate on.
+    print('Got %d lines in %d modules.' % (line_count,len(modules_hash)))
 
-ds = ogr.Open( infile, update = 0 )
+    #########################################################################
+    # Read all polygon/chain links and build a hash keyed by POLY_ID listing
+    # the chains (by TLID) attached to it.
 
-poly_layer = ds.GetLayerByName( 'Polygon' )
+    link_layer = ds.GetLayerByName( 'PolyChainLink' )
 
-#############################################################################
-#	Create output file for the composed polygons.
+    feat = link_layer.GetNextFeature()
+    geom_id_field = feat.GetFieldIndex( 'TLID' )
+    tile_ref_field = feat.GetFieldIndex( 'MODULE' )
+    lpoly_field = feat.GetFieldIndex( 'POLYIDL' )
+    rpoly_field = feat.GetFieldIndex( 'POLYIDR' )
 
-nad83 = osr.SpatialReference()
-nad83.SetFromUserInput('NAD83')
+    link_count = 0
 
-shp_driver = ogr.GetDriverByName( 'ESRI Shapefile' )
-shp_driver.DeleteDataSource( outfile )
+    while feat is not None:
+        module = modules_hash[feat.GetField( tile_ref_field )]
 
-shp_ds = shp_driver.CreateDataSource( outfile )
+        tlid = feat.GetField( geom_id_field )
 
-shp_layer = shp_ds.CreateLayer( 'out', geom_type = ogr.wkbPolygon,
-                                srs = nad83 )
+        lpoly_id = feat.GetField( lpoly_field )
+        rpoly_id = feat.GetField( rpoly_field )
 
-src_defn = poly_layer.GetLayerDefn()
-poly_field_count = src_defn.GetFieldCount()
+        if lpoly_id == rpoly_id:
+            feat.Destroy()
+            feat = link_layer.GetNextFeature()
+            continue
 
-for fld_index in range(poly_field_count):
-    src_fd = src_defn.GetFieldDefn( fld_index )
-    
-    fd = ogr.FieldDefn( src_fd.GetName(), src_fd.GetType() )
-    fd.SetWidth( src_fd.GetWidth() )
-    fd.SetPrecision( src_fd.GetPrecision() )
-    shp_layer.CreateField( fd )
+        try:
+            module.poly_line_links[lpoly_id].append( tlid )
+        except:
+            module.poly_line_links[lpoly_id] = [ tlid ]
 
-#############################################################################
-# Read all features in the line layer, holding just the geometry in a hash
-# for fast lookup by TLID.
+        try:
+            module.poly_line_links[rpoly_id].append( tlid )
+        except:
+            module.poly_line_links[rpoly_id] = [ tlid ]
 
-line_layer = ds.GetLayerByName( 'CompleteChain' )
-line_count = 0
+        link_count = link_count + 1
 
-modules_hash = {}
+        feat.Destroy()
+
+        feat = link_layer.GetNextFeature()
 
-feat = line_layer.GetNextFeature()
-geom_id_field = feat.GetFieldIndex( 'TLID' )
-tile_ref_field = feat.GetFieldIndex( 'MODULE' )
-while feat is not None:
-    geom_id = feat.GetField( geom_id_field )
-    tile_ref = feat.GetField( tile_ref_field )
+    print('Processed %d links.' % link_count)
 
-    try:
-        module = modules_hash[tile_ref]
-    except:
-        module = Module()
-        modules_hash[tile_ref] = module
+    #########################################################################
+    # Process all polygon features.
 
-    module.lines[geom_id] = feat.GetGeometryRef().Clone()
-    line_count = line_count + 1
+    feat = poly_layer.GetNextFeature()
+    tile_ref_field = feat.GetFieldIndex( 'MODULE' )
+    polyid_field = feat.GetFieldIndex( 'POLYID' )
 
-    feat.Destroy()
+    poly_count = 0
+    degenerate_count = 0
 
-    feat = line_layer.GetNextFeature()
+    while feat is not None:
+        module = modules_hash[feat.GetField( tile_ref_field )]
+        polyid = feat.GetField( polyid_field )
 
-print('Got %d lines in %d modules.' % (line_count,len(modules_hash)))
+        tlid_list = module.poly_line_links[polyid]
 
-#############################################################################
-# Read all polygon/chain links and build a hash keyed by POLY_ID listing
-# the chains (by TLID) attached to it. 
+        link_coll = ogr.Geometry( type = ogr.wkbGeometryCollection )
+        for tlid in tlid_list:
+            geom = module.lines[tlid]
+            link_coll.AddGeometry( geom )
 
-link_layer = ds.GetLayerByName( 'PolyChainLink' )
+        try:
+            poly = ogr.BuildPolygonFromEdges( link_coll )
 
-feat = link_layer.GetNextFeature()
-geom_id_field = feat.GetFieldIndex( 'TLID' )
-tile_ref_field = feat.GetFieldIndex( 'MODULE' )
-lpoly_field = feat.GetFieldIndex( 'POLYIDL' )
-rpoly_field = feat.GetFieldIndex( 'POLYIDR' )
+            if poly.GetGeometryRef(0).GetPointCount() < 4:
+                degenerate_count = degenerate_count + 1
+                poly.Destroy()
+                feat.Destroy()
+                feat = poly_layer.GetNextFeature()
+                continue
 
-link_count = 0
+            #print poly.ExportToWkt()
+            #feat.SetGeometryDirectly( poly )
 
-while feat is not None:
-    module = modules_hash[feat.GetField( tile_ref_field )]
+            feat2 = ogr.Feature(feature_def=shp_layer.GetLayerDefn())
 
-    tlid = feat.GetField( geom_id_field )
+            for fld_index in range(poly_field_count):
+                feat2.SetField( fld_index, feat.GetField( fld_index ) )
 
-    lpoly_id = feat.GetField( lpoly_field )
-    rpoly_id = feat.GetField( rpoly_field )
+            feat2.SetGeometryDirectly( poly )
 
- 
-    if lpoly_id == rpoly_id:
-        feat.Destroy()
-        feat = link_layer.GetNextFeature()
-        continue    
-    
-    try:
-        module.poly_line_links[lpoly_id].append( tlid )
-    except:
-        module.poly_line_links[lpoly_id] = [ tlid ]
+            shp_layer.CreateFeature( feat2 )
+            feat2.Destroy()
 
-    try:
-        module.poly_line_links[rpoly_id].append( tlid )
-    except:
-        module.poly_line_links[rpoly_id] = [ tlid ]
+            poly_count = poly_count + 1
+        except:
+            print('BuildPolygonFromEdges failed.')
 
-    link_count = link_count + 1
+        feat.Destroy()
 
-    feat.Destroy()
+        feat = poly_layer.GetNextFeature()
 
-    feat = link_layer.GetNextFeature()
+    return (poly_count, degenerate_count)
 
-print('Processed %d links.' % link_count)
+#############################################################################
+# Streaming mode: first pass loading the edge store.
+
+def load_edge_store( ds, poly_layer, store, batch_size = 10000 ):
+
+    line_layer = ds.GetLayerByName( 'CompleteChain' )
+    geom_id_field = line_layer.GetLayerDefn().GetFieldIndex( 'TLID' )
+    tile_ref_field = line_layer.GetLayerDefn().GetFieldIndex( 'MODULE' )
+
+    line_count = 0
+    rows = []
+    for feat in line_layer:
+        rows.append( (feat.GetField( tile_ref_field ), feat.GetField( geom_id_field ),
+                      feat.GetGeometryRef().ExportToWkb()) )
+        if len(rows) == batch_size:
+            store.add_lines( rows )
+            line_count = line_count + len(rows)
+            rows = []
+    store.add_lines( rows )
+    line_count = line_count + len(rows)
+
+    print('Stored %d lines.' % line_count)
+
+    link_layer = ds.GetLayerByName( 'PolyChainLink' )
+    link_defn = link_layer.GetLayerDefn()
+    geom_id_field = link_defn.GetFieldIndex( 'TLID' )
+    tile_ref_field = link_defn.GetFieldIndex( 'MODULE' )
+    lpoly_field = link_defn.GetFieldIndex( 'POLYIDL' )
+    rpoly_field = link_defn.GetFieldIndex( 'POLYIDR' )
+
+    link_count = 0
+    rows = []
+    for feat in link_layer:
+        lpoly_id = feat.GetField( lpoly_field )
+        rpoly_id = feat.GetField( rpoly_field )
+        if lpoly_id == rpoly_id:
+            continue
+
+        tile_ref = feat.GetField( tile_ref_field )
+        tlid = feat.GetField( geom_id_field )
+        rows.append( (tile_ref, lpoly_id, tlid) )
+        rows.append( (tile_ref, rpoly_id, tlid) )
+        link_count = link_count + 1
+        if len(rows) >= batch_size:
+            store.add_links( rows )
+            rows = []
+    store.add_links( rows )
+
+    print('Processed %d links.' % link_count)
+
+    poly_defn = poly_layer.GetLayerDefn()
+    tile_ref_field = poly_defn.GetFieldIndex( 'MODULE' )
+    polyid_field = poly_defn.GetFieldIndex( 'POLYID' )
+    poly_field_count = poly_defn.GetFieldCount()
+
+    rows = []
+    poly_layer.ResetReading()
+    for feat in poly_layer:
+        rows.append( (feat.GetField( tile_ref_field ), feat.GetField( polyid_field ),
+                      [ feat.GetField( fld_index ) for fld_index in range(poly_field_count) ]) )
+        if len(rows) == batch_size:
+            store.add_polygons( rows )
+            rows = []
+    store.add_polygons( rows )
+
+    store.create_indexes()
 
 #############################################################################
-# Process all polygon features.
+# Streaming mode: assembly of the polygons of one module, from the edge
+# store. Run in worker processes.
+
+def assemble_module( args ):
+
+    (store_filename, module) = args
+
+    store = EdgeStore( store_filename )
+    lines = store.get_module_lines( module )
+    poly_line_links = store.get_module_links( module )
+    polygons = store.get_module_polygons( module )
+    store.close()
+
+    geoms = {}
+    results = []
+    degenerate_count = 0
+    failed_count = 0
+
+    for (polyid, fields) in polygons:
+        link_coll = ogr.Geometry( type = ogr.wkbGeometryCollection )
+        try:
+            for tlid in poly_line_links[polyid]:
+                geom = geoms.get( tlid )
+                if geom is None:
+                    geom = ogr.CreateGeometryFromWkb( lines[tlid] )
+                    geoms[tlid] = geom
+                link_coll.AddGeometry( geom )
+
+            poly = ogr.BuildPolygonFromEdges( link_coll )
+        except:
+            failed_count = failed_count + 1
+            continue
+
+        if poly.GetGeometryRef(0).GetPointCount() < 4:
+            degenerate_count = degenerate_count + 1
+            continue
+
+        results.append( (fields, poly.ExportToWkb()) )
 
-feat = poly_layer.GetNextFeature()
-tile_ref_field = feat.GetFieldIndex( 'MODULE' )
-polyid_field = feat.GetFieldIndex( 'POLYID' )
+    return (module, results, degenerate_count, failed_count)
 
-poly_count = 0
-degenerate_count = 0
+#############################################################################
+def tigerpoly_stream( ds, poly_layer, shp_layer, store_filename,
+                      num_processes = 1, group_transaction = 20000 ):
+
+    store = EdgeStore( store_filename, create = True )
+    load_edge_store( ds, poly_layer, store )
+    modules = store.get_modules()
+    store.close()
 
-while feat is not None:
-    module = modules_hash[feat.GetField( tile_ref_field )]
-    polyid = feat.GetField( polyid_field )
+    print('Assembling polygons of %d modules.' % len(modules))
 
-    tlid_list = module.poly_line_links[polyid]
+    tasks = [ (store_filename, module) for module in modules ]
+    if num_processes > 1 and len(tasks) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool( num_processes )
+        module_results = pool.imap( assemble_module, tasks )
+    else:
+        pool = None
+        module_results = (assemble_module( task ) for task in tasks)
 
-    link_coll = ogr.Geometry( type = ogr.wkbGeometryCollection )
-    for tlid in tlid_list:
-        geom = module.lines[tlid]
-        link_coll.AddGeometry( geom )
+    poly_count = 0
+    degenerate_count = 0
+    shp_defn = shp_layer.GetLayerDefn()
+    in_transaction = False
 
     try:
-        poly = ogr.BuildPolygonFromEdges( link_coll )
+        for (module, results, module_degenerate_count, failed_count) in module_results:
+            degenerate_count = degenerate_count + module_degenerate_count
+            for i in range(failed_count):
+                print('BuildPolygonFromEdges failed.')
+
+            for (fields, wkb) in results:
+                if not in_transaction:
+                    shp_layer.StartTransaction()
+                    in_transaction = True
+
+                feat2 = ogr.Feature( shp_defn )
+                for fld_index in range(len(fields)):
+                    if fields[fld_index] is not None:
+                        feat2.SetField( fld_index, fields[fld_index] )
+                feat2.SetGeometryDirectly( ogr.CreateGeometryFromWkb( wkb ) )
+                shp_layer.CreateFeature( feat2 )
+                feat2 = None
+
+                poly_count = poly_count + 1
+                if (poly_count % group_transaction) == 0:
+                    shp_layer.CommitTransaction()
+                    in_transaction = False
+
+        if in_transaction:
+            shp_layer.CommitTransaction()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    os.unlink( store_filename )
+
+    return (poly_count, degenerate_count)
 
-        if poly.GetGeometryRef(0).GetPointCount() < 4:
-            degenerate_count = degenerate_count + 1
-            poly.Destroy()
-            feat.Destroy()
-            feat = poly_layer.GetNextFeature()
-            continue
-        
-        #print poly.ExportToWkt()
-        #feat.SetGeometryDirectly( poly )
+#############################################################################
+def main( argv ):
 
-        feat2 = ogr.Feature(feature_def=shp_layer.GetLayerDefn())
+    infile = None
+    outfile = None
+    stream = False
+    store_filename = None
+    num_processes = 1
+    group_transaction = 20000
 
-        for fld_index in range(poly_field_count):
-            feat2.SetField( fld_index, feat.GetField( fld_index ) )
+    #########################################################################
+    # Argument processing.
 
-        feat2.SetGeometryDirectly( poly )
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
 
-        shp_layer.CreateFeature( feat2 )
-        feat2.Destroy()
+        if arg == '-stream':
+            stream = True
 
-        poly_count = poly_count + 1
-    except:
-        print('BuildPolygonFromEdges failed.')
+        elif arg == '-store' and i < len(argv) - 1:
+            stream = True
+            store_filename = argv[i+1]
+            i = i + 1
 
-    feat.Destroy()
+        elif arg == '-j' and i < len(argv) - 1:
+            num_processes = int(argv[i+1])
+            i = i + 1
 
-    feat = poly_layer.GetNextFeature()
+        elif arg == '-gt' and i < len(argv) - 1:
+            group_transaction = int(argv[i+1])
+            i = i + 1
 
-if degenerate_count: 
-    print('Discarded %d degenerate polygons.' % degenerate_count)
+        elif infile is None:
+            infile = arg
 
-print('Built %d polygons.' % poly_count)
+        elif outfile is None:
+            outfile = arg
 
-#############################################################################
-# Cleanup
+        else:
+            Usage()
+
+        i = i + 1
+
+    if outfile is None:
+        outfile = 'poly.shp'
+
+    if infile is None:
+        Usage()
+
+    if group_transaction < 1:
+        print('-gt should be at least 1.')
+        Usage()
+
+    if store_filename is None:
+        store_filename = outfile + '.edges.sqlite'
+
+    #########################################################################
+    # Open the datasource to operate on.
+
+    ds = ogr.Open( infile, update = 0 )
+
+    poly_layer = ds.GetLayerByName( 'Polygon' )
+
+    #########################################################################
+    #	Create output file for the composed polygons.
+
+    nad83 = osr.SpatialReference()
+    nad83.SetFromUserInput('NAD83')
+
+    shp_driver = ogr.GetDriverByName( 'ESRI Shapefile' )
+    shp_driver.DeleteDataSource( outfile )
+
+    shp_ds = shp_driver.CreateDataSource( outfile )
+
+    shp_layer = shp_ds.CreateLayer( 'out', geom_type = ogr.wkbPolygon,
+                                    srs = nad83 )
+
+    src_defn = poly_layer.GetLayerDefn()
+    poly_field_count = src_defn.GetFieldCount()
+
+    for fld_index in range(poly_field_count):
+        src_fd = src_defn.GetFieldDefn( fld_index )
+
+        fd = ogr.FieldDefn( src_fd.GetName(), src_fd.GetType() )
+        fd.SetWidth( src_fd.GetWidth() )
+        fd.SetPrecision( src_fd.GetPrecision() )
+        shp_layer.CreateField( fd )
+
+    if stream:
+        (poly_count, degenerate_count) = tigerpoly_stream( ds, poly_layer, shp_layer,
+                                                           store_filename, num_processes,
+                                                           group_transaction )
+    else:
+        (poly_count, degenerate_count) = tigerpoly_in_memory( ds, poly_layer, shp_layer,
+                                                              poly_field_count )
+
+    if degenerate_count:
+        print('Discarded %d degenerate polygons.' % degenerate_count)
+
+    print('Built %d polygons.' % poly_count)
+
+    #########################################################################
+    # Cleanup
+
+    shp_ds.Destroy()
+    ds.Destroy()
+
+    return 0
 
-shp_ds.Destroy()
-ds.Destroy()
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
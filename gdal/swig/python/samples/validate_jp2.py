@@ -29,6 +29,8 @@
 #  DEALINGS IN THE SOFTWARE.
 #******************************************************************************
 
+import bisect
+import json
 import os
 import sys
 from osgeo import gdal
@@ -36,7 +38,8 @@ from osgeo import osr
 
 def Usage():
     print('Usage: validate_jp2 [-expected_gmljp2] [-inspire_tg] [-datatype imagery|non_imagery]')
-    print('                    [-oidoc in.xml] [-ogc_schemas_location path|disabled] test.jp2')
+    print('                    [-oidoc in.xml] [-ogc_schemas_location path|disabled]')
+    print('                    [-j num_processes] [-summary out.json] test.jp2 [other.jp2]*')
     print('')
     print('Options:')
     print('-expected_gmljp2: hint to indicate that a GMLJP2 box should be present.')
@@ -45,13 +48,115 @@ def Usage():
     print('                               Only used by -inspire_tg')
     print('-oidoc: XML document conforming with Inspire Orthoimagery GML application schema.')
     print('-ogc_schemas_location: Path to directory with OGC schemas. Needed for GMLJP2 validation.')
+    print('-j: Number of processes used to validate several files. Defaults to 1.')
+    print('-summary: Write a JSON summary of the validation of all files. Defaults to stdout')
+    print('          when several files are validated.')
     return 1
 
 XML_TYPE_IDX = 0
 XML_VALUE_IDX = 1
 XML_FIRST_CHILD_IDX = 2
 
+class XMLIndex:
+    """ Index of a tree returned by gdal.ParseXMLString() or
+        gdal.GetJPEG2000Structure(), built in a single walk.
+
+        The nodes are numbered in document order, so that the nodes of the
+        subtree of a node are the ones whose number is in
+        [node_number, end_number[. The first node of a subtree matching a
+        criterion is then found with a bisection in the sorted list of the
+        numbers of the matching nodes, instead of walking the subtree. """
+
+    def __init__(self, root):
+        self.root = root
+        self.nodes = []
+        self.end = []
+        self.positions = {}
+        self.by_value = {}
+        self.by_attribute = {}
+
+        stack = [ (root, False) ]
+        while len(stack) > 0:
+            (node, visited) = stack.pop()
+            if visited:
+                self.end[self.positions[id(node)]] = len(self.nodes)
+                continue
+            pos = len(self.nodes)
+            self.nodes.append(node)
+            self.end.append(pos + 1)
+            self.positions[id(node)] = pos
+            value = node[XML_VALUE_IDX]
+            if value in self.by_value:
+                self.by_value[value].append(pos)
+            else:
+                self.by_value[value] = [ pos ]
+            if len(node) > XML_FIRST_CHILD_IDX:
+                stack.append((node, True))
+                for child_idx in range(len(node) - 1, XML_FIRST_CHILD_IDX - 1, -1):
+                    stack.append((node[child_idx], False))
+
+    def get_position(self, node):
+        pos = self.positions.get(id(node))
+        if pos is None or self.nodes[pos] is not node:
+            return None
+        return pos
+
+    def find_first(self, pos, matching_positions):
+        """ Return the first node of the subtree of the node at pos whose
+            number is in matching_positions """
+        if matching_positions is None:
+            return None
+        i = bisect.bisect_left(matching_positions, pos)
+        if i < len(matching_positions) and matching_positions[i] < self.end[pos]:
+            return self.nodes[matching_positions[i]]
+        return None
+
+    def find_xml_node(self, pos, value):
+        return self.find_first(pos, self.by_value.get(value))
+
+    def find_element_with_name(self, pos, element_name, name, attribute_name):
+        key = (element_name, attribute_name)
+        if key not in self.by_attribute:
+            # Group once all the elements of that name by attribute value
+            the_dic = {}
+            for element_pos in self.by_value.get(element_name, []):
+                element = self.nodes[element_pos]
+                if element[XML_TYPE_IDX] != gdal.CXT_Element:
+                    continue
+                attr_val = get_attribute_val(element, attribute_name)
+                if attr_val in the_dic:
+                    the_dic[attr_val].append(element_pos)
+                else:
+                    the_dic[attr_val] = [ element_pos ]
+            self.by_attribute[key] = the_dic
+        return self.find_first(pos, self.by_attribute[key].get(name))
+
+# Indexes of the trees being validated
+xml_indexes = []
+
+def index_xml_tree(ar):
+    """ Index a tree so that the find_xxx() functions called on it, or on
+        any of its nodes, no longer walk it. """
+    if ar is not None:
+        xml_indexes.append(XMLIndex(ar))
+    return ar
+
+def clear_xml_indexes():
+    del xml_indexes[:]
+
+def get_xml_index(ar):
+    for index in xml_indexes:
+        pos = index.get_position(ar)
+        if pos is not None:
+            return (index, pos)
+    return (None, None)
+
 def find_xml_node(ar, element_name, only_attributes = False):
+    if not only_attributes:
+        (index, pos) = get_xml_index(ar)
+        if index is not None:
+            return index.find_xml_node(pos, element_name)
+
     #type = ar[XML_TYPE_IDX]
     value = ar[XML_VALUE_IDX]
     if value == element_name:
@@ -81,6 +186,10 @@ def find_message(ar):
     return msg
 
 def find_element_with_name(ar, element_name, name, attribute_name = 'name'):
+    (index, pos) = get_xml_index(ar)
+    if index is not None:
+        return index.find_element_with_name(pos, element_name, name, attribute_name)
+
     type = ar[XML_TYPE_IDX]
     value = ar[XML_VALUE_IDX]
     if type == gdal.CXT_Element and value == element_name and get_attribute_val(ar, attribute_name) == name:
@@ -379,10 +488,17 @@ def check_oi_rg_consistency(filename, serialized_oi_rg, error_report):
 
 def validate(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype = 'imagery', error_report = None):
 
+    try:
+        return validate_indexed(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype, error_report)
+    finally:
+        clear_xml_indexes()
+
+def validate_indexed(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype = 'imagery', error_report = None):
+
     if error_report is None:
         error_report = ErrorReport()
 
-    ar = gdal.GetJPEG2000Structure(filename, ['ALL=YES'])
+    ar = index_xml_tree(gdal.GetJPEG2000Structure(filename, ['ALL=YES']))
     if ar is None:
         error_report.error_count = 1
         return error_report
@@ -942,7 +1058,7 @@ def validate(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location,
 
     # Check GMLJP2 RectifiedGrid envelope against codestream dimensions
     if gmljp2_found:
-        gmljp2_node = gdal.ParseXMLString(gmljp2)
+        gmljp2_node = index_xml_tree(gdal.ParseXMLString(gmljp2))
         rg = find_xml_node(gmljp2_node, 'gml:RectifiedGrid')
         if rg is None:
             rg = find_xml_node(gmljp2_node, 'RectifiedGrid')
@@ -981,7 +1097,7 @@ def validate(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location,
     # Check against Orthoimagery document
     if oidoc:
         oidoc_content = open(oidoc).read()
-        oidoc_node = gdal.ParseXMLString(oidoc_content)
+        oidoc_node = index_xml_tree(gdal.ParseXMLString(oidoc_content))
         if oidoc_node is None:
             error_report.EmitError('GENERAL', 'Cannot parse %s' % oidoc)
         else:
@@ -1164,9 +1280,60 @@ def validate(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location,
     return error_report
 
 
+def validate_worker(args):
+    (filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype) = args
+    error_report = ErrorReport(collect_internally = True)
+    try:
+        validate(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype, error_report)
+    except Exception:
+        error_report.EmitError('GENERAL', 'Exception during validation: %s' % str(sys.exc_info()[1]))
+    return { 'filename': filename,
+             'error_count': error_report.error_count,
+             'warning_count': error_report.warning_count,
+             'errors': error_report.error_array,
+             'warnings': error_report.warning_array }
+
+def validate_batch(filenames, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype = 'imagery', num_processes = 1, summary_filename = None):
+    """ Validate several files, possibly in a pool of processes, and write
+        a JSON summary of the results. Return the number of invalid files. """
+
+    tasks = [ (filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype) for filename in filenames ]
+    if num_processes > 1 and len(tasks) > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(min(num_processes, len(tasks)))
+        try:
+            results = pool.map(validate_worker, tasks, 1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        results = [ validate_worker(task) for task in tasks ]
+
+    invalid_count = 0
+    for result in results:
+        if result['error_count'] != 0:
+            invalid_count += 1
+    summary = { 'file_count': len(results),
+                'invalid_file_count': invalid_count,
+                'files': results }
+
+    content = json.dumps(summary, indent = 2)
+    if summary_filename is None:
+        print(content)
+    else:
+        f = open(summary_filename, 'wt')
+        f.write(content)
+        f.close()
+        for result in results:
+            print('%s: %d error(s), %d warning(s)' % (result['filename'], result['error_count'], result['warning_count']))
+
+    return invalid_count
+
 def main():
     i = 1
-    filename = None
+    filenames = []
+    num_processes = 1
+    summary_filename = None
     oidoc = None
     ogc_schemas_location = None
     inspire_tg = False
@@ -1188,21 +1355,30 @@ def main():
                 return Usage()
             datatype = sys.argv[i+1]
             i = i + 1
+        elif sys.argv[i] == "-j":
+            if i >= len(sys.argv) - 1:
+                return Usage()
+            num_processes = int(sys.argv[i+1])
+            i = i + 1
+        elif sys.argv[i] == "-summary":
+            if i >= len(sys.argv) - 1:
+                return Usage()
+            summary_filename = sys.argv[i+1]
+            i = i + 1
         elif sys.argv[i] == "-inspire_tg":
             inspire_tg = True
         elif sys.argv[i] == "-expected_gmljp2":
             expected_gmljp2 = True
         elif sys.argv[i][0] == '-':
             return Usage()
-        elif filename is None:
-            filename = sys.argv[i]
         else:
-            return Usage()
+            filenames.append(sys.argv[i])
 
         i = i + 1
 
-    if filename is None:
+    if len(filenames) == 0:
         return Usage()
+    filename = filenames[0]
 
     if ogc_schemas_location is None:
         try:
@@ -1222,6 +1398,9 @@ def main():
                 print('Cannot find %s/xml.xsd. -ogc_schemas_location value is probably wrong' % ogc_schemas_location)
                 return 1
 
+    if len(filenames) > 1 or summary_filename is not None:
+        return validate_batch(filenames, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype, num_processes, summary_filename)
+
     return validate(filename, oidoc, inspire_tg, expected_gmljp2, ogc_schemas_location, datatype).error_count
 
 if __name__ == '__main__':
@@ -34,173 +34,357 @@ try:
 except ImportError:
     import gdal
 
+import math
 import sys
+import multiprocessing
+
+# Maximum amount of raster data held in memory by CopyBand()
+COPY_BUFFER_SIZE = 64 * 1024 * 1024
 
 def CopyBand( srcband, dstband ):
-    for line in range(srcband.YSize):
-        line_data = srcband.ReadRaster( 0, line, srcband.XSize, 1 )
-        dstband.WriteRaster( 0, line, srcband.XSize, 1, line_data,
-                             buf_type = srcband.DataType )
-        
+
+    # Transfer whole rows of destination blocks at once, limited to
+    # COPY_BUFFER_SIZE bytes.
+    (block_xsize, block_ysize) = dstband.GetBlockSize()
+    pixel_size = max(1, gdal.GetDataTypeSize(srcband.DataType) // 8)
+    (xsize, ysize) = (srcband.XSize, srcband.YSize)
+
+    row_size = xsize * pixel_size * block_ysize
+    chunk_ysize = block_ysize * max(1, COPY_BUFFER_SIZE // row_size)
+    chunk_xsize = xsize
+    if row_size > COPY_BUFFER_SIZE:
+        chunk_xsize = COPY_BUFFER_SIZE // (block_ysize * pixel_size)
+        chunk_xsize = max(block_xsize, chunk_xsize // block_xsize * block_xsize)
+
+    for yoff in range(0, ysize, chunk_ysize):
+        height = min(chunk_ysize, ysize - yoff)
+        for xoff in range(0, xsize, chunk_xsize):
+            width = min(chunk_xsize, xsize - xoff)
+            data = srcband.ReadRaster( xoff, yoff, width, height,
+                                       buf_type = srcband.DataType )
+            dstband.WriteRaster( xoff, yoff, width, height, data,
+                                 buf_type = srcband.DataType )
+
 def Usage():
     print("""
 gdal_fillnodata [-q] [-md max_distance] [-si smooth_iterations]
-                [-o name=value] [-b band]
+                [-o name=value] [-b band] [-tile size] [-j num_jobs]
                 srcfile [-nomask] [-mask filename] [-of format] [-co name=value]* [dstfile]
 """)
     sys.exit(1)
-    
+
 # =============================================================================
-# 	Mainline
+# 	FillWindow()
+#
+#	Worker function: fill the nodata pixels of a window of the source
+#	band in memory, and return the raw data of the target area.
 # =============================================================================
 
-max_distance = 100
-smoothing_iterations = 0
-options = []
-quiet_flag = 0
-src_filename = None
-src_band = 1
+def FillWindow( args ):
 
-dst_filename = None
-format = 'GTiff'
-creation_options = []
+    (src_filename, src_band, mask, max_distance, smoothing_iterations,
+     options, window, target) = args
+    (xoff, yoff, xsize, ysize) = window
+    (txoff, tyoff, txsize, tysize) = target
 
-mask = 'default'
+    src_ds = gdal.Open( src_filename )
+    srcband = src_ds.GetRasterBand(src_band)
+    data_type = srcband.DataType
 
-gdal.AllRegister()
-argv = gdal.GeneralCmdLineProcessor( sys.argv )
-if argv is None:
-    sys.exit( 0 )
+    mem_drv = gdal.GetDriverByName('MEM')
+    tile_ds = mem_drv.Create( '', xsize, ysize, 1, data_type )
+    tileband = tile_ds.GetRasterBand(1)
+    tileband.WriteRaster( 0, 0, xsize, ysize,
+                          srcband.ReadRaster( xoff, yoff, xsize, ysize,
+                                              buf_type = data_type ),
+                          buf_type = data_type )
 
-# Parse command line arguments.
-i = 1
-while i < len(argv):
-    arg = argv[i]
+    mask_ds = None
+    if mask == 'none':
+        # Same as the non tiled mode: the nodata value of the filled band
+        # defines its mask.
+        ndv = srcband.GetNoDataValue()
+        if ndv is not None:
+            tileband.SetNoDataValue( ndv )
+        tile_maskband = None
+    else:
+        if mask == 'default':
+            maskband = srcband.GetMaskBand()
+        else:
+            mask_ds = gdal.Open( mask )
+            maskband = mask_ds.GetRasterBand(1)
+        tile_mask_ds = mem_drv.Create( '', xsize, ysize, 1, gdal.GDT_Byte )
+        tile_maskband = tile_mask_ds.GetRasterBand(1)
+        tile_maskband.WriteRaster( 0, 0, xsize, ysize,
+                                   maskband.ReadRaster( xoff, yoff, xsize, ysize,
+                                                        buf_type = gdal.GDT_Byte ),
+                                   buf_type = gdal.GDT_Byte )
 
-    if arg == '-of':
-        i = i + 1
-        format = argv[i]
+    gdal.FillNodata( tileband, tile_maskband,
+                     max_distance, smoothing_iterations, options )
 
-    elif arg == '-co':
-        i = i + 1
-        creation_options.append(argv[i])
+    data = tileband.ReadRaster( txoff - xoff, tyoff - yoff, txsize, tysize,
+                                buf_type = data_type )
+    return (target, data)
 
-    elif arg == '-q' or arg == '-quiet':
-        quiet_flag = 1
-        
-    elif arg == '-si':
-        i = i + 1
-        smoothing_iterations = int(argv[i])
-        
-    elif arg == '-b':
-        i = i + 1
-        src_band = int(argv[i])
-        
-    elif arg == '-md':
-        i = i + 1
-        max_distance = float(argv[i])
-        
-    elif arg == '-nomask':
-        mask = 'none'
-        
-    elif arg == '-mask':
-        i = i + 1
-        mask = argv[i]
-        
-    elif arg == '-mask':
-        i = i + 1
-        mask = argv[i]
-        
-    elif arg[:2] == '-h':
-        Usage()
-        
-    elif src_filename is None:
-        src_filename = argv[i]
+# =============================================================================
+# 	FillTiled()
+# =============================================================================
 
-    elif dst_filename is None:
-        dst_filename = argv[i]
+def FillTiled( src_filename, src_band, mask, dstband, max_distance,
+               smoothing_iterations, options, tile_size, num_jobs,
+               quiet_flag ):
 
+    src_ds = gdal.Open( src_filename )
+    (xsize, ysize) = (src_ds.RasterXSize, src_ds.RasterYSize)
+    data_type = src_ds.GetRasterBand(src_band).DataType
+    src_ds = None
+
+    # A zero distance means no limit, which must be resolved against the
+    # size of the whole raster and not the one of the windows.
+    if max_distance == 0:
+        max_distance = max(xsize, ysize) + 1
+
+    # Values are interpolated from valid pixels at most max_distance
+    # pixels away, and each smoothing iteration looks one pixel further.
+    halo = int(math.ceil(max_distance)) + smoothing_iterations
+
+    jobs = []
+    for yoff in range(0, ysize, tile_size):
+        for xoff in range(0, xsize, tile_size):
+            target = (xoff, yoff, min(tile_size, xsize - xoff),
+                      min(tile_size, ysize - yoff))
+            x0 = max(0, xoff - halo)
+            y0 = max(0, yoff - halo)
+            x1 = min(xsize, xoff + target[2] + halo)
+            y1 = min(ysize, yoff + target[3] + halo)
+            jobs.append( (src_filename, src_band, mask, max_distance,
+                          smoothing_iterations, options,
+                          (x0, y0, x1 - x0, y1 - y0), target) )
+
+    if num_jobs > 1:
+        pool = multiprocessing.Pool( num_jobs )
+        results = pool.imap_unordered( FillWindow, jobs )
     else:
+        pool = None
+        results = ( FillWindow( job ) for job in jobs )
+
+    done = 0
+    for (target, data) in results:
+        (xoff, yoff, width, height) = target
+        dstband.WriteRaster( xoff, yoff, width, height, data,
+                             buf_type = data_type )
+        done = done + 1
+        if not quiet_flag:
+            gdal.TermProgress_nocb( float(done) / len(jobs) )
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    return 0
+
+# =============================================================================
+# 	Mainline
+# =============================================================================
+
+def main( argv ):
+
+    max_distance = 100
+    smoothing_iterations = 0
+    options = []
+    quiet_flag = 0
+    src_filename = None
+    src_band = 1
+
+    dst_filename = None
+    format = 'GTiff'
+    creation_options = []
+
+    mask = 'default'
+
+    tile_size = None
+    num_jobs = 1
+
+    gdal.AllRegister()
+    argv = gdal.GeneralCmdLineProcessor( argv )
+    if argv is None:
+        return 0
+
+    # Parse command line arguments.
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == '-of':
+            i = i + 1
+            format = argv[i]
+
+        elif arg == '-co':
+            i = i + 1
+            creation_options.append(argv[i])
+
+        elif arg == '-q' or arg == '-quiet':
+            quiet_flag = 1
+
+        elif arg == '-si':
+            i = i + 1
+            smoothing_iterations = int(argv[i])
+
+        elif arg == '-b':
+            i = i + 1
+            src_band = int(argv[i])
+
+        elif arg == '-md':
+            i = i + 1
+            max_distance = float(argv[i])
+
+        elif arg == '-nomask':
+            mask = 'none'
+
+        elif arg == '-mask':
+            i = i + 1
+            mask = argv[i]
+
+        elif arg == '-mask':
+            i = i + 1
+            mask = argv[i]
+
+        elif arg == '-tile':
+            i = i + 1
+            tile_size = int(argv[i])
+
+        elif arg == '-j':
+            i = i + 1
+            num_jobs = int(argv[i])
+
+        elif arg[:2] == '-h':
+            Usage()
+
+        elif src_filename is None:
+            src_filename = argv[i]
+
+        elif dst_filename is None:
+            dst_filename = argv[i]
+
+        else:
+            Usage()
+
+        i = i + 1
+
+    if src_filename is None:
         Usage()
 
-    i = i + 1
+    if num_jobs > 1 and tile_size is None:
+        tile_size = 4096
+
+    if tile_size is not None and dst_filename is None:
+        print('A destination file is required in tiled mode.')
+        return 1
 
-if src_filename is None:
-    Usage()
-    
 # =============================================================================
 # 	Verify we have next gen bindings with the sievefilter method.
 # =============================================================================
-try:
-    gdal.FillNodata
-except:
-    print('')
-    print('gdal.FillNodata() not available.  You are likely using "old gen"')
-    print('bindings or an older version of the next gen bindings.')
-    print('')
-    sys.exit(1)
+    try:
+        gdal.FillNodata
+    except:
+        print('')
+        print('gdal.FillNodata() not available.  You are likely using "old gen"')
+        print('bindings or an older version of the next gen bindings.')
+        print('')
+        return 1
 
 # =============================================================================
 #	Open source file
 # =============================================================================
 
-if dst_filename is None:
-    src_ds = gdal.Open( src_filename, gdal.GA_Update )
-else:
-    src_ds = gdal.Open( src_filename, gdal.GA_ReadOnly )
-    
-if src_ds is None:
-    print('Unable to open %s' % src_filename)
-    sys.exit(1)
+    if dst_filename is None:
+        src_ds = gdal.Open( src_filename, gdal.GA_Update )
+    else:
+        src_ds = gdal.Open( src_filename, gdal.GA_ReadOnly )
 
-srcband = src_ds.GetRasterBand(src_band)
+    if src_ds is None:
+        print('Unable to open %s' % src_filename)
+        return 1
 
-if mask is 'default':
-    maskband = srcband.GetMaskBand()
-elif mask is 'none':
-    maskband = None
-else:
-    mask_ds = gdal.Open( mask )
-    maskband = mask_ds.GetRasterBand(1)
+    srcband = src_ds.GetRasterBand(src_band)
+
+    mask_ds = None
+    if mask == 'default':
+        maskband = srcband.GetMaskBand()
+    elif mask == 'none':
+        maskband = None
+    else:
+        mask_ds = gdal.Open( mask )
+        maskband = mask_ds.GetRasterBand(1)
 
 # =============================================================================
 #       Create output file if one is specified.
 # =============================================================================
 
-if dst_filename is not None:
-
-    drv = gdal.GetDriverByName(format)
-    dst_ds = drv.Create( dst_filename,src_ds.RasterXSize, src_ds.RasterYSize,1,
-                         srcband.DataType, creation_options )
-    wkt = src_ds.GetProjection()
-    if wkt != '':
-        dst_ds.SetProjection( wkt )
-    dst_ds.SetGeoTransform( src_ds.GetGeoTransform() )
-    
-    dstband = dst_ds.GetRasterBand(1)
-    CopyBand( srcband, dstband )
-    ndv = srcband.GetNoDataValue()
-    if ndv is not None:
-        dstband.SetNoDataValue(ndv)
-
-else:
-    dstband = srcband
+    dst_ds = None
+    if dst_filename is not None:
+
+        drv = gdal.GetDriverByName(format)
+        drv_md = drv.GetMetadata()
+
+        if tile_size is None and src_ds.RasterCount == 1 \
+           and 'DCAP_CREATE' in drv_md and 'DCAP_CREATECOPY' in drv_md:
+            # Let the driver copy the whole dataset, and reopen it in
+            # update mode.
+            dst_ds = drv.CreateCopy( dst_filename, src_ds,
+                                     options = creation_options )
+            if dst_ds is not None:
+                dst_ds = None
+                dst_ds = gdal.Open( dst_filename, gdal.GA_Update )
+
+        if dst_ds is None:
+            dst_ds = drv.Create( dst_filename,src_ds.RasterXSize, src_ds.RasterYSize,1,
+                                 srcband.DataType, creation_options )
+            wkt = src_ds.GetProjection()
+            if wkt != '':
+                dst_ds.SetProjection( wkt )
+            dst_ds.SetGeoTransform( src_ds.GetGeoTransform() )
+
+            dstband = dst_ds.GetRasterBand(1)
+            # In tiled mode, every pixel is written by the fill itself.
+            if tile_size is None:
+                CopyBand( srcband, dstband )
+            ndv = srcband.GetNoDataValue()
+            if ndv is not None:
+                dstband.SetNoDataValue(ndv)
+
+        dstband = dst_ds.GetRasterBand(1)
+
+    else:
+        dstband = srcband
 
 # =============================================================================
 #	Invoke algorithm.
 # =============================================================================
 
-if quiet_flag:
-    prog_func = None
-else:
-    prog_func = gdal.TermProgress
-    
-result = gdal.FillNodata( dstband, maskband,
-                          max_distance, smoothing_iterations, options,
-                          callback = prog_func )
+    if tile_size is not None:
+        result = FillTiled( src_filename, src_band, mask, dstband,
+                            max_distance, smoothing_iterations, options,
+                            tile_size, num_jobs, quiet_flag )
+    else:
+        if quiet_flag:
+            prog_func = None
+        else:
+            prog_func = gdal.TermProgress
+
+        result = gdal.FillNodata( dstband, maskband,
+                                  max_distance, smoothing_iterations, options,
+                                  callback = prog_func )
 
+    srcband = None
+    dstband = None
+    maskband = None
+    src_ds = None
+    dst_ds = None
+    mask_ds = None
 
-src_ds = None
-dst_ds = None
-mask_ds = None
+    return 0
 
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -29,8 +29,10 @@
 #  DEALINGS IN THE SOFTWARE.
 ###############################################################################
 
+import multiprocessing
 import os
 import sys
+import time
 from osgeo import gdal
 
 def Usage():
@@ -40,10 +42,155 @@ def Usage():
     print('                       [-threads {ALL_CPUS|number}] [-bitdepth val] [-nodata val]')
     print('                       [-spat_adjust {union,intersection,none,nonewithoutwarning}]')
     print('                       [-verbose_vrt] [-co NAME=VALUE]* [-q]')
+    print('                       [-j num_jobs] [-window size] [-timing]')
     print('')
     print('Create a dataset resulting from a pansharpening operation.')
     return -1
 
+# Pansharpened VRT opened by each worker process, keyed by its XML definition
+vrt_cache = {}
+
+def pansharpen_window(args):
+
+    (vrt_xml, window) = args
+    (xoff, yoff, xsize, ysize) = window
+
+    start = time.time()
+    vrt_ds = vrt_cache.get(vrt_xml)
+    if vrt_ds is None:
+        vrt_ds = gdal.Open(vrt_xml)
+        vrt_cache[vrt_xml] = vrt_ds
+    opened = time.time()
+
+    # The panchromatic read, the resampling of the spectral bands and
+    # the weighting are all done by this single request on the VRT, so
+    # they cannot be timed separately.
+    data = vrt_ds.ReadRaster(xoff, yoff, xsize, ysize)
+    done = time.time()
+    error_msg = None
+    if data is None:
+        error_msg = gdal.GetLastErrorMsg()
+
+    return (window, data, error_msg, opened - start, done - opened)
+
+def create_windowed_output(out_name, vrt_ds, format, creation_options):
+
+    drv = gdal.GetDriverByName(format)
+    if drv is None:
+        print('Unknown format: %s' % format)
+        return None
+    if drv.GetMetadataItem(gdal.DCAP_CREATE) is None:
+        print('Format %s does not support Create(), which is needed with -j or -window' % format)
+        return None
+
+    options = list(creation_options)
+    keys = [ option.split('=')[0].upper() for option in options ]
+    if format.upper() == 'GTIFF':
+        if 'TILED' not in keys:
+            options.append('TILED=YES')
+        nbits = vrt_ds.GetRasterBand(1).GetMetadataItem('NBITS', 'IMAGE_STRUCTURE')
+        if nbits is not None and 'NBITS' not in keys:
+            options.append('NBITS=' + nbits)
+
+    first_band = vrt_ds.GetRasterBand(1)
+    out_ds = drv.Create(out_name, vrt_ds.RasterXSize, vrt_ds.RasterYSize,
+                        vrt_ds.RasterCount, first_band.DataType, options)
+    if out_ds is None:
+        return None
+
+    out_ds.SetGeoTransform(vrt_ds.GetGeoTransform())
+    out_ds.SetProjection(vrt_ds.GetProjectionRef())
+    for i in range(vrt_ds.RasterCount):
+        vrt_band = vrt_ds.GetRasterBand(i+1)
+        out_band = out_ds.GetRasterBand(i+1)
+        out_band.SetColorInterpretation(vrt_band.GetColorInterpretation())
+        nodata = vrt_band.GetNoDataValue()
+        if nodata is not None:
+            out_band.SetNoDataValue(nodata)
+
+    return out_ds
+
+def gdal_pansharpen_windowed(vrt_xml, out_name, format, creation_options,
+                             window_size, num_jobs, callback, timing):
+
+    start = time.time()
+
+    vrt_ds = gdal.Open(vrt_xml)
+    if vrt_ds is None:
+        return 1
+    out_ds = create_windowed_output(out_name, vrt_ds, format, creation_options)
+    if out_ds is None:
+        return 1
+    (xsize, ysize) = (vrt_ds.RasterXSize, vrt_ds.RasterYSize)
+    vrt_ds = None
+
+    # Windows are made of whole output blocks, so that each block is
+    # written once.
+    (block_xsize, block_ysize) = out_ds.GetRasterBand(1).GetBlockSize()
+    if window_size is None:
+        window_size = 1024
+    win_xsize = max(1, window_size // block_xsize) * block_xsize
+    win_ysize = max(1, window_size // block_ysize) * block_ysize
+
+    jobs = []
+    for yoff in range(0, ysize, win_ysize):
+        for xoff in range(0, xsize, win_xsize):
+            window = (xoff, yoff, min(win_xsize, xsize - xoff),
+                      min(win_ysize, ysize - yoff))
+            jobs.append((vrt_xml, window))
+
+    if num_jobs > 1:
+        pool = multiprocessing.Pool(num_jobs)
+        results = pool.imap_unordered(pansharpen_window, jobs)
+    else:
+        pool = None
+        results = (pansharpen_window(job) for job in jobs)
+
+    open_time = 0.0
+    pansharpen_time = 0.0
+    write_time = 0.0
+    done = 0
+    ret = 0
+    for (window, data, error_msg, window_open_time, window_pansharpen_time) in results:
+        open_time += window_open_time
+        pansharpen_time += window_pansharpen_time
+
+        (xoff, yoff, width, height) = window
+        if data is None:
+            print('Cannot compute the window of %dx%d pixels at (%d,%d): %s' %
+                  (width, height, xoff, yoff, error_msg))
+            ret = 1
+            break
+
+        t = time.time()
+        out_ds.WriteRaster(xoff, yoff, width, height, data)
+        write_time += time.time() - t
+
+        done = done + 1
+        if callback is not None:
+            gdal.TermProgress_nocb(float(done) / len(jobs))
+
+    if pool is not None:
+        if ret != 0:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
+
+    t = time.time()
+    out_ds = None
+    write_time += time.time() - t
+
+    if timing and ret == 0:
+        print('Windows:                 %d of %dx%d pixels, %d job(s)' %
+              (len(jobs), win_xsize, win_ysize, num_jobs))
+        print('VRT opening:             %.3f s' % open_time)
+        print('Pansharpened reads:      %.3f s' % pansharpen_time)
+        print('Write:                   %.3f s' % write_time)
+        print('Elapsed:                 %.3f s' % (time.time() - start))
+
+    return ret
+
 def gdal_pansharpen(argv):
 
     argv = gdal.GeneralCmdLineProcessor( argv )
@@ -66,6 +213,9 @@ def gdal_pansharpen(argv):
     num_threads = None
     bitdepth = None
     nodata = None
+    num_jobs = 1
+    window_size = None
+    timing = False
 
     i = 1
     argc = len(argv)
@@ -97,6 +247,14 @@ def gdal_pansharpen(argv):
         elif argv[i] == '-nodata' and i < len(argv)-1:
             nodata = argv[i+1]
             i = i + 1
+        elif argv[i] == '-j' and i < len(argv)-1:
+            num_jobs = int(argv[i+1])
+            i = i + 1
+        elif argv[i] == '-window' and i < len(argv)-1:
+            window_size = int(argv[i+1])
+            i = i + 1
+        elif argv[i] == '-timing':
+            timing = True
         elif argv[i] == '-q':
             callback = None
         elif argv[i] == '-verbose_vrt':
@@ -236,10 +394,19 @@ def gdal_pansharpen(argv):
 
         return 0
 
+    if num_jobs > 1 or window_size is not None:
+        return gdal_pansharpen_windowed(vrt_xml, out_name, format,
+                                        creation_options, window_size,
+                                        num_jobs, callback, timing)
+
+    start = time.time()
     vrt_ds = gdal.Open(vrt_xml)
     out_ds = gdal.GetDriverByName(format).CreateCopy(out_name, vrt_ds, 0, creation_options, callback = callback)
     if out_ds is None:
         return 1
+    out_ds = None
+    if timing:
+        print('Elapsed:                 %.3f s' % (time.time() - start))
     return 0
 
 def main():
@@ -36,186 +36,445 @@ except ImportError:
     import gdal, ogr, osr
 
 import sys
+import multiprocessing
 
 def Usage():
     print("""
 gdal_polygonize [-8] [-nomask] [-mask filename] raster_file [-b band]
-                [-q] [-f ogr_format] out_file [layer] [fieldname]
+                [-q] [-f ogr_format] [-tile size] [-j num_jobs] [-gt n]
+                out_file [layer] [fieldname]
 """)
     sys.exit(1)
 
 # =============================================================================
-# 	Mainline
+# 	PolygonizeTile()
+#
+#	Polygonize a window of the source band in a worker process, and
+#	return the polygons as (DN, WKB, touches_seam) tuples. The polygons
+#	are in pixel coordinates of the whole source raster, so that the
+#	vertices on a seam are the same integers in the two adjacent tiles.
+#	A polygon touches a seam when its extent reaches an edge of the
+#	window that is shared with another tile.
 # =============================================================================
 
-format = 'GML'
-options = []
-quiet_flag = 0
-src_filename = None
-src_band_n = 1
+def PolygonizeTile( args ):
 
-dst_filename = None
-dst_layername = None
-dst_fieldname = None
-dst_field = -1
+    (src_filename, src_band_n, mask, options, xoff, yoff, xsize, ysize) = args
 
-mask = 'default'
+    src_ds = gdal.Open( src_filename )
+    srcband = src_ds.GetRasterBand(src_band_n)
 
-gdal.AllRegister()
-argv = gdal.GeneralCmdLineProcessor( sys.argv )
-if argv is None:
-    sys.exit( 0 )
+    if mask == 'default':
+        maskband = srcband.GetMaskBand()
+    elif mask == 'none':
+        maskband = None
+    else:
+        mask_ds = gdal.Open( mask )
+        maskband = mask_ds.GetRasterBand(1)
+
+    tile_gt = [ xoff, 1, 0, yoff, 0, 1 ]
+
+    mem_drv = gdal.GetDriverByName('MEM')
+    tile_ds = mem_drv.Create( '', xsize, ysize, 1, srcband.DataType )
+    tile_ds.SetGeoTransform( tile_gt )
+    tile_band = tile_ds.GetRasterBand(1)
+    tile_band.WriteRaster( 0, 0, xsize, ysize,
+                           srcband.ReadRaster( xoff, yoff, xsize, ysize ) )
+
+    tile_maskband = None
+    if maskband is not None:
+        mask_tile_ds = mem_drv.Create( '', xsize, ysize, 1, gdal.GDT_Byte )
+        tile_maskband = mask_tile_ds.GetRasterBand(1)
+        tile_maskband.WriteRaster( 0, 0, xsize, ysize,
+                                   maskband.ReadRaster( xoff, yoff, xsize, ysize,
+                                                        buf_type = gdal.GDT_Byte ) )
+
+    out_ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+    out_layer = out_ds.CreateLayer('poly')
+    out_layer.CreateField( ogr.FieldDefn( 'DN', ogr.OFTInteger ) )
+
+    gdal.Polygonize( tile_band, tile_maskband, out_layer, 0, options )
+
+    # Pixel offsets of the edges shared with neighbouring tiles
+    (raster_xsize, raster_ysize) = (src_ds.RasterXSize, src_ds.RasterYSize)
+    seams = []
+    if xoff > 0:
+        seams.append( ('x', xoff) )
+    if xoff + xsize < raster_xsize:
+        seams.append( ('x', xoff + xsize) )
+    if yoff > 0:
+        seams.append( ('y', yoff) )
+    if yoff + ysize < raster_ysize:
+        seams.append( ('y', yoff + ysize) )
+
+    result = []
+    for feat in out_layer:
+        geom = feat.GetGeometryRef()
+        (minx, maxx, miny, maxy) = geom.GetEnvelope()
+        touches_seam = False
+        for (axis, value) in seams:
+            if axis == 'x' and (minx == value or maxx == value):
+                touches_seam = True
+            elif axis == 'y' and (miny == value or maxy == value):
+                touches_seam = True
+        result.append( (feat.GetField(0), geom.ExportToWkb(), touches_seam) )
+
+    return result
 
-# Parse command line arguments.
-i = 1
-while i < len(argv):
-    arg = argv[i]
+# =============================================================================
+# 	MergeSeamPolygons()
+#
+#	Merge the polygons, coming from different tiles, that have the same DN
+#	and share a boundary (or a corner in 8 connectedness mode). Yields
+#	(DN, geometry) tuples.
+#
+#	In 8 connectedness mode, polygons only sharing a corner are merged
+#	into a MultiPolygon, since a polygon whose ring touches itself at a
+#	vertex is not valid for GEOS. The single pass polygonization returns
+#	such a self-touching Polygon instead.
+# =============================================================================
 
-    if arg == '-f':
-        i = i + 1
-        format = argv[i]
-
-    elif arg == '-q' or arg == '-quiet':
-        quiet_flag = 1
-
-    elif arg == '-8':
-        options.append('8CONNECTED=8')
-        
-    elif arg == '-nomask':
-        mask = 'none'
-        
-    elif arg == '-mask':
-        i = i + 1
-        mask = argv[i]
-        
-    elif arg == '-b':
-        i = i + 1
-        src_band_n = int(argv[i])
+def MergeSeamPolygons( candidates, connectedness8 ):
+
+    by_dn = {}
+    for (tile_id, dn, wkb) in candidates:
+        geom = ogr.CreateGeometryFromWkb( wkb )
+        by_dn.setdefault( dn, [] ).append( (tile_id, geom, geom.GetEnvelope()) )
+
+    for dn in by_dn:
+        polys = by_dn[dn]
+        parent = list(range(len(polys)))
+
+        def find( i ):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        # Sweep over the envelopes sorted by minx to only test pairs of
+        # polygons whose envelopes intersect or touch.
+        order = sorted( range(len(polys)), key = lambda i: polys[i][2][0] )
+        active = []
+        for i in order:
+            (tile_i, geom_i, env_i) = polys[i]
+            active = [ j for j in active if polys[j][2][1] >= env_i[0] ]
+            for j in active:
+                (tile_j, geom_j, env_j) = polys[j]
+                if tile_i == tile_j or env_j[3] < env_i[2] or env_j[2] > env_i[3]:
+                    continue
+                if find(i) == find(j):
+                    continue
+                inter = geom_i.Intersection( geom_j )
+                if inter is None or inter.IsEmpty():
+                    continue
+                # Polygons only touching at a corner are distinct in 4
+                # connectedness mode
+                if connectedness8 or \
+                   ogr.GT_Flatten(inter.GetGeometryType()) not in (ogr.wkbPoint, ogr.wkbMultiPoint):
+                    parent[find(i)] = find(j)
+            active.append( i )
+
+        groups = {}
+        for i in range(len(polys)):
+            groups.setdefault( find(i), [] ).append( polys[i][1] )
+
+        for root in groups:
+            group = groups[root]
+            if len(group) == 1:
+                yield (dn, group[0])
+            else:
+                multi = ogr.Geometry( ogr.wkbMultiPolygon )
+                for geom in group:
+                    multi.AddGeometry( geom )
+                yield (dn, multi.UnionCascaded())
+
+# =============================================================================
+# 	PixelToGeoref()
+#
+#	Transform in place a geometry from pixel coordinates to georeferenced
+#	coordinates, as GDALPolygonize() does with the source geotransform.
+# =============================================================================
+
+def PixelToGeoref( geom, gt ):
+
+    for i in range(geom.GetGeometryCount()):
+        PixelToGeoref( geom.GetGeometryRef(i), gt )
 
-    elif src_filename is None:
-        src_filename = argv[i]
+    for i in range(geom.GetPointCount()):
+        (px, py) = (geom.GetX(i), geom.GetY(i))
+        geom.SetPoint_2D( i, gt[0] + px * gt[1] + py * gt[2],
+                             gt[3] + px * gt[4] + py * gt[5] )
 
-    elif dst_filename is None:
-        dst_filename = argv[i]
+# =============================================================================
+# 	PolygonizeTiled()
+# =============================================================================
 
-    elif dst_layername is None:
-        dst_layername = argv[i]
+def PolygonizeTiled( src_filename, src_band_n, mask, options, dst_layer, dst_field,
+                     tile_size, num_jobs, group_transaction, quiet_flag ):
 
-    elif dst_fieldname is None:
-        dst_fieldname = argv[i]
+    src_ds = gdal.Open( src_filename )
+    (xsize, ysize) = (src_ds.RasterXSize, src_ds.RasterYSize)
+    gt = src_ds.GetGeoTransform()
+    src_ds = None
 
+    tiles = []
+    for yoff in range(0, ysize, tile_size):
+        for xoff in range(0, xsize, tile_size):
+            tiles.append( (src_filename, src_band_n, mask, options, xoff, yoff,
+                           min(tile_size, xsize - xoff), min(tile_size, ysize - yoff)) )
+
+    if quiet_flag:
+        prog_func = None
+    else:
+        prog_func = gdal.TermProgress_nocb
+
+    state = { 'count': 0 }
+    dst_layer.StartTransaction()
+
+    def write( dn, geom ):
+        feat = ogr.Feature( dst_layer.GetLayerDefn() )
+        if dst_field >= 0:
+            feat.SetField( dst_field, dn )
+        PixelToGeoref( geom, gt )
+        feat.SetGeometry( geom )
+        dst_layer.CreateFeature( feat )
+        state['count'] += 1
+        if state['count'] % group_transaction == 0:
+            dst_layer.CommitTransaction()
+            dst_layer.StartTransaction()
+
+    if num_jobs > 1:
+        pool = multiprocessing.Pool( num_jobs )
+        results = pool.imap( PolygonizeTile, tiles )
     else:
+        pool = None
+        results = ( PolygonizeTile( tile ) for tile in tiles )
+
+    candidates = []
+    for (tile_id, result) in enumerate(results):
+        for (dn, wkb, touches_seam) in result:
+            if touches_seam:
+                candidates.append( (tile_id, dn, wkb) )
+            else:
+                write( dn, ogr.CreateGeometryFromWkb( wkb ) )
+        if prog_func is not None:
+            prog_func( 0.9 * (tile_id + 1) / len(tiles) )
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    for (dn, geom) in MergeSeamPolygons( candidates, '8CONNECTED=8' in options ):
+        write( dn, geom )
+
+    dst_layer.CommitTransaction()
+
+    if prog_func is not None:
+        prog_func( 1.0 )
+
+    return 0
+
+# =============================================================================
+# 	Mainline
+# =============================================================================
+
+def main( argv ):
+
+    format = 'GML'
+    options = []
+    quiet_flag = 0
+    src_filename = None
+    src_band_n = 1
+
+    dst_filename = None
+    dst_layername = None
+    dst_fieldname = None
+    dst_field = -1
+
+    mask = 'default'
+
+    tile_size = None
+    num_jobs = 1
+    group_transaction = 20000
+
+    gdal.AllRegister()
+    argv = gdal.GeneralCmdLineProcessor( argv )
+    if argv is None:
+        return 0
+
+    # Parse command line arguments.
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == '-f':
+            i = i + 1
+            format = argv[i]
+
+        elif arg == '-q' or arg == '-quiet':
+            quiet_flag = 1
+
+        elif arg == '-8':
+            options.append('8CONNECTED=8')
+
+        elif arg == '-nomask':
+            mask = 'none'
+
+        elif arg == '-mask':
+            i = i + 1
+            mask = argv[i]
+
+        elif arg == '-b':
+            i = i + 1
+            src_band_n = int(argv[i])
+
+        elif arg == '-tile':
+            i = i + 1
+            tile_size = int(argv[i])
+
+        elif arg == '-j':
+            i = i + 1
+            num_jobs = int(argv[i])
+
+        elif arg == '-gt':
+            i = i + 1
+            group_transaction = int(argv[i])
+
+        elif src_filename is None:
+            src_filename = argv[i]
+
+        elif dst_filename is None:
+            dst_filename = argv[i]
+
+        elif dst_layername is None:
+            dst_layername = argv[i]
+
+        elif dst_fieldname is None:
+            dst_fieldname = argv[i]
+
+        else:
+            Usage()
+
+        i = i + 1
+
+    if src_filename is None or dst_filename is None:
         Usage()
 
-    i = i + 1
+    if dst_layername is None:
+        dst_layername = 'out'
 
-if src_filename is None or dst_filename is None:
-    Usage()
+    if num_jobs > 1 and tile_size is None:
+        tile_size = 4096
 
-if dst_layername is None:
-    dst_layername = 'out'
-    
 # =============================================================================
 # 	Verify we have next gen bindings with the polygonize method.
 # =============================================================================
-try:
-    gdal.Polygonize
-except:
-    print('')
-    print('gdal.Polygonize() not available.  You are likely using "old gen"')
-    print('bindings or an older version of the next gen bindings.')
-    print('')
-    sys.exit(1)
+    try:
+        gdal.Polygonize
+    except:
+        print('')
+        print('gdal.Polygonize() not available.  You are likely using "old gen"')
+        print('bindings or an older version of the next gen bindings.')
+        print('')
+        return 1
 
 # =============================================================================
 #	Open source file
 # =============================================================================
 
-src_ds = gdal.Open( src_filename )
-    
-if src_ds is None:
-    print('Unable to open %s' % src_filename)
-    sys.exit(1)
+    src_ds = gdal.Open( src_filename )
+
+    if src_ds is None:
+        print('Unable to open %s' % src_filename)
+        return 1
 
-srcband = src_ds.GetRasterBand(src_band_n)
+    srcband = src_ds.GetRasterBand(src_band_n)
 
-if mask is 'default':
-    maskband = srcband.GetMaskBand()
-elif mask is 'none':
-    maskband = None
-else:
-    mask_ds = gdal.Open( mask )
-    maskband = mask_ds.GetRasterBand(1)
+    mask_ds = None
+    if mask == 'default':
+        maskband = srcband.GetMaskBand()
+    elif mask == 'none':
+        maskband = None
+    else:
+        mask_ds = gdal.Open( mask )
+        maskband = mask_ds.GetRasterBand(1)
 
 # =============================================================================
 #       Try opening the destination file as an existing file.
 # =============================================================================
 
-try:
-    gdal.PushErrorHandler( 'CPLQuietErrorHandler' )
-    dst_ds = ogr.Open( dst_filename, update=1 )
-    gdal.PopErrorHandler()
-except:
-    dst_ds = None
+    try:
+        gdal.PushErrorHandler( 'CPLQuietErrorHandler' )
+        dst_ds = ogr.Open( dst_filename, update=1 )
+        gdal.PopErrorHandler()
+    except:
+        dst_ds = None
 
 # =============================================================================
 # 	Create output file.
 # =============================================================================
-if dst_ds is None:
-    drv = ogr.GetDriverByName(format)
-    if not quiet_flag:
-        print('Creating output %s of format %s.' % (dst_filename, format))
-    dst_ds = drv.CreateDataSource( dst_filename )
+    if dst_ds is None:
+        drv = ogr.GetDriverByName(format)
+        if not quiet_flag:
+            print('Creating output %s of format %s.' % (dst_filename, format))
+        dst_ds = drv.CreateDataSource( dst_filename )
 
 # =============================================================================
 #       Find or create destination layer.
 # =============================================================================
-try:
-    dst_layer = dst_ds.GetLayerByName(dst_layername)
-except:
-    dst_layer = None
-
-if dst_layer is None:
-
-    srs = None
-    if src_ds.GetProjectionRef() != '':
-        srs = osr.SpatialReference()
-        srs.ImportFromWkt( src_ds.GetProjectionRef() )
-        
-    dst_layer = dst_ds.CreateLayer(dst_layername, srs = srs )
-
-    if dst_fieldname is None:
-        dst_fieldname = 'DN'
-        
-    fd = ogr.FieldDefn( dst_fieldname, ogr.OFTInteger )
-    dst_layer.CreateField( fd )
-    dst_field = 0
-else:
-    if dst_fieldname is not None:
-        dst_field = dst_layer.GetLayerDefn().GetFieldIndex(dst_fieldname)
-        if dst_field < 0:
-            print("Warning: cannot find field '%s' in layer '%s'" % (dst_fieldname, dst_layername))
+    try:
+        dst_layer = dst_ds.GetLayerByName(dst_layername)
+    except:
+        dst_layer = None
 
-# =============================================================================
-#	Invoke algorithm.
-# =============================================================================
+    if dst_layer is None:
 
-if quiet_flag:
-    prog_func = None
-else:
-    prog_func = gdal.TermProgress
-    
-result = gdal.Polygonize( srcband, maskband, dst_layer, dst_field, options,
-                          callback = prog_func )
-    
-srcband = None
-src_ds = None
-dst_ds = None
-mask_ds = None
+        srs = None
+        if src_ds.GetProjectionRef() != '':
+            srs = osr.SpatialReference()
+            srs.ImportFromWkt( src_ds.GetProjectionRef() )
 
+        dst_layer = dst_ds.CreateLayer(dst_layername, srs = srs )
 
+        if dst_fieldname is None:
+            dst_fieldname = 'DN'
 
+        fd = ogr.FieldDefn( dst_fieldname, ogr.OFTInteger )
+        dst_layer.CreateField( fd )
+        dst_field = 0
+    else:
+        if dst_fieldname is not None:
+            dst_field = dst_layer.GetLayerDefn().GetFieldIndex(dst_fieldname)
+            if dst_field < 0:
+                print("Warning: cannot find field '%s' in layer '%s'" % (dst_fieldname, dst_layername))
+
+# =============================================================================
+#	Invoke algorithm.
+# =============================================================================
+
+    if tile_size is not None:
+        srcband = None
+        src_ds = None
+        maskband = None
+        mask_ds = None
+        result = PolygonizeTiled( src_filename, src_band_n, mask, options,
+                                  dst_layer, dst_field, tile_size, num_jobs,
+                                  group_transaction, quiet_flag )
+    else:
+        if quiet_flag:
+            prog_func = None
+        else:
+            prog_func = gdal.TermProgress
 
+        result = gdal.Polygonize( srcband, maskband, dst_layer, dst_field, options,
+                                  callback = prog_func )
 
+    srcband = None
+    src_ds = None
+    dst_ds = None
+    mask_ds = None
 
+    return 0
 
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -27,15 +27,15 @@
 #  THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
 #  FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
-#  DEALINGS IN THE SOFTWARE.
-#******************************************************************************
 
 try:
     from osgeo import gdal
 except ImportError:
     import gdal
 
+import math
 import sys
+import multiprocessing
 
 def Usage():
     print("""
@@ -44,152 +44,631 @@ gdal_proximity.py srcfile dstfile [-srcband n] [-dstband n]
                   [-ot Byte/Int16/Int32/Float32/etc]
                   [-values n,n,n] [-distunits PIXEL/GEO]
                   [-maxdist n] [-nodata n] [-use_input_nodata YES/NO]
-                  [-fixed-buf-val n] [-q] """)
+                  [-fixed-buf-val n] [-q]
+                  [-exact] [-strip rows] [-j num_jobs]
+                  [-srcwin xoff yoff xsize ysize]
+                  [-nearest_value filename] [-nearest_index filename] """)
     sys.exit(1)
 
 # =============================================================================
-#     Mainline
+# 	NearestInColumns()
+#
+#	First pass of the exact distance transform. For each pixel, find
+#	the closest target pixel in the same column. rows gives the row
+#	coordinate of each line of the array, which needs not be contiguous.
+#	Returns the line index of the closest target (-1 if none), and the
+#	vertical distance to it in pixels (inf if none).
 # =============================================================================
 
-format = 'GTiff'
-creation_options = []
-options = []
-src_filename = None
-src_band_n = 1
-dst_filename = None
-dst_band_n = 1
-creation_type = 'Float32'
-quiet_flag = 0
+def NearestInColumns( target, rows ):
 
-gdal.AllRegister()
-argv = gdal.GeneralCmdLineProcessor( sys.argv )
-if argv is None:
-    sys.exit( 0 )
+    import numpy
 
-# Parse command line arguments.
-i = 1
-while i < len(argv):
-    arg = argv[i]
+    (nlines, ncols) = target.shape
+    lines = numpy.arange(nlines).reshape(nlines, 1)
+    cols = numpy.arange(ncols)
 
-    if arg == '-of':
-        i = i + 1
-        format = argv[i]
+    above = numpy.maximum.accumulate(
+        numpy.where( target, lines, -1 ), axis = 0 )
+    below = numpy.minimum.accumulate(
+        numpy.where( target, lines, nlines )[::-1], axis = 0 )[::-1]
 
-    elif arg == '-co':
-        i = i + 1
-        creation_options.append(argv[i])
+    dy_above = numpy.where( above >= 0,
+                            rows - rows[above.clip(0), cols], numpy.inf )
+    dy_below = numpy.where( below < nlines,
+                            rows[below.clip(0, nlines - 1), cols] - rows,
+                            numpy.inf )
 
-    elif arg == '-ot':
-        i = i + 1
-        creation_type = argv[i]
+    nearest = numpy.where( dy_below < dy_above, below, above )
+    return (nearest, numpy.minimum( dy_above, dy_below ))
 
-    elif arg == '-maxdist':
-        i = i + 1
-        options.append( 'MAXDIST=' + argv[i] )
+# =============================================================================
+# 	LowerEnvelope()
+#
+#	Second pass of the exact distance transform (Felzenszwalb and
+#	Huttenlocher), run on all lines at once. f holds the squared
+#	vertical distances of the first pass, and a the squared horizontal
+#	pixel size. For each pixel, returns the column of the closest target
+#	(-1 if none) and the squared distance to it.
+# =============================================================================
 
-    elif arg == '-values':
-        i = i + 1
-        options.append( 'VALUES=' + argv[i] )
+def LowerEnvelope( f, a ):
+
+    import numpy
+
+    (nlines, ncols) = f.shape
+    x = numpy.arange(ncols)
+
+    # Parabola q of a line is a * (x - q)^2 + f[q]. v holds the columns
+    # of the parabolas of the lower envelope, and z the abscissa from
+    # which each of them is the lowest one.
+    h = f + a * x.astype(numpy.float64) ** 2
+    v = numpy.zeros( (nlines, ncols), dtype = numpy.int64 )
+    z = numpy.zeros( (nlines, ncols + 1) )
+    k = numpy.zeros( nlines, dtype = numpy.int64 ) - 1
+
+    finite = numpy.isfinite( f )
+    for q in range(ncols):
+        pending = numpy.flatnonzero( finite[:, q] )
+        while len(pending) > 0:
+            kp = k[pending]
+            top = kp.clip(0)
+            has_top = kp >= 0
+            p = v[pending, top]
+            s = numpy.where( has_top,
+                             (h[pending, q] - h[pending, p])
+                             / (2 * a * numpy.where( has_top, q - p, 1 )),
+                             -numpy.inf )
+
+            # Parabolas hidden by the new one are removed from the stack
+            pop = has_top & (s <= z[pending, top])
+            push = pending[~pop]
+            kp = kp[~pop] + 1
+            v[push, kp] = q
+            z[push, kp] = s[~pop]
+            z[push, kp + 1] = numpy.inf
+            k[push] = kp
+
+            pending = pending[pop]
+            k[pending] = k[pending] - 1
+
+    # Locate every column among the envelope boundaries of its line,
+    # all lines being searched at once by shifting each of them to its
+    # own interval.
+    nbounds = k.clip(0)
+    span = ncols + 2
+    shift = (numpy.arange(nlines) * span).reshape(nlines, 1)
+    in_use = x.reshape(1, ncols) < nbounds.reshape(nlines, 1)
+    bounds = (z[:, 1:].clip(-1, ncols) + shift)[in_use]
+    pos = numpy.searchsorted( bounds, (x + shift).ravel() ).reshape(nlines, ncols)
+    first = (numpy.cumsum(nbounds) - nbounds).reshape(nlines, 1)
+    nearest = v[numpy.arange(nlines).reshape(nlines, 1), pos - first]
+
+    empty = (k < 0).reshape(nlines, 1)
+    nearest = numpy.where( empty, -1, nearest )
+    dist_sq = numpy.where( empty, numpy.inf,
+                           a * (x - nearest) ** 2
+                           + f[numpy.arange(nlines).reshape(nlines, 1),
+                               nearest.clip(0)] )
+    return (nearest, dist_sq)
 
-    elif arg == '-distunits':
-        i = i + 1
-        options.append( 'DISTUNITS=' + argv[i] )
+# =============================================================================
+# 	ProximityWindow()
+#
+#	Worker function: compute the exact proximity of the target area
+#	from the pixels of the window. seeds optionally gives, for each
+#	column of the window, the row and value of the closest target pixel
+#	above and below the window (row -1 if none).
+# =============================================================================
 
-    elif arg == '-nodata':
-        i = i + 1
-        options.append( 'NODATA=' + argv[i] )
+def ProximityWindow( args ):
+
+    (src_filename, src_band_n, params, window, target, seeds) = args
+    (xoff, yoff, xsize, ysize) = window
+    (txoff, tyoff, txsize, tysize) = target
+
+    import numpy
+
+    src_ds = gdal.Open( src_filename )
+    srcband = src_ds.GetRasterBand(src_band_n)
+    raster_xsize = src_ds.RasterXSize
+
+    # Pixel values are processed as integers, like in ComputeProximity()
+    values = srcband.ReadAsArray( xoff, yoff, xsize, ysize,
+                                  buf_type = gdal.GDT_Int32 )
+    is_target = IsTarget( values, params['values'] )
+
+    # Pad the window with a line above and below holding the seeds
+    rows = numpy.zeros( (ysize + 2, xsize), dtype = numpy.int64 )
+    rows[1:-1] = numpy.arange(yoff, yoff + ysize).reshape(ysize, 1)
+    ext_values = numpy.zeros( (ysize + 2, xsize), dtype = values.dtype )
+    ext_values[1:-1] = values
+    ext_target = numpy.zeros( (ysize + 2, xsize), dtype = bool )
+    ext_target[1:-1] = is_target
+    if seeds is not None:
+        (above_row, above_value, below_row, below_value) = seeds
+        rows[0] = above_row
+        rows[-1] = below_row
+        ext_values[0] = above_value
+        ext_values[-1] = below_value
+        ext_target[0] = above_row >= 0
+        ext_target[-1] = below_row >= 0
+
+    (near_line, dy) = NearestInColumns( ext_target, rows )
+
+    first_line = 1 + tyoff - yoff
+    lines = slice(first_line, first_line + tysize)
+    (pixel_xsize, pixel_ysize) = params['pixel_size']
+    f = (dy[lines] * pixel_ysize) ** 2
+    (near_col, dist_sq) = LowerEnvelope( f, pixel_xsize * pixel_xsize )
+
+    cols = slice(txoff - xoff, txoff - xoff + txsize)
+    near_col = near_col[:, cols]
+    dist = numpy.sqrt( dist_sq[:, cols] )
+
+    maxdist = params['maxdist']
+    if maxdist is None:
+        found = near_col >= 0
+    else:
+        found = (near_col >= 0) & (dist <= maxdist)
+
+    prox = dist.astype(numpy.float32)
+    if params['fixed_buf_val'] is not None:
+        prox[found & (dist > 0)] = params['fixed_buf_val']
+    prox[~found] = params['nodata']
+    if params['src_nodata'] is not None:
+        is_nodata = values[tyoff - yoff:tyoff - yoff + tysize, cols] \
+                    == params['src_nodata']
+        prox[is_nodata & ~is_target[tyoff - yoff:tyoff - yoff + tysize, cols]] \
+                    = params['nodata']
+
+    near_value = None
+    near_index = None
+    if params['want_value'] or params['want_index']:
+        near_col = near_col.clip(0)
+        near_line = near_line[lines][numpy.arange(tysize).reshape(tysize, 1),
+                                     near_col]
+        if params['want_value']:
+            near_value = numpy.where( found,
+                                      ext_values[near_line, near_col],
+                                      params['value_nodata'] )
+        if params['want_index']:
+            near_index = numpy.where( found,
+                                      rows[near_line, near_col] * raster_xsize
+                                      + xoff + near_col, -1 ).astype(numpy.float64)
+
+    return (target, prox, near_value, near_index)
 
-    elif arg == '-use_input_nodata':
-        i = i + 1
-        options.append( 'USE_INPUT_NODATA=' + argv[i] )
+# =============================================================================
+# 	IsTarget()
+# =============================================================================
 
-    elif arg == '-fixed-buf-val':
-        i = i + 1
-        options.append( 'FIXED_BUF_VAL=' + argv[i] )
+def IsTarget( values, target_values ):
 
-    elif arg == '-srcband':
-        i = i + 1
-        src_band_n = int(argv[i])
+    import numpy
 
-    elif arg == '-dstband':
-        i = i + 1
-        dst_band_n = int(argv[i])
+    if target_values is None:
+        return values != 0
+    is_target = numpy.zeros( values.shape, dtype = bool )
+    for value in target_values:
+        is_target |= values == value
+    return is_target
 
-    elif arg == '-q' or arg == '-quiet':
-        quiet_flag = 1
+# =============================================================================
+# 	ComputeSeeds()
+#
+#	When no maximum distance bounds the search, scan the columns of the
+#	processed area once downwards and once upwards to find, for each
+#	strip, the closest target pixels above and below it.
+# =============================================================================
 
-    elif src_filename is None:
-        src_filename = argv[i]
+def ComputeSeeds( srcband, target_values, xoff, xsize, strips, strip_size ):
+
+    import numpy
+
+    ysize = srcband.YSize
+    starts = [ strip[1] for strip in strips ]
+    ends = [ strip[1] + strip[3] for strip in strips ]
+    bounds = set( starts + ends + [0, ysize] )
+    bounds.update( range(starts[0], -1, -strip_size) )
+    bounds.update( range(ends[-1], ysize, strip_size) )
+    bounds = sorted(bounds)
+    chunks = [ (bounds[i], bounds[i+1]) for i in range(len(bounds) - 1) ]
+
+    above = {}
+    below = {}
+    for (direction, record) in ( (1, above), (-1, below) ):
+        seed_row = numpy.zeros( xsize, dtype = numpy.int64 ) - 1
+        seed_value = numpy.zeros( xsize, dtype = numpy.int32 )
+        for (y0, y1) in chunks[::direction]:
+            if direction > 0 and y0 in starts:
+                record[y0] = (seed_row.copy(), seed_value.copy())
+            if direction < 0 and y1 in ends:
+                record[y1] = (seed_row.copy(), seed_value.copy())
+
+            values = srcband.ReadAsArray( xoff, y0, xsize, y1 - y0,
+                                          buf_type = gdal.GDT_Int32 )
+            is_target = IsTarget( values, target_values )
+            has_target = is_target.any( axis = 0 )
+            if direction > 0:
+                line = (y1 - y0 - 1) - is_target[::-1].argmax( axis = 0 )
+            else:
+                line = is_target.argmax( axis = 0 )
+            cols = numpy.flatnonzero( has_target )
+            seed_row[cols] = y0 + line[cols]
+            seed_value[cols] = values[line[cols], cols]
+
+    return [ above[strip[1]] + below[strip[1] + strip[3]] for strip in strips ]
 
-    elif dst_filename is None:
-        dst_filename = argv[i]
+# =============================================================================
+# 	ProximityTiled()
+# =============================================================================
 
+def ProximityTiled( src_filename, src_band_n, params, dstband,
+                    value_band, index_band, srcwin, strip_size, num_jobs,
+                    quiet_flag ):
+
+    src_ds = gdal.Open( src_filename )
+    srcband = src_ds.GetRasterBand(src_band_n)
+    (xsize, ysize) = (src_ds.RasterXSize, src_ds.RasterYSize)
+    (axoff, ayoff, axsize, aysize) = srcwin
+
+    strips = []
+    for yoff in range(ayoff, ayoff + aysize, strip_size):
+        strips.append( (axoff, yoff, axsize,
+                        min(strip_size, ayoff + aysize - yoff)) )
+
+    # With a maximum distance, any target pixel within reach of a strip
+    # lies in a bounded halo around it. Otherwise all the columns are
+    # needed, and the closest target pixels outside the strips are
+    # passed along with them.
+    maxdist = params['maxdist']
+    (pixel_xsize, pixel_ysize) = params['pixel_size']
+    if maxdist is not None:
+        xhalo = int(math.ceil(maxdist / pixel_xsize))
+        yhalo = int(math.ceil(maxdist / pixel_ysize))
+        x0 = max(0, axoff - xhalo)
+        x1 = min(xsize, axoff + axsize + xhalo)
+        all_seeds = [ None for strip in strips ]
     else:
+        yhalo = 0
+        x0 = 0
+        x1 = xsize
+        all_seeds = ComputeSeeds( srcband, params['values'], x0, x1 - x0,
+                                  strips, strip_size )
+
+    srcband = None
+    src_ds = None
+
+    jobs = []
+    for (strip, seeds) in zip(strips, all_seeds):
+        y0 = max(0, strip[1] - yhalo)
+        y1 = min(ysize, strip[1] + strip[3] + yhalo)
+        jobs.append( (src_filename, src_band_n, params,
+                      (x0, y0, x1 - x0, y1 - y0), strip, seeds) )
+
+    if num_jobs > 1:
+        pool = multiprocessing.Pool( num_jobs )
+        results = pool.imap_unordered( ProximityWindow, jobs )
+    else:
+        pool = None
+        results = ( ProximityWindow( job ) for job in jobs )
+
+    done = 0
+    for (target, prox, near_value, near_index) in results:
+        dstband.WriteArray( prox, target[0], target[1] )
+        if value_band is not None:
+            value_band.WriteArray( near_value, target[0], target[1] )
+        if index_band is not None:
+            index_band.WriteArray( near_index, target[0], target[1] )
+        done = done + 1
+        if not quiet_flag:
+            gdal.TermProgress_nocb( float(done) / len(jobs) )
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    return 0
+
+# =============================================================================
+# 	CreateNearestBand()
+# =============================================================================
+
+def CreateNearestBand( filename, format, creation_options, src_ds,
+                       data_type, nodata ):
+
+    drv = gdal.GetDriverByName(format)
+    ds = drv.Create( filename, src_ds.RasterXSize, src_ds.RasterYSize, 1,
+                     data_type, creation_options )
+    ds.SetGeoTransform( src_ds.GetGeoTransform() )
+    ds.SetProjection( src_ds.GetProjectionRef() )
+    ds.GetRasterBand(1).SetNoDataValue( nodata )
+    return ds
+
+# =============================================================================
+# 	Mainline
+# =============================================================================
+
+def main( argv ):
+
+    format = 'GTiff'
+    creation_options = []
+    options = []
+    src_filename = None
+    src_band_n = 1
+    dst_filename = None
+    dst_band_n = 1
+    creation_type = 'Float32'
+    quiet_flag = 0
+
+    exact = False
+    strip_size = None
+    num_jobs = 1
+    srcwin = None
+    value_filename = None
+    index_filename = None
+
+    gdal.AllRegister()
+    argv = gdal.GeneralCmdLineProcessor( argv )
+    if argv is None:
+        return 0
+
+    # Parse command line arguments.
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == '-of':
+            i = i + 1
+            format = argv[i]
+
+        elif arg == '-co':
+            i = i + 1
+            creation_options.append(argv[i])
+
+        elif arg == '-ot':
+            i = i + 1
+            creation_type = argv[i]
+
+        elif arg == '-maxdist':
+            i = i + 1
+            options.append( 'MAXDIST=' + argv[i] )
+
+        elif arg == '-values':
+            i = i + 1
+            options.append( 'VALUES=' + argv[i] )
+
+        elif arg == '-distunits':
+            i = i + 1
+            options.append( 'DISTUNITS=' + argv[i] )
+
+        elif arg == '-nodata':
+            i = i + 1
+            options.append( 'NODATA=' + argv[i] )
+
+        elif arg == '-use_input_nodata':
+            i = i + 1
+            options.append( 'USE_INPUT_NODATA=' + argv[i] )
+
+        elif arg == '-fixed-buf-val':
+            i = i + 1
+            options.append( 'FIXED_BUF_VAL=' + argv[i] )
+
+        elif arg == '-srcband':
+            i = i + 1
+            src_band_n = int(argv[i])
+
+        elif arg == '-dstband':
+            i = i + 1
+            dst_band_n = int(argv[i])
+
+        elif arg == '-q' or arg == '-quiet':
+            quiet_flag = 1
+
+        elif arg == '-exact':
+            exact = True
+
+        elif arg == '-strip':
+            i = i + 1
+            strip_size = int(argv[i])
+            exact = True
+
+        elif arg == '-j':
+            i = i + 1
+            num_jobs = int(argv[i])
+            exact = True
+
+        elif arg == '-srcwin' and i < len(argv)-4:
+            srcwin = (int(argv[i+1]), int(argv[i+2]),
+                      int(argv[i+3]), int(argv[i+4]))
+            i = i + 4
+            exact = True
+
+        elif arg == '-nearest_value':
+            i = i + 1
+            value_filename = argv[i]
+            exact = True
+
+        elif arg == '-nearest_index':
+            i = i + 1
+            index_filename = argv[i]
+            exact = True
+
+        elif src_filename is None:
+            src_filename = argv[i]
+
+        elif dst_filename is None:
+            dst_filename = argv[i]
+
+        else:
+            Usage()
+
+        i = i + 1
+
+    if src_filename is None or dst_filename is None:
         Usage()
 
-    i = i + 1
+    if exact:
+        try:
+            import numpy
+        except ImportError:
+            print('The -exact mode requires NumPy.')
+            return 1
 
-if src_filename is None or dst_filename is None:
-    Usage()
-    
 # =============================================================================
 #    Open source file
 # =============================================================================
 
-src_ds = gdal.Open( src_filename )
-    
-if src_ds is None:
-    print('Unable to open %s' % src_filename)
-    sys.exit(1)
+    src_ds = gdal.Open( src_filename )
+
+    if src_ds is None:
+        print('Unable to open %s' % src_filename)
+        return 1
 
-srcband = src_ds.GetRasterBand(src_band_n)
+    srcband = src_ds.GetRasterBand(src_band_n)
 
 # =============================================================================
 #       Try opening the destination file as an existing file.
 # =============================================================================
 
-try:
-    driver = gdal.IdentifyDriver( dst_filename )
-    if driver is not None:
-        dst_ds = gdal.Open( dst_filename, gdal.GA_Update )
-        dstband = dst_ds.GetRasterBand(dst_band_n)
-    else:
+    try:
+        driver = gdal.IdentifyDriver( dst_filename )
+        if driver is not None:
+            dst_ds = gdal.Open( dst_filename, gdal.GA_Update )
+            dstband = dst_ds.GetRasterBand(dst_band_n)
+        else:
+            dst_ds = None
+    except:
         dst_ds = None
-except:
-    dst_ds = None
 
 # =============================================================================
 #     Create output file.
 # =============================================================================
-if dst_ds is None:
-    drv = gdal.GetDriverByName(format)
-    dst_ds = drv.Create( dst_filename,
-                         src_ds.RasterXSize, src_ds.RasterYSize, 1,
-                         gdal.GetDataTypeByName(creation_type), creation_options )
+    dst_created = dst_ds is None
+    if dst_created:
+        drv = gdal.GetDriverByName(format)
+        dst_ds = drv.Create( dst_filename,
+                             src_ds.RasterXSize, src_ds.RasterYSize, 1,
+                             gdal.GetDataTypeByName(creation_type), creation_options )
+
+        dst_ds.SetGeoTransform( src_ds.GetGeoTransform() )
+        dst_ds.SetProjection( src_ds.GetProjectionRef() )
 
-    dst_ds.SetGeoTransform( src_ds.GetGeoTransform() )
-    dst_ds.SetProjection( src_ds.GetProjectionRef() )
-    
-    dstband = dst_ds.GetRasterBand(1)
+        dstband = dst_ds.GetRasterBand(1)
 
 # =============================================================================
 #    Invoke algorithm.
 # =============================================================================
 
-if quiet_flag:
-    prog_func = None
-else:
-    prog_func = gdal.TermProgress
-    
-gdal.ComputeProximity( srcband, dstband, options,
-                       callback = prog_func )
-    
-srcband = None
-dstband = None
-src_ds = None
-dst_ds = None
+    if quiet_flag:
+        prog_func = None
+    else:
+        prog_func = gdal.TermProgress
+
+    if not exact:
+        gdal.ComputeProximity( srcband, dstband, options,
+                               callback = prog_func )
+
+        srcband = None
+        dstband = None
+        src_ds = None
+        dst_ds = None
+
+        return 0
+
+# =============================================================================
+#    Exact distance transform, computed by strips of lines.
+# =============================================================================
+
+    opts = dict( [ option.split('=', 1) for option in options ] )
 
+    params = {}
+    params['values'] = None
+    if 'VALUES' in opts:
+        params['values'] = [ int(float(value))
+                             for value in opts['VALUES'].split(',') ]
 
+    params['pixel_size'] = (1.0, 1.0)
+    if opts.get('DISTUNITS', 'PIXEL').upper() == 'GEO':
+        gt = src_ds.GetGeoTransform()
+        params['pixel_size'] = (abs(gt[1]), abs(gt[5]))
 
+    params['maxdist'] = None
+    if 'MAXDIST' in opts:
+        params['maxdist'] = float(opts['MAXDIST'])
+
+    if 'NODATA' in opts:
+        params['nodata'] = float(opts['NODATA'])
+    else:
+        params['nodata'] = dstband.GetNoDataValue()
+        if params['nodata'] is None:
+            params['nodata'] = 65535.0
+
+    params['fixed_buf_val'] = None
+    if 'FIXED_BUF_VAL' in opts:
+        params['fixed_buf_val'] = float(opts['FIXED_BUF_VAL'])
+
+    params['src_nodata'] = None
+    if opts.get('USE_INPUT_NODATA', 'NO').upper() in ('YES', 'ON', 'TRUE', '1'):
+        params['src_nodata'] = srcband.GetNoDataValue()
+
+    params['value_nodata'] = srcband.GetNoDataValue()
+    if params['value_nodata'] is None:
+        params['value_nodata'] = 0
+    params['want_value'] = value_filename is not None
+    params['want_index'] = index_filename is not None
+
+    value_ds = None
+    value_band = None
+    if value_filename is not None:
+        value_ds = CreateNearestBand( value_filename, format, creation_options,
+                                      src_ds, srcband.DataType,
+                                      params['value_nodata'] )
+        value_band = value_ds.GetRasterBand(1)
+
+    index_ds = None
+    index_band = None
+    if index_filename is not None:
+        index_ds = CreateNearestBand( index_filename, format, creation_options,
+                                      src_ds, gdal.GDT_Float64, -1 )
+        index_band = index_ds.GetRasterBand(1)
+
+    if srcwin is None:
+        srcwin = (0, 0, src_ds.RasterXSize, src_ds.RasterYSize)
+
+    # Only the pixels of the window are computed: the ones outside of it
+    # are set to nodata in the files that are created here.
+    if srcwin != (0, 0, src_ds.RasterXSize, src_ds.RasterYSize):
+        if dst_created:
+            dstband.SetNoDataValue( params['nodata'] )
+            dstband.Fill( params['nodata'] )
+        if value_band is not None:
+            value_band.Fill( params['value_nodata'] )
+        if index_band is not None:
+            index_band.Fill( -1 )
+
+    if strip_size is None:
+        if num_jobs > 1:
+            strip_size = max(1, int(math.ceil(float(srcwin[3]) / (4 * num_jobs))))
+        else:
+            strip_size = srcwin[3]
+        strip_size = min(strip_size, 1024)
+
+    result = ProximityTiled( src_filename, src_band_n, params, dstband,
+                             value_band, index_band, srcwin, strip_size,
+                             num_jobs, quiet_flag )
+
+    srcband = None
+    dstband = None
+    value_band = None
+    index_band = None
+    src_ds = None
+    dst_ds = None
+    value_ds = None
+    index_ds = None
 
+    return result
 
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
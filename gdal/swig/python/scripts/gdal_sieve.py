@@ -35,156 +35,460 @@ except ImportError:
     import gdal
 
 import sys
+import multiprocessing
 
 def Usage():
     print("""
 gdal_sieve [-q] [-st threshold] [-4] [-8] [-o name=value]
+           [-tile size] [-j num_jobs]
            srcfile [-nomask] [-mask filename] [-of format] [dstfile]
 """)
     sys.exit(1)
-    
+
 # =============================================================================
-# 	Mainline
+# 	LabelRegions()
+#
+#	Connected component labelling of the valid pixels sharing the same
+#	value, by repeated hooking of the roots of adjacent pixels and
+#	pointer jumping. Returns the label array, and the pixel index pairs
+#	of adjacent valid pixels belonging to different regions.
+#
+#	Pixel indices are int32, and the pairs of adjacent pixels are
+#	filtered direction by direction, so that only the pairs of valid
+#	pixels are held, on 8 bytes each. In the worst case of a window made
+#	of small regions, the labelling needs about 40 bytes per pixel with 4
+#	connectedness, and 65 with 8 connectedness.
 # =============================================================================
 
-threshold = 2
-connectedness = 4
-options = []
-quiet_flag = 0
-src_filename = None
+def LabelRegions( values, valid, connectedness ):
 
-dst_filename = None
-format = 'GTiff'
+    import numpy
 
-mask = 'default'
+    (ysize, xsize) = values.shape
+    flat_values = values.ravel()
 
-gdal.AllRegister()
-argv = gdal.GeneralCmdLineProcessor( sys.argv )
-if argv is None:
-    sys.exit( 0 )
+    # (row offset, column offset) of the neighbours of a pixel that come
+    # after it
+    directions = [ (0, 1), (1, 0) ]
+    if connectedness == 8:
+        directions += [ (1, 1), (1, -1) ]
 
-# Parse command line arguments.
-i = 1
-while i < len(argv):
-    arg = argv[i]
+    same_pairs = []
+    other_pairs = []
+    for (dy, dx) in directions:
+        x0 = max(0, -dx)
+        x1 = xsize - max(0, dx)
+        both_valid = valid[0:ysize-dy, x0:x1] & valid[dy:ysize, x0+dx:x1+dx]
+        (rows, cols) = numpy.nonzero( both_valid )
+        both_valid = None
+        a = rows.astype(numpy.int32) * xsize + (cols.astype(numpy.int32) + x0)
+        rows = None
+        cols = None
+        b = a + (dy * xsize + dx)
+        same = flat_values[a] == flat_values[b]
+        same_pairs.append( (a[same], b[same]) )
+        other_pairs.append( (a[~same], b[~same]) )
+        a = None
+        b = None
 
-    if arg == '-of':
-        i = i + 1
-        format = argv[i]
-
-    elif arg == '-4':
-        connectedness = 4
-        
-    elif arg == '-8':
-        connectedness = 8
-        
-    elif arg == '-q' or arg == '-quiet':
-        quiet_flag = 1
-        
-    elif arg == '-st':
-        i = i + 1
-        threshold = int(argv[i])
-        
-    elif arg == '-nomask':
-        mask = 'none'
-        
-    elif arg == '-mask':
-        i = i + 1
-        mask = argv[i]
-        
-    elif arg == '-mask':
-        i = i + 1
-        mask = argv[i]
-        
-    elif arg[:2] == '-h':
-        Usage()
-        
-    elif src_filename is None:
-        src_filename = argv[i]
+    sa = numpy.concatenate( [ pair[0] for pair in same_pairs ] )
+    sb = numpy.concatenate( [ pair[1] for pair in same_pairs ] )
+    same_pairs = None
+    na = numpy.concatenate( [ pair[0] for pair in other_pairs ] )
+    nb = numpy.concatenate( [ pair[1] for pair in other_pairs ] )
+    other_pairs = None
+
+    parent = numpy.arange(xsize * ysize, dtype = numpy.int32)
+    while True:
+        (pa, pb) = (parent[sa], parent[sb])
+        not_merged = pa != pb
+        if not not_merged.any():
+            break
+        (sa, sb) = (sa[not_merged], sb[not_merged])
+        (pa, pb) = (pa[not_merged], pb[not_merged])
+        numpy.minimum.at( parent, numpy.maximum(pa, pb), numpy.minimum(pa, pb) )
+        while True:
+            grand_parent = parent[parent]
+            if (grand_parent == parent).all():
+                break
+            parent = grand_parent
+
+    # Number the regions in the order of their roots
+    is_root = parent == numpy.arange(xsize * ysize, dtype = numpy.int32)
+    rank = numpy.cumsum( is_root, dtype = numpy.int32 ) - 1
+    is_root = None
+    labels = rank[parent]
+    return (labels.reshape(ysize, xsize), na, nb)
+
+# =============================================================================
+# 	AnalyseWindow()
+#
+#	Given the sieve result computed on a window, determine which pixels
+#	of the target area (contained in the window, at least threshold
+#	pixels away from its edges that are not raster edges) are final.
+#
+#	Regions larger than the threshold in the window are never altered.
+#	A small region not touching the window edges is fully known, and so
+#	is its fate when all its neighbours are fully known too, or when its
+#	single truncated neighbour is already bigger than the threshold and
+#	than all other neighbours. Otherwise the region is uncertain and its
+#	bounding box is reported so that it is processed again with a larger
+#	window.
+# =============================================================================
+
+def AnalyseWindow( values, valid, sieved, threshold, connectedness,
+                   window, target, raster_size ):
+
+    import numpy
+
+    (wxoff, wyoff, wxsize, wysize) = window
+    (txoff, tyoff, txsize, tysize) = target
+
+    (labels, na, nb) = LabelRegions( values, valid, connectedness )
+    flat_labels = labels.ravel()
+    nlabels = int(flat_labels.max()) + 1
+    sizes = numpy.bincount( flat_labels[valid.ravel()], minlength = nlabels )
+
+    truncated = numpy.zeros( nlabels, dtype = bool )
+    edges = []
+    if wxoff > 0:
+        edges.append( (slice(None), 0) )
+    if wyoff > 0:
+        edges.append( (0, slice(None)) )
+    if wxoff + wxsize < raster_size[0]:
+        edges.append( (slice(None), wxsize - 1) )
+    if wyoff + wysize < raster_size[1]:
+        edges.append( (wysize - 1, slice(None)) )
+    for edge in edges:
+        truncated[ labels[edge][valid[edge]] ] = True
+
+    small = (sizes < threshold) & ~truncated
+
+    # Distinct (region, neighbour) pairs, with region being small. The
+    # pairs are made distinct before being made symmetric, and those
+    # between two regions that are not small are dropped first, to limit
+    # the memory used.
+    (p, q) = (flat_labels[na], flat_labels[nb])
+    (na, nb) = (None, None)
+    kept = small[p] | small[q]
+    (p, q) = (p[kept], q[kept])
+    kept = None
+    keys = numpy.unique( numpy.minimum(p, q).astype(numpy.int64) * nlabels +
+                         numpy.maximum(p, q) )
+    (p, q) = (keys // nlabels, keys % nlabels)
+    keys = None
+    (p, q) = (numpy.concatenate( (p, q) ), numpy.concatenate( (q, p) ))
+    selected = small[p]
+    (p, q) = (p[selected], q[selected])
+
+    exact = ~truncated[q]
+    max_exact = numpy.zeros( nlabels, dtype = numpy.int64 ) - 1
+    numpy.maximum.at( max_exact, p[exact], sizes[q[exact]] )
+    max_truncated = numpy.zeros( nlabels, dtype = numpy.int64 ) - 1
+    numpy.maximum.at( max_truncated, p[~exact], sizes[q[~exact]] )
+    count_truncated = numpy.bincount( p[~exact], minlength = nlabels )
+
+    certain = (count_truncated == 0) | \
+              ((count_truncated == 1) & (max_truncated > max_exact) &
+               (max_truncated >= threshold))
+    uncertain_labels = small & ~certain
+
+    tx = txoff - wxoff
+    ty = tyoff - wyoff
+    target_labels = labels[ty:ty+tysize, tx:tx+txsize]
+    uncertain = uncertain_labels[target_labels] & valid[ty:ty+tysize, tx:tx+txsize]
+
+    bboxes = []
+    for label in numpy.unique( target_labels[uncertain] ):
+        (rows, cols) = numpy.nonzero( labels == label )
+        bboxes.append( (wxoff + int(cols.min()), wyoff + int(rows.min()),
+                        int(cols.max() - cols.min()) + 1,
+                        int(rows.max() - rows.min()) + 1) )
 
-    elif dst_filename is None:
-        dst_filename = argv[i]
+    return (target, sieved[ty:ty+tysize, tx:tx+txsize], uncertain, bboxes)
 
+# =============================================================================
+# 	SieveWindow()
+#
+#	Worker function: run the sieve filter on a window of the source.
+# =============================================================================
+
+def SieveWindow( args ):
+
+    (src_filename, mask, threshold, connectedness, window, target) = args
+    (xoff, yoff, xsize, ysize) = window
+
+    import numpy
+    from osgeo import gdal_array
+
+    src_ds = gdal.Open( src_filename )
+    srcband = src_ds.GetRasterBand(1)
+    if mask == 'default':
+        maskband = srcband.GetMaskBand()
+    elif mask == 'none':
+        maskband = None
+    else:
+        mask_ds = gdal.Open( mask )
+        maskband = mask_ds.GetRasterBand(1)
+
+    # The sieve filter works on Int32 values
+    values = srcband.ReadAsArray( xoff, yoff, xsize, ysize, buf_type = gdal.GDT_Int32 )
+    if maskband is not None:
+        valid = maskband.ReadAsArray( xoff, yoff, xsize, ysize, buf_type = gdal.GDT_Byte ) != 0
+    else:
+        valid = numpy.ones( values.shape, dtype = bool )
+
+    tile_ds = gdal_array.OpenArray( values )
+    mask_tile_ds = gdal_array.OpenArray( valid.view(numpy.uint8) )
+    sieved = numpy.empty( values.shape, dtype = numpy.int32 )
+    out_ds = gdal_array.OpenArray( sieved, update = True )
+
+    gdal.SieveFilter( tile_ds.GetRasterBand(1), mask_tile_ds.GetRasterBand(1),
+                      out_ds.GetRasterBand(1), threshold, connectedness )
+    out_ds.FlushCache()
+    out_ds = None
+
+    return AnalyseWindow( values, valid, sieved, threshold, connectedness,
+                          window, target, (src_ds.RasterXSize, src_ds.RasterYSize) )
+
+# =============================================================================
+# 	SieveTiled()
+# =============================================================================
+
+def SieveTiled( src_filename, mask, dstband, threshold, connectedness,
+                tile_size, num_jobs, quiet_flag ):
+
+    src_ds = gdal.Open( src_filename )
+    (xsize, ysize) = (src_ds.RasterXSize, src_ds.RasterYSize)
+    src_ds = None
+
+    def expand( area, halo ):
+        (xoff, yoff, w, h) = area
+        x0 = max(0, xoff - halo)
+        y0 = max(0, yoff - halo)
+        x1 = min(xsize, xoff + w + halo)
+        y1 = min(ysize, yoff + h + halo)
+        return (x0, y0, x1 - x0, y1 - y0)
+
+    def run( targets, halo ):
+        jobs = [ (src_filename, mask, threshold, connectedness,
+                  expand(target, halo), target) for target in targets ]
+        if pool is not None:
+            return pool.imap_unordered( SieveWindow, jobs )
+        return ( SieveWindow( job ) for job in jobs )
+
+    if num_jobs > 1:
+        pool = multiprocessing.Pool( num_jobs )
     else:
+        pool = None
+
+    # Any region smaller than the threshold touching a tile is fully
+    # contained in the tile extended by threshold pixels.
+    halo = threshold
+
+    tiles = []
+    for yoff in range(0, ysize, tile_size):
+        for xoff in range(0, xsize, tile_size):
+            tiles.append( (xoff, yoff, min(tile_size, xsize - xoff),
+                           min(tile_size, ysize - yoff)) )
+
+    pending = set()
+    done = 0
+    for (target, data, uncertain, bboxes) in run( tiles, halo ):
+        dstband.WriteArray( data, target[0], target[1] )
+        pending.update( bboxes )
+        done = done + 1
+        if not quiet_flag:
+            gdal.TermProgress_nocb( 0.9 * done / len(tiles) )
+
+    # Stitching pass: process again the uncertain regions with larger
+    # windows, until their fate is known. Only final pixels are written.
+    while len(pending) > 0:
+        halo = halo * 2
+        bboxes = list(pending)
+        pending = set()
+        for (target, data, uncertain, new_bboxes) in run( bboxes, halo ):
+            (xoff, yoff, w, h) = target
+            current = dstband.ReadAsArray( xoff, yoff, w, h )
+            current[~uncertain] = data[~uncertain]
+            dstband.WriteArray( current, xoff, yoff )
+            pending.update( new_bboxes )
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    if not quiet_flag:
+        gdal.TermProgress_nocb( 1.0 )
+
+    return 0
+
+# =============================================================================
+# 	Mainline
+# =============================================================================
+
+def main( argv ):
+
+    threshold = 2
+    connectedness = 4
+    options = []
+    quiet_flag = 0
+    src_filename = None
+
+    dst_filename = None
+    format = 'GTiff'
+
+    mask = 'default'
+
+    tile_size = None
+    num_jobs = 1
+
+    gdal.AllRegister()
+    argv = gdal.GeneralCmdLineProcessor( argv )
+    if argv is None:
+        return 0
+
+    # Parse command line arguments.
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == '-of':
+            i = i + 1
+            format = argv[i]
+
+        elif arg == '-4':
+            connectedness = 4
+
+        elif arg == '-8':
+            connectedness = 8
+
+        elif arg == '-q' or arg == '-quiet':
+            quiet_flag = 1
+
+        elif arg == '-st':
+            i = i + 1
+            threshold = int(argv[i])
+
+        elif arg == '-nomask':
+            mask = 'none'
+
+        elif arg == '-mask':
+            i = i + 1
+            mask = argv[i]
+
+        elif arg == '-mask':
+            i = i + 1
+            mask = argv[i]
+
+        elif arg == '-tile':
+            i = i + 1
+            tile_size = int(argv[i])
+
+        elif arg == '-j':
+            i = i + 1
+            num_jobs = int(argv[i])
+
+        elif arg[:2] == '-h':
+            Usage()
+
+        elif src_filename is None:
+            src_filename = argv[i]
+
+        elif dst_filename is None:
+            dst_filename = argv[i]
+
+        else:
+            Usage()
+
+        i = i + 1
+
+    if src_filename is None:
         Usage()
 
-    i = i + 1
+    if num_jobs > 1 and tile_size is None:
+        tile_size = 4096
+
+    if tile_size is not None and dst_filename is None:
+        print('A destination file is required in tiled mode.')
+        return 1
 
-if src_filename is None:
-    Usage()
-    
 # =============================================================================
 # 	Verify we have next gen bindings with the sievefilter method.
 # =============================================================================
-try:
-    gdal.SieveFilter
-except:
-    print('')
-    print('gdal.SieveFilter() not available.  You are likely using "old gen"')
-    print('bindings or an older version of the next gen bindings.')
-    print('')
-    sys.exit(1)
+    try:
+        gdal.SieveFilter
+    except:
+        print('')
+        print('gdal.SieveFilter() not available.  You are likely using "old gen"')
+        print('bindings or an older version of the next gen bindings.')
+        print('')
+        return 1
 
 # =============================================================================
 #	Open source file
 # =============================================================================
 
-if dst_filename is None:
-    src_ds = gdal.Open( src_filename, gdal.GA_Update )
-else:
-    src_ds = gdal.Open( src_filename, gdal.GA_ReadOnly )
-    
-if src_ds is None:
-    print('Unable to open %s ' % src_filename)
-    sys.exit(1)
+    if dst_filename is None:
+        src_ds = gdal.Open( src_filename, gdal.GA_Update )
+    else:
+        src_ds = gdal.Open( src_filename, gdal.GA_ReadOnly )
+
+    if src_ds is None:
+        print('Unable to open %s ' % src_filename)
+        return 1
 
-srcband = src_ds.GetRasterBand(1)
+    srcband = src_ds.GetRasterBand(1)
 
-if mask is 'default':
-    maskband = srcband.GetMaskBand()
-elif mask is 'none':
-    maskband = None
-else:
-    mask_ds = gdal.Open( mask )
-    maskband = mask_ds.GetRasterBand(1)
+    mask_ds = None
+    if mask == 'default':
+        maskband = srcband.GetMaskBand()
+    elif mask == 'none':
+        maskband = None
+    else:
+        mask_ds = gdal.Open( mask )
+        maskband = mask_ds.GetRasterBand(1)
 
 # =============================================================================
 #       Create output file if one is specified.
 # =============================================================================
 
-if dst_filename is not None:
+    if dst_filename is not None:
 
-    drv = gdal.GetDriverByName(format)
-    dst_ds = drv.Create( dst_filename,src_ds.RasterXSize, src_ds.RasterYSize,1,
-                         srcband.DataType )
-    wkt = src_ds.GetProjection()
-    if wkt != '':
-        dst_ds.SetProjection( wkt )
-    dst_ds.SetGeoTransform( src_ds.GetGeoTransform() )
-    
-    dstband = dst_ds.GetRasterBand(1)
-else:
-    dstband = srcband
+        drv = gdal.GetDriverByName(format)
+        dst_ds = drv.Create( dst_filename,src_ds.RasterXSize, src_ds.RasterYSize,1,
+                             srcband.DataType )
+        wkt = src_ds.GetProjection()
+        if wkt != '':
+            dst_ds.SetProjection( wkt )
+        dst_ds.SetGeoTransform( src_ds.GetGeoTransform() )
+
+        dstband = dst_ds.GetRasterBand(1)
+    else:
+        dstband = srcband
 
 # =============================================================================
 #	Invoke algorithm.
 # =============================================================================
 
-if quiet_flag:
-    prog_func = None
-else:
-    prog_func = gdal.TermProgress
-    
-result = gdal.SieveFilter( srcband, maskband, dstband,
-                           threshold, connectedness, 
-                           callback = prog_func )
-    
-src_ds = None
-dst_ds = None
-mask_ds = None
-
-
+    if tile_size is not None:
+        result = SieveTiled( src_filename, mask, dstband, threshold, connectedness,
+                             tile_size, num_jobs, quiet_flag )
+    else:
+        if quiet_flag:
+            prog_func = None
+        else:
+            prog_func = gdal.TermProgress
 
+        result = gdal.SieveFilter( srcband, maskband, dstband,
+                                   threshold, connectedness,
+                                   callback = prog_func )
 
+    src_ds = None
+    dst_ds = None
+    mask_ds = None
 
+    return 0
 
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
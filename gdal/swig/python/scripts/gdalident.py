@@ -36,73 +36,359 @@ except ImportError:
 import sys
 import stat
 import os
+import json
+import collections
+import multiprocessing
+import multiprocessing.pool
 
 # =============================================================================
 # 	Usage()
 # =============================================================================
 def Usage():
-    print('Usage: gdalident.py [-r] file(s)')
+    print('Usage: gdalident.py [-r] [-f] [-j num_jobs] [-json] [-fast]')
+    print('                    [-cache cache_file] file(s)')
     sys.exit(1)
 
 # =============================================================================
-# 	ProcessTarget()
+# 	ResultCache
 # =============================================================================
 
-def ProcessTarget( target, recursive, report_failure, filelist = None ):
+class ResultCache:
+    """ Persistent identification results keyed on (path, mtime, size) """
 
-    if filelist is not None:
-        driver = gdal.IdentifyDriver( target, filelist )
-    else:
-        driver = gdal.IdentifyDriver( target )
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = {}
+        if os.path.exists(filename):
+            try:
+                f = open(filename, 'r')
+                try:
+                    self.entries = json.load(f)
+                finally:
+                    f.close()
+            except ValueError:
+                print('Warning: ignoring corrupted cache %s' % filename)
 
-    if driver is not None:
-        print('%s: %s' % (target, driver.ShortName))
-    elif report_failure:
-        print('%s: unrecognised' % target)
+    def get(self, target, st):
+        entry = self.entries.get(target)
+        if entry is not None and entry[0] == st.st_mtime and entry[1] == st.st_size:
+            return (True, entry[2])
+        return (False, None)
 
-    if recursive and driver is None:
+    def put(self, target, st, driver_name):
+        self.entries[target] = [ st.st_mtime, st.st_size, driver_name ]
+
+    def save(self):
+        tmp_filename = self.filename + '.tmp'
+        f = open(tmp_filename, 'w')
+        try:
+            json.dump(self.entries, f)
+        finally:
+            f.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+        os.rename(tmp_filename, self.filename)
+
+# =============================================================================
+# 	MagicCache
+# =============================================================================
+
+class MagicCache:
+    """ Remembers the driver identified for a given extension and magic
+        number, the first bytes of the file, so that files looking the same
+        do not need to go through gdal.IdentifyDriver() again. As a few
+        formats rely on sidecar files, the extensions of the siblings
+        sharing the same basename are part of the key. Files of different
+        formats sharing all of these, such as formats based on TIFF, are
+        reported with the driver of the first one identified, so this is
+        only enabled with -fast. """
+
+    magic_size = 16
+
+    def __init__(self):
+        self.entries = {}
+
+    def key(self, target, filelist):
+        try:
+            f = open(target, 'rb')
+            try:
+                magic = f.read(self.magic_size)
+            finally:
+                f.close()
+        except (IOError, OSError):
+            return None
+
+        (basename, ext) = os.path.splitext(os.path.basename(target))
+        sidecars = []
+        if filelist is not None:
+            for item in filelist:
+                (item_basename, item_ext) = os.path.splitext(item)
+                if item_basename == basename and item_ext != ext:
+                    sidecars.append(item_ext.lower())
+        sidecars.sort()
+        return (ext.lower(), magic, tuple(sidecars))
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, driver_name):
+        self.entries[key] = driver_name
+
+# =============================================================================
+# 	IdentifyJob()
+#
+#	Identify a list of targets sharing the same list of sibling files.
+#	Run in the worker processes.
+# =============================================================================
+
+def IdentifyJob( args ):
+
+    (targets, filelist) = args
+    driver_names = []
+    for target in targets:
+        if filelist is not None:
+            driver = gdal.IdentifyDriver( target, filelist )
+        else:
+            driver = gdal.IdentifyDriver( target )
+        if driver is not None:
+            driver_names.append(driver.ShortName)
+        else:
+            driver_names.append(None)
+    return driver_names
+
+# =============================================================================
+# 	Scanner
+# =============================================================================
+
+class Scanner:
+    """ Identifies targets, and recursively the content of directories.
+        With several jobs, gdal.IdentifyDriver(), which does not release the
+        GIL, runs in a pool of worker processes, while os.stat(),
+        os.listdir() and the reading of the magic numbers of -fast run in a
+        pool of threads, so that their latency on network file systems
+        overlaps. Targets are processed by chunks of targets of the same
+        directory, with a bounded number of chunks in flight, and the
+        results of each chunk are written as soon as it is identified. The
+        caches are only updated in the main process. """
+
+    chunk_size = 64
+    io_threads_per_job = 4
+
+    def __init__(self, recursive, report_failure, num_jobs = 1,
+                 json_output = False, result_cache = None, magic_cache = None,
+                 out = None):
+        self.recursive = recursive
+        self.report_failure = report_failure
+        self.num_jobs = max(1, num_jobs)
+        self.json_output = json_output
+        self.result_cache = result_cache
+        self.magic_cache = magic_cache
+        if out is None:
+            out = sys.stdout
+        self.out = out
+
+    def Report(self, target, driver_name):
+        if driver_name is None and not self.report_failure:
+            return
+        if self.json_output:
+            line = json.dumps({ 'path': target, 'driver': driver_name })
+        elif driver_name is not None:
+            line = '%s: %s' % (target, driver_name)
+        else:
+            line = '%s: unrecognised' % target
+        self.out.write(line + '\n')
+
+    def Stat(self, target):
         try:
-            mode = os.stat(target)[stat.ST_MODE]
-        except:
-            mode = 0
-
-        if stat.S_ISDIR(mode):
-            subfilelist = os.listdir(target)
-            for item in subfilelist:
-                subtarget = os.path.join(target,item)
-                ProcessTarget( subtarget, 1, report_failure, subfilelist )
-            
+            return os.stat(target)
+        except OSError:
+            return None
+
+    def ListDir(self, target):
+        try:
+            return os.listdir(target)
+        except OSError:
+            return None
+
+    def Examine(self, task):
+        """ Returns (st, found, driver_name, magic_key) for a target, from
+            the caches. Only reads the caches, so that it can run in the
+            I/O threads. """
+        (target, filelist) = task
+        st = self.Stat(target)
+        if self.result_cache is not None and st is not None:
+            (found, driver_name) = self.result_cache.get(target, st)
+            if found:
+                return (st, True, driver_name, None)
+
+        key = None
+        if self.magic_cache is not None and st is not None and stat.S_ISREG(st.st_mode):
+            key = self.magic_cache.key(target, filelist)
+            if key is not None:
+                driver_name = self.magic_cache.get(key)
+                if driver_name is not None:
+                    return (st, True, driver_name, key)
+
+        return (st, False, None, key)
+
+    def Store(self, target, st, key, driver_name):
+        if key is not None and driver_name is not None:
+            self.magic_cache.put(key, driver_name)
+        if self.result_cache is not None and st is not None:
+            self.result_cache.put(target, st, driver_name)
+
+    def IsDirectoryToScan(self, st, driver_name):
+        return self.recursive and driver_name is None and \
+            st is not None and stat.S_ISDIR(st.st_mode)
+
+    def ProcessTask(self, target, filelist):
+        (st, found, driver_name, key) = self.Examine((target, filelist))
+        if not found:
+            driver_name = IdentifyJob(([target], filelist))[0]
+        self.Store(target, st, key, driver_name)
+        self.Report(target, driver_name)
+
+        if self.IsDirectoryToScan(st, driver_name):
+            subfilelist = self.ListDir(target)
+            if subfilelist is not None:
+                for item in subfilelist:
+                    self.ProcessTask(os.path.join(target, item), subfilelist)
+
+    def NextChunk(self, cursors):
+        # The cursor on top of the stack is a [directory, entries, index]
+        # list, directory being None for the targets of the command line
+        cursor = cursors[-1]
+        (dirname, items, start) = cursor
+        end = min(start + self.chunk_size, len(items))
+        if end == len(items):
+            cursors.pop()
+        else:
+            cursor[2] = end
+        if dirname is None:
+            return [ (item, None) for item in items[start:end] ]
+        return [ (os.path.join(dirname, item), items) for item in items[start:end] ]
+
+    def SubmitChunk(self, pool, io_pool, chunk):
+        examined = io_pool.map(self.Examine, chunk)
+        targets = [ chunk[i][0] for i in range(len(chunk)) if not examined[i][1] ]
+        result = None
+        if len(targets) > 0:
+            result = pool.apply_async(IdentifyJob, ((targets, chunk[0][1]),))
+        return (chunk, examined, result)
+
+    def FinishChunk(self, io_pool, cursors, submitted):
+        (chunk, examined, result) = submitted
+        if result is not None:
+            driver_names = iter(result.get())
+        dirs = []
+        for i in range(len(chunk)):
+            target = chunk[i][0]
+            (st, found, driver_name, key) = examined[i]
+            if not found:
+                driver_name = next(driver_names)
+            self.Store(target, st, key, driver_name)
+            self.Report(target, driver_name)
+            if self.IsDirectoryToScan(st, driver_name):
+                dirs.append(target)
+        self.out.flush()
+
+        # The directories are pushed on the stack of cursors, so that only
+        # the listings of the directories being scanned are held in memory
+        listings = io_pool.map(self.ListDir, dirs)
+        for i in range(len(dirs) - 1, -1, -1):
+            if listings[i]:
+                cursors.append([ dirs[i], listings[i], 0 ])
+
+    def Run(self, targets):
+        if self.num_jobs == 1:
+            for target in targets:
+                self.ProcessTask(target, None)
+            return
+
+        pool = multiprocessing.Pool(self.num_jobs)
+        io_pool = multiprocessing.pool.ThreadPool(self.io_threads_per_job * self.num_jobs)
+        try:
+            cursors = [ [ None, list(targets), 0 ] ]
+            in_flight = collections.deque()
+            while len(cursors) > 0 or len(in_flight) > 0:
+                while len(cursors) > 0 and len(in_flight) < 2 * self.num_jobs:
+                    in_flight.append(self.SubmitChunk(pool, io_pool, self.NextChunk(cursors)))
+                self.FinishChunk(io_pool, cursors, in_flight.popleft())
+        finally:
+            io_pool.close()
+            io_pool.join()
+            pool.close()
+            pool.join()
+
 # =============================================================================
 # 	Mainline
 # =============================================================================
 
-recursive = 0
-report_failure = 0
-files = []
+def main( argv ):
+
+    recursive = 0
+    report_failure = 0
+    num_jobs = 1
+    json_output = False
+    fast = False
+    cache_filename = None
+    files = []
+
+    gdal.AllRegister()
+    argv = gdal.GeneralCmdLineProcessor( argv )
+    if argv is None:
+        return 0
+
+    # Parse command line arguments.
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == '-r':
+            recursive = 1
+
+        elif arg == '-f':
+            report_failure = 1
+
+        elif arg == '-j' and i < len(argv)-1:
+            i = i + 1
+            num_jobs = int(argv[i])
+
+        elif arg == '-json':
+            json_output = True
+
+        elif arg == '-fast':
+            fast = True
+
+        elif arg == '-cache' and i < len(argv)-1:
+            i = i + 1
+            cache_filename = argv[i]
+
+        else:
+            files.append(arg)
 
-gdal.AllRegister()
-argv = gdal.GeneralCmdLineProcessor( sys.argv )
-if argv is None:
-    sys.exit( 0 )
+        i = i + 1
 
-# Parse command line arguments.
-i = 1
-while i < len(argv):
-    arg = argv[i]
+    if len(files) == 0:
+        Usage()
 
-    if arg == '-r':
-        recursive = 1
+    result_cache = None
+    if cache_filename is not None:
+        result_cache = ResultCache(cache_filename)
 
-    elif arg == '-f':
-        report_failure = 1
+    magic_cache = None
+    if fast:
+        magic_cache = MagicCache()
 
-    else:
-        files.append(arg)
+    scanner = Scanner( recursive, report_failure, num_jobs = num_jobs,
+                       json_output = json_output, result_cache = result_cache,
+                       magic_cache = magic_cache )
+    scanner.Run( files )
 
-    i = i + 1
+    if result_cache is not None:
+        result_cache.save()
 
-if len(files) == 0:
-    Usage()
+    return 0
 
-for file in files:
-    ProcessTarget( file, recursive, report_failure )
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
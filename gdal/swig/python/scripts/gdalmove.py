@@ -31,6 +31,7 @@
 from osgeo import gdal, osr
 import sys
 import math
+import multiprocessing
 
 ###############################################################################
 def fmt_loc( srs_obj, loc):
@@ -38,14 +39,84 @@ def fmt_loc( srs_obj, loc):
         return '%12.3f %12.3f' % (loc[0], loc[1])
     else:
         return '%12.8f %12.8f' % (loc[0], loc[1])
-    
+
+###############################################################################
+def apply_gt( gt, loc ):
+    return (gt[0] + loc[0] * gt[1] + loc[1] * gt[2],
+            gt[3] + loc[0] * gt[4] + loc[1] * gt[5],
+            loc[2])
+
+###############################################################################
+def grid_pixel_line( xsize, ysize, grid_size ):
+
+    # grid_size x grid_size points regularly spaced over the image,
+    # including its edges.
+    points = []
+    for j in range(grid_size):
+        for i in range(grid_size):
+            points.append( (xsize * i / float(grid_size - 1),
+                            ysize * j / float(grid_size - 1),
+                            0.0) )
+    return points
+
 ###############################################################################
-def move( filename, t_srs, s_srs=None, pixel_threshold = None ):
+def fit_geotransform( pixel_line, geo ):
+
+    # Least squares fit of geo = gt(pixel_line). Coordinates are centered
+    # on their means, which leaves a 2x2 system for the linear terms of
+    # each axis.
+    try:
+        import numpy
+        pl = numpy.array(pixel_line, dtype = numpy.float64)[:, 0:2]
+        g = numpy.array(geo, dtype = numpy.float64)[:, 0:2]
+        pl_mean = pl.mean(axis = 0)
+        g_mean = g.mean(axis = 0)
+        pl = pl - pl_mean
+        g = g - g_mean
+        sxx = (pl[:, 0] * pl[:, 0]).sum()
+        sxy = (pl[:, 0] * pl[:, 1]).sum()
+        syy = (pl[:, 1] * pl[:, 1]).sum()
+        sx = (pl[:, 0:1] * g).sum(axis = 0)
+        sy = (pl[:, 1:2] * g).sum(axis = 0)
+        pl_mean = list(pl_mean)
+        g_mean = list(g_mean)
+    except ImportError:
+        n = float(len(pixel_line))
+        pl_mean = [ sum([p[k] for p in pixel_line]) / n for k in (0, 1) ]
+        g_mean = [ sum([p[k] for p in geo]) / n for k in (0, 1) ]
+        pl = [ (p[0] - pl_mean[0], p[1] - pl_mean[1]) for p in pixel_line ]
+        g = [ (p[0] - g_mean[0], p[1] - g_mean[1]) for p in geo ]
+        sxx = sum([p[0] * p[0] for p in pl])
+        sxy = sum([p[0] * p[1] for p in pl])
+        syy = sum([p[1] * p[1] for p in pl])
+        sx = [ sum([pl[i][0] * g[i][k] for i in range(len(pl))]) for k in (0, 1) ]
+        sy = [ sum([pl[i][1] * g[i][k] for i in range(len(pl))]) for k in (0, 1) ]
+
+    det = sxx * syy - sxy * sxy
+    gt = []
+    for k in (0, 1):
+        a = (sx[k] * syy - sy[k] * sxy) / det
+        b = (sy[k] * sxx - sx[k] * sxy) / det
+        gt += [ float(g_mean[k] - a * pl_mean[0] - b * pl_mean[1]),
+                float(a), float(b) ]
+
+    return tuple(gt)
+
+###############################################################################
+def move( filename, t_srs, s_srs=None, pixel_threshold = None,
+          grid_size = None, quiet = False ):
+
+    if grid_size is not None and grid_size < 2:
+        print('The grid size must be at least 2.')
+        return None
 
     # -------------------------------------------------------------------------
     # Open the file. 
     # -------------------------------------------------------------------------
     ds = gdal.Open( filename )
+    if ds is None:
+        print('Unable to open %s' % filename)
+        return None
 
     # -------------------------------------------------------------------------
     # Compute the current (s_srs) locations of the four corners and center
@@ -65,55 +136,63 @@ def move( filename, t_srs, s_srs=None, pixel_threshold = None ):
         (ds.RasterXSize, ds.RasterYSize, 0),
         (ds.RasterXSize/2.0, ds.RasterYSize/2.0, 0.0) ]
 
-    orig_gt = ds.GetGeoTransform()
+    # Optional dense grid of check points, transformed along with the
+    # corners.
+    if grid_size is not None:
+        grid = grid_pixel_line( ds.RasterXSize, ds.RasterYSize, grid_size )
+    else:
+        grid = []
 
+    orig_gt = ds.GetGeoTransform()
 
     corners_s_geo = []
-    for item in corners_pixel_line:
-        corners_s_geo.append( \
-            (orig_gt[0] + item[0] * orig_gt[1] + item[1] * orig_gt[2],
-             orig_gt[3] + item[0] * orig_gt[4] + item[1] * orig_gt[5],
-             item[2]) )
-        
+    for item in corners_pixel_line + grid:
+        corners_s_geo.append( apply_gt( orig_gt, item ) )
+
     # -------------------------------------------------------------------------
-    # Prepare a transformation from source to destination srs. 
+    # Prepare a transformation from source to destination srs. Spatial
+    # references and transformations are cached, which matters when many
+    # files are processed.
     # -------------------------------------------------------------------------
     if s_srs is None:
         s_srs = ds.GetProjectionRef()
 
-    s_srs_obj = osr.SpatialReference()
-    s_srs_obj.SetFromUserInput( s_srs )
-    
-    t_srs_obj = osr.SpatialReference()
-    t_srs_obj.SetFromUserInput( t_srs )
+    s_srs_obj = osr.GetCachedSpatialReference( s_srs )
+    t_srs_obj = osr.GetCachedSpatialReference( t_srs )
 
-    tr = osr.CoordinateTransformation( s_srs_obj, t_srs_obj )
+    tr = osr.GetCachedCoordinateTransformation( s_srs_obj, t_srs_obj )
 
     # -------------------------------------------------------------------------
-    # Transform the corners
+    # Transform the corners, and the grid points, in a single call.
     # -------------------------------------------------------------------------
     
     corners_t_geo = tr.TransformPoints( corners_s_geo )
+    grid_t_geo = corners_t_geo[len(corners_pixel_line):]
+    corners_t_geo = corners_t_geo[:len(corners_pixel_line)]
+    corners_s_geo = corners_s_geo[:len(corners_pixel_line)]
     
     # -------------------------------------------------------------------------
-    #  Compute a new geotransform for the image in the target SRS.  For now
-    #  we just use the top left, top right, and bottom left to produce the
-    #  geotransform.  The result will be exact at these three points by
-    #  definition, but if the underlying transformation is not affine it will
-    #  be wrong at the center and bottom right.  It would be better if we
-    #  used all five points for a least squares fit but that is a bit beyond
-    #  me for now. 
+    #  Compute a new geotransform for the image in the target SRS.  With a
+    #  grid of check points, this is a least squares fit on all of them.
+    #  Otherwise we just use the top left, top right, and bottom left to
+    #  produce the geotransform.  The result will be exact at these three
+    #  points by definition, but if the underlying transformation is not
+    #  affine it will be wrong at the center and bottom right.
     # -------------------------------------------------------------------------
-    ul = corners_t_geo[0]
-    ur = corners_t_geo[2]
-    ll = corners_t_geo[1]
-    
-    new_gt = (ul[0],
-              (ur[0] - ul[0]) / ds.RasterXSize,
-              (ll[0] - ul[0]) / ds.RasterYSize,
-              ul[1],
-              (ur[1] - ul[1]) / ds.RasterXSize,
-              (ll[1] - ul[1]) / ds.RasterYSize)
+    if grid_size is not None:
+        new_gt = fit_geotransform( grid, grid_t_geo )
+
+    else:
+        ul = corners_t_geo[0]
+        ur = corners_t_geo[2]
+        ll = corners_t_geo[1]
+
+        new_gt = (ul[0],
+                  (ur[0] - ul[0]) / ds.RasterXSize,
+                  (ll[0] - ul[0]) / ds.RasterYSize,
+                  ul[1],
+                  (ur[1] - ul[1]) / ds.RasterXSize,
+                  (ll[1] - ul[1]) / ds.RasterYSize)
 
     (x,inv_new_gt) = gdal.InvGeoTransform( new_gt )
     
@@ -126,15 +205,13 @@ def move( filename, t_srs, s_srs=None, pixel_threshold = None ):
     error_pixel_line = []
     corners_pixel_line_new = []
     
-    print('___Corner___ ________Original________  _______Adjusted_________   ______ Err (geo) ______ _Err (pix)_')
+    if not quiet:
+        print('___Corner___ ________Original________  _______Adjusted_________   ______ Err (geo) ______ _Err (pix)_')
 
     for i in range(len(corners_s_geo)):
 
         item = corners_pixel_line[i]
-        corners_t_new_geo.append( 
-            (new_gt[0] + item[0] * new_gt[1] + item[1] * new_gt[2],
-             new_gt[3] + item[0] * new_gt[4] + item[1] * new_gt[5],
-             item[2]) )
+        corners_t_new_geo.append( apply_gt( new_gt, item ) )
 
         error_geo.append( (corners_t_new_geo[i][0] - corners_t_geo[i][0],
                            corners_t_new_geo[i][1] - corners_t_geo[i][1],
@@ -142,35 +219,47 @@ def move( filename, t_srs, s_srs=None, pixel_threshold = None ):
 
 
         item = corners_t_geo[i]
-        corners_pixel_line_new.append(
-            (inv_new_gt[0] + item[0] * inv_new_gt[1] + item[1] * inv_new_gt[2],
-             inv_new_gt[3] + item[0] * inv_new_gt[4] + item[1] * inv_new_gt[5],
-             item[2]) )
+        corners_pixel_line_new.append( apply_gt( inv_new_gt, item ) )
 
         error_pixel_line.append(
             (corners_pixel_line_new[i][0] - corners_pixel_line[i][0],
              corners_pixel_line_new[i][1] - corners_pixel_line[i][1],
              corners_pixel_line_new[i][2] - corners_pixel_line[i][2]) )
 
-        print( '%-11s %s %s %s %5.2f %5.2f' % \
-            (corners_names[i],
-             fmt_loc(s_srs_obj, corners_s_geo[i]),
-             fmt_loc(t_srs_obj, corners_t_geo[i]),
-             fmt_loc(t_srs_obj, error_geo[i]),
-             error_pixel_line[i][0],
-             error_pixel_line[i][1]))
+        if not quiet:
+            print( '%-11s %s %s %s %5.2f %5.2f' % \
+                (corners_names[i],
+                 fmt_loc(s_srs_obj, corners_s_geo[i]),
+                 fmt_loc(t_srs_obj, corners_t_geo[i]),
+                 fmt_loc(t_srs_obj, error_geo[i]),
+                 error_pixel_line[i][0],
+                 error_pixel_line[i][1]))
 
-    print('')
+    if not quiet:
+        print('')
 
     # -------------------------------------------------------------------------
-    # Do we want to update the file?
+    #  Errors on the grid points.
     # -------------------------------------------------------------------------
-    max_error = 0
-    for err_item in error_pixel_line:
-        this_error = math.sqrt(err_item[0] * err_item[0] + err_item[1] * err_item[1])
-        if this_error > max_error:
-            max_error = this_error
+    for i in range(len(grid)):
+        item = apply_gt( inv_new_gt, grid_t_geo[i] )
+        error_pixel_line.append( (item[0] - grid[i][0],
+                                  item[1] - grid[i][1],
+                                  0.0) )
+
+    errors = [ math.sqrt(err_item[0] * err_item[0] + err_item[1] * err_item[1])
+               for err_item in error_pixel_line ]
+    max_error = max(errors)
+    rms_error = math.sqrt(sum([err * err for err in errors]) / len(errors))
+
+    if grid_size is not None and not quiet:
+        print('Least squares fit on a %dx%d grid of check points:' % (grid_size, grid_size))
+        print('  RMS error: %.5f pixels, maximum error: %.5f pixels' % (rms_error, max_error))
+        print('')
 
+    # -------------------------------------------------------------------------
+    # Do we want to update the file?
+    # -------------------------------------------------------------------------
     update = 0
     if pixel_threshold is not None:
         if pixel_threshold > max_error:
@@ -183,10 +272,15 @@ def move( filename, t_srs, s_srs=None, pixel_threshold = None ):
         ds = None
         ds = gdal.Open( filename, gdal.GA_Update )
 
-        print('Updating file...')
+        if not quiet:
+            print('Updating file...')
         ds.SetGeoTransform( new_gt )
         ds.SetProjection( t_srs_obj.ExportToWkt() )
-        print('Done.')
+        if not quiet:
+            print('Done.')
+
+    elif quiet:
+        pass
 
     elif pixel_threshold is None:
         print('No error threshold in pixels selected with -et, file not updated.')
@@ -197,11 +291,63 @@ error threshold so the file has not been updated.""" % max_error)
     
     ds = None
 
+    return (new_gt, max_error, rms_error, update)
+
+###############################################################################
+def move_worker( args ):
+
+    (filename, t_srs, s_srs, pixel_threshold, grid_size) = args
+    try:
+        result = move( filename, t_srs, s_srs, pixel_threshold, grid_size,
+                       quiet = True )
+    except Exception as e:
+        return (filename, None, str(e))
+    return (filename, result, None)
+
+###############################################################################
+def move_list( filenames, t_srs, s_srs, pixel_threshold, grid_size,
+               num_jobs ):
+
+    jobs = [ (filename, t_srs, s_srs, pixel_threshold, grid_size)
+             for filename in filenames ]
+
+    if num_jobs > 1:
+        pool = multiprocessing.Pool( num_jobs )
+        results = pool.imap( move_worker, jobs, 16 )
+    else:
+        pool = None
+        results = ( move_worker( job ) for job in jobs )
+
+    failures = 0
+    for (filename, result, message) in results:
+        if result is None:
+            if message is not None:
+                print('%s: failed: %s' % (filename, message))
+            else:
+                print('%s: failed' % filename)
+            failures += 1
+            continue
+
+        (new_gt, max_error, rms_error, update) = result
+        if update:
+            status = 'updated'
+        else:
+            status = 'not updated'
+        print('%s: max error %.5f pixels, RMS error %.5f pixels, %s' %
+              (filename, max_error, rms_error, status))
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    return failures
+
 ###############################################################################
 def Usage():
     print("""
 gdalmove.py [-s_srs <srs_defn>] -t_srs <srs_defn>
-            [-et <max_pixel_err>] target_file
+            [-et <max_pixel_err>] [-grid <n>]
+            {target_file | -list <file_list> [-j <num_jobs>]}
 """)
     sys.exit(1)
     
@@ -225,6 +371,9 @@ if __name__ == '__main__':
     update=0
     filename = None
     pixel_threshold = None
+    grid_size = None
+    list_filename = None
+    num_jobs = 1
 
     # Script argument parsing.
 
@@ -243,6 +392,21 @@ if __name__ == '__main__':
             pixel_threshold = float(argv[i+1])
             i += 1
 
+        elif argv[i] == '-grid' and i < len(argv)-1:
+            grid_size = int(argv[i+1])
+            if grid_size < 2:
+                print('The grid size (-grid) must be at least 2.')
+                Usage()
+            i += 1
+
+        elif argv[i] == '-list' and i < len(argv)-1:
+            list_filename = argv[i+1]
+            i += 1
+
+        elif argv[i] == '-j' and i < len(argv)-1:
+            num_jobs = int(argv[i+1])
+            i += 1
+
         elif filename == None:
             filename = argv[i]
 
@@ -254,7 +418,7 @@ if __name__ == '__main__':
         # next argument
 
 
-    if filename is None:
+    if filename is None and list_filename is None:
         print('Missing name of file to operate on, but required.')
         Usage()
 
@@ -262,5 +426,18 @@ if __name__ == '__main__':
         print('Target SRS (-t_srs) missing, but required.')
         Usage()
 
+    if list_filename is not None:
+        if list_filename == '-':
+            lines = sys.stdin.readlines()
+        else:
+            lines = open(list_filename).readlines()
+        filenames = [ line.strip() for line in lines if line.strip() != '' ]
+        if filename is not None:
+            filenames.insert( 0, filename )
 
-    move( filename, t_srs, s_srs, pixel_threshold )
+        if move_list( filenames, t_srs, s_srs, pixel_threshold, grid_size,
+                      num_jobs ) != 0:
+            sys.exit( 1 )
+
+    else:
+        move( filename, t_srs, s_srs, pixel_threshold, grid_size )